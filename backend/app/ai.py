@@ -1,73 +1,117 @@
 import os
-import json
-from typing import List, Dict, Any, Tuple
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import List, Dict, Any, Tuple, Optional, Callable
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from app.prompt_builder import PromptBuilder, BuiltPrompt
+from app.prompts import (
+    INSTRUCTIONS, ROOT_CAUSE_TEMPLATE, MERGE_TEMPLATE, ACTION_TEMPLATE,
+    SCORING_TEMPLATE, SCORING_SUMMARY_TEMPLATE
+)
+from app.llm_provider import LLMProvider, get_default_provider
+from app.schemas import (
+    RootCauseScoreResponse, MergeRootCauseResult, ActionSuggestionResult,
+    ScoreItemsResult, ScoringSummaryResult
+)
+from app.metrics import scoring_latency
+from app.clustering import RootCauseCluster, cluster_root_causes, reconcile_merge_result, SINGLE, DUPLICATE
+from app.embeddings import get_sentence_model
+from app.tracing import span
+from app.logging_config import configure_logging, log_event, debug_event
+from app.structured_output import StructuredOutputError, json_schema_for, parse_structured
+from app.single_flight import SingleFlight, request_key
+from app.llm_limiter import AdaptiveLimiter, LLMOverloaded, get_llm_limiter
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger('root_cause_ai')
 
+# Scoring execution: requests with more root causes than SCORE_FANOUT_THRESHOLD
+# are scored in parallel chunks of SCORE_CHUNK_SIZE instead of one big generation
+SCORE_FANOUT_THRESHOLD = int(os.getenv("SCORE_FANOUT_THRESHOLD", "6"))
+SCORE_CHUNK_SIZE = int(os.getenv("SCORE_CHUNK_SIZE", "3"))
+SCORE_MAX_CONCURRENCY = int(os.getenv("SCORE_MAX_CONCURRENCY", "4"))
+
+# Embedding pre-clustering before the LLM merge of submitted root causes
+MERGE_PRECLUSTER = os.getenv("MERGE_PRECLUSTER", "true").lower() == "true"
+
+# Identical suggestion requests in flight at the same time share one LLM call
+suggestion_flight = SingleFlight("suggestions")
+
+
+def choose_scoring_mode(item_count: int) -> str:
+    """
+    Pick the scoring execution mode for a number of root causes
+
+    Args:
+        item_count (int): Number of root causes to score
+
+    Returns:
+        str: 'fanout' above SCORE_FANOUT_THRESHOLD items, otherwise 'single'
+    """
+    return "fanout" if item_count > SCORE_FANOUT_THRESHOLD else "single"
+
 
 class RootCauseAI:
     """
     AI module for suggesting root causes based on historical data
-    using Gemini model through Langchain
+    using an LLM provider (Gemini through Langchain by default)
     """
 
-    def __init__(self):
-        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        self.model = ChatGoogleGenerativeAI(
-            model="models/gemini-2.5-flash-preview-05-20",
-            google_api_key=self.gemini_api_key,
-            temperature=0.2
-        )
+    def __init__(self, provider: Optional[LLMProvider] = None,
+                 embedder: Optional[Callable[[List[str]], Any]] = None,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        # The provider is shared process-wide, so static instructions are
+        # registered (and cached by Gemini) once rather than sent per request
+        self.provider = provider or get_default_provider()
+        for key, instructions in INSTRUCTIONS.items():
+            self.provider.register_instruction(key, instructions)
+
+        # Texts -> embedding array for merge pre-clustering; defaults to the shared sentence model
+        self.embedder = embedder
+
+        # Adaptive concurrency limit around every LLM call, shared process-wide by default
+        self.limiter = limiter or get_llm_limiter()
+
+        # Token accounting of the most recent prompt sent by this instance
+        self.last_prompt_stats: Dict[str, Any] = {}
+        self.last_merge_stats: Dict[str, Any] = {}
+
+    def _invoke(self, call_name: str, instruction_key: str, built: BuiltPrompt, output_schema: Any = None) -> str:
+        """
+        Send the per-request part of a prompt to the model and return the raw text response
+
+        Args:
+            call_name (str): Name of the calling method, for logging
+            instruction_key (str): Key of the static instructions registered with the provider
+            built (BuiltPrompt): Rendered per-request prompt with token accounting
+            output_schema: Expected output type, requested as schema-constrained JSON
+
+        Returns:
+            str: Raw text content of the model response
+        """
+        self.last_prompt_stats = {**built.stats(), "instruction_key": instruction_key}
+
+        # One structured line per call; full prompt and response only in debug traces
+        log_event(logger, logging.INFO, "llm_call", sample_rate=1.0, call=call_name, **self.last_prompt_stats)
+        debug_event(logger, "llm_prompt", call=call_name, prompt=built.text)
+
+        response_schema = json_schema_for(output_schema) if output_schema is not None else None
+        with span("llm", instruction=instruction_key, prompt_tokens=built.tokens):
+            result = self.limiter.call(
+                lambda: self.provider.generate(instruction_key, built.text, response_schema=response_schema))
 
-        # ===== Cara mengganti model ke DeepSeek AI =====
-        # 1. Install langchain-deepseek:
-        # pip install -U langchain-deepseek
-        #
-        # 2. Import DeepSeek integration:
-        # from langchain_deepseek import ChatDeepSeek
-        #
-        # 3. Tambahkan deepseek_api_key ke .env file:
-        # DEEPSEEK_API_KEY=your_api_key_here
-        #
-        # 4. Ganti kode di atas dengan ini:
-        # self.deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
-        # self.model = ChatDeepSeek(
-        #     model="deepseek-chat",  # atau model lain sesuai kebutuhan
-        #     temperature=0.2
-        # )
-        #
-        # ===== Cara mengganti model ke OpenAI (GPT) =====
-        # 1. Install langchain-openai:
-        # pip install -U langchain-openai
-        #
-        # 2. Import OpenAI integration:
-        # from langchain_openai import ChatOpenAI
-        #
-        # 3. Tambahkan openai_api_key ke .env file:
-        # OPENAI_API_KEY=your_api_key_here
-        #
-        # 4. Ganti kode di atas dengan ini:
-        # self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        # self.model = ChatOpenAI(
-        #     model="gpt-4-turbo",  # atau model lain seperti gpt-3.5-turbo
-        #     openai_api_key=self.openai_api_key,
-        #     temperature=0.2
-        # )
-
-    def create_root_cause_prompt(self, area: str, problem: str, category: str, historical_data: List[Dict[str, Any]]) -> str:
+        debug_event(logger, "llm_response", call=call_name, response=result)
+        return result
+
+    def create_root_cause_prompt(self, area: str, problem: str, category: str, historical_data: List[Dict[str, Any]],
+                                 priors: str = "") -> BuiltPrompt:
         """
         Create a prompt for the AI model to suggest root causes
 
@@ -76,72 +120,21 @@ class RootCauseAI:
             problem (str): Description of the problem
             category (str): Category of the problem (4M+1E)
             historical_data (list): List of historical data (optimized) from database
+            priors (str): Root cause frequency section (root_cause_stats.format_priors), or ''
 
         Returns:
-            PromptTemplate: Configured prompt template for the AI
-        """
-        # Convert historical data to a formatted string for the prompt
-        historical_examples = ""
-
-        if historical_data:
-            valid_records = [r for r in historical_data if isinstance(r, dict) and all(
-                k in r for k in ['area', 'problem', 'root_cause', 'category'])]
-            if not valid_records:
-                historical_examples = "No valid historical data available (missing keys).\n"
-            else:
-                # Limit to 10 examples to avoid token limits
-                for i, record in enumerate(valid_records[:10]):
-                    historical_examples += f"Example {i+1}:\n"
-                    historical_examples += f"- Area: {record['area']}\n"
-                    historical_examples += f"- Problem: {record['problem']}\n"
-                    historical_examples += f"- Root Cause: {record['root_cause']}\n"
-                    historical_examples += f"- Category: {record['category']}\n\n"
-        else:
-            historical_examples = "No historical data available for this area.\n"
-
-        template = f"""
-        Anda adalah AI expert untuk analisa root cause di industri manufaktur packaging.
-        
-        ## Instruksi:
-        - Berikan jawaban dalam **Bahasa Indonesia** yang natural, seperti catatan teknisi di database.
-        - Gunakan istilah teknis dalam bahasa Inggris **hanya untuk istilah mesin/teknis**,
-          namun penjelasan dan kalimat utama tetap dominan Bahasa Indonesia.
-        - Gaya bahasa harus mirip data historis di database: campuran, tidak full English.
-        - Jawaban harus singkat, padat, dan mudah dipahami operator/teknisi.
-        - Perbaiki semua jawaban agar jelas dan terstruktur, bahkan jika data historis menggunakan kata-kata yang kurang jelas.
-        - Berikan jawaban yang tegas dan spesifik tanpa keraguan
-        - Hindari penggunaan tanda "/" dalam jawaban
-        - Pilih satu istilah yang paling tepat, jangan memberikan alternatif
-        
-        ## Context:
-        - Area: {{area}}
-        - Category (4M+1E): {{category}}
-        - Problem: {{problem}}
-        
-        ## Data Historis (area & category sama):
-        {{historical_data}}
-        
-        ## Task:
-        Berdasarkan problem dan pola historis, berikan 3-5 root cause paling mungkin.
-        
-        Format jawaban: JSON array string, contoh:
-        ["Root cause 1", "Root cause 2", "Root cause 3"]
-        
-        ## Penting:
-        - Jika problem sangat mirip dengan data historis, prioritaskan root cause tersebut.
-        - Jika tidak ada data mirip, gunakan pengetahuan manufaktur umum.
-        - Jawaban harus relevan dengan area, problem, dan category.
-        - **Jangan gunakan full English** kecuali istilah teknis.
+            BuiltPrompt: Rendered prompt within the 'root_cause' token budget
         """
-
-        prompt = PromptTemplate(
-            input_variables=["area", "problem", "category", "historical_data"],
-            template=template
+        return PromptBuilder("root_cause", ROOT_CAUSE_TEMPLATE).build(
+            variables={"area": area, "problem": problem, "category": category, "priors": priors},
+            records=historical_data,
+            columns=["area", "problem", "root_cause", "category"],
+            context_columns={"area": area, "category": category},
+            empty_message="No historical data available for this area."
         )
 
-        return prompt
-
-    def suggest_root_causes(self, area: str, problem: str, category: str, historical_data: List[Dict[str, Any]]) -> List[str]:
+    def suggest_root_causes(self, area: str, problem: str, category: str, historical_data: List[Dict[str, Any]],
+                            priors: str = "") -> List[str]:
         """
         Generate root cause suggestions using LLM reasoning
 
@@ -151,212 +144,162 @@ class RootCauseAI:
             category (str): Category (4M+1E) of the problem
             historical_data (list): List of semantically filtered historical data from database
             containing only area, problem, root_cause, and category columns
+            priors (str): Root cause frequency section for the prompt, or ''
 
         Returns:
             list: List of suggested root causes
         """
+        return suggestion_flight.do(
+            self._suggestion_key("suggest_root_causes", area, problem, category, historical_data, priors=priors),
+            lambda: self._generate_root_causes(area, problem, category, historical_data, priors))
+
+    async def suggest_root_causes_async(self, area: str, problem: str, category: str,
+                                        historical_data: List[Dict[str, Any]], priors: str = "") -> List[str]:
+        """suggest_root_causes() for async handlers; coalesces with sync callers"""
+        return await suggestion_flight.do_async(
+            self._suggestion_key("suggest_root_causes", area, problem, category, historical_data, priors=priors),
+            lambda: self._generate_root_causes(area, problem, category, historical_data, priors))
+
+    def _suggestion_key(self, operation: str, area: str, problem: str, category: str,
+                        historical_data: List[Dict[str, Any]], root_cause: Optional[str] = None,
+                        priors: str = "") -> str:
+        """Single-flight key: normalized inputs plus the provider answering them"""
+        return request_key(operation, provider=id(self.provider), area=area, problem=problem,
+                           category=category, root_cause=root_cause, historical_data=historical_data,
+                           priors=priors)
+
+    def _generate_root_causes(self, area: str, problem: str, category: str,
+                              historical_data: List[Dict[str, Any]], priors: str = "") -> List[str]:
+        """Build the prompt and ask the model for root causes (one LLM call)"""
         try:
             # Create prompt with the semantically filtered data from database
             prompt = self.create_root_cause_prompt(
-                area, problem, category, historical_data)
-
-            # Use the modern pattern with | operator instead of deprecated LLMChain
-            chain = prompt | self.model
-
-            # Create a structured historical data string focusing only on problem and root cause
-            valid_records = [r for r in historical_data if isinstance(r, dict) and all(
-                k in r for k in ['area', 'problem', 'root_cause', 'category'])]
-            if not valid_records:
-                historical_data_str = "No valid historical data available (missing keys)."
-            else:
-                # Limit to only top 5 records to minimize token usage
-                top_records = valid_records[:5]
-                historical_data_str = "\n".join(
-                    [f"- Area: {record['area']}\n  Problem: {record['problem']}\n  Root Cause: {record['root_cause']}\n  Category: {record['category']}" for record in top_records])
-                if len(valid_records) > 5:
-                    historical_data_str += f"\n(Showing top 5 of {len(valid_records)} records)"
-
-            # Prepare input for logging
-            input_data = {
-                "area": area,
-                "problem": problem,
-                "category": category,
-                "historical_data": historical_data_str
-            }
+                area, problem, category, historical_data, priors)
 
-            # Log the prompt being sent to the AI
-            logger.info(f"\n{'='*50}\nAPI CALL: suggest_root_causes\n{'='*50}")
-            logger.info(f"PROMPT:\n{prompt.template}")
-            logger.info(
-                f"INPUT DATA:\n{json.dumps(input_data, indent=2, ensure_ascii=False)}")
-
-            # Invoke the AI model
-            result = chain.invoke(input_data)
-
-            # Log the raw response from the AI
-            raw_response = result.content if hasattr(
-                result, 'content') else str(result)
-            logger.info(f"RAW AI RESPONSE:\n{raw_response}\n{'='*50}")
-            # Modern LangChain returns AIMessage objects
-            # Extract the text content from the AIMessage
-            if hasattr(result, 'content'):
-                result = result.content
-            elif isinstance(result, dict) and "text" in result:
-                result = result["text"]
-
-            # Process the result to extract the list of root causes
-            # Expecting a JSON array from the LLM
-            # json is already imported at the top of the file
-            try:
-                # Clean up the result to make sure it's a valid JSON array
-                cleaned_result = result.strip() if isinstance(
-                    result, str) else str(result).strip()
-                if cleaned_result.startswith("```json"):
-                    cleaned_result = cleaned_result.replace(
-                        "```json", "").replace("```", "").strip()
-
-                suggested_causes = json.loads(cleaned_result)
-                return suggested_causes
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                # Split by newlines or commas if the LLM didn't return proper JSON
-                fallback_causes = [
-                    cause.strip()
-                    for cause in result.replace("[", "").replace("]", "").replace('"', "").split(",")
-                    if cause.strip()
-                ]
-                return fallback_causes[:5]  # Limit to 5 causes
+            # Invoke the AI model, expecting a JSON array of strings
+            result = self._invoke("suggest_root_causes", "root_cause", prompt, List[str])
+            return parse_structured(result, List[str], "root_cause")
 
+        except LLMOverloaded:
+            # Shed calls become HTTP 503 + Retry-After, not an error list
+            raise
+        except StructuredOutputError as e:
+            print(f"Error parsing AI suggestion: {str(e)}")
+            return ["Error generating suggestions. Please try again."]
         except Exception as e:
             print(f"Error in AI suggestion: {str(e)}")
             return ["Error generating suggestions. Please try again."]
 
+    def _embed(self, texts: List[str]) -> Any:
+        """Embed texts with the injected embedder or the shared sentence model"""
+        if self.embedder is not None:
+            return self.embedder(texts)
+        model = get_sentence_model()
+        if model is None:
+            raise RuntimeError("Sentence transformer model is not available")
+        return model.encode(texts)
+
+    def _cluster_for_merge(self, root_causes_data: List[Dict[str, Any]]) -> Optional[List[RootCauseCluster]]:
+        """Pre-cluster submitted root causes; None when clustering is disabled or unavailable"""
+        if not MERGE_PRECLUSTER or len(root_causes_data) < 2:
+            return None
+        try:
+            return cluster_root_causes([item["root_cause"] for item in root_causes_data], self._embed)
+        except Exception as e:
+            logger.warning(f"Root cause pre-clustering unavailable, merging with the LLM only: {str(e)}")
+            return None
+
+    def _merge_with_llm(self, entries: List[Dict[str, Any]], columns: List[str]) -> Dict[str, Any]:
+        """Ask the model to merge entries and reconcile its answer with the input"""
+        # Root causes are sent as a compact table; every user's entry must
+        # come back, so nothing is deduplicated or dropped
+        prompt = PromptBuilder("merge", MERGE_TEMPLATE).build(
+            variables={},
+            records=entries,
+            columns=columns,
+            table_variable="root_causes_table",
+            empty_message="(kosong)",
+            dedup=False,
+            enforce_budget=False
+        )
+        result = self._invoke("analyze_and_merge_root_causes", "merge", prompt, MergeRootCauseResult)
+        merged = parse_structured(result, MergeRootCauseResult, "merge").model_dump()
+        return reconcile_merge_result(merged, entries)
+
     def analyze_and_merge_root_causes(self, root_causes_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Analyze a list of root causes from different users and merge similar ones
         while preserving all user information
 
+        Root causes are first clustered by embedding similarity. Clusters of
+        near-identical entries are merged locally under their most central
+        wording, singletons stay individual, and only ambiguous clusters are
+        sent to the LLM. Without an embedding model the whole list goes to
+        the LLM.
+
         Args:
             root_causes_data (list): List of dictionaries with 'root_cause' and 'user_id' keys
 
         Returns:
             dict: A dictionary containing both merged and original root causes with user information
         """
-        try:
-            # Create the prompt for analyzing and merging similar root causes
-            template = """
-            Anda adalah AI expert untuk analisa root cause di industri manufaktur packaging.
-            
-            ## Instruksi:
-            - Analisis daftar root cause berikut yang berasal dari berbagai user
-            - Identifikasi root cause yang mirip atau memiliki maksud yang sama
-            - Gabungkan (merge) root cause yang mirip tersebut menjadi satu formulasi yang lebih baik
-            - Tetap pertahankan informasi user_id untuk setiap root cause, bahkan yang sudah digabungkan
-            - Berikan jawaban dalam format JSON yang mudah diproses
-            
-            ## Data Root Cause dari Berbagai User:
-            {root_causes_json}
-            
-            ## Format Output yang Diharapkan:
-            ```json
-            {{
-              "merged_root_causes": [
-                {{
-                  "merged_root_cause": "[Root cause hasil penggabungan]",
-                  "original_data": [
-                    {{ "root_cause": "[original root cause 1]", "user_id": "[user_id 1]" }},
-                    {{ "root_cause": "[original root cause 2]", "user_id": "[user_id 2]" }}
-                  ]
-                }}
-              ],
-              "individual_root_causes": [
-                {{ "root_cause": "[root cause yang tidak digabung]", "user_id": "[user_id]" }}
-              ]
-            }}
-            ```
-            
-            ## Penting:
-            - Root cause yang sangat mirip harus digabung menjadi satu formulasi yang lebih baik
-            - Root cause yang berbeda harus dipertahankan sebagai individual
-            - Setiap root cause (baik yang digabung maupun individual) harus mempertahankan informasi user_id aslinya
-            - JSON output harus valid dan mengikuti format yang ditentukan
-            
-            Berikan output JSON-nya saja, tanpa penjelasan tambahan:
-            """
-
-            # Convert the root causes data to JSON string for the prompt
-            root_causes_json = json.dumps(
-                root_causes_data, ensure_ascii=False, indent=2)
-
-            # Create a prompt template
-            prompt = PromptTemplate(
-                input_variables=["root_causes_json"], template=template)
-
-            # Use the modern pattern with | operator
-            chain = prompt | self.model
-
-            # Log the prompt being sent to the AI
-            logger.info(
-                f"\n{'='*50}\nAPI CALL: analyze_and_merge_root_causes\n{'='*50}")
-            logger.info(f"PROMPT:\n{prompt.template}")
-            logger.info(f"INPUT DATA:\n{root_causes_json}")
-
-            # Invoke the chain with the JSON string
-            result = chain.invoke({"root_causes_json": root_causes_json})
-
-            # Log the raw response from the AI
-            raw_response = result.content if hasattr(
-                result, 'content') else str(result)
-            logger.info(f"RAW AI RESPONSE:\n{raw_response}\n{'='*50}")
-
-            # Extract the text content from the AIMessage
-            if hasattr(result, 'content'):
-                result = result.content
-            elif isinstance(result, dict) and "text" in result:
-                result = result["text"]
-
-            # Process the result to extract the JSON output
+        merged: List[Dict[str, Any]] = []
+        individual: List[Dict[str, Any]] = []
+        llm_entries: List[Dict[str, Any]] = []
+        columns = ["user_id", "root_cause"]
+
+        clusters = self._cluster_for_merge(root_causes_data)
+        if clusters is None:
+            llm_entries = list(root_causes_data)
+        else:
+            columns = ["cluster", "user_id", "root_cause"]
+            for number, cluster in enumerate(clusters, 1):
+                items = [{"root_cause": root_causes_data[i]["root_cause"],
+                          "user_id": root_causes_data[i]["user_id"]} for i in cluster.members]
+                if cluster.kind == SINGLE:
+                    individual.extend(items)
+                elif cluster.kind == DUPLICATE:
+                    merged.append({
+                        "merged_root_cause": root_causes_data[cluster.representative]["root_cause"],
+                        "original_data": items
+                    })
+                else:
+                    llm_entries.extend({**item, "cluster": number} for item in items)
+
+        self.last_merge_stats = {
+            "entries": len(root_causes_data),
+            "clusters": len(clusters) if clusters is not None else None,
+            "merged_locally": len(merged),
+            "llm_entries": len(llm_entries),
+        }
+        log_event(logger, logging.INFO, "merge_clustering", sample_rate=1.0, **self.last_merge_stats)
+
+        merged_result: Dict[str, Any] = {}
+        if llm_entries:
             try:
-                # Clean up the result to make sure it's a valid JSON
-                cleaned_result = result.strip() if isinstance(
-                    result, str) else str(result).strip()
-
-                # Remove code block markers if present
-                if cleaned_result.startswith("```json"):
-                    cleaned_result = cleaned_result.replace(
-                        "```json", "").replace("```", "").strip()
-                elif cleaned_result.startswith("```"):
-                    cleaned_result = cleaned_result.replace(
-                        "```", "", 2).strip()
-
-                # Parse the JSON result
-                merged_result = json.loads(cleaned_result)
-
-                # Add a field to track all original data for reference
-                merged_result["all_original_data"] = root_causes_data
-
-                return merged_result
-
-            except json.JSONDecodeError as e:
-                # Return an error message if JSON parsing fails
+                llm_result = self._merge_with_llm(llm_entries, columns)
+                merged.extend(llm_result["merged_root_causes"])
+                individual.extend(llm_result["individual_root_causes"])
+            except LLMOverloaded:
+                # Shed calls become HTTP 503 + Retry-After, not an error list
+                raise
+            except StructuredOutputError as e:
+                # Keep the local merges; ambiguous entries stay as submitted
                 print(f"Error parsing AI response as JSON: {str(e)}")
-                return {
-                    "error": "Failed to parse AI response",
-                    "merged_root_causes": [],
-                    "individual_root_causes": root_causes_data,
-                    "all_original_data": root_causes_data
-                }
-
-        except Exception as e:
-            print(f"Error in AI merging analysis: {str(e)}")
-            return {
-                "error": f"Error analyzing root causes: {str(e)}",
-                "merged_root_causes": [],
-                "individual_root_causes": root_causes_data,
-                "all_original_data": root_causes_data
-            }
-
-    def create_action_prompt(self, area: str, problem: str, root_cause: str, category: str, historical_data: List[Dict[str, Any]]) -> PromptTemplate:
+                merged_result["error"] = "Failed to parse AI response"
+                individual.extend({"root_cause": item["root_cause"], "user_id": item["user_id"]} for item in llm_entries)
+            except Exception as e:
+                print(f"Error in AI merging analysis: {str(e)}")
+                merged_result["error"] = f"Error analyzing root causes: {str(e)}"
+                individual.extend({"root_cause": item["root_cause"], "user_id": item["user_id"]} for item in llm_entries)
+
+        merged_result["merged_root_causes"] = merged
+        merged_result["individual_root_causes"] = individual
+        # Add a field to track all original data for reference
+        merged_result["all_original_data"] = root_causes_data
+        return merged_result
+
+    def create_action_prompt(self, area: str, problem: str, root_cause: str, category: str, historical_data: List[Dict[str, Any]]) -> BuiltPrompt:
         """
         Create a prompt for the AI model to suggest temporary and preventive actions
 
@@ -368,83 +311,19 @@ class RootCauseAI:
             historical_data (list): List of historical data (optimized) from database
 
         Returns:
-            PromptTemplate: Configured prompt template for the AI
-        """
-        # Convert historical data to a formatted string for the prompt
-        historical_examples = ""
-
-        if historical_data:
-            valid_records = [r for r in historical_data if isinstance(r, dict) and
-                             all(k in r for k in ['area', 'problem', 'root_cause', 'category', 'temporary_action', 'preventive_action'])]
-            if not valid_records:
-                historical_examples = "No valid historical data available (missing action fields).\n"
-            else:
-                # Limit to 10 examples to avoid token limits
-                for i, record in enumerate(valid_records[:10]):
-                    historical_examples += f"Example {i+1}:\n"
-                    historical_examples += f"- Area: {record['area']}\n"
-                    historical_examples += f"- Problem: {record['problem']}\n"
-                    historical_examples += f"- Root Cause: {record['root_cause']}\n"
-                    historical_examples += f"- Category: {record['category']}\n"
-                    historical_examples += f"- Temporary Action: {record['temporary_action']}\n"
-                    historical_examples += f"- Preventive Action: {record['preventive_action']}\n\n"
-        else:
-            historical_examples = "No historical data available for this area and category.\n"
-
-        template = """
-        Anda adalah AI expert untuk menganalisa dan membuat temporary action dan preventive action di industri manufaktur packaging.
-        
-        ## Instruksi:
-        - Berikan jawaban dalam **Bahasa Indonesia** yang natural, seperti catatan teknisi di database.
-        - Gunakan istilah teknis dalam bahasa Inggris **hanya untuk istilah mesin/teknis**,
-          namun penjelasan dan kalimat utama tetap dominan Bahasa Indonesia.
-        - Gaya bahasa harus mirip data historis di database: campuran, tidak full English.
-        - Jawaban harus singkat, padat, dan mudah dipahami operator/teknisi.
-        - Perbaiki semua jawaban agar jelas dan terstruktur, bahkan jika data historis menggunakan kata-kata yang kurang jelas.
-        - Berikan jawaban yang tegas dan spesifik tanpa keraguan
-        - Hindari penggunaan tanda "/" dalam jawaban
-        - Pilih satu istilah yang paling tepat, jangan memberikan alternatif
-        
-        ## Context:
-        - Area: {area}
-        - Category (4M+1E): {category}
-        - Problem: {problem}
-        - Root Cause: {root_cause}
-        
-        ## Data Historis (area & category sama):
-        {historical_data}
-        
-        ## Task:
-        Berdasarkan problem, root cause, dan pola historis, berikan saran untuk:
-        1. Temporary Action (3-5 saran) - tindakan cepat untuk mengatasi masalah sementara
-        2. Preventive Action (3-5 saran) - tindakan pencegahan jangka panjang agar masalah tidak terulang
-        
-        Format jawaban: JSON dengan format:
-        ```json
-        {{{{
-            "temporary_actions": ["Temporary action 1", "Temporary action 2", "Temporary action 3"],
-            "preventive_actions": ["Preventive action 1", "Preventive action 2", "Preventive action 3"]
-        }}}}
-        ```
-        
-        ## Penting:
-        - Jika problem sangat mirip dengan data historis, prioritaskan tindakan yang pernah berhasil.
-        - Jika tidak ada data mirip, gunakan pengetahuan manufaktur umum.
-        - Jawaban harus relevan dengan area, problem, root cause, dan category.
-        - **Jangan gunakan full English** kecuali istilah teknis.
-        - Temporary action fokus pada solusi cepat untuk mengatasi gejala.
-        - Preventive action fokus pada solusi jangka panjang yang mengatasi akar masalah.
+            BuiltPrompt: Rendered prompt within the 'action' token budget
         """
-
-        prompt = PromptTemplate(
-            input_variables=["area", "problem",
-                             "root_cause", "category", "historical_data"],
-            template=template
+        return PromptBuilder("action", ACTION_TEMPLATE).build(
+            variables={"area": area, "problem": problem,
+                       "root_cause": root_cause, "category": category},
+            records=historical_data,
+            columns=["area", "problem", "root_cause", "category",
+                     "temporary_action", "preventive_action"],
+            context_columns={"area": area, "category": category},
+            empty_message="No historical data available for this area and category."
         )
 
-        return prompt
-
-    def create_scoring_prompt(self, area: str, problem: str, category: str, root_causes: List[str]) -> PromptTemplate:
+    def create_scoring_prompt(self, area: str, problem: str, category: str, root_causes: List[str]) -> BuiltPrompt:
         """
         Create a prompt for the AI model to score root causes based on quality benchmark criteria
 
@@ -455,99 +334,20 @@ class RootCauseAI:
             root_causes (list): List of root causes to be scored
 
         Returns:
-            PromptTemplate: Configured prompt template for the AI
+            BuiltPrompt: Rendered prompt within the 'scoring' token budget
         """
         # Format the root causes as a numbered list for the prompt
-        root_causes_text = ""
-        for i, cause in enumerate(root_causes):
-            root_causes_text += f"{i+1}. {cause}\n"
-
-        template = """
-        Anda adalah AI expert untuk analisa root cause di industri manufaktur packaging.
-        
-        ## Instruksi:
-        - Berikan penilaian (scoring) untuk setiap root cause yang diinput user
-        - Gunakan kriteria benchmark sebagai acuan penilaian
-        - Setiap root cause diberi nilai berdasarkan kualitas, relevansi, dan kejelasannya
-        - Berikan jawaban dalam format JSON yang mudah diproses
-        
-        ## Context:
-        - Area: {area}
-        - Category (4M+1E): {category}
-        - Problem: {problem}
-        
-        ## Root Causes untuk Dinilai:
-        {root_causes_text}
-        
-        ## Kriteria Benchmark Penilaian:
-        1. Spesifisitas (1-25 poin): Seberapa spesifik root cause dalam menjelaskan masalah
-            - 1-5: Sangat umum, tidak spesifik
-            - 6-15: Cukup spesifik
-            - 16-25: Sangat spesifik dan detail
-            
-        2. Relevansi dengan Problem (1-25 poin): Seberapa relevan root cause dengan problem yang dijelaskan
-            - 1-5: Tidak relevan dengan problem
-            - 6-15: Cukup relevan
-            - 16-25: Sangat relevan dan tepat sasaran
-            
-        3. Kejelasan Analisis (1-25 poin): Seberapa jelas root cause dalam mengidentifikasi penyebab
-            - 1-5: Tidak jelas, membingungkan
-            - 6-15: Cukup jelas
-            - 16-25: Sangat jelas dan mudah dipahami
-            
-        4. Actionability (1-25 poin): Seberapa mudah root cause dapat ditindaklanjuti
-            - 1-5: Sulit untuk ditindaklanjuti
-            - 6-15: Cukup dapat ditindaklanjuti
-            - 16-25: Sangat mudah untuk ditindaklanjuti
-        
-        ## Format Jawaban:
-        Berikan output JSON dengan format:
-        ```json
-        {{
-          "scores": [
-            {{
-              "root_cause": "Root cause 1",
-              "spesifisitas": 20,
-              "relevansi": 18,
-              "kejelasan": 22,
-              "actionability": 19,
-              "total_score": 79,
-              "feedback": "Feedback singkat tentang root cause ini"
-            }},
-            {{
-              "root_cause": "Root cause 2",
-              "spesifisitas": 15,
-              "relevansi": 20,
-              "kejelasan": 18,
-              "actionability": 16,
-              "total_score": 69,
-              "feedback": "Feedback singkat tentang root cause ini"
-            }}
-          ],
-          "summary": "Rangkuman singkat tentang hasil penilaian keseluruhan"
-        }}
-        ```
-        
-        ## Penting:
-        - Berikan nilai yang objektif sesuai dengan kriteria benchmark
-        - Total score adalah jumlah dari semua kriteria (range 4-100 poin)
-        - Nilai per kriteria harus dalam range 1-25
-        - Nilai total harus dalam range 4-100
-        - Feedback harus singkat, konstruktif, dan dalam Bahasa Indonesia
-        - Summary harus memberikan gambaran keseluruhan hasil penilaian
-        
-        Berikan output JSON-nya saja, tanpa penjelasan tambahan:
-        """
+        root_causes_text = "\n".join(
+            f"{i+1}. {cause}" for i, cause in enumerate(root_causes))
 
-        prompt = PromptTemplate(
-            input_variables=["area", "problem",
-                             "category", "root_causes_text"],
-            template=template
+        return PromptBuilder("scoring", SCORING_TEMPLATE).build(
+            variables={"area": area, "problem": problem, "category": category,
+                       "root_causes_text": root_causes_text},
+            table_variable="historical_data"
         )
 
-        return prompt
-
-    def score_root_causes(self, area: str, problem: str, category: str, root_causes: List[str]) -> Dict[str, Any]:
+    def score_root_causes(self, area: str, problem: str, category: str, root_causes: List[str],
+                          mode: Optional[str] = None) -> Dict[str, Any]:
         """
         Score root causes based on quality benchmark criteria
 
@@ -556,100 +356,144 @@ class RootCauseAI:
             problem (str): Description of the problem
             category (str): Category (4M+1E) of the problem
             root_causes (list): List of root causes to be scored
+            mode (str): 'single' (one call) or 'fanout' (parallel chunks plus a
+                separate summary call); chosen from the item count when omitted
 
         Returns:
             dict: Dictionary with scores and feedback for each root cause
         """
+        mode = mode or choose_scoring_mode(len(root_causes))
+        with scoring_latency.time(mode=mode):
+            if mode == "fanout":
+                return self._score_fanout(area, problem, category, root_causes)
+            return self._score_single(area, problem, category, root_causes)
+
+    def _score_single(self, area: str, problem: str, category: str, root_causes: List[str]) -> Dict[str, Any]:
+        """Score all root causes and write the summary in one LLM call"""
         try:
             # Create the prompt for scoring root causes
             prompt = self.create_scoring_prompt(
                 area, problem, category, root_causes)
 
-            # Use the modern pattern with | operator
-            chain = prompt | self.model
-
-            # Format root causes as text for the prompt
-            root_causes_text = ""
-            for i, cause in enumerate(root_causes):
-                root_causes_text += f"{i+1}. {cause}\n"
-
-            # Prepare input for logging
-            input_data = {
-                "area": area,
-                "problem": problem,
-                "category": category,
-                "root_causes_text": root_causes_text
-            }
-
-            # Log the prompt being sent to the AI
-            logger.info(f"\n{'='*50}\nAPI CALL: score_root_causes\n{'='*50}")
-            logger.info(f"PROMPT:\n{prompt.template}")
-            logger.info(
-                f"INPUT DATA:\n{json.dumps(input_data, indent=2, ensure_ascii=False)}")
-
-            # Invoke the chain with the input variables
-            result = chain.invoke(input_data)
-
-            # Log the raw response from the AI
-            raw_response = result.content if hasattr(
-                result, 'content') else str(result)
-            logger.info(f"RAW AI RESPONSE:\n{raw_response}\n{'='*50}")
+            # Invoke the AI model
+            result = self._invoke("score_root_causes", "scoring", prompt, RootCauseScoreResponse)
+            return parse_structured(result, RootCauseScoreResponse, "scoring").model_dump()
+
+        except LLMOverloaded:
+            # Shed calls become HTTP 503 + Retry-After, not an error list
+            raise
+        except StructuredOutputError as e:
+            print(f"Error parsing AI scoring response: {str(e)}")
+            return self._scoring_error(root_causes, f"Error parsing scoring result: {str(e)}")
+        except Exception as e:
+            print(f"Error in AI root cause scoring: {str(e)}")
+            return self._scoring_error(root_causes, f"Error scoring root causes: {str(e)}")
 
-            # Extract the text content from the AIMessage
-            if hasattr(result, 'content'):
-                result = result.content
-            elif isinstance(result, dict) and "text" in result:
-                result = result["text"]
+    def _score_chunk(self, area: str, problem: str, category: str, root_causes: List[str]) -> Dict[str, Any]:
+        """Score one chunk of root causes (no summary); errors only affect this chunk"""
+        try:
+            prompt = self.create_scoring_prompt(area, problem, category, root_causes)
+            result = self._invoke("score_root_causes", "scoring_items", prompt, ScoreItemsResult)
+            chunk_result = parse_structured(result, ScoreItemsResult, "scoring_items").model_dump()
+        except LLMOverloaded:
+            # Shed calls become HTTP 503 + Retry-After, not an error list
+            raise
+        except StructuredOutputError as e:
+            logger.warning(f"Error parsing AI scoring chunk: {str(e)}")
+            return self._scoring_error(root_causes, f"Error parsing scoring result: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Error in AI root cause scoring chunk: {str(e)}")
+            return self._scoring_error(root_causes, f"Error scoring root causes: {str(e)}")
+
+        # Chunks are joined by position, so a missing or extra score would
+        # shift every score after it; the model may reword a root cause, so
+        # each score gets the submitted text back
+        scores = chunk_result["scores"]
+        if len(scores) != len(root_causes):
+            log_event(logger, logging.WARNING, "scoring_chunk_mismatch", sample_rate=1.0,
+                      expected=len(root_causes), returned=len(scores))
+            return self._scoring_error(
+                root_causes, f"Scoring result does not match the submitted root causes: "
+                             f"expected {len(root_causes)}, got {len(scores)}")
+        for item, cause in zip(scores, root_causes):
+            item["root_cause"] = cause
+        return chunk_result
+
+    def _score_fanout(self, area: str, problem: str, category: str, root_causes: List[str]) -> Dict[str, Any]:
+        """
+        Score root causes in parallel chunks under SCORE_MAX_CONCURRENCY, then
+        write the summary in a separate call over the merged scores
+        """
+        chunks = [root_causes[i:i + SCORE_CHUNK_SIZE]
+                  for i in range(0, len(root_causes), SCORE_CHUNK_SIZE)]
+
+        with ThreadPoolExecutor(max_workers=min(SCORE_MAX_CONCURRENCY, len(chunks))) as executor:
+            # Each worker runs in a copy of the request context so its spans
+            # are attributed to the calling endpoint
+            futures = [executor.submit(contextvars.copy_context().run,
+                                       self._score_chunk, area, problem, category, chunk)
+                       for chunk in chunks]
+            chunk_results = [future.result() for future in futures]
+
+        # Chunks come back in submission order, so the scores keep the input order
+        scores = [item for result in chunk_results for item in result["scores"]]
+        errors = [result["error"] for result in chunk_results if "error" in result]
+
+        if len(errors) == len(chunk_results):
+            return self._scoring_error(root_causes, errors[0])
+
+        scoring_result: Dict[str, Any] = {
+            "scores": scores,
+            "summary": self._summarize_scores(area, problem, category, scores)
+        }
+        if errors:
+            scoring_result["error"] = "; ".join(errors)
+        return scoring_result
+
+    def _summarize_scores(self, area: str, problem: str, category: str, scores: List[Dict[str, Any]]) -> str:
+        """Write the overall scoring summary from already computed scores"""
+        try:
+            prompt = PromptBuilder("scoring_summary", SCORING_SUMMARY_TEMPLATE).build(
+                variables={"area": area, "problem": problem, "category": category},
+                records=scores,
+                columns=["root_cause", "total_score", "feedback"],
+                table_variable="scores_table",
+                dedup=False
+            )
+            result = self._invoke("score_root_causes", "scoring_summary", prompt, ScoringSummaryResult)
+            return parse_structured(result, ScoringSummaryResult, "scoring_summary").summary
+        except Exception as e:
+            logger.warning(f"Error in AI scoring summary, using the best score instead: {str(e)}")
+            if not scores:
+                return "Ringkasan penilaian tidak tersedia."
+            best = max(scores, key=lambda item: item.get("total_score", 0))
+            return f"Root cause dengan skor tertinggi: {best['root_cause']} ({best['total_score']:.0f} poin)."
+
+    @staticmethod
+    def _scoring_error(root_causes: List[str], message: str) -> Dict[str, Any]:
+        """
+        Build a zero-score result that still satisfies RootCauseScoreResponse
 
-            # Process the result to extract the JSON output
-            # json is already imported at the top of the file
-            try:
-                # Clean up the result to make sure it's a valid JSON
-                cleaned_result = result.strip() if isinstance(
-                    result, str) else str(result).strip()
-
-                # Remove code block markers if present
-                if cleaned_result.startswith("```json"):
-                    cleaned_result = cleaned_result.replace(
-                        "```json", "").replace("```", "").strip()
-                elif cleaned_result.startswith("```"):
-                    cleaned_result = cleaned_result.replace(
-                        "```", "", 2).strip()
-
-                # Parse the JSON result
-                scoring_result = json.loads(cleaned_result)
-
-                # Ensure the expected keys are present
-                if "scores" not in scoring_result:
-                    raise ValueError("Missing 'scores' key in AI response")
-
-                return scoring_result
-
-            except (json.JSONDecodeError, ValueError) as e:
-                # Fallback if JSON parsing fails
-                print(f"Error parsing AI scoring response: {str(e)}")
-                # Return a basic error response
-                return {
-                    "error": f"Error parsing scoring result: {str(e)}",
-                    "scores": [{
-                        "root_cause": cause,
-                        "total_score": 0,
-                        "feedback": "Error saat menilai root cause."
-                    } for cause in root_causes],
-                    "summary": "Terjadi kesalahan dalam proses penilaian. Silakan coba lagi."
-                }
+        Args:
+            root_causes (list): Root causes that were submitted
+            message (str): Error description
 
-        except Exception as e:
-            print(f"Error in AI root cause scoring: {str(e)}")
-            return {
-                "error": f"Error scoring root causes: {str(e)}",
-                "scores": [{
-                    "root_cause": cause,
-                    "total_score": 0,
-                    "feedback": "Error saat menilai root cause."
-                } for cause in root_causes],
-                "summary": "Terjadi kesalahan dalam proses penilaian. Silakan coba lagi."
-            }
+        Returns:
+            dict: Scoring result with an 'error' key
+        """
+        return {
+            "error": message,
+            "scores": [{
+                "root_cause": cause,
+                "spesifisitas": 0,
+                "relevansi": 0,
+                "kejelasan": 0,
+                "actionability": 0,
+                "total_score": 0,
+                "feedback": "Error saat menilai root cause."
+            } for cause in root_causes],
+            "summary": "Terjadi kesalahan dalam proses penilaian. Silakan coba lagi."
+        }
 
     def suggest_actions(self, area: str, problem: str, root_cause: str, category: str, historical_data: List[Dict[str, Any]]) -> Dict[str, List[str]]:
         """
@@ -665,108 +509,38 @@ class RootCauseAI:
         Returns:
             dict: Dictionary with lists of suggested temporary and preventive actions
         """
+        return suggestion_flight.do(
+            self._suggestion_key("suggest_actions", area, problem, category, historical_data, root_cause),
+            lambda: self._generate_actions(area, problem, root_cause, category, historical_data))
+
+    async def suggest_actions_async(self, area: str, problem: str, root_cause: str, category: str,
+                                    historical_data: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """suggest_actions() for async handlers; coalesces with sync callers"""
+        return await suggestion_flight.do_async(
+            self._suggestion_key("suggest_actions", area, problem, category, historical_data, root_cause),
+            lambda: self._generate_actions(area, problem, root_cause, category, historical_data))
+
+    def _generate_actions(self, area: str, problem: str, root_cause: str, category: str,
+                          historical_data: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Build the prompt and ask the model for temporary and preventive actions (one LLM call)"""
         try:
             # Create the prompt for action suggestions with semantically filtered data from database
             prompt = self.create_action_prompt(
                 area, problem, root_cause, category, historical_data)
 
-            # Use the modern pattern with | operator
-            chain = prompt | self.model
-
-            # Create a structured historical data string focusing on actions
-            valid_records = [r for r in historical_data if isinstance(r, dict) and
-                             all(k in r for k in ['area', 'problem', 'root_cause', 'category', 'temporary_action', 'preventive_action'])]
-            if not valid_records:
-                historical_data_str = "No valid historical data available (missing action fields)."
-            else:
-                # Limit to only top 5 records to minimize token usage
-                top_records = valid_records[:5]
-                historical_data_str = "\n".join([
-                    f"- Area: {record['area']}\n  Problem: {record['problem']}\n  Root Cause: {record['root_cause']}\n  "
-                    f"Category: {record['category']}\n  Temporary Action: {record['temporary_action']}\n  "
-                    f"Preventive Action: {record['preventive_action']}"
-                    for record in top_records
-                ])
-                if len(valid_records) > 5:
-                    historical_data_str += f"\n(Showing top 5 of {len(valid_records)} records)"
-
-            # Prepare input for logging
-            input_data = {
-                "area": area,
-                "problem": problem,
-                "root_cause": root_cause,
-                "category": category,
-                "historical_data": historical_data_str
+            # Invoke the AI model
+            result = self._invoke("suggest_actions", "action", prompt, ActionSuggestionResult)
+            return parse_structured(result, ActionSuggestionResult, "action").model_dump()
+
+        except LLMOverloaded:
+            # Shed calls become HTTP 503 + Retry-After, not an error list
+            raise
+        except StructuredOutputError as e:
+            print(f"Error parsing AI response: {str(e)}")
+            return {
+                "temporary_actions": ["Error parsing temporary actions"],
+                "preventive_actions": ["Error parsing preventive actions"]
             }
-
-            # Log the prompt being sent to the AI
-            logger.info(f"\n{'='*50}\nAPI CALL: suggest_actions\n{'='*50}")
-            logger.info(f"PROMPT:\n{prompt.template}")
-            logger.info(
-                f"INPUT DATA:\n{json.dumps(input_data, indent=2, ensure_ascii=False)}")
-
-            # Invoke the chain with the input variables
-            result = chain.invoke(input_data)
-
-            # Log the raw response from the AI
-            raw_response = result.content if hasattr(
-                result, 'content') else str(result)
-            logger.info(f"RAW AI RESPONSE:\n{raw_response}\n{'='*50}")
-
-            # Extract the text content from the AIMessage
-            if hasattr(result, 'content'):
-                result = result.content
-            elif isinstance(result, dict) and "text" in result:
-                result = result["text"]
-
-            # Process the result to extract the JSON output
-            # json is already imported at the top of the file
-            try:
-                # Clean up the result to make sure it's a valid JSON
-                cleaned_result = result.strip() if isinstance(
-                    result, str) else str(result).strip()
-
-                # Remove code block markers if present
-                if cleaned_result.startswith("```json"):
-                    cleaned_result = cleaned_result.replace(
-                        "```json", "").replace("```", "").strip()
-                elif cleaned_result.startswith("```"):
-                    cleaned_result = cleaned_result.replace(
-                        "```", "", 2).strip()
-
-                # Parse the JSON result
-                actions = json.loads(cleaned_result)
-
-                # Ensure the expected keys are present
-                if "temporary_actions" not in actions or "preventive_actions" not in actions:
-                    raise ValueError("Missing expected keys in AI response")
-
-                return actions
-
-            except (json.JSONDecodeError, ValueError) as e:
-                # Fallback if JSON parsing fails
-                print(f"Error parsing AI response: {str(e)}")
-                # Attempt basic extraction if possible
-                temp_actions = []
-                prev_actions = []
-
-                # Very basic fallback parsing
-                if "temporary" in result.lower():
-                    temp_section = result.lower().split("temporary")[
-                        1].split("preventive")[0]
-                    temp_actions = [line.strip() for line in temp_section.split(
-                        "\n") if line.strip() and "-" in line]
-
-                if "preventive" in result.lower():
-                    prev_section = result.lower().split("preventive")[1]
-                    prev_actions = [line.strip() for line in prev_section.split(
-                        "\n") if line.strip() and "-" in line]
-
-                return {
-                    "temporary_actions": temp_actions[:5] if temp_actions else ["Error parsing temporary actions"],
-                    "preventive_actions": prev_actions[:5] if prev_actions else ["Error parsing preventive actions"]
-                }
-
         except Exception as e:
             print(f"Error in AI action suggestion: {str(e)}")
             return {
@@ -0,0 +1,180 @@
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import mysql.connector
+
+from app import db_backend
+from app.database import AREAS_QUERY, db_config
+from app.read_replica import get_replica_router
+from app.tracing import span
+
+# Configure logging
+logger = logging.getLogger('areas_cache')
+
+# GET /api/areas is served from a process-level copy of the line names,
+# without a DatabaseConnector (no sentence model) or a connection per
+# request. The copy is reloaded when AREAS_VERSION_FILE changes (touched by
+# invalidate_areas(): scripts/migrate_gemba_data.py and
+# POST /api/areas/invalidate after a new line is added, shared by all
+# workers on the host) and at the latest after AREAS_CACHE_TTL_SECONDS.
+# Clients may reuse a response for AREAS_CACHE_MAX_AGE seconds, then
+# revalidate it with If-None-Match.
+AREAS_CACHE_TTL_SECONDS = float(os.getenv("AREAS_CACHE_TTL_SECONDS", "300"))
+AREAS_CACHE_MAX_AGE = int(os.getenv("AREAS_CACHE_MAX_AGE", "60"))
+AREAS_VERSION_FILE = os.getenv("AREAS_VERSION_FILE", "data/areas.version")
+
+
+def load_areas(primary: bool = False) -> Optional[List[str]]:
+    """
+    Line names from the database
+
+    Args:
+        primary (bool): Read the primary even if a read replica is configured,
+            so a line that was just added is included
+
+    Returns:
+        list: Area names, or None on error
+    """
+    config = db_config()
+    connection = None
+    try:
+        if not primary:
+            connection = get_replica_router().read_connection(config)
+        if connection is None:
+            connection = db_backend.connect(config)
+        cursor = connection.cursor(dictionary=True)
+        with span("sql", query="areas"):
+            cursor.execute(AREAS_QUERY)
+            return [row["area"] for row in cursor.fetchall()]
+    except mysql.connector.Error as err:
+        logger.error(f"Error fetching areas: {err}")
+        return None
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+def _version(path: str) -> Tuple[int, int]:
+    """Identity of the version file (inode, mtime), (0, 0) when absent"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0, 0
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def etag_for(areas: List[str]) -> str:
+    return '"' + hashlib.sha1(json.dumps(areas).encode("utf-8")).hexdigest()[:16] + '"'
+
+
+class AreasCache:
+    """
+    Process-level copy of the areas list with its ETag
+
+    Args:
+        loader: Returns the areas, or None when they could not be read; called
+            with primary=True after an invalidation
+        ttl (float): Seconds before the list is reloaded without an invalidation
+        version_file (str): File touched to invalidate every process's copy
+    """
+
+    def __init__(self, loader: Callable[[bool], Optional[List[str]]] = load_areas,
+                 ttl: float = AREAS_CACHE_TTL_SECONDS, version_file: str = AREAS_VERSION_FILE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.version_file = version_file
+        self.clock = clock
+        self._areas: Optional[List[str]] = None
+        self._etag: Optional[str] = None
+        self._loaded_at = 0.0
+        self._loaded_version: Tuple[int, int] = (0, 0)
+        self._invalidated = False
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return (self._areas is not None and self.clock() - self._loaded_at < self.ttl
+                and _version(self.version_file) == self._loaded_version)
+
+    def get(self) -> Tuple[List[str], Optional[str]]:
+        """
+        Current areas and their ETag, reloading them when invalidated or expired
+
+        Returns:
+            tuple: (areas, etag); the last good list is kept if a reload fails,
+                and ([], None) is returned when nothing could be loaded
+        """
+        if self._fresh():
+            return self._areas, self._etag
+        with self._lock:
+            if self._fresh():
+                return self._areas, self._etag
+            version = _version(self.version_file)
+            # A replica may not have the new line yet
+            invalidated = self._invalidated or (self._areas is not None and version != self._loaded_version)
+            areas = self.loader(invalidated)
+            if areas is None:
+                if self._areas is None:
+                    return [], None
+                # Serve the previous list and retry on the next request
+                return self._areas, self._etag
+            self._areas, self._etag = areas, etag_for(areas)
+            self._loaded_at, self._loaded_version = self.clock(), version
+            self._invalidated = False
+            return self._areas, self._etag
+
+    def invalidate(self):
+        """Reload this copy and, through the version file, every other process's"""
+        with self._lock:
+            self._invalidated = True
+            self._loaded_at = float("-inf")
+        touch_version(self.version_file)
+
+
+def touch_version(path: str = AREAS_VERSION_FILE):
+    """Replace the version file, so its (inode, mtime) identity changes"""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "w") as f:
+            f.write(str(time.time_ns()))
+        os.replace(temp, path)
+    except OSError as e:
+        logger.warning(f"Could not update {path}, other processes keep their areas for up to "
+                       f"{AREAS_CACHE_TTL_SECONDS:.0f}s: {e}")
+
+
+_cache: Optional[AreasCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_areas_cache() -> AreasCache:
+    """Process-wide areas cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AreasCache()
+    return _cache
+
+
+def set_areas_cache(cache: Optional[AreasCache]):
+    """Replace the process-wide cache (used by tests)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def invalidate_areas():
+    """Call after inserting a line: every process reloads the areas on its next request"""
+    if _cache is not None:
+        _cache.invalidate()
+    else:
+        touch_version()
@@ -1,10 +1,15 @@
 import os
 import mysql.connector
+from app import db_backend
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 
+from app.attendance_events import attendance_broker
+from app.read_replica import get_replica_router, session_key, user_key
+from app.tracing import span
+
 # Load environment variables
 load_dotenv()
 
@@ -27,11 +32,13 @@ class AttendanceDB:
         }
         self.connection = None
         self.cursor = None
+        # Replica connection for pure reads, opened on first use
+        self.read_connection = None
 
     def connect(self):
         """Establish database connection"""
         try:
-            self.connection = mysql.connector.connect(**self.config)
+            self.connection = db_backend.connect(self.config)
             self.cursor = self.connection.cursor(dictionary=True)
             return True
         except mysql.connector.Error as err:
@@ -44,6 +51,34 @@ class AttendanceDB:
             self.cursor.close()
         if self.connection:
             self.connection.close()
+        if self.read_connection:
+            self.read_connection.close()
+            self.read_connection = None
+
+    def _read_cursor(self, *keys: str):
+        """
+        Cursor for a pure read: on the read replica when the router allows
+        it (app/read_replica.py), otherwise on the primary connection
+
+        Args:
+            keys: Read-your-writes keys of the read (user_key, session_key)
+        """
+        router = get_replica_router()
+        if self.read_connection is None or router.recently_written(*keys):
+            if self.read_connection is not None:
+                self.read_connection.close()
+            self.read_connection = router.read_connection(self.config, *keys)
+        if self.read_connection is not None:
+            return self.read_connection.cursor(dictionary=True)
+        if not self.connection or not self.connection.is_connected():
+            self.connect()
+        return self.cursor
+
+    @staticmethod
+    def _mark_written(user_id: str, session_id: Optional[int] = None):
+        """Send this user's (and session's) next reads to the primary"""
+        keys = [user_key(user_id)] + ([session_key(session_id)] if session_id is not None else [])
+        get_replica_router().mark_write(*keys)
 
     def validate_qr_token(self, qr_token: str) -> Optional[Dict[str, Any]]:
         """
@@ -190,7 +225,12 @@ class AttendanceDB:
                     }
                     
                     # Add pointss for attendance
-                    self._add_attendance_pointss(user_id, status)
+                    with span("points_write"):
+                        self._add_attendance_pointss(user_id, status)
+
+                    self._mark_written(user_id, session_id)
+                    self._publish_presence_event(
+                        session_id, "check_in", updated_data)
 
                     return True, "Presence updated successfully", updated_data
                 
@@ -217,6 +257,10 @@ class AttendanceDB:
                         "role": user['role']
                     }
 
+                    self._mark_written(user_id, session_id)
+                    self._publish_presence_event(
+                        session_id, "check_out", updated_data)
+
                     return True, "Presence updated successfully", updated_data
                 
                 # Just return the data if user has clocked out 
@@ -269,7 +313,8 @@ class AttendanceDB:
                 presence_id = self.cursor.lastrowid
 
                 # Add pointss for attendance
-                self._add_attendance_pointss(user_id, status)
+                with span("points_write"):
+                    self._add_attendance_pointss(user_id, status)
 
                 # Return new presence data
                 new_data = {
@@ -282,6 +327,9 @@ class AttendanceDB:
                     "role": user['role']
                 }
 
+                self._mark_written(user_id, session_id)
+                self._publish_presence_event(session_id, "check_in", new_data)
+
                 message = "Presence recorded successfully" if status == "present" else "Late attendance recorded"
                 return True, message, new_data
 
@@ -291,6 +339,25 @@ class AttendanceDB:
                 self.connection.rollback()
             return False, f"Error recording presence: {str(e)}", {}
 
+    def _publish_presence_event(self, session_id: int, event_type: str, presence_data: Dict[str, Any]):
+        """
+        Publish a check-in/check-out delta to live attendee stream subscribers
+
+        Args:
+            session_id (int): Session ID
+            event_type (str): 'check_in' or 'check_out'
+            presence_data (dict): Presence data as returned to the caller
+        """
+        try:
+            attendance_broker.publish(session_id, {
+                "type": event_type,
+                "session_id": session_id,
+                **presence_data
+            })
+        except Exception as e:
+            # Never let a live-stream problem fail the attendance write
+            logger.error(f"Error publishing attendance event: {str(e)}")
+
     def _add_attendance_pointss(self, user_id: str, status: str = 'PRESENT') -> bool:
         """
         Add pointss to user for attendance
@@ -407,6 +474,7 @@ class AttendanceDB:
             ))
 
             self.connection.commit()
+            self._mark_written(user_id)
             return True
 
         except Exception as e:
@@ -415,20 +483,21 @@ class AttendanceDB:
                 self.connection.rollback()
             return False
 
-    def get_session_attendees(self, session_id: int) -> list:
+    def get_session_attendees(self, session_id: int, user_id: Optional[str] = None) -> list:
         """
         Get list of attendees for a session
 
         Args:
             session_id (int): Session ID
+            user_id (str, optional): Requesting user, whose own recent
+                check-in must be visible
 
         Returns:
             list: List of attendees with presence data
         """
         try:
-            # Connect to database if not connected
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            keys = [session_key(session_id)] + ([user_key(user_id)] if user_id else [])
+            cursor = self._read_cursor(*keys)
 
             query = """
             SELECT p.id, p.user_id, p.status, p.time_in, p.time_out,
@@ -439,8 +508,8 @@ class AttendanceDB:
             ORDER BY p.time_in DESC
             """
 
-            self.cursor.execute(query, (session_id,))
-            attendees = self.cursor.fetchall()
+            cursor.execute(query, (session_id,))
+            attendees = cursor.fetchall()
 
             # Format datetime objects for JSON serialization
             formatted_attendees = []
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Dict, Any, Optional, Set
+
+# Configure logging
+logger = logging.getLogger('attendance_events')
+
+
+class AttendanceSubscription:
+    """
+    A single live subscriber to attendance events of one session.
+
+    Events are buffered in a bounded asyncio queue owned by the subscriber's
+    event loop. When the buffer is full the oldest event is dropped and the
+    subscription is flagged so the client can be told to resync.
+    """
+
+    def __init__(self, session_id: int, loop: asyncio.AbstractEventLoop, max_queue_size: int):
+        self.session_id = session_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]):
+        """Enqueue an event without ever blocking (runs on the subscriber loop)"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next event
+
+        Args:
+            timeout (float): Seconds to wait before giving up
+
+        Returns:
+            Optional[Dict[str, Any]]: The next event, or None on timeout
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AttendanceEventBroker:
+    """
+    In-process fan-out broker for attendance check-in/check-out events.
+
+    `publish` is called from the (threaded) request handlers that write
+    attendance records; it only schedules a non-blocking enqueue on each
+    subscriber's loop, so a slow client can never hold up a check-in write.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[int, Set[AttendanceSubscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id: int) -> AttendanceSubscription:
+        """
+        Register a subscriber for a session. Must be called from a running event loop.
+
+        Args:
+            session_id (int): Session ID to follow
+
+        Returns:
+            AttendanceSubscription: The new subscription
+        """
+        subscription = AttendanceSubscription(
+            session_id, asyncio.get_running_loop(), self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AttendanceSubscription):
+        """Remove a subscriber; safe to call more than once"""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.session_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.session_id]
+
+    def subscriber_count(self, session_id: Optional[int] = None) -> int:
+        """Number of live subscribers, optionally for one session only"""
+        with self._lock:
+            if session_id is not None:
+                return len(self._subscribers.get(session_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, session_id: int, event: Dict[str, Any]):
+        """
+        Fan an event out to every subscriber of the session. Never blocks.
+
+        Args:
+            session_id (int): Session the event belongs to
+            event (dict): JSON-serializable event payload
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop is closed; drop it
+                self.unsubscribe(subscription)
+
+
+def format_sse(event: Dict[str, Any], event_name: Optional[str] = None) -> str:
+    """
+    Encode an event as a Server-Sent Events frame
+
+    Args:
+        event (dict): JSON-serializable payload
+        event_name (str): Optional SSE event name
+
+    Returns:
+        str: The SSE frame
+    """
+    frame = ""
+    if event_name:
+        frame += f"event: {event_name}\n"
+    frame += f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    return frame
+
+
+# Process-wide broker shared by the attendance writers and the stream endpoint
+attendance_broker = AttendanceEventBroker(
+    max_queue_size=int(os.getenv('ATTENDANCE_STREAM_QUEUE_SIZE', '100')))
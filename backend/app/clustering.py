@@ -0,0 +1,172 @@
+import os
+import logging
+from typing import List, Dict, Any, Callable, Optional, Sequence
+
+import numpy as np
+
+from app.prompt_builder import normalize_text
+
+# Configure logging
+logger = logging.getLogger('clustering')
+
+# Cosine similarity at which root causes are candidates for the same cluster
+MERGE_CLUSTER_THRESHOLD = float(os.getenv("MERGE_CLUSTER_THRESHOLD", "0.75"))
+# Clusters whose members are all at least this similar are merged without the LLM
+MERGE_DUPLICATE_THRESHOLD = float(os.getenv("MERGE_DUPLICATE_THRESHOLD", "0.9"))
+
+SINGLE = "single"
+DUPLICATE = "duplicate"
+AMBIGUOUS = "ambiguous"
+
+
+class RootCauseCluster:
+    """
+    A group of submitted root causes that are candidates for one merged entry
+    """
+
+    def __init__(self, members: List[int], kind: str, representative: int, min_similarity: float):
+        self.members = members
+        self.kind = kind
+        self.representative = representative
+        self.min_similarity = min_similarity
+
+    def __repr__(self):
+        return f"RootCauseCluster(kind={self.kind!r}, members={self.members!r})"
+
+
+def cosine_similarity_matrix(embeddings: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity of row vectors"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized = embeddings / np.where(norms == 0, 1, norms)
+    return np.clip(normalized @ normalized.T, -1.0, 1.0)
+
+
+def _agglomerate(similarity: np.ndarray, threshold: float) -> List[List[int]]:
+    """Average-linkage agglomerative clustering cut at a similarity threshold"""
+    n = similarity.shape[0]
+    if n < 2:
+        return [list(range(n))]
+
+    from sklearn.cluster import AgglomerativeClustering
+
+    labels = AgglomerativeClustering(
+        n_clusters=None,
+        metric="precomputed",
+        linkage="average",
+        distance_threshold=1.0 - threshold
+    ).fit_predict(np.maximum(1.0 - similarity, 0.0))
+
+    groups: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels):
+        groups.setdefault(int(label), []).append(index)
+    return sorted(groups.values(), key=lambda g: g[0])
+
+
+def cluster_root_causes(texts: Sequence[str], embed: Callable[[List[str]], np.ndarray],
+                        cluster_threshold: Optional[float] = None,
+                        duplicate_threshold: Optional[float] = None) -> List[RootCauseCluster]:
+    """
+    Group root causes by meaning and classify each group
+
+    Texts that are identical after normalization are grouped before
+    embedding, so each distinct text is embedded once. Groups are then
+    formed with average-linkage agglomerative clustering on cosine similarity:
+    a group of one is 'single', a group whose members are all pairwise at
+    least `duplicate_threshold` similar is 'duplicate' (safe to merge without
+    the LLM), anything else is 'ambiguous'.
+
+    Args:
+        texts (list): Root cause texts in submission order
+        embed (callable): Function mapping a list of texts to a 2D embedding array
+        cluster_threshold (float): Average similarity needed to join a cluster
+        duplicate_threshold (float): Minimum pairwise similarity of a duplicate cluster
+
+    Returns:
+        list: RootCauseCluster objects, ordered by their first member
+    """
+    cluster_threshold = MERGE_CLUSTER_THRESHOLD if cluster_threshold is None else cluster_threshold
+    duplicate_threshold = MERGE_DUPLICATE_THRESHOLD if duplicate_threshold is None else duplicate_threshold
+    if not texts:
+        return []
+
+    # Exact duplicates (after normalization) share one embedding
+    unique_keys: Dict[str, int] = {}
+    owners: List[List[int]] = []
+    for index, text in enumerate(texts):
+        key = normalize_text(text)
+        if key not in unique_keys:
+            unique_keys[key] = len(owners)
+            owners.append([])
+        owners[unique_keys[key]].append(index)
+
+    unique_texts = [texts[group[0]] for group in owners]
+    similarity = cosine_similarity_matrix(embed(unique_texts)) if len(unique_texts) > 1 \
+        else np.ones((1, 1), dtype=np.float32)
+
+    clusters = []
+    for group in _agglomerate(similarity, cluster_threshold):
+        members = sorted(i for u in group for i in owners[u])
+        block = similarity[np.ix_(group, group)]
+        min_similarity = float(block.min()) if len(group) > 1 else 1.0
+
+        if len(members) == 1:
+            kind = SINGLE
+        elif min_similarity >= duplicate_threshold:
+            kind = DUPLICATE
+        else:
+            kind = AMBIGUOUS
+
+        # Medoid: the distinct text closest on average to the rest of the cluster
+        medoid = group[int(np.argmax(block.mean(axis=1)))]
+        clusters.append(RootCauseCluster(members, kind, owners[medoid][0], min_similarity))
+
+    clusters.sort(key=lambda c: c.members[0])
+    return clusters
+
+
+def reconcile_merge_result(result: Dict[str, Any], entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Make an LLM merge result account for every submitted entry exactly once
+
+    Original items that do not match a submitted entry are dropped, entries
+    the model left out are added back as individual root causes, and merged
+    groups with a single remaining entry become individual.
+
+    Args:
+        result (dict): 'merged_root_causes' and 'individual_root_causes' from the model
+        entries (list): Submitted entries with 'root_cause' and 'user_id' keys
+
+    Returns:
+        dict: Result with the same two keys covering every entry once
+    """
+    remaining: Dict[tuple, int] = {}
+    for entry in entries:
+        key = (str(entry["user_id"]), normalize_text(entry["root_cause"]))
+        remaining[key] = remaining.get(key, 0) + 1
+
+    def claim(item: Dict[str, Any]) -> bool:
+        key = (str(item.get("user_id")), normalize_text(item.get("root_cause")))
+        if remaining.get(key, 0) > 0:
+            remaining[key] -= 1
+            return True
+        return False
+
+    merged = []
+    individual = []
+    for group in result.get("merged_root_causes", []):
+        originals = [item for item in group.get("original_data", []) if claim(item)]
+        if len(originals) > 1:
+            merged.append({"merged_root_cause": group["merged_root_cause"], "original_data": originals})
+        else:
+            individual.extend(originals)
+    individual.extend(item for item in result.get("individual_root_causes", []) if claim(item))
+
+    # Anything the model dropped is kept as submitted
+    for entry in entries:
+        key = (str(entry["user_id"]), normalize_text(entry["root_cause"]))
+        if remaining.get(key, 0) > 0:
+            remaining[key] -= 1
+            individual.append({"root_cause": entry["root_cause"], "user_id": entry["user_id"]})
+
+    return {"merged_root_causes": merged, "individual_root_causes": individual}
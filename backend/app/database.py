@@ -1,10 +1,22 @@
 import os
+import time
 import mysql.connector
+from app import db_backend
 from dotenv import load_dotenv
 import numpy as np
 from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from app.embeddings import get_sentence_model
+from app.embedding_store import encode_texts, normalize
+from app.embedding_executor import EmbeddingOverloaded
+from app.lexical_index import (
+    HYBRID_SEARCH, HYBRID_LEXICAL_WEIGHT, RRF_K, lexical_ranking, lexical_scores, rrf_fuse
+)
+from app.reranker import RERANK_CANDIDATES, RERANK_TOP_K, get_reranker, rerank as cross_encoder_rerank
+from app.near_duplicates import MMR_CANDIDATES, MMR_LAMBDA, collapse_near_duplicates, mmr_order
+from app.read_replica import get_replica_router
+from app.resources import acquired
+from app.tracing import span
+from app.logging_config import log_event, debug_event, debug_enabled
 import logging
 import traceback
 
@@ -14,35 +26,133 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger('database')
 
+# Record fields included in per-match debug events
+_MATCH_LOG_FIELDS = ('area', 'category', 'problem', 'root_cause', 'temporary_action', 'preventive_action')
+
+# History queries read the denormalized issue_history table (one row per root
+# cause with its line, problem and actions, kept in sync by triggers; see
+# scripts/migrate_issue_history.py) instead of joining issues, root_causes,
+# lines and actions and grouping on every request. Lines are matched first
+# so the (line_id, category, created_at) index is used. Without the table
+# the join queries are used, and the table is looked for again every
+# HISTORY_READ_MODEL_RETRY_SECONDS, so a migration is picked up without a restart.
+HISTORY_READ_MODEL = os.getenv("HISTORY_READ_MODEL", "true").lower() == "true"
+HISTORY_READ_MODEL_RETRY_SECONDS = float(os.getenv("HISTORY_READ_MODEL_RETRY_SECONDS", "300"))
+
+ROOT_CAUSE_HISTORY_QUERY = """
+SELECT area, problem, root_cause, category, created_at
+FROM issue_history
+WHERE line_id IN (SELECT id FROM `lines` WHERE name LIKE %s) AND category LIKE %s
+ORDER BY created_at DESC
+"""
+
+ACTION_HISTORY_QUERY = """
+SELECT area, problem, root_cause, category, created_at, temporary_action, preventive_action
+FROM issue_history
+WHERE line_id IN (SELECT id FROM `lines` WHERE name LIKE %s) AND category LIKE %s
+ORDER BY created_at DESC
+"""
+
+ROOT_CAUSE_JOIN_QUERY = """
+SELECT
+    l.name AS area,
+    i.description AS problem,
+    rc.description AS root_cause,
+    rc.category AS category,
+    i.created_at AS created_at
+FROM issues i
+JOIN root_causes rc ON i.id = rc.issue_id
+JOIN `lines` l ON i.line_id = l.id  -- Assuming lines.id and lines.name exist for area
+WHERE l.name LIKE %s AND rc.category LIKE %s
+ORDER BY i.created_at DESC
+"""
+
+ACTION_JOIN_QUERY = """
+SELECT
+    l.name AS area,
+    i.description AS problem,
+    rc.description AS root_cause,
+    rc.category AS category,
+    i.created_at AS created_at,
+    MAX(CASE WHEN act.type = 'CORRECTIVE' THEN act.description ELSE NULL END) AS temporary_action,
+    MAX(CASE WHEN act.type = 'PREVENTIVE' THEN act.description ELSE NULL END) AS preventive_action
+FROM issues i
+JOIN root_causes rc ON i.id = rc.issue_id
+JOIN `lines` l ON i.line_id = l.id  -- Assuming lines.id and lines.name exist for area
+LEFT JOIN actions act ON rc.id = act.root_cause_id -- Actions are linked to root_causes
+WHERE l.name LIKE %s AND rc.category LIKE %s
+GROUP BY l.name, i.description, rc.description, rc.category, i.created_at -- Grouping to aggregate actions
+ORDER BY i.created_at DESC
+"""
+
+AREAS_QUERY = "SELECT DISTINCT name AS area FROM `lines` ORDER BY name"
+
+# time.monotonic() when the read model was last found missing, None while it is used
+_read_model_missing_since: Optional[float] = None
+
+
+def _use_read_model() -> bool:
+    if not HISTORY_READ_MODEL:
+        return False
+    missing_since = _read_model_missing_since
+    return missing_since is None or time.monotonic() - missing_since >= HISTORY_READ_MODEL_RETRY_SECONDS
+
+
+def _is_missing_table(err: mysql.connector.Error) -> bool:
+    """ER_NO_SUCH_TABLE from MySQL, or the SQLite stand-in's equivalent"""
+    return getattr(err, "errno", None) == 1146 or "no such table" in str(err).lower()
+
+
+def db_config() -> Dict[str, Any]:
+    """Connection arguments of the primary database, from the DB_* variables"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', ''),
+        'database': os.getenv('DB_NAME', 'digital_gemba'),
+        'port': int(os.getenv('DB_PORT', '3306'))
+    }
+
+
 class DatabaseConnector:
     """
     Database connector for MySQL to handle connections to the gemba_issues table
     with semantic search capabilities for improved data retrieval
     """
     def __init__(self):
-        self.config = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'user': os.getenv('DB_USER', 'root'),
-            'password': os.getenv('DB_PASSWORD', ''),
-            'database': os.getenv('DB_NAME', 'digital_gemba'),
-            'port': int(os.getenv('DB_PORT', '3306'))
-        }
+        self.config = db_config()
         self.connection = None
         self.cursor = None
-        
-        # Initialize the sentence transformer model for semantic search
-        # Using a multilingual model that works well with Indonesian and English text
-        try:
-            self.sentence_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-            logger.info("Sentence transformer model loaded successfully in database connector")
-        except Exception as e:
-            logger.error(f"Error loading sentence transformer model in database connector: {str(e)}")
-            self.sentence_model = None
 
-    def connect(self):
-        """Establish database connection"""
+    @property
+    def sentence_model(self):
+        """
+        Sentence transformer for semantic search, shared by all connectors so
+        it is loaded once per process; only looked up by the queries that
+        embed text (not by areas or statistics reads)
+        """
+        if "_sentence_model" not in self.__dict__:
+            self._sentence_model = get_sentence_model()
+            acquired("embedding_model")
+        return self._sentence_model
+
+    @sentence_model.setter
+    def sentence_model(self, model):
+        self._sentence_model = model
+
+    def connect(self, read_only: bool = True):
+        """
+        Establish database connection
+
+        Args:
+            read_only (bool): Every query of this connector is a read, so it
+                may be served by the read replica (app/read_replica.py);
+                False for scripts that write through it
+        """
         try:
-            self.connection = mysql.connector.connect(**self.config)
+            self.connection = get_replica_router().read_connection(self.config) if read_only else None
+            if self.connection is None:
+                self.connection = db_backend.connect(self.config)
             self.cursor = self.connection.cursor(dictionary=True)
             return True
         except mysql.connector.Error as err:
@@ -57,9 +167,34 @@ class DatabaseConnector:
             self.connection.close()
 
 
+    def _fetch_history(self, name: str, read_model_query: str, join_query: str, area: str, category: str):
+        """Run a history query on the issue_history read model, or on the base tables without it"""
+        global _read_model_missing_since
+        if not self.connection or not self.connection.is_connected():
+            self.connect()
+        params = (f"%{area}%", f"%{category}%")
+        if _use_read_model():
+            try:
+                with span("sql", query=name):
+                    self.cursor.execute(read_model_query, params)
+                    rows = self.cursor.fetchall()
+                if _read_model_missing_since is not None:
+                    _read_model_missing_since = None
+                    logger.info("issue_history table found, history queries use the read model again")
+                return rows
+            except mysql.connector.Error as err:
+                if not _is_missing_table(err):
+                    raise
+                _read_model_missing_since = time.monotonic()
+                logger.warning(f"issue_history table not found, querying the base tables for "
+                               f"{HISTORY_READ_MODEL_RETRY_SECONDS:.0f}s (run scripts/migrate_issue_history.py)")
+        with span("sql", query=name):
+            self.cursor.execute(join_query, params)
+            return self.cursor.fetchall()
+
     def get_optimized_data_by_area_and_category(self, area, category):
         """
-        Fetch only essential columns (area, problem, root_cause, category) filtered by area and category
+        Fetch only essential columns (area, problem, root_cause, category, created_at) filtered by area and category
         to optimize token usage for AI processing
         
         Args:
@@ -68,23 +203,9 @@ class DatabaseConnector:
         Returns:
             list: A list of dictionaries containing only essential columns
         """
-        query = """
-        SELECT
-            l.name AS area,
-            i.description AS problem,
-            rc.description AS root_cause,
-            rc.category AS category
-        FROM issues i
-        JOIN root_causes rc ON i.id = rc.issue_id
-        JOIN `lines` l ON i.line_id = l.id  -- Assuming lines.id and lines.name exist for area
-        WHERE l.name LIKE %s AND rc.category LIKE %s
-        ORDER BY i.created_at DESC
-        """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            self.cursor.execute(query, (f"%{area}%", f"%{category}%"))
-            return self.cursor.fetchall()
+            return self._fetch_history("root_cause_history", ROOT_CAUSE_HISTORY_QUERY, ROOT_CAUSE_JOIN_QUERY,
+                                       area, category)
         except mysql.connector.Error as err:
             print(f"Error fetching optimized data: {err}")
             return []
@@ -100,46 +221,94 @@ class DatabaseConnector:
         Returns:
             list: A list of dictionaries containing all necessary fields for action suggestions
         """
+        try:
+            return self._fetch_history("action_history", ACTION_HISTORY_QUERY, ACTION_JOIN_QUERY, area, category)
+        except mysql.connector.Error as err:
+            logger.error(f"Error fetching action data: {err}")
+            return []
+            
+    def get_root_cause_rows_since(self, last_id: int = 0, limit: int = 5000):
+        """
+        Fetch root causes with their line, problem and date, in id order, for
+        the materialized root cause statistics (app/root_cause_stats.py)
+        
+        Args:
+            last_id (int): Only rows with a root cause id above this one
+            limit (int): Maximum number of rows
+        Returns:
+            list: Dictionaries with id, area, category, problem, root_cause and
+                created_at; None on error (an empty list means no newer rows)
+        """
         query = """
         SELECT
+            rc.id AS id,
             l.name AS area,
+            rc.category AS category,
             i.description AS problem,
             rc.description AS root_cause,
-            rc.category AS category,
-            MAX(CASE WHEN act.type = 'CORRECTIVE' THEN act.description ELSE NULL END) AS temporary_action,
-            MAX(CASE WHEN act.type = 'PREVENTIVE' THEN act.description ELSE NULL END) AS preventive_action
-        FROM issues i
-        JOIN root_causes rc ON i.id = rc.issue_id
-        JOIN `lines` l ON i.line_id = l.id  -- Assuming lines.id and lines.name exist for area
-        LEFT JOIN actions act ON rc.id = act.root_cause_id -- Actions are linked to root_causes
-        WHERE l.name LIKE %s AND rc.category LIKE %s
-        GROUP BY l.name, i.description, rc.description, rc.category, i.created_at -- Grouping to aggregate actions
-        ORDER BY i.created_at DESC
+            i.created_at AS created_at
+        FROM root_causes rc
+        JOIN issues i ON i.id = rc.issue_id
+        JOIN `lines` l ON i.line_id = l.id
+        WHERE rc.id > %s
+        ORDER BY rc.id
+        LIMIT %s
         """
         try:
             if not self.connection or not self.connection.is_connected():
                 self.connect()
-            self.cursor.execute(query, (f"%{area}%", f"%{category}%"))
-            return self.cursor.fetchall()
+            with span("sql", query="root_cause_stats"):
+                self.cursor.execute(query, (last_id, limit))
+                return self.cursor.fetchall()
         except mysql.connector.Error as err:
-            logger.error(f"Error fetching action data: {err}")
-            return []
+            logger.error(f"Error fetching root cause rows: {err}")
+            return None
             
+    def _rerank(self, query_text: str, field_values: List[str], order: np.ndarray, top_k: int):
+        """Cross-encoder reorder of the widest candidates; the given order when unavailable or over budget"""
+        model = get_reranker()
+        if model is None:
+            return order, top_k
+        candidates = order[:max(RERANK_CANDIDATES, top_k)]
+        with span("rerank", candidates=len(candidates)):
+            reranked = cross_encoder_rerank(model, query_text, [field_values[i] for i in candidates])
+        if reranked is None:
+            return order, top_k
+        return candidates[reranked], min(top_k, RERANK_TOP_K)
+
+    def _diversify(self, similarities: np.ndarray, embeddings: np.ndarray, order: np.ndarray, top_k: int):
+        """MMR pick of top_k among the best MMR_CANDIDATES, relevance following the given order"""
+        candidates = np.asarray(order[:max(MMR_CANDIDATES, top_k)])
+        # Cosine scale, but assigned by rank so keyword/reranker order is kept
+        relevance = np.sort(similarities[candidates])[::-1]
+        with span("mmr", candidates=len(candidates)):
+            picked = mmr_order(relevance, embeddings[candidates], top_k)
+        return candidates[picked]
+
     def _filter_by_semantic_similarity(self, query_text: str, data: List[Dict[str, Any]], 
-                                     field_to_match: str, top_k: int = 10) -> List[Dict[str, Any]]:
+                                     field_to_match: str, top_k: int = 10,
+                                     rerank: bool = False, diverse: bool = False,
+                                     keep_scores: bool = False) -> List[Dict[str, Any]]:
         """
-        Generic helper method to filter data based on semantic similarity
+        Generic helper method to filter data based on semantic similarity,
+        fused with a BM25 keyword ranking when HYBRID_SEARCH is enabled
         
         Args:
             query_text (str): The text to compare against
             data (list): List of data dictionaries to filter
             field_to_match (str): The field in the dictionaries to compare against
             top_k (int): Number of most relevant records to return
+            rerank (bool): Rerank the wider candidate set with the cross-encoder
+                (RERANK=true), returning at most RERANK_TOP_K records
+            diverse (bool): Pick the top_k by maximal marginal relevance, so
+                near-identical records do not fill the result
+            keep_scores (bool): Return copies carrying the cosine similarity in
+                '_similarity' (field -> score, accumulated over searches)
             
         Returns:
             list: List of most semantically relevant records
         """
-        if not self.sentence_model or not data:
+        if not data or not (self.sentence_model or HYBRID_SEARCH):
             logger.warning("Semantic search not available or no data provided")
             return data[:top_k] if len(data) > top_k else data
         
@@ -153,73 +322,74 @@ class DatabaseConnector:
             
             # Extract the field to match from data
             field_values = [record[field_to_match] for record in valid_records]
+            similarities = bm25 = None
+            
+            if self.sentence_model:
+                # Encode the query and field values
+                with span("embed", texts=len(field_values) + 1):
+                    query_embedding = self.sentence_model.encode(query_text)
+                    # Historical texts come from the precomputed index when configured
+                    field_embeddings = encode_texts(self.sentence_model, field_values)
+                
+                with span("similarity", candidates=len(field_values)):
+                    # Calculate cosine similarity, most similar first
+                    field_embeddings = normalize(field_embeddings)
+                    similarities = field_embeddings @ normalize(query_embedding)
+                    semantic_order = np.argsort(-similarities, kind="stable")
+            else:
+                logger.warning("Semantic search not available, ranking by keywords only")
             
-            # Log the data we're searching through
-            logger.info(f"\n{'='*50}\nSEMANTIC SEARCH DETAILS\n{'='*50}")
-            logger.info(f"Query: '{query_text}'")
-            logger.info(f"Field to match: '{field_to_match}'")
-            logger.info(f"Total records to search: {len(valid_records)}")
-            logger.info(f"Top {top_k} matches will be returned")
+            if HYBRID_SEARCH:
+                # BM25 catches exact machine/item codes; fused with the semantic ranking by RRF
+                with span("lexical", candidates=len(field_values)):
+                    bm25 = lexical_scores(query_text, field_values)
+                    lexical_order = lexical_ranking(bm25)
+                    if similarities is not None:
+                        order = rrf_fuse([semantic_order, lexical_order], RRF_K, [1.0, HYBRID_LEXICAL_WEIGHT])
+                    else:
+                        unmatched = np.setdiff1d(np.arange(len(field_values)), lexical_order, assume_unique=True)
+                        order = np.concatenate([lexical_order, unmatched])
+            else:
+                order = semantic_order
             
-            # Encode the query and field values
-            logger.info(f"Encoding for semantic search: {query_text}")
-            query_embedding = self.sentence_model.encode(query_text)
-            field_embeddings = self.sentence_model.encode(field_values)
+            if rerank:
+                order, top_k = self._rerank(query_text, field_values, order, top_k)
             
-            # Calculate cosine similarity
-            similarities = cosine_similarity(
-                query_embedding.reshape(1, -1), 
-                field_embeddings
-            )[0]
+            if diverse and similarities is not None and MMR_LAMBDA < 1.0:
+                order = self._diversify(similarities, field_embeddings, order, top_k)
             
-            # Get indices of top_k most similar values
-            top_indices = np.argsort(similarities)[-top_k:]
-            top_indices = top_indices[::-1]  # Reverse to get highest similarity first
+            # Get indices of top_k most relevant values
+            top_indices = order[:top_k]
             
             # Get the corresponding records
             top_records = [valid_records[i] for i in top_indices]
+            if keep_scores and similarities is not None:
+                top_records = [{**record, "_similarity": {**record.get("_similarity", {}),
+                                                           field_to_match: round(float(similarities[i]), 4)}}
+                               for record, i in zip(top_records, top_indices)]
             
-            # Log similarity scores for debugging
-            logger.info(f"\n{'='*50}\nSEMANTIC SEARCH RESULTS\n{'='*50}")
-            for i, idx in enumerate(top_indices):
-                logger.info(f"Match {i+1}: Score {similarities[idx]:.4f}")
-                
-                # Always show the field we matched against
-                logger.info(f"  {field_to_match}: {field_values[idx]}")
-                
-                # Show all important fields if they exist
-                if 'problem' in valid_records[idx]:
-                    logger.info(f"  Problem: {valid_records[idx]['problem']}")
-                if 'root_cause' in valid_records[idx]:
-                    logger.info(f"  Root Cause: {valid_records[idx]['root_cause']}")
-                if 'area' in valid_records[idx]:
-                    logger.info(f"  Area: {valid_records[idx]['area']}")
-                if 'category' in valid_records[idx]:
-                    logger.info(f"  Category: {valid_records[idx]['category']}")
-                if 'temporary_action' in valid_records[idx]:
-                    action_text = valid_records[idx]['temporary_action']
-                    if action_text is not None:
-                        logger.info(f"  Temporary Action: {action_text[:100]}..." if len(action_text) > 100 else f"  Temporary Action: {action_text}")
-                    else:
-                        logger.info(f"  Temporary Action: None")
-                if 'preventive_action' in valid_records[idx]:
-                    action_text = valid_records[idx]['preventive_action']
-                    if action_text is not None:
-                        logger.info(f"  Preventive Action: {action_text[:100]}..." if len(action_text) > 100 else f"  Preventive Action: {action_text}")
-                    else:
-                        logger.info(f"  Preventive Action: None")
-                
-                # Add separator between matches for readability
-                logger.info(f"  {'-'*40}")
-            logger.info(f"{'='*50}")
+            # One sampled summary line per search; per-match detail only in debug traces
+            log_event(logger, logging.INFO, "semantic_search", field=field_to_match,
+                      candidates=len(valid_records), top_k=top_k, hybrid=HYBRID_SEARCH,
+                      best_score=round(float(similarities.max()), 4) if similarities is not None else None,
+                      best_bm25=round(float(bm25.max()), 4) if bm25 is not None else None)
+            if debug_enabled(logger):
+                for rank, idx in enumerate(top_indices, 1):
+                    debug_event(logger, "semantic_match", query=query_text, field=field_to_match, rank=rank,
+                                score=round(float(similarities[idx]), 4) if similarities is not None else None,
+                                bm25=round(float(bm25[idx]), 4) if bm25 is not None else None,
+                                record={k: v for k, v in valid_records[idx].items() if k in _MATCH_LOG_FIELDS})
             
             return top_records
             
+        except EmbeddingOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Error in semantic search: {str(e)}\n{traceback.format_exc()}")
             return data[:top_k] if len(data) > top_k else data
     
-    def get_semantic_root_cause_data(self, problem: str, area: str, category: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    def get_semantic_root_cause_data(self, problem: str, area: str, category: str, top_k: int = 10,
+                                     keep_scores: bool = False) -> List[Dict[str, Any]]:
         """
         Get historical data for root cause suggestions with semantic filtering based on problem similarity
         
@@ -228,6 +398,7 @@ class DatabaseConnector:
             area (str): The area to filter by
             category (str): The category to filter by
             top_k (int): Number of most relevant records to return
+            keep_scores (bool): Attach the problem similarity ('_similarity')
             
         Returns:
             list: List of semantically relevant historical records for root cause suggestions
@@ -239,11 +410,16 @@ class DatabaseConnector:
             logger.warning(f"No basic data found for area '{area}' and category '{category}'")
             return []
         
+        # Repeated (area, problem, root cause) facts become one record with a count
+        with span("dedup", records=len(basic_data)):
+            basic_data = collapse_near_duplicates(basic_data, ('area', 'problem', 'root_cause'))
+        
         # Then apply semantic filtering based on problem similarity
-        return self._filter_by_semantic_similarity(problem, basic_data, 'problem', top_k)
+        return self._filter_by_semantic_similarity(problem, basic_data, 'problem', top_k, rerank=True, diverse=True,
+                                                   keep_scores=keep_scores)
     
     def get_semantic_action_data(self, problem: str, root_cause: str, area: str, category: str, top_k: int = 5, 
-                                problem_filter_count: int = 8) -> List[Dict[str, Any]]:
+                                problem_filter_count: int = 8, keep_scores: bool = False) -> List[Dict[str, Any]]:
         """
         Get historical data for action suggestions with sequential filtering:
         1. First filter top N problem matches
@@ -256,6 +432,7 @@ class DatabaseConnector:
             category (str): The category to filter by
             top_k (int): Final number of most relevant records to return
             problem_filter_count (int): Number of problem matches to filter in first step
+            keep_scores (bool): Attach the problem and root cause similarities ('_similarity')
             
         Returns:
             list: List of semantically relevant historical records for action suggestions
@@ -267,31 +444,24 @@ class DatabaseConnector:
             logger.warning(f"No action data found for area '{area}' and category '{category}'")
             return []
         
-        # Apply sequential semantic filtering
-        logger.info(f"Searching for actions with problem: '{problem}' and root cause: '{root_cause}'")
+        with span("dedup", records=len(action_data)):
+            action_data = collapse_near_duplicates(
+                action_data, ('area', 'problem', 'root_cause', 'temporary_action', 'preventive_action'))
         
+        # Apply sequential semantic filtering
         # STEP 1: Filter by problem similarity first (get top problem_filter_count matches)
-        problem_matches = self._filter_by_semantic_similarity(problem, action_data, 'problem', problem_filter_count)
-        logger.info(f"Step 1: Found {len(problem_matches)} matches based on problem similarity")
+        problem_matches = self._filter_by_semantic_similarity(problem, action_data, 'problem', problem_filter_count,
+                                                              keep_scores=keep_scores)
         
         if not problem_matches:
             logger.warning("No problem matches found, returning empty list")
             return []
         
         # STEP 2: From those problem matches, filter by root cause similarity
-        final_matches = self._filter_by_semantic_similarity(root_cause, problem_matches, 'root_cause', top_k)
-        logger.info(f"Step 2: Filtered to {len(final_matches)} final matches based on root cause similarity")
-        
-        # Log the top results
-        for i, record in enumerate(final_matches[:3]):
-            if 'problem' in record and 'root_cause' in record:
-                logger.info(f"Top action match {i+1}:")
-                logger.info(f"  Problem: {record['problem']}")
-                logger.info(f"  Root Cause: {record['root_cause']}")
-                if 'temporary_action' in record:
-                    logger.info(f"  Temporary Action: {record['temporary_action']}")
-                if 'preventive_action' in record:
-                    logger.info(f"  Preventive Action: {record['preventive_action']}")
+        final_matches = self._filter_by_semantic_similarity(root_cause, problem_matches, 'root_cause', top_k,
+                                                            diverse=True, keep_scores=keep_scores)
+        log_event(logger, logging.INFO, "action_search", candidates=len(action_data),
+                  problem_matches=len(problem_matches), final_matches=len(final_matches))
         
         return final_matches
         
@@ -302,13 +472,11 @@ class DatabaseConnector:
         Returns:
             list: A list of all unique areas
         """
-        query = "SELECT DISTINCT name AS area FROM `lines` ORDER BY name"
-        
         try:
             if not self.connection or not self.connection.is_connected():
                 self.connect()
                 
-            self.cursor.execute(query)
+            self.cursor.execute(AREAS_QUERY)
             result = self.cursor.fetchall()
             return [r['area'] for r in result]
         except mysql.connector.Error as err:
@@ -0,0 +1,277 @@
+import os
+import re
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, Sequence
+
+import mysql.connector
+
+from app.resources import acquired
+
+# Configure logging
+logger = logging.getLogger('db_backend')
+
+# Connection factory shared by DatabaseConnector and AttendanceDB.
+# DB_BACKEND=mysql (default) connects with mysql.connector; DB_BACKEND=sqlite
+# opens SQLITE_PATH through a MySQL-compatible shim, used as a local stand-in
+# for benchmarks and tests (see benchmarks/seed_sqlite.py).
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "gemba_bench.sqlite3")
+# Stand-in read replica for DB_BACKEND=sqlite (see app/read_replica.py)
+SQLITE_READ_PATH = os.getenv("SQLITE_READ_PATH", "")
+
+_PLACEHOLDER_RE = re.compile(r"%s")
+
+# Tables used by the API, in SQLite syntax
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS `lines` (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    line_id INTEGER NOT NULL REFERENCES `lines`(id),
+    description TEXT,
+    created_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS root_causes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    issue_id INTEGER NOT NULL REFERENCES issues(id),
+    description TEXT,
+    category TEXT
+);
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    root_cause_id INTEGER NOT NULL REFERENCES root_causes(id),
+    type TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    role TEXT,
+    email TEXT,
+    points INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS genba_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    status TEXT,
+    start_time TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS attendances (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    session_id INTEGER NOT NULL,
+    status TEXT,
+    time_in TIMESTAMP,
+    time_out TIMESTAMP,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS point_histories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    userid TEXT,
+    type TEXT,
+    category TEXT,
+    point_before INTEGER,
+    point_earned INTEGER,
+    point_after INTEGER,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS points_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    points INTEGER,
+    reason TEXT,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_issues_line ON issues(line_id);
+CREATE INDEX IF NOT EXISTS idx_root_causes_issue ON root_causes(issue_id);
+CREATE INDEX IF NOT EXISTS idx_actions_root_cause ON actions(root_cause_id);
+CREATE INDEX IF NOT EXISTS idx_attendances_session ON attendances(session_id, user_id);
+
+-- Retrieval read model, as created in MySQL by scripts/migrate_issue_history.py
+CREATE TABLE IF NOT EXISTS issue_history (
+    root_cause_id INTEGER PRIMARY KEY,
+    issue_id INTEGER NOT NULL,
+    line_id INTEGER NOT NULL,
+    area TEXT,
+    category TEXT,
+    problem TEXT,
+    root_cause TEXT,
+    temporary_action TEXT,
+    preventive_action TEXT,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_issue_history_line_category ON issue_history(line_id, category, created_at);
+CREATE INDEX IF NOT EXISTS idx_issue_history_issue ON issue_history(issue_id);
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_rc_insert AFTER INSERT ON root_causes BEGIN
+    INSERT INTO issue_history (root_cause_id, issue_id, line_id, area, category, problem, root_cause, created_at)
+    SELECT NEW.id, i.id, i.line_id, l.name, NEW.category, i.description, NEW.description, i.created_at
+    FROM issues i JOIN `lines` l ON l.id = i.line_id WHERE i.id = NEW.issue_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_rc_update AFTER UPDATE ON root_causes BEGIN
+    UPDATE issue_history SET
+        issue_id = NEW.issue_id,
+        line_id = (SELECT line_id FROM issues WHERE id = NEW.issue_id),
+        area = (SELECT l.name FROM issues i JOIN `lines` l ON l.id = i.line_id WHERE i.id = NEW.issue_id),
+        category = NEW.category,
+        problem = (SELECT description FROM issues WHERE id = NEW.issue_id),
+        root_cause = NEW.description,
+        created_at = (SELECT created_at FROM issues WHERE id = NEW.issue_id)
+    WHERE root_cause_id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_rc_delete AFTER DELETE ON root_causes BEGIN
+    DELETE FROM issue_history WHERE root_cause_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_issue_update AFTER UPDATE ON issues BEGIN
+    UPDATE issue_history SET
+        line_id = NEW.line_id,
+        area = (SELECT name FROM `lines` WHERE id = NEW.line_id),
+        problem = NEW.description,
+        created_at = NEW.created_at
+    WHERE issue_id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_issue_delete AFTER DELETE ON issues BEGIN
+    DELETE FROM issue_history WHERE issue_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_line_update AFTER UPDATE OF name ON `lines` BEGIN
+    UPDATE issue_history SET area = NEW.name WHERE line_id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_action_insert AFTER INSERT ON actions BEGIN
+    UPDATE issue_history SET
+        temporary_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = NEW.root_cause_id AND type = 'CORRECTIVE'),
+        preventive_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = NEW.root_cause_id AND type = 'PREVENTIVE')
+    WHERE root_cause_id = NEW.root_cause_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_action_update AFTER UPDATE ON actions BEGIN
+    UPDATE issue_history SET
+        temporary_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = issue_history.root_cause_id AND type = 'CORRECTIVE'),
+        preventive_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = issue_history.root_cause_id AND type = 'PREVENTIVE')
+    WHERE root_cause_id IN (OLD.root_cause_id, NEW.root_cause_id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_issue_history_action_delete AFTER DELETE ON actions BEGIN
+    UPDATE issue_history SET
+        temporary_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = OLD.root_cause_id AND type = 'CORRECTIVE'),
+        preventive_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = OLD.root_cause_id AND type = 'PREVENTIVE')
+    WHERE root_cause_id = OLD.root_cause_id;
+END;
+"""
+
+
+def _parse_timestamp(value: bytes) -> Optional[datetime]:
+    # Zero dates ('0000-00-00') come back as None, as from mysql.connector
+    try:
+        return datetime.fromisoformat(value.decode("utf-8").strip())
+    except ValueError:
+        return None
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+
+
+class SQLiteCursor:
+    """
+    The subset of a mysql.connector dictionary cursor used by the app:
+    %s placeholders, dict rows, lastrowid, and errors raised as
+    mysql.connector.Error so existing handlers keep working.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None):
+        try:
+            self._cursor.execute(_PLACEHOLDER_RE.sub("?", query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise mysql.connector.Error(msg=str(e)) from e
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(row)
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """MySQL-compatible wrapper around a sqlite3 connection"""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(
+            path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._open = True
+
+    def cursor(self, dictionary: bool = False) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def is_connected(self) -> bool:
+        return self._open
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        if self._open:
+            self._connection.close()
+            self._open = False
+
+
+def create_sqlite_schema(path: str):
+    """Create the API tables in a SQLite file (idempotent)"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SQLITE_SCHEMA)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def connect(config: Dict[str, Any], replica: bool = False):
+    """
+    Open a database connection for the configured backend
+
+    Args:
+        config (dict): mysql.connector connection arguments (ignored for SQLite)
+        replica (bool): Open the SQLite stand-in replica (SQLITE_READ_PATH);
+            for MySQL the replica host is already in config
+
+    Returns:
+        Connection exposing cursor(dictionary=True), is_connected(), commit(),
+        rollback() and close()
+
+    Raises:
+        mysql.connector.Error: If the connection cannot be opened
+    """
+    acquired("db_replica" if replica else "db_primary")
+    if DB_BACKEND == "sqlite":
+        try:
+            return SQLiteConnection(SQLITE_READ_PATH if replica else SQLITE_PATH)
+        except sqlite3.Error as e:
+            raise mysql.connector.Error(msg=str(e)) from e
+    return mysql.connector.connect(**config)
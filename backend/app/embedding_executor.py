@@ -0,0 +1,169 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.metrics import embedding_rejections
+
+# Configure logging
+logger = logging.getLogger('embedding_executor')
+
+# Sentence transformer inference is CPU-bound and holds the GIL for long
+# stretches, stalling every other request in the process. With
+# EMBED_EXECUTOR=process it runs in a pool of EMBED_WORKERS processes, each
+# limited to EMBED_THREADS_PER_WORKER threads; results come back through
+# shared memory. At most EMBED_QUEUE_SIZE calls may be queued or running;
+# further calls are rejected at once (HTTP 503) instead of piling up.
+EMBED_EXECUTOR = os.getenv("EMBED_EXECUTOR", "inline").lower()
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+EMBED_THREADS_PER_WORKER = int(os.getenv("EMBED_THREADS_PER_WORKER", "1"))
+EMBED_QUEUE_SIZE = int(os.getenv("EMBED_QUEUE_SIZE", "16"))
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "30"))
+
+_THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+class EmbeddingOverloaded(Exception):
+    """The embedding queue is full; the caller should retry later"""
+
+
+# ---- worker process side ----
+
+_worker_model: Any = None
+
+
+def _init_worker(threads: int, model_factory: Optional[Callable[[], Any]]):
+    # Pin the thread pools before torch/numpy start them
+    for name in _THREAD_ENV:
+        os.environ[name] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    global _worker_model
+    try:
+        try:
+            import torch
+
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+        if model_factory is None:
+            from app.embeddings import load_sentence_model
+
+            model_factory = load_sentence_model
+        _worker_model = model_factory()
+    except Exception as e:
+        logging.getLogger('embedding_executor').error(f"Embedding worker could not load the model: {str(e)}")
+        _worker_model = None
+
+
+def _encode_in_worker(texts: List[str], buffer_name: Optional[str]):
+    if _worker_model is None:
+        raise RuntimeError("Sentence transformer model is not available in the embedding worker")
+    vectors = np.asarray(_worker_model.encode(texts), dtype=np.float32)
+    if buffer_name is None:
+        return vectors.shape[-1]
+    # Write straight into the caller's shared buffer; only the shape is pickled back
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        np.ndarray(vectors.shape, dtype=np.float32, buffer=buffer.buf)[:] = vectors
+    finally:
+        buffer.close()
+    return vectors.shape
+
+
+# ---- caller side ----
+
+
+class EmbeddingExecutor:
+    """
+    Process pool with the encode() interface of a SentenceTransformer
+
+    Args:
+        workers (int): Worker processes
+        threads_per_worker (int): torch/BLAS threads per worker
+        max_queue (int): Calls queued or running before new ones are rejected
+        timeout (float): Seconds to wait for a result
+        model_factory (callable): Picklable function returning the model in a
+            worker; defaults to loading SENTENCE_MODEL_NAME
+    """
+
+    def __init__(self, workers: int = EMBED_WORKERS, threads_per_worker: int = EMBED_THREADS_PER_WORKER,
+                 max_queue: int = EMBED_QUEUE_SIZE, timeout: float = EMBED_TIMEOUT,
+                 model_factory: Optional[Callable[[], Any]] = None):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.dim: Optional[int] = None
+        self._slots = threading.BoundedSemaphore(max_queue)
+        # spawn: workers must not inherit the parent's threads or locks
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(threads_per_worker, model_factory))
+
+    def _submit(self, texts: List[str], buffer_name: Optional[str]):
+        if not self._slots.acquire(blocking=False):
+            embedding_rejections.inc()
+            raise EmbeddingOverloaded(f"Embedding queue is full ({self.max_queue} calls pending)")
+        try:
+            future = self._pool.submit(_encode_in_worker, texts, buffer_name)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def warm(self) -> bool:
+        """
+        Start every worker and load its model (blocking)
+
+        Returns:
+            bool: Whether the workers could load the model
+        """
+        futures = [self._pool.submit(_encode_in_worker, ["warmup"], None) for _ in range(self.workers)]
+        try:
+            self.dim = int(futures[0].result(timeout=max(self.timeout, 600)))
+            for future in futures[1:]:
+                future.result(timeout=max(self.timeout, 600))
+            return True
+        except Exception as e:
+            logger.error(f"Embedding workers failed to start: {str(e)}")
+            return False
+
+    def encode(self, texts: Union[str, Sequence[str]], **kwargs) -> np.ndarray:
+        """
+        Encode texts in a worker process
+
+        Args:
+            texts: One text or a list of texts
+
+        Returns:
+            np.ndarray: 1-D vector for a single text, otherwise one row per text
+
+        Raises:
+            EmbeddingOverloaded: If the queue is full
+            TimeoutError: If no result arrives within the timeout
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(self._submit(["warmup"], None).result(timeout=self.timeout))
+
+        buffer = shared_memory.SharedMemory(create=True, size=len(texts) * self.dim * 4)
+        try:
+            try:
+                shape = self._submit(texts, buffer.name).result(timeout=self.timeout)
+            except FutureTimeoutError:
+                raise TimeoutError(f"Embedding took longer than {self.timeout}s")
+            vectors = np.ndarray(shape, dtype=np.float32, buffer=buffer.buf).copy()
+        finally:
+            buffer.close()
+            buffer.unlink()
+        return vectors[0] if single else vectors
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
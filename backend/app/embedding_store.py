@@ -0,0 +1,195 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from app.embeddings import SENTENCE_MODEL_NAME
+
+# Configure logging
+logger = logging.getLogger('embedding_store')
+
+# Directory with precomputed embeddings of historical texts (problems and
+# root causes), written by scripts/build_embedding_index.py. The vectors are
+# memory-mapped read-only, so every worker process shares one copy through
+# the page cache; a directory under /dev/shm keeps it in shared memory.
+# Empty disables the store and every text is encoded per request.
+EMBEDDING_INDEX_PATH = os.getenv("EMBEDDING_INDEX_PATH", "")
+
+_VECTORS_FILE = "vectors.npy"
+_TEXTS_FILE = "texts.json"
+_META_FILE = "meta.json"
+
+
+class EmbeddingStore:
+    """
+    Text -> embedding lookup over a fixed set of historical texts
+
+    Args:
+        texts (list): Texts in row order of `vectors`
+        vectors (np.ndarray): One embedding per text (may be a memmap)
+        meta (dict): Build information, e.g. the model name
+    """
+
+    def __init__(self, texts: Sequence[str], vectors: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        if len(texts) != len(vectors):
+            raise ValueError(f"{len(texts)} texts but {len(vectors)} vectors")
+        self.vectors = vectors
+        self.meta = meta or {}
+        self._rows = {text: row for row, text in enumerate(texts)}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._rows
+
+    @property
+    def texts(self) -> List[str]:
+        """Distinct texts in the store"""
+        return list(self._rows)
+
+    def encode(self, model: Any, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeddings of texts, taken from the store where possible
+
+        Only texts missing from the store are passed to the model.
+
+        Args:
+            model: Object with an encode(list_of_texts) method
+            texts (list): Texts to embed
+
+        Returns:
+            np.ndarray: One float32 row per text
+        """
+        rows = [self._rows.get(text) for text in texts]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        result = np.empty((len(texts), self.vectors.shape[1]), dtype=np.float32)
+        hits = [i for i, row in enumerate(rows) if row is not None]
+        if hits:
+            result[hits] = self.vectors[[rows[i] for i in hits]]
+        if missing:
+            result[missing] = model.encode([texts[i] for i in missing])
+        return result
+
+    def save(self, directory: str):
+        """Write the store as vectors.npy, texts.json and meta.json"""
+        os.makedirs(directory, exist_ok=True)
+        texts = [None] * len(self._rows)
+        for text, row in self._rows.items():
+            texts[row] = text
+        np.save(os.path.join(directory, _VECTORS_FILE), np.asarray(self.vectors, dtype=np.float32))
+        with open(os.path.join(directory, _TEXTS_FILE), "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+        with open(os.path.join(directory, _META_FILE), "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "count": len(texts), "dim": int(self.vectors.shape[1])}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "EmbeddingStore":
+        """
+        Load a saved store
+
+        Args:
+            directory (str): Directory written by save()
+            mmap (bool): Memory-map the vectors read-only instead of reading
+                them into this process's private memory
+
+        Returns:
+            EmbeddingStore: The store
+        """
+        vectors = np.load(os.path.join(directory, _VECTORS_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(directory, _TEXTS_FILE), encoding="utf-8") as f:
+            texts = json.load(f)
+        meta: Dict[str, Any] = {}
+        meta_path = os.path.join(directory, _META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        return cls(texts, vectors, meta)
+
+
+def build_store(model: Any, texts: Sequence[str], batch_size: int = 256,
+                meta: Optional[Dict[str, Any]] = None) -> EmbeddingStore:
+    """
+    Encode unique texts into a new store
+
+    Args:
+        model: Object with an encode(list_of_texts) method
+        texts (list): Texts to embed (duplicates and empty texts are skipped)
+        batch_size (int): Texts per encode call
+
+    Returns:
+        EmbeddingStore: The store
+    """
+    unique: List[str] = list(dict.fromkeys(t for t in texts if t))
+    parts = [np.asarray(model.encode(unique[i:i + batch_size]), dtype=np.float32)
+             for i in range(0, len(unique), batch_size)]
+    vectors = np.concatenate(parts) if parts else np.empty((0, 0), dtype=np.float32)
+    return EmbeddingStore(unique, vectors, meta)
+
+
+_store: Optional[EmbeddingStore] = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """
+    Process-wide store from EMBEDDING_INDEX_PATH, loaded on first use
+
+    Returns:
+        EmbeddingStore: The memory-mapped store, or None if not configured or unreadable
+    """
+    global _store, _store_loaded
+    if not _store_loaded:
+        with _store_lock:
+            if not _store_loaded:
+                if EMBEDDING_INDEX_PATH:
+                    try:
+                        _store = EmbeddingStore.load(EMBEDDING_INDEX_PATH)
+                        model_name = _store.meta.get("model")
+                        if model_name and model_name != SENTENCE_MODEL_NAME:
+                            logger.error(f"Embedding index was built with '{model_name}', "
+                                         f"not '{SENTENCE_MODEL_NAME}'; ignoring it")
+                            _store = None
+                        else:
+                            logger.info(f"Embedding index loaded from {EMBEDDING_INDEX_PATH}: {len(_store)} texts")
+                    except Exception as e:
+                        logger.error(f"Error loading embedding index from {EMBEDDING_INDEX_PATH}: {str(e)}")
+                        _store = None
+                _store_loaded = True
+    return _store
+
+
+def set_embedding_store(store: Optional[EmbeddingStore]):
+    """Replace the process-wide store (used by tests and benchmarks)"""
+    global _store, _store_loaded
+    with _store_lock:
+        _store = store
+        _store_loaded = True
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize row vectors as float32, so dot products are cosine similarities
+
+    Args:
+        vectors (np.ndarray): 1-D vector or 2-D array of row vectors
+
+    Returns:
+        np.ndarray: Normalized float32 copy (zero vectors stay zero)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def encode_texts(model: Any, texts: Sequence[str]) -> np.ndarray:
+    """Embeddings of texts, using the process-wide store for known texts"""
+    store = get_embedding_store()
+    if store is None:
+        return np.asarray(model.encode(list(texts)), dtype=np.float32)
+    return store.encode(model, texts)
@@ -0,0 +1,78 @@
+import os
+import threading
+import logging
+from typing import Optional, Any
+
+# Configure logging
+logger = logging.getLogger('embeddings')
+
+# Multilingual model that works well with Indonesian and English text
+SENTENCE_MODEL_NAME = os.getenv("SENTENCE_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+
+_sentence_model: Optional[Any] = None
+_sentence_model_loaded = False
+_sentence_model_lock = threading.Lock()
+
+
+def load_sentence_model() -> Any:
+    """Load SENTENCE_MODEL_NAME in this process (raises on failure)"""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(SENTENCE_MODEL_NAME)
+
+
+def _create_model() -> Optional[Any]:
+    from app.embedding_executor import EMBED_EXECUTOR, EmbeddingExecutor
+
+    if EMBED_EXECUTOR == "process":
+        executor = EmbeddingExecutor()
+        if executor.warm():
+            logger.info(f"Sentence transformer model '{SENTENCE_MODEL_NAME}' loaded in "
+                        f"{executor.workers} embedding worker processes")
+            return executor
+        executor.shutdown()
+        return None
+    model = load_sentence_model()
+    logger.info(f"Sentence transformer model '{SENTENCE_MODEL_NAME}' loaded successfully")
+    return model
+
+
+def get_sentence_model() -> Optional[Any]:
+    """
+    Process-wide sentence transformer, loaded on first use
+
+    With EMBED_EXECUTOR=process this is an EmbeddingExecutor, which has the
+    same encode() interface but runs the model in worker processes.
+
+    Returns:
+        SentenceTransformer: The shared model, or None if it could not be loaded
+    """
+    global _sentence_model, _sentence_model_loaded
+    if not _sentence_model_loaded:
+        with _sentence_model_lock:
+            if not _sentence_model_loaded:
+                try:
+                    _sentence_model = _create_model()
+                except Exception as e:
+                    logger.error(f"Error loading sentence transformer model: {str(e)}")
+                    _sentence_model = None
+                _sentence_model_loaded = True
+    return _sentence_model
+
+
+def release_sentence_model():
+    """Stop the embedding worker processes, if any (at application shutdown)"""
+    global _sentence_model, _sentence_model_loaded
+    with _sentence_model_lock:
+        if hasattr(_sentence_model, "shutdown"):
+            _sentence_model.shutdown()
+        _sentence_model = None
+        _sentence_model_loaded = False
+
+
+def set_sentence_model(model: Optional[Any]):
+    """Replace the process-wide model (used by tests and benchmarks)"""
+    global _sentence_model, _sentence_model_loaded
+    with _sentence_model_lock:
+        _sentence_model = model
+        _sentence_model_loaded = True
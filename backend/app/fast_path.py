@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.prompt_builder import normalize_text
+from app.single_flight import request_key
+
+# Configure logging
+logger = logging.getLogger('fast_path')
+
+# Answer suggest_root_causes / suggest_actions straight from history when the
+# retrieved records match the request almost exactly (cosine similarity of
+# the problem, and for actions also of the root cause, >= FAST_PATH_THRESHOLD):
+# the historical answers are ranked by occurrences and returned without an
+# LLM call. With FAST_PATH_REFINE the LLM answer is computed after the
+# response and served to the next identical request for
+# FAST_PATH_REFINE_TTL_SECONDS.
+FAST_PATH = os.getenv("FAST_PATH", "true").lower() == "true"
+FAST_PATH_THRESHOLD = float(os.getenv("FAST_PATH_THRESHOLD", "0.95"))
+FAST_PATH_MAX_ANSWERS = int(os.getenv("FAST_PATH_MAX_ANSWERS", "5"))
+FAST_PATH_REFINE = os.getenv("FAST_PATH_REFINE", "false").lower() == "true"
+FAST_PATH_REFINE_TTL_SECONDS = float(os.getenv("FAST_PATH_REFINE_TTL_SECONDS", "3600"))
+FAST_PATH_REFINE_CACHE_SIZE = int(os.getenv("FAST_PATH_REFINE_CACHE_SIZE", "1024"))
+
+# Response 'source' values
+HISTORY = "history"
+LLM = "llm"
+
+
+class FastAnswer:
+    """
+    Suggestions taken from history
+
+    Args:
+        answer: Root cause list, or dict of temporary/preventive action lists
+        confidence (float): Similarity of the best matching record
+        matches (int): Matching historical occurrences
+    """
+
+    def __init__(self, answer: Any, confidence: float, matches: int):
+        self.answer = answer
+        self.confidence = confidence
+        self.matches = matches
+
+    def __repr__(self):
+        return f"FastAnswer(confidence={self.confidence!r}, matches={self.matches!r})"
+
+
+def _similarity(record: Dict[str, Any], fields: Sequence[str]) -> Optional[float]:
+    """Lowest similarity of the record over the fields (None when not scored)"""
+    scores = record.get("_similarity") or {}
+    if any(field not in scores for field in fields):
+        return None
+    return min(scores[field] for field in fields)
+
+
+def _ranked(matches: List[Tuple[Dict[str, Any], float]], field: str, limit: int) -> List[str]:
+    """Distinct values of a field, most occurrences first, then most similar"""
+    totals: Dict[str, List] = {}
+    for record, score in matches:
+        value = (record.get(field) or "").strip()
+        key = normalize_text(value)
+        if not key:
+            continue
+        if key not in totals:
+            totals[key] = [value, 0, score]
+        totals[key][1] += record.get("_count", 1)
+        totals[key][2] = max(totals[key][2], score)
+    ranked = sorted(totals.values(), key=lambda t: (-t[1], -t[2]))
+    return [value for value, _, _ in ranked[:limit]]
+
+
+def _matches(historical_data: List[Dict[str, Any]], fields: Sequence[str], threshold: float):
+    scored = [(record, _similarity(record, fields)) for record in historical_data]
+    return [(record, score) for record, score in scored if score is not None and score >= threshold]
+
+
+def root_cause_answer(historical_data: List[Dict[str, Any]], threshold: float = FAST_PATH_THRESHOLD,
+                      limit: int = FAST_PATH_MAX_ANSWERS) -> Optional[FastAnswer]:
+    """
+    Root causes of historical records whose problem matches the request
+
+    Args:
+        historical_data (list): Records from get_semantic_root_cause_data(keep_scores=True)
+        threshold (float): Minimum problem similarity
+        limit (int): Maximum root causes
+
+    Returns:
+        FastAnswer: Ranked root causes, or None when no record is similar enough
+    """
+    matches = _matches(historical_data, ("problem",), threshold)
+    answer = _ranked(matches, "root_cause", limit)
+    if not answer:
+        return None
+    return FastAnswer(answer, max(score for _, score in matches),
+                      sum(record.get("_count", 1) for record, _ in matches))
+
+
+def action_answer(historical_data: List[Dict[str, Any]], threshold: float = FAST_PATH_THRESHOLD,
+                  limit: int = FAST_PATH_MAX_ANSWERS) -> Optional[FastAnswer]:
+    """
+    Actions of historical records whose problem and root cause match the request
+
+    Args:
+        historical_data (list): Records from get_semantic_action_data(keep_scores=True)
+        threshold (float): Minimum problem and root cause similarity
+        limit (int): Maximum actions of each type
+
+    Returns:
+        FastAnswer: Ranked temporary and preventive actions, or None unless
+            both kinds are found
+    """
+    matches = _matches(historical_data, ("problem", "root_cause"), threshold)
+    answer = {"temporary_actions": _ranked(matches, "temporary_action", limit),
+              "preventive_actions": _ranked(matches, "preventive_action", limit)}
+    if not answer["temporary_actions"] or not answer["preventive_actions"]:
+        return None
+    return FastAnswer(answer, max(score for _, score in matches),
+                      sum(record.get("_count", 1) for record, _ in matches))
+
+
+def _failed(result: Any) -> bool:
+    """RootCauseAI reports errors as suggestions starting with 'Error'"""
+    values = result if isinstance(result, list) else [v for vs in (result or {}).values() for v in vs]
+    return not values or any(str(v).startswith("Error") for v in values)
+
+
+class Refinements:
+    """
+    LLM answers computed in the background for fast-path requests
+
+    Args:
+        ttl (float): Seconds a refined answer is served
+        max_size (int): Answers kept (least recently used dropped)
+    """
+
+    def __init__(self, ttl: float = FAST_PATH_REFINE_TTL_SECONDS, max_size: int = FAST_PATH_REFINE_CACHE_SIZE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._answers: "OrderedDict[str, tuple]" = OrderedDict()
+        self._running = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(operation: str, **fields) -> str:
+        return request_key(f"refine:{operation}", **fields)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Refined answer for the key, if computed and not expired"""
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is None:
+                return None
+            if entry[0] < self.clock():
+                del self._answers[key]
+                return None
+            self._answers.move_to_end(key)
+            return entry[1]
+
+    def refine(self, key: str, func: Callable[[], Any]):
+        """Compute func() (the LLM answer) once per key and keep it unless it failed"""
+        with self._lock:
+            if key in self._running:
+                return
+            self._running.add(key)
+        try:
+            result = func()
+            if _failed(result):
+                return
+            with self._lock:
+                self._answers[key] = (self.clock() + self.ttl, result)
+                self._answers.move_to_end(key)
+                while len(self._answers) > self.max_size:
+                    self._answers.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Background refinement failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.discard(key)
+
+
+refinements = Refinements()
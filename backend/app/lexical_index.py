@@ -0,0 +1,211 @@
+import os
+import re
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger('lexical_index')
+
+# Hybrid retrieval: semantic ranking fused with BM25 over the same texts by
+# reciprocal rank fusion. Machine and item codes ("KBA 2", "GRN28-JA10")
+# are matched exactly by BM25, which the multilingual embeddings do poorly.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*")
+_SEPARATOR_RE = re.compile(r"[-/.]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms of a text, with extra terms for codes
+
+    'GRN28-JA10' yields grn28-ja10, grn28, ja10 and grn28ja10; a word followed
+    by a short number ('KBA 2', 'DC 4') also yields the joined term (kba2),
+    so codes match however they are written.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: Terms, in order, with repeats
+    """
+    words = _WORD_RE.findall(str(text).lower())
+    terms: List[str] = []
+    for i, word in enumerate(words):
+        terms.append(word)
+        parts = _SEPARATOR_RE.split(word)
+        if len(parts) > 1:
+            terms.extend(parts)
+            terms.append("".join(parts))
+        if i + 1 < len(words) and word.isalpha() and words[i + 1].isdigit() and len(words[i + 1]) <= 3:
+            terms.append(word + words[i + 1])
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over a list of texts
+
+    Args:
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._rows: Dict[str, int] = {}
+        self._doc_terms: List[Counter] = []
+        self._lengths = np.empty(0, dtype=np.float32)
+        self._avgdl = 1.0
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def build(self, texts: Sequence[str]) -> "BM25Index":
+        self._doc_terms = [Counter(tokenize(text)) for text in texts]
+        self._rows = {}
+        for row, text in enumerate(texts):
+            self._rows.setdefault(text, row)
+        self._lengths = np.array([sum(terms.values()) for terms in self._doc_terms], dtype=np.float32)
+        self._avgdl = float(self._lengths.mean()) if len(self._lengths) and self._lengths.mean() > 0 else 1.0
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for row, terms in enumerate(self._doc_terms):
+            for term, tf in terms.items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(row)
+                tfs.append(tf)
+        self._postings = {term: (np.array(ids, dtype=np.int32), np.array(tfs, dtype=np.float32))
+                          for term, (ids, tfs) in postings.items()}
+        n = len(self._doc_terms)
+        self._idf = {term: math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                     for term, (ids, _) in self._postings.items()}
+        return self
+
+    def idf(self, term: str) -> float:
+        # Terms absent from the corpus get the highest possible weight
+        return self._idf.get(term, math.log(1 + (len(self._doc_terms) + 0.5) / 0.5))
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k documents for a query over the whole index
+
+        Returns:
+            tuple: (positions, scores), best first; only documents sharing a term
+        """
+        scores = np.zeros(len(self._doc_terms), dtype=np.float32)
+        for term in set(tokenize(query)):
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            ids, tfs = entry
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[ids] / self._avgdl)
+            scores[ids] += self._idf[term] * tfs * (self.k1 + 1) / (tfs + norm)
+        matched = np.flatnonzero(scores > 0)
+        order = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return order, scores[order]
+
+    def score_texts(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """
+        BM25 scores of arbitrary texts against a query, with this index's statistics
+
+        Texts already in the index reuse their term counts; others are
+        tokenized on the fly.
+
+        Returns:
+            np.ndarray: One score per text
+        """
+        query_terms = [(term, self.idf(term)) for term in set(tokenize(query))]
+        scores = np.zeros(len(texts), dtype=np.float32)
+        for i, text in enumerate(texts):
+            row = self._rows.get(text)
+            terms = self._doc_terms[row] if row is not None else Counter(tokenize(text))
+            length = sum(terms.values())
+            norm = self.k1 * (1 - self.b + self.b * length / self._avgdl)
+            score = 0.0
+            for term, idf in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    score += idf * tf * (self.k1 + 1) / (tf + norm)
+            scores[i] = score
+        return scores
+
+
+def rrf_fuse(rankings: Sequence[Sequence[int]], k: int = RRF_K,
+             weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    Reciprocal rank fusion: score(d) = sum of weight / (k + rank of d)
+
+    Args:
+        rankings (list): Rankings of positions, best first
+        k (int): Rank smoothing constant
+        weights (list): Weight per ranking (default 1)
+
+    Returns:
+        np.ndarray: Positions from every ranking, best fused score first; ties
+            keep the order of the earlier rankings
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, position in enumerate(ranking, 1):
+            fused[int(position)] = fused.get(int(position), 0.0) + weight / (k + rank)
+    return np.array(sorted(fused, key=lambda p: -fused[p]), dtype=np.int64)
+
+
+def lexical_ranking(scores: np.ndarray) -> np.ndarray:
+    """Positions with a positive BM25 score, best first"""
+    matched = np.flatnonzero(scores > 0)
+    return matched[np.argsort(-scores[matched], kind="stable")]
+
+
+_lexical_index: Optional[BM25Index] = None
+_lexical_source = None
+_lexical_lock = threading.Lock()
+
+
+def get_lexical_index() -> Optional[BM25Index]:
+    """
+    BM25 index over the texts of the precomputed embedding index
+
+    Built on first use (or by the warm-up, before workers fork) and rebuilt
+    when the embedding store is replaced. None without an embedding index.
+    """
+    global _lexical_index, _lexical_source
+    from app.embedding_store import get_embedding_store
+
+    store = get_embedding_store()
+    if store is None:
+        return None
+    if _lexical_source is not store:
+        with _lexical_lock:
+            if _lexical_source is not store:
+                _lexical_index = BM25Index().build(store.texts)
+                _lexical_source = store
+                logger.info(f"Built BM25 index over {len(_lexical_index)} texts")
+    return _lexical_index
+
+
+def lexical_scores(query: str, texts: Sequence[str]) -> np.ndarray:
+    """
+    BM25 scores of candidate texts for a query
+
+    Uses corpus statistics from the embedding index's BM25 index when one
+    is loaded, otherwise from the candidates themselves.
+    """
+    index = get_lexical_index()
+    if index is None:
+        index = BM25Index().build(texts)
+    return index.score_texts(query, texts)
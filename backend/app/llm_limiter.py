@@ -0,0 +1,293 @@
+import os
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+from app.metrics import llm_concurrency_limit, llm_in_flight, llm_queue_wait, llm_shed
+
+# Configure logging
+logger = logging.getLogger('llm_limiter')
+
+# Adaptive (AIMD) limit on concurrent LLM calls. The limit grows by one per
+# window of successful calls while it is saturated and halves when the
+# provider answers with a rate-limit error. Calls over the limit wait in a
+# FIFO queue of at most LLM_QUEUE_SIZE; when the queue is full, the request
+# deadline has passed or the provider rate-limits, the call fails at once
+# with LLMOverloaded (HTTP 503 + Retry-After) instead of an error list after
+# the full timeout.
+LLM_LIMITER = os.getenv("LLM_LIMITER", "true").lower() == "true"
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+LLM_BACKOFF_FACTOR = float(os.getenv("LLM_BACKOFF_FACTOR", "0.5"))
+
+# Time budget of a request, from arrival; the X-Request-Timeout header can
+# only shorten it. It bounds the wait for a limiter slot, the provider call
+# itself (passed as its timeout) and the wait for an identical in-flight
+# request (single flight).
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def set_request_deadline(timeout: Optional[float] = None):
+    """
+    Start the time budget of the current request
+
+    Args:
+        timeout (float): Seconds the client is willing to wait; capped at
+            REQUEST_DEADLINE_SECONDS
+
+    Returns:
+        Token for reset_request_deadline
+    """
+    budget = REQUEST_DEADLINE_SECONDS if timeout is None else min(timeout, REQUEST_DEADLINE_SECONDS)
+    return _deadline.set(time.monotonic() + budget)
+
+
+def reset_request_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current request's budget, or None outside a request"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(minimum: float = 0.1) -> Optional[float]:
+    """Timeout for a provider call: the remaining budget, or None outside a request"""
+    remaining = remaining_time()
+    return None if remaining is None else max(minimum, remaining)
+
+
+class LLMOverloaded(Exception):
+    """
+    The LLM call was shed; the caller should retry after retry_after seconds
+
+    Args:
+        message (str): Description
+        retry_after (int): Suggested wait in seconds
+        reason (str): 'queue_full', 'deadline', 'rate_limited' or
+            'unavailable' (every provider's circuit breaker is open)
+    """
+
+    def __init__(self, message: str, retry_after: int = 1, reason: str = "queue_full"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+_RATE_LIMIT_NAMES = ("ResourceExhausted", "RateLimitError", "TooManyRequests")
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    Whether a provider exception is a rate-limit (HTTP 429) rejection
+
+    Recognizes google.api_core ResourceExhausted, OpenAI RateLimitError and
+    errors carrying a 429 code or status_code. The message is not used: a
+    "quota" or "429" in the text of another error does not make it one.
+    """
+    if type(error).__name__ in _RATE_LIMIT_NAMES:
+        return True
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        code = code() if callable(code) else code
+        if code == 429 or getattr(code, "value", None) == 429:
+            return True
+    return False
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter with a bounded FIFO wait queue
+
+    Args:
+        initial (int): Starting limit
+        min_limit (int): Lowest limit after backoff
+        max_limit (int): Highest limit
+        queue_size (int): Calls allowed to wait for a slot
+        backoff (float): Factor applied to the limit on a rate-limit error
+        enabled (bool): When False, call() runs the function directly
+    """
+
+    def __init__(self, initial: int = LLM_INITIAL_CONCURRENCY, min_limit: int = LLM_MIN_CONCURRENCY,
+                 max_limit: int = LLM_MAX_CONCURRENCY, queue_size: int = LLM_QUEUE_SIZE,
+                 backoff: float = LLM_BACKOFF_FACTOR, enabled: bool = LLM_LIMITER):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.queue_size = queue_size
+        self.backoff = backoff
+        self.enabled = enabled
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiters: Deque[threading.Event] = deque()
+        self._last_backoff = 0.0
+        self._latency = 1.0  # moving average of successful call time, for Retry-After
+        self._lock = threading.Lock()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _publish(self):
+        llm_concurrency_limit.set(int(self._limit))
+        llm_in_flight.set(self._in_flight)
+
+    def _retry_after(self) -> int:
+        # Time for the queue ahead to drain at the current limit
+        return max(1, min(60, math.ceil(self._latency * (len(self._waiters) + 1) / max(1, int(self._limit)))))
+
+    def _shed(self, reason: str, message: str) -> LLMOverloaded:
+        llm_shed.inc(reason=reason)
+        logger.warning(f"LLM call shed ({reason}): {message}")
+        return LLMOverloaded(message, retry_after=self._retry_after(), reason=reason)
+
+    def _grant(self):
+        # Hand free slots to waiters in arrival order (lock held)
+        while self._waiters and self._in_flight < int(self._limit):
+            self._in_flight += 1
+            self._waiters.popleft().set()
+        self._publish()
+
+    def acquire(self) -> bool:
+        """
+        Take a slot, waiting in the queue up to the request deadline
+
+        Returns:
+            bool: Whether the limiter was saturated (the call had to queue)
+
+        Raises:
+            LLMOverloaded: If the queue is full or the deadline passes first
+        """
+        remaining = remaining_time()
+        with self._lock:
+            if remaining is not None and remaining <= 0:
+                raise self._shed("deadline", "Request deadline passed before the LLM call")
+            if self._in_flight < int(self._limit) and not self._waiters:
+                self._in_flight += 1
+                self._publish()
+                return self._in_flight >= int(self._limit)
+            if len(self._waiters) >= self.queue_size:
+                raise self._shed("queue_full", f"LLM queue is full ({self.queue_size} calls waiting)")
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        start = time.monotonic()
+        waiter.wait(timeout=remaining if remaining is not None else REQUEST_DEADLINE_SECONDS)
+        with self._lock:
+            if not waiter.is_set():
+                self._waiters.remove(waiter)
+                raise self._shed("deadline", "Request deadline passed while waiting for an LLM slot")
+        llm_queue_wait.observe(time.monotonic() - start)
+        return True
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot only if one is free now, without queueing
+
+        For extra calls made on behalf of a call that already holds a slot
+        (router hedges), so they count against the limit as well. Always
+        succeeds when the limiter is disabled.
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._in_flight < int(self._limit) and not self._waiters:
+                self._in_flight += 1
+                self._publish()
+                return True
+        return False
+
+    def release_unused(self):
+        """Return a slot from try_acquire() that was not used for a call"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._in_flight -= 1
+            self._grant()
+
+    def release(self, started: float, saturated: bool, rate_limited: bool = False):
+        """
+        Return a slot and adapt the limit
+
+        Args:
+            started (float): time.monotonic() when the call started
+            saturated (bool): Value returned by acquire()
+            rate_limited (bool): Whether the provider rejected the call with a rate limit
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if rate_limited:
+                # One decrease per window: calls started before the last
+                # backoff already saw the old limit
+                if started >= self._last_backoff:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_backoff = now
+            else:
+                self._latency = 0.8 * self._latency + 0.2 * (now - started)
+                if saturated:
+                    # +1 after a full limit's worth of successful calls
+                    self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._grant()
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """
+        Run func() under the limit
+
+        Raises:
+            LLMOverloaded: If the call was shed or the provider rate-limited it
+        """
+        if not self.enabled:
+            return func()
+        saturated = self.acquire()
+        started = time.monotonic()
+        rate_limited = False
+        try:
+            return func()
+        except Exception as e:
+            if not is_rate_limited(e):
+                raise
+            rate_limited = True
+            raise self._shed("rate_limited", f"Provider rate limit: {str(e)}") from e
+        finally:
+            self.release(started, saturated, rate_limited)
+
+
+_llm_limiter: Optional[AdaptiveLimiter] = None
+_llm_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    """Process-wide limiter shared by all RootCauseAI instances"""
+    global _llm_limiter
+    if _llm_limiter is None:
+        with _llm_limiter_lock:
+            if _llm_limiter is None:
+                _llm_limiter = AdaptiveLimiter()
+    return _llm_limiter
+
+
+def set_llm_limiter(limiter: Optional[AdaptiveLimiter]):
+    """Replace the process-wide limiter (used by tests and benchmarks)"""
+    global _llm_limiter
+    with _llm_limiter_lock:
+        _llm_limiter = limiter
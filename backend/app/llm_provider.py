@@ -0,0 +1,421 @@
+import os
+import time
+import threading
+import logging
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Callable, Set, Tuple, Union
+
+from app.llm_limiter import call_timeout
+
+# Configure logging
+logger = logging.getLogger('llm_provider')
+
+
+class RateLimitError(Exception):
+    """The provider rejected the call because of rate limiting (HTTP 429)"""
+
+
+_CACHE_MISSING_NAMES = ("NotFound", "InvalidArgument")
+
+
+def _is_cache_missing(error: Optional[BaseException]) -> bool:
+    """
+    Whether Gemini rejected the cached content itself (deleted, expired or
+    invalid: NotFound / InvalidArgument, HTTP 404 / 400), also when wrapped
+    by Langchain (ChatGoogleGenerativeAIError raised from InvalidArgument)
+    """
+    while error is not None:
+        if type(error).__name__ in _CACHE_MISSING_NAMES:
+            return True
+        for attr in ("code", "status_code"):
+            code = getattr(error, attr, None)
+            code = code() if callable(code) else code
+            if code in (400, 404) or getattr(code, "value", None) in (400, 404):
+                return True
+        error = error.__cause__
+    return False
+
+
+class LLMProvider:
+    """
+    Provider-agnostic LLM interface.
+
+    Static instruction blocks are registered once per process under a key and
+    reused by every request; `generate` only carries the per-request prompt.
+    How an instruction is kept (context cache, system instruction, ...) is up
+    to the provider.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._instructions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register_instruction(self, key: str, text: str):
+        """
+        Register a static instruction block; a no-op if it is already registered unchanged
+
+        Args:
+            key (str): Instruction key, e.g. 'root_cause'
+            text (str): Static instruction text
+        """
+        with self._lock:
+            if self._instructions.get(key) == text:
+                return
+            self._instructions[key] = text
+            self._on_register(key, text)
+
+    def has_instruction(self, key: str) -> bool:
+        return key in self._instructions
+
+    def get_instruction(self, key: str) -> str:
+        return self._instructions[key]
+
+    def _on_register(self, key: str, text: str):
+        """Hook for providers that upload instructions ahead of time"""
+
+    @staticmethod
+    def _timeout_kwargs() -> Dict[str, Any]:
+        """Per-call timeout from the request deadline, for the Langchain invoke"""
+        timeout = call_timeout()
+        return {} if timeout is None else {"timeout": timeout}
+
+    @staticmethod
+    def _content(result: Any) -> str:
+        # Modern LangChain returns AIMessage objects
+        # Extract the text content from the AIMessage
+        if hasattr(result, 'content'):
+            result = result.content
+        elif isinstance(result, dict) and "text" in result:
+            result = result["text"]
+        return result if isinstance(result, str) else str(result)
+
+    def generate(self, instruction_key: str, prompt: str,
+                 response_schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a response for a per-request prompt under a registered instruction
+
+        Args:
+            instruction_key (str): Key of a registered instruction
+            prompt (str): Per-request variable part of the prompt
+            response_schema (dict): Optional JSON schema the output must follow;
+                providers without constrained decoding may ignore it
+
+        Returns:
+            str: Raw text response
+        """
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Gemini through Langchain.
+
+    When GEMINI_CONTEXT_CACHE is enabled each instruction is uploaded once as
+    Gemini cached content and requests only reference it. Gemini rejects
+    caches below its minimum size, so instructions that cannot be cached are
+    sent as a system instruction, which keeps the prefix stable for Gemini's
+    implicit caching.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None,
+                 temperature: float = 0.2, use_context_cache: Optional[bool] = None,
+                 cache_ttl_seconds: Optional[int] = None):
+        super().__init__()
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash-preview-05-20")
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.temperature = temperature
+        if use_context_cache is None:
+            use_context_cache = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() == "true"
+        self.use_context_cache = use_context_cache
+        self.cache_ttl_seconds = cache_ttl_seconds or int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+        # After a failed upload the instruction is sent as system instruction
+        # and the upload is tried again after this many seconds
+        self.cache_retry_seconds = int(os.getenv("GEMINI_CACHE_RETRY_SECONDS", "300"))
+
+        self.model = ChatGoogleGenerativeAI(
+            model=self.model_name,
+            google_api_key=self.api_key,
+            temperature=self.temperature
+        )
+        # instruction key -> (Gemini cached content name, refresh deadline);
+        # the name is None while an upload failed and waits for its retry
+        self._caches: Dict[str, Tuple[Optional[str], float]] = {}
+        # Keys whose cache is being refreshed by some thread
+        self._refreshing: Set[str] = set()
+
+        # DeepSeek dan OpenAI tersedia sebagai OpenAIProvider (LLM_PROVIDER=deepseek / openai),
+        # atau sebagai cadangan Gemini lewat router: LLM_PROVIDER=gemini,deepseek (app/llm_router.py)
+
+    def _create_cache(self, key: str, text: str) -> Tuple[Optional[str], float]:
+        """Upload an instruction as Gemini cached content; (name, refresh deadline), name None on failure"""
+        try:
+            import google.generativeai as genai
+            from google.generativeai import caching
+
+            genai.configure(api_key=self.api_key)
+            cache = caching.CachedContent.create(
+                model=self.model_name,
+                display_name=f"gemba-{key}",
+                system_instruction=text,
+                ttl=timedelta(seconds=self.cache_ttl_seconds)
+            )
+            logger.info(f"Registered '{key}' instruction as Gemini cached content {cache.name}")
+            # Refresh a minute before Gemini expires the cache
+            return cache.name, time.monotonic() + self.cache_ttl_seconds - 60
+        except Exception as e:
+            logger.warning(f"Context cache unavailable for '{key}', sending it as system instruction "
+                           f"for {self.cache_retry_seconds}s: {str(e)}")
+            return None, time.monotonic() + self.cache_retry_seconds
+
+    def _on_register(self, key: str, text: str):
+        self._caches.pop(key, None)
+        if not self.use_context_cache:
+            return
+        self._caches[key] = self._create_cache(key, text)
+
+    def _cache_name_for(self, key: str) -> Optional[str]:
+        entry = self._caches.get(key)
+        if entry is None:
+            return None
+        cache_name, expires_at = entry
+        if time.monotonic() < expires_at:
+            return cache_name
+
+        # One thread refreshes; the others keep using the current cache,
+        # which Gemini keeps for another minute
+        with self._lock:
+            if self._caches.get(key) is not entry or key in self._refreshing:
+                entry = self._caches.get(key)
+                return entry[0] if entry else None
+            self._refreshing.add(key)
+            text = self._instructions[key]
+
+        # Uploaded outside the lock, so registrations and other keys are not held up
+        new_entry = self._create_cache(key, text)
+        with self._lock:
+            self._refreshing.discard(key)
+            # Swap only if the instruction was not re-registered meanwhile
+            if self._caches.get(key) is entry:
+                self._caches[key] = new_entry
+            entry = self._caches.get(key)
+        return entry[0] if entry else None
+
+    def _expire_cache(self, key: str, cache_name: str):
+        """Re-upload the instruction on the next call (the cache was rejected)"""
+        with self._lock:
+            entry = self._caches.get(key)
+            if entry is not None and entry[0] == cache_name:
+                self._caches[key] = (cache_name, 0.0)
+
+    @classmethod
+    def _to_gemini_schema(cls, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a JSON schema to the OpenAPI subset accepted by Gemini"""
+        gemini_schema: Dict[str, Any] = {"type_": str(schema.get("type", "string")).upper()}
+        if "properties" in schema:
+            gemini_schema["properties"] = {
+                name: cls._to_gemini_schema(prop) for name, prop in schema["properties"].items()}
+        if "items" in schema:
+            gemini_schema["items"] = cls._to_gemini_schema(schema["items"])
+        if schema.get("required"):
+            gemini_schema["required"] = list(schema["required"])
+        return gemini_schema
+
+    def generate(self, instruction_key: str, prompt: str,
+                 response_schema: Optional[Dict[str, Any]] = None) -> str:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        kwargs: Dict[str, Any] = self._timeout_kwargs()
+        if response_schema is not None:
+            kwargs["generation_config"] = {
+                "response_mime_type": "application/json",
+                "response_schema": self._to_gemini_schema(response_schema)
+            }
+
+        cache_name = self._cache_name_for(instruction_key)
+        if cache_name is not None:
+            try:
+                return self._content(self.model.invoke(
+                    [HumanMessage(content=prompt)], cached_content=cache_name, **kwargs))
+            except Exception as e:
+                # Rate limits, timeouts and other errors go to the limiter and
+                # router as they are; sending the call again would double it
+                if not _is_cache_missing(e):
+                    raise
+                # Evicted or invalid server-side: this call goes without the
+                # cache, the next one uploads the instruction again
+                logger.warning(f"Cached content {cache_name} rejected for '{instruction_key}': {str(e)}")
+                self._expire_cache(instruction_key, cache_name)
+
+        messages = [
+            SystemMessage(content=self.get_instruction(instruction_key)),
+            HumanMessage(content=prompt)
+        ]
+        return self._content(self.model.invoke(messages, **kwargs))
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI-compatible chat models through Langchain (OpenAI, DeepSeek).
+
+    There is no server-side instruction cache; registered instructions are
+    sent as the system message of every call.
+    """
+
+    name = "openai"
+
+    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, temperature: float = 0.2, name: Optional[str] = None):
+        super().__init__()
+        from langchain_openai import ChatOpenAI
+
+        if name:
+            self.name = name
+        self.model_name = model_name or os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+        self.model = ChatOpenAI(
+            model=self.model_name,
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url,
+            temperature=temperature
+        )
+
+    def generate(self, instruction_key: str, prompt: str,
+                 response_schema: Optional[Dict[str, Any]] = None) -> str:
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        messages = [
+            SystemMessage(content=self.get_instruction(instruction_key)),
+            HumanMessage(content=prompt)
+        ]
+        # JSON mode; the schema itself is enforced by parse_structured
+        kwargs = self._timeout_kwargs()
+        if response_schema is not None:
+            kwargs["response_format"] = {"type": "json_object"}
+        return self._content(self.model.invoke(messages, **kwargs))
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Offline provider for tests and benchmarks.
+
+    Records every request and the bytes it would have sent, so prompt and
+    caching changes can be measured without network access.
+    """
+
+    name = "fake"
+
+    def __init__(self, responses: Optional[Dict[str, Union[str, Callable[[str], str]]]] = None,
+                 default_response: str = "[]",
+                 latency: Union[float, Callable[[str, str], float]] = 0.0,
+                 capacity: Optional[int] = None,
+                 failure: Optional[Callable[[str, str], Optional[Exception]]] = None):
+        super().__init__()
+        self.responses = responses or {}
+        self.default_response = default_response
+        # Seconds to sleep per call, or a function of (instruction_key, prompt)
+        self.latency = latency
+        # Concurrent calls accepted before answering with RateLimitError (a quota)
+        self.capacity = capacity
+        self.active = 0
+        self.rate_limited = 0
+        # Function of (instruction_key, prompt) returning an exception to raise, or None
+        self.failure = failure
+        self.registered_bytes = 0
+        self.requests: List[Dict[str, Any]] = []
+
+    def _on_register(self, key: str, text: str):
+        # Instructions are "uploaded" once, at registration
+        self.registered_bytes += len(text.encode("utf-8"))
+
+    def generate(self, instruction_key: str, prompt: str,
+                 response_schema: Optional[Dict[str, Any]] = None) -> str:
+        if not self.has_instruction(instruction_key):
+            raise KeyError(f"Instruction '{instruction_key}' is not registered")
+
+        with self._lock:
+            if self.capacity is not None and self.active >= self.capacity:
+                self.rate_limited += 1
+                raise RateLimitError(f"429 Too Many Requests: more than {self.capacity} concurrent calls")
+            self.active += 1
+            self.requests.append({
+                "instruction_key": instruction_key,
+                "prompt": prompt,
+                "bytes_sent": len(prompt.encode("utf-8")),
+                "response_schema": response_schema
+            })
+
+        try:
+            delay = self.latency(instruction_key, prompt) if callable(self.latency) else self.latency
+            if delay:
+                time.sleep(delay)
+            error = self.failure(instruction_key, prompt) if self.failure else None
+            if error is not None:
+                raise error
+        finally:
+            with self._lock:
+                self.active -= 1
+
+        response = self.responses.get(instruction_key, self.default_response)
+        return response(prompt) if callable(response) else response
+
+    def total_bytes_sent(self) -> int:
+        """Bytes sent across all requests, excluding one-off instruction registration"""
+        return sum(r["bytes_sent"] for r in self.requests)
+
+
+_default_provider: Optional[LLMProvider] = None
+_default_provider_lock = threading.Lock()
+
+
+def create_provider(name: Optional[str] = None) -> LLMProvider:
+    """
+    Create a provider by name
+
+    Args:
+        name (str): 'gemini', 'deepseek', 'openai' or 'fake'; defaults to the
+            LLM_PROVIDER env variable. A comma-separated list ('gemini,deepseek')
+            creates a RouterProvider with failover in that order.
+
+    Returns:
+        LLMProvider: The new provider
+    """
+    name = (name or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    if "," in name:
+        from app.llm_router import RouterProvider
+
+        names = [n.strip() for n in name.split(",") if n.strip()]
+        return RouterProvider({n: create_provider(n) for n in names})
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "deepseek":
+        return OpenAIProvider(model_name=os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
+                              api_key=os.getenv("DEEPSEEK_API_KEY"),
+                              base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
+                              name="deepseek")
+    if name == "openai":
+        return OpenAIProvider()
+    if name == "fake":
+        return FakeLLMProvider()
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def get_default_provider() -> LLMProvider:
+    """Process-wide provider shared by all RootCauseAI instances"""
+    global _default_provider
+    if _default_provider is None:
+        with _default_provider_lock:
+            if _default_provider is None:
+                _default_provider = create_provider()
+    return _default_provider
+
+
+def set_default_provider(provider: Optional[LLMProvider]):
+    """Replace the process-wide provider (used by tests and benchmarks)"""
+    global _default_provider
+    with _default_provider_lock:
+        _default_provider = provider
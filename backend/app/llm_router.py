@@ -0,0 +1,335 @@
+import os
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.llm_limiter import AdaptiveLimiter, LLMOverloaded, get_llm_limiter, is_rate_limited, remaining_time
+from app.llm_provider import LLMProvider
+from app.metrics import llm_breaker_open, llm_hedges, llm_provider_calls, llm_retries, llm_shed
+
+# Configure logging
+logger = logging.getLogger('llm_router')
+
+# Transient errors (timeouts, connection errors, 5xx) are retried up to
+# LLM_RETRIES times with full-jitter exponential backoff, each time over the
+# whole route. Rate limits (429) are not retried: after failing over they are
+# raised to the AIMD limiter (app/llm_limiter.py), which backs off and sheds.
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.25"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "4"))
+
+# Hedging: when a provider has not answered within its p95 latency, the next
+# provider of the route is called as well and the first answer wins. Until
+# LLM_HEDGE_MIN_SAMPLES calls are measured, LLM_HEDGE_DELAY is used. A hedge
+# takes its own limiter slot and is skipped when none is free.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() == "true"
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "8"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# A provider is skipped for LLM_BREAKER_COOLDOWN seconds after
+# LLM_BREAKER_FAILURES consecutive failures, then probed with one call
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Provider order per instruction key (endpoint), e.g.
+# "scoring=deepseek,gemini;merge=gemini"; other keys use the LLM_PROVIDER order
+LLM_ROUTES = os.getenv("LLM_ROUTES", "")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Retryable errors, by exception class name (google.api_core for Gemini,
+# openai for OpenAI/DeepSeek) or by a 5xx status code; the message is not used
+_TRANSIENT_NAMES = ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+                    "BadGateway", "APIConnectionError", "APITimeoutError")
+_TRANSIENT_STATUS = range(500, 505)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an error is worth retrying (timeout, connection or 5xx; not a rate limit)"""
+    if is_rate_limited(error):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_NAMES for cls in type(error).__mro__):
+        return True
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        code = code() if callable(code) else code
+        code = getattr(code, "value", code)
+        if isinstance(code, int) and code in _TRANSIENT_STATUS:
+            return True
+    return False
+
+
+def parse_routes(spec: str) -> Dict[str, List[str]]:
+    """
+    Parse an LLM_ROUTES value
+
+    Args:
+        spec (str): 'key=a,b;key2=b'
+
+    Returns:
+        dict: Instruction key -> provider names in order
+    """
+    routes: Dict[str, List[str]] = {}
+    for part in spec.split(";"):
+        if "=" not in part:
+            continue
+        key, names = part.split("=", 1)
+        routes[key.strip()] = [n.strip().lower() for n in names.split(",") if n.strip()]
+    return routes
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Args:
+        name (str): Provider name, for metrics and logs
+        failures (int): Consecutive failures that open the breaker
+        cooldown (float): Seconds before an open breaker lets a probe through
+    """
+
+    def __init__(self, name: str, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.name = name
+        self.failure_threshold = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now (takes the probe slot when half-open)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state, self._probing = HALF_OPEN, False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state, self._failures, self._probing = CLOSED, 0, False
+        llm_breaker_open.set(0, provider=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit breaker for '{self.name}' opened after {self._failures} failures")
+                self.state, self._opened_at, self._probing = OPEN, time.monotonic(), False
+                llm_breaker_open.set(1, provider=self.name)
+
+
+class LatencyTracker:
+    """Recent successful call durations of one provider"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int) -> Optional[float]:
+        """Nearest-rank percentile, or None with fewer than min_samples samples"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if len(ordered) < max(1, min_samples):
+            return None
+        return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class RouterProvider(LLMProvider):
+    """
+    LLM provider that spreads calls over several providers
+
+    Each call follows the route of its instruction key (default: the order
+    of `providers`). Providers with an open circuit breaker are skipped; an
+    error fails over to the next provider at once; a provider slower than
+    its p95 is hedged with the next one. Transient failures of the whole
+    route are retried with jittered backoff within the request deadline.
+
+    Args:
+        providers (dict): Name -> provider, in default priority order
+        routes (dict): Instruction key -> provider names; defaults to LLM_ROUTES
+        retries (int): Retries of the route after transient failures
+        hedge (bool): Enable hedged calls
+        hedge_delay (float): Hedge delay while a provider's p95 is unknown
+        sleep (callable): Used for backoff (tests pass a no-op)
+        limiter (AdaptiveLimiter): Limiter hedges take a slot from; defaults
+            to the process-wide one
+    """
+
+    name = "router"
+
+    def __init__(self, providers: Dict[str, LLMProvider], routes: Optional[Dict[str, List[str]]] = None,
+                 retries: int = LLM_RETRIES, hedge: bool = LLM_HEDGE, hedge_delay: float = LLM_HEDGE_DELAY,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES, breaker_failures: int = LLM_BREAKER_FAILURES,
+                 breaker_cooldown: float = LLM_BREAKER_COOLDOWN, sleep: Callable[[float], None] = time.sleep,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        super().__init__()
+        if not providers:
+            raise ValueError("RouterProvider needs at least one provider")
+        self.providers = dict(providers)
+        self.default_route = list(self.providers)
+        routes = parse_routes(LLM_ROUTES) if routes is None else routes
+        self.routes = {key: [n for n in names if n in self.providers] for key, names in routes.items()}
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breakers = {n: CircuitBreaker(n, breaker_failures, breaker_cooldown) for n in self.providers}
+        self.latency = {n: LatencyTracker() for n in self.providers}
+        self._sleep = sleep
+        self._limiter = limiter
+        # Hedged calls cannot be cancelled; the losers finish in these threads
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 8 * len(self.providers)), thread_name_prefix="llm-router")
+
+    def _on_register(self, key: str, text: str):
+        for provider in self.providers.values():
+            provider.register_instruction(key, text)
+
+    def route_for(self, instruction_key: str) -> List[str]:
+        """Provider names tried for an instruction key, in order"""
+        return self.routes.get(instruction_key) or self.default_route
+
+    def hedge_after(self, name: str) -> float:
+        """Seconds to wait on a provider before hedging"""
+        p95 = self.latency[name].percentile(LLM_HEDGE_PERCENTILE, self.hedge_min_samples)
+        return self.hedge_delay if p95 is None else p95
+
+    @property
+    def limiter(self) -> AdaptiveLimiter:
+        return self._limiter or get_llm_limiter()
+
+    def _call(self, name: str, instruction_key: str, prompt: str,
+              response_schema: Optional[Dict[str, Any]]) -> str:
+        start = time.monotonic()
+        try:
+            result = self.providers[name].generate(instruction_key, prompt, response_schema=response_schema)
+        except Exception as e:
+            # Only an unhealthy provider counts against its breaker; a
+            # rejected request (invalid argument, ...) means it answered
+            if is_transient(e) or is_rate_limited(e):
+                self.breakers[name].record_failure()
+            else:
+                self.breakers[name].record_success()
+            llm_provider_calls.inc(provider=name, outcome="error")
+            raise
+        self.latency[name].observe(time.monotonic() - start)
+        self.breakers[name].record_success()
+        llm_provider_calls.inc(provider=name, outcome="ok")
+        return result
+
+    def _attempt(self, instruction_key: str, prompt: str, response_schema: Optional[Dict[str, Any]]) -> str:
+        """One pass over the route: failover on errors, at most one hedge"""
+        candidates = iter(self.route_for(instruction_key))
+        pending: Dict[Future, str] = {}
+        hedged = False
+        hedge_name: Optional[str] = None
+        errors: List[Exception] = []
+
+        def launch() -> Optional[str]:
+            for name in candidates:
+                if self.breakers[name].allow():
+                    # Copy the request context so spans and the deadline follow the call
+                    future = self._pool.submit(contextvars.copy_context().run,
+                                               self._call, name, instruction_key, prompt, response_schema)
+                    pending[future] = name
+                    return name
+            return None
+
+        current = launch()
+        if current is None:
+            llm_shed.inc(reason="unavailable")
+            raise LLMOverloaded(f"No LLM provider available for '{instruction_key}' (all circuit breakers open)",
+                                retry_after=int(min(b.cooldown for b in self.breakers.values())) or 1,
+                                reason="unavailable")
+
+        while pending:
+            remaining = remaining_time()
+            can_hedge = self.hedge and not hedged
+            timeout = self.hedge_after(current) if can_hedge else None
+            if remaining is not None:
+                if remaining <= 0:
+                    llm_shed.inc(reason="deadline")
+                    raise LLMOverloaded("Request deadline passed while waiting for the LLM", reason="deadline")
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge and (remaining is None or remaining > timeout):
+                    hedged = True
+                    slow = current
+                    limiter = self.limiter
+                    # The original call holds a slot; the hedge needs its own
+                    if not limiter.try_acquire():
+                        llm_hedges.inc(provider=slow, outcome="no_slot")
+                        continue
+                    current = launch() or current
+                    if current == slow:
+                        limiter.release_unused()
+                        continue
+                    hedge_name = current
+                    hedge_future = next(f for f, n in pending.items() if n == current)
+                    started = time.monotonic()
+                    hedge_future.add_done_callback(lambda f, started=started: limiter.release(
+                        started, saturated=False, rate_limited=f.exception() is not None and is_rate_limited(
+                            f.exception())))
+                    llm_hedges.inc(provider=current, outcome="fired")
+                    logger.info(f"Hedging '{instruction_key}': '{slow}' slower than "
+                                f"{self.hedge_after(slow):.2f}s, also calling '{current}'")
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if name == hedge_name:
+                    llm_hedges.inc(provider=name, outcome="won")
+                return result
+
+            if not pending:
+                # Fail over to the next provider at once
+                current = launch()
+                if current is None:
+                    break
+
+        # A rate limit is raised in preference, so the limiter backs off
+        raise next((e for e in errors if is_rate_limited(e)), errors[-1])
+
+    def generate(self, instruction_key: str, prompt: str,
+                 response_schema: Optional[Dict[str, Any]] = None) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return self._attempt(instruction_key, prompt, response_schema)
+            except LLMOverloaded:
+                raise
+            except Exception as e:
+                if attempt == self.retries or not is_transient(e):
+                    raise
+                # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+                delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+                remaining = remaining_time()
+                if remaining is not None and remaining <= delay:
+                    raise
+                llm_retries.inc(instruction=instruction_key)
+                logger.warning(f"Retrying '{instruction_key}' in {delay:.2f}s after: {str(e)}")
+                self._sleep(delay)
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import contextvars
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Set
+
+# LOG_LEVEL gates what is emitted, LOG_FORMAT is 'text' or 'json', and
+# LOG_SAMPLE_RATE is the share of high-volume events (log_event with
+# sampling) that are kept. Requests whose ID is in LOG_DEBUG_REQUEST_IDS,
+# or that send X-Debug-Trace: true, log everything at DEBUG detail.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_request_id", default=None)
+_debug_trace: contextvars.ContextVar[bool] = contextvars.ContextVar("log_debug_trace", default=False)
+
+_debug_request_ids: Set[str] = {
+    request_id.strip() for request_id in os.getenv("LOG_DEBUG_REQUEST_IDS", "").split(",") if request_id.strip()}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def _fields_text(fields: Dict[str, Any]) -> str:
+    return " ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in fields.items())
+
+
+class TextFormatter(logging.Formatter):
+    """The existing 'time - logger - level - message' layout with key=value fields appended"""
+
+    def __init__(self):
+        super().__init__(_TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            text += f" request_id={request_id}"
+        if fields:
+            text += " " + _fields_text(fields)
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves all formatting to the listener thread.
+
+    The stock QueueHandler renders the message in the calling thread; this
+    one only stamps the request ID (a context variable, so it has to be read
+    here) and enqueues the record. A full queue drops the record instead of
+    blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(force: bool = False):
+    """
+    Route all logging through a bounded queue to a background writer thread
+
+    Safe to call more than once; only the first call (or a forced one)
+    installs the handlers.
+
+    Args:
+        force (bool): Reinstall the handlers even if already configured
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None and not force:
+            return
+        if _listener is not None:
+            _listener.stop()
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DeferredQueueHandler(log_queue))
+        root.setLevel(LOG_LEVEL)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork(); pre-forked workers get their own
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def set_request_context(request_id: Optional[str], debug: bool = False):
+    """
+    Bind a request ID (and optional debug trace) to the current context
+
+    Args:
+        request_id (str): Request ID stamped on every record
+        debug (bool): Force full DEBUG detail for this request
+
+    Returns:
+        tuple: Tokens for reset_request_context
+    """
+    debug = debug or (request_id in _debug_request_ids)
+    return _request_id.set(request_id), _debug_trace.set(debug)
+
+
+def reset_request_context(tokens):
+    request_token, debug_token = tokens
+    _request_id.reset(request_token)
+    _debug_trace.reset(debug_token)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def enable_debug_trace(request_id: str):
+    """Log every future request with this ID at full DEBUG detail"""
+    _debug_request_ids.add(request_id)
+
+
+def disable_debug_trace(request_id: str):
+    _debug_request_ids.discard(request_id)
+
+
+def debug_enabled(logger: logging.Logger) -> bool:
+    """
+    Whether DEBUG detail should be produced, either because the logger is
+    at DEBUG level or because the current request is debug-traced.
+
+    Use it to guard loops that build detail records.
+    """
+    return _debug_trace.get() or logger.isEnabledFor(logging.DEBUG)
+
+
+def _emit(logger: logging.Logger, level: int, event: str, fields: Dict[str, Any]):
+    record = logger.makeRecord(logger.name, level, "(event)", 0, event, (), None, extra={"fields": fields})
+    # handle() skips the logger level check, so debug-traced requests get through
+    logger.handle(record)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, sample_rate: Optional[float] = None, **fields):
+    """
+    Emit a structured event; nothing is formatted unless the event is kept
+
+    An event is kept when the current request is debug-traced, or when the
+    logger is enabled for `level` and the event survives sampling. Kept
+    sampled events carry their sample rate, so counts can be scaled back up.
+
+    Args:
+        logger (logging.Logger): Logger to emit on
+        level (int): Logging level, e.g. logging.INFO
+        event (str): Event name, e.g. 'semantic_search'
+        sample_rate (float): Share of events kept; defaults to LOG_SAMPLE_RATE,
+            pass 1.0 for low-volume events
+        **fields: Structured fields, formatted only by the writer thread
+    """
+    if not _debug_trace.get():
+        if not logger.isEnabledFor(level):
+            return
+        rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        if rate < 1.0:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+    _emit(logger, level, event, fields)
+
+
+def debug_event(logger: logging.Logger, event: str, **fields):
+    """Emit a DEBUG-detail event when debug_enabled(logger), never sampled"""
+    if debug_enabled(logger):
+        _emit(logger, logging.DEBUG, event, fields)
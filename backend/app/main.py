@@ -1,21 +1,51 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
 from app.auth import get_api_key
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
-import uvicorn
 import os
+import uuid
 from datetime import datetime
 
+from app.schemas import (
+    RootCauseRequest, RootCauseResponse, RootCauseItem, MergeRootCauseRequest, RootCauseStatsResponse,
+    OriginalRootCauseItem, MergedRootCauseGroup, MergeRootCauseResponse,
+    ActionSuggestionRequest, ActionSuggestionResponse, ScoreItem,
+    RootCauseScoreRequest, RootCauseScoreResponse, AttendanceRequest,
+    AttendanceData, AttendanceResponse
+)
 from app.database import DatabaseConnector
 from app.ai import RootCauseAI
 from app.attendance_db import AttendanceDB
+from app.attendance_events import attendance_broker, format_sse
+from app.metrics import render_prometheus, fast_path_answers
+from app.tracing import traced, span
+from app.logging_config import configure_logging, set_request_context, reset_request_context
+from app.warmup import warmup_status
+from app.resources import lifespan, request_handle
+from app.embedding_executor import EmbeddingOverloaded
+from app.llm_limiter import LLMOverloaded, set_request_deadline, reset_request_deadline
+from app.root_cause_stats import STATS_WINDOW_DAYS, get_root_cause_stats, prompt_priors
+from app import fast_path
+from app.areas_cache import AREAS_CACHE_MAX_AGE, get_areas_cache, invalidate_areas
+from app.fast_path import HISTORY, LLM, action_answer, refinements, root_cause_answer
+
+# Seconds between keep-alive comments on idle attendee streams
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('ATTENDANCE_STREAM_HEARTBEAT', '15'))
+
+# Honour the X-Debug-Trace request header (full DEBUG logs for that request)
+LOG_ALLOW_DEBUG_HEADER = os.getenv('LOG_ALLOW_DEBUG_HEADER', 'false').lower() == 'true'
+
+configure_logging()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Gemba Digital with AI - Root Cause Suggestion",
     description="API for suggesting root causes based on historical data and AI reasoning",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for web/mobile integration
@@ -28,153 +58,93 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Define request and response models
-
-
-class RootCauseRequest(BaseModel):
-    area: str
-    problem: str
-    category: str
-
-
-class RootCauseResponse(BaseModel):
-    input_area: str
-    input_problem: str
-    suggested_root_causes: List[str]
-
-# New models for the root cause merging API
-
-
-class RootCauseItem(BaseModel):
-    root_cause: str
-    user_id: str
-
-
-class MergeRootCauseRequest(BaseModel):
-    root_causes: List[RootCauseItem]
-
-
-class OriginalRootCauseItem(BaseModel):
-    root_cause: str
-    user_id: str
-
-
-class MergedRootCauseGroup(BaseModel):
-    merged_root_cause: str
-    original_data: List[OriginalRootCauseItem]
-
+# Tag every log record with the request ID; X-Request-ID is echoed back
 
-class MergeRootCauseResponse(BaseModel):
-    merged_root_causes: List[MergedRootCauseGroup]
-    individual_root_causes: List[OriginalRootCauseItem]
-    all_original_data: List[OriginalRootCauseItem]
-
-# New models for the action suggestion API
-
-
-class ActionSuggestionRequest(BaseModel):
-    area: str
-    problem: str
-    root_cause: str
-    category: str
-
-
-class ActionSuggestionResponse(BaseModel):
-    input_area: str
-    input_problem: str
-    input_root_cause: str
-    temporary_actions: List[str]
-    preventive_actions: List[str]
-
-# New models for the root cause scoring API
-
-
-class ScoreItem(BaseModel):
-    root_cause: str
-    spesifisitas: float
-    relevansi: float
-    kejelasan: float
-    actionability: float
-    total_score: float
-    feedback: str
 
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    debug = LOG_ALLOW_DEBUG_HEADER and request.headers.get("X-Debug-Trace", "").lower() == "true"
+    tokens = set_request_context(request_id, debug)
+    # Time budget for LLM calls; X-Request-Timeout (seconds) can shorten it
+    try:
+        timeout = float(request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        timeout = None
+    deadline_token = set_request_deadline(timeout)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_deadline(deadline_token)
+        reset_request_context(tokens)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
-class RootCauseScoreRequest(BaseModel):
-    area: str
-    problem: str
-    category: str
-    root_causes: List[str]
-    user_id: str
+# Shed load when the embedding workers are saturated, instead of queueing
 
 
-class RootCauseScoreResponse(BaseModel):
-    scores: List[ScoreItem]
-    summary: str
+@app.exception_handler(EmbeddingOverloaded)
+def embedding_overloaded(request: Request, exc: EmbeddingOverloaded):
+    return JSONResponse({"detail": "Embedding service is busy, please retry"}, status_code=503,
+                        headers={"Retry-After": "1"})
 
-# Models for attendance API
+# Shed LLM calls when the provider is rate limiting or the LLM queue is full
 
 
-class AttendanceRequest(BaseModel):
-    user_id: str
-    qr_token: str
+@app.exception_handler(LLMOverloaded)
+def llm_overloaded(request: Request, exc: LLMOverloaded):
+    return JSONResponse({"detail": "AI service is busy, please retry", "reason": exc.reason}, status_code=503,
+                        headers={"Retry-After": str(exc.retry_after)})
 
+# Per-request dependencies (app/resources.py): each is created on first use
+# by the handler, and connections are opened by the first query
 
-class AttendanceData(BaseModel):
-    user_id: str
-    timestamp: str
-    status: str
-    time_in: Optional[str] = None
-    time_out: Optional[str] = None
-    user_name: Optional[str] = None
-    role: Optional[str] = None
+# Dependency to get database connection
+get_db = request_handle("history_db", DatabaseConnector, DatabaseConnector.disconnect)
 
+# Dependency to get AI model
+get_ai_model = request_handle("ai_model", RootCauseAI)
 
-class AttendanceResponse(BaseModel):
-    status: str
-    message: str
-    data: Optional[AttendanceData] = None
+# Dependency to get attendance database connection
+get_attendance_db = request_handle("attendance_db", AttendanceDB, AttendanceDB.disconnect)
 
-# Dependency to get database connection
+# Root endpoint
 
 
-def get_db():
-    db = DatabaseConnector()
-    try:
-        db.connect()
-        yield db
-    finally:
-        db.disconnect()
+@app.get("/")
+def read_root():
+    return {"message": "Gemba Digital with AI - Root Cause Suggestion API", "version": "1.0.0"}
 
-# Dependency to get AI model
+# Liveness probe: the process is up and serving (no dependencies touched)
 
 
-def get_ai_model():
-    return RootCauseAI()
+@app.get("/health/live")
+def health_live():
+    return {"status": "alive"}
 
-# Dependency to get attendance database connection
+# Readiness probe: 503 until the background warm-up has finished
 
 
-def get_attendance_db():
-    db = AttendanceDB()
-    try:
-        db.connect()
-        yield db
-    finally:
-        db.disconnect()
+@app.get("/health/ready")
+def health_ready():
+    status = warmup_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
-# Root endpoint
+# Prometheus scrape endpoint (request/stage latency, LLM parse counters)
 
 
-@app.get("/")
-def read_root():
-    return {"message": "Gemba Digital with AI - Root Cause Suggestion API", "version": "1.0.0"}
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 # API endpoint for root cause suggestion
 
 
 @app.post("/api/root-cause/suggest", response_model=RootCauseResponse)
+@traced("root_cause_suggest")
 def suggest_root_causes(
     request: RootCauseRequest,
+    background_tasks: BackgroundTasks,
     db: DatabaseConnector = Depends(get_db),
     ai_model: RootCauseAI = Depends(get_ai_model),
     api_key: str = Depends(get_api_key)
@@ -188,15 +158,40 @@ def suggest_root_causes(
     historical_data = db.get_semantic_root_cause_data(
         problem=request.problem,
         area=request.area,
-        category=request.category
+        category=request.category,
+        keep_scores=fast_path.FAST_PATH
     )
 
+    # Most frequent root causes of this line/category (and problem type) as priors
+    with span("stats"):
+        priors = prompt_priors(request.area, request.category, request.problem)
+
+    # Near-identical historical problems: answer from history without the LLM
+    answer = root_cause_answer(historical_data) if fast_path.FAST_PATH else None
+    if answer is not None:
+        key = refinements.key("suggest_root_causes", area=request.area, problem=request.problem,
+                              category=request.category)
+        refined = refinements.get(key)
+        if refined is None and fast_path.FAST_PATH_REFINE:
+            background_tasks.add_task(refinements.refine, key, lambda: ai_model.suggest_root_causes(
+                request.area, request.problem, request.category, historical_data, priors=priors))
+        fast_path_answers.inc(endpoint="root_cause_suggest", source=HISTORY if refined is None else "refined")
+        return RootCauseResponse(
+            input_area=request.area,
+            input_problem=request.problem,
+            suggested_root_causes=refined or answer.answer,
+            source=LLM if refined is not None else HISTORY,
+            confidence=None if refined is not None else answer.confidence
+        )
+    fast_path_answers.inc(endpoint="root_cause_suggest", source=LLM)
+
     # Generate suggestions using AI model
     suggested_causes = ai_model.suggest_root_causes(
         area=request.area,
         problem=request.problem,
         category=request.category,
-        historical_data=historical_data
+        historical_data=historical_data,
+        priors=priors
     )
 
     # Return response dalam format RootCauseResponse
@@ -206,18 +201,67 @@ def suggest_root_causes(
         suggested_root_causes=suggested_causes
     )
 
+# API endpoint for the most frequent root causes of a line and category
+
+
+@app.get("/api/root-cause/stats", response_model=RootCauseStatsResponse)
+@traced("root_cause_stats")
+def root_cause_stats(
+    area: str,
+    category: str,
+    problem: Optional[str] = None,
+    window_days: int = STATS_WINDOW_DAYS,
+    limit: int = 10,
+    api_key: str = Depends(get_api_key)
+):
+    stats = get_root_cause_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Root cause statistics are disabled")
+    if not area or not category or window_days < 0 or not 1 <= limit <= 50:
+        raise HTTPException(
+            status_code=400, detail="Area and category are required, window_days >= 0 and limit 1-50")
+
+    # Refreshed in the background; before the first load there is nothing to report
+    stats.refresh_if_stale()
+    if not stats.loaded:
+        raise HTTPException(status_code=503, detail="Root cause statistics are loading, please retry",
+                            headers={"Retry-After": "5"})
+    result = stats.query(area, category, problem=problem, window_days=window_days, limit=limit)
+    return RootCauseStatsResponse(area=area, category=category, problem=problem, **result)
+
 # API endpoint to get all unique areas for dropdown selection in UI
 
 
 @app.get("/api/areas", response_model=List[str])
-def get_areas(db: DatabaseConnector = Depends(get_db), api_key: str = Depends(get_api_key)):
-    areas = db.get_all_areas()
-    return areas
+@traced("areas")
+def get_areas(request: Request, api_key: str = Depends(get_api_key)):
+    # Served from the process-level copy (app/areas_cache.py); clients
+    # revalidate with If-None-Match and get 304 while nothing changed
+    areas, etag = get_areas_cache().get()
+    if etag is None:
+        # Nothing loaded yet (database unreachable): an empty list must not be cached
+        raise HTTPException(status_code=503, detail="Areas are not available, please retry",
+                            headers={"Retry-After": "5"})
+    headers = {"Cache-Control": f"private, max-age={AREAS_CACHE_MAX_AGE}", "ETag": etag}
+    if_none_match = request.headers.get("If-None-Match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(areas, headers=headers)
+
+# Reload the cached areas everywhere after a line was added (admin flows)
+
+
+@app.post("/api/areas/invalidate")
+def invalidate_areas_cache(api_key: str = Depends(get_api_key)):
+    invalidate_areas()
+    return {"status": "success"}
 
 # New API endpoint for merging similar root causes while preserving user information
 
 
 @app.post("/api/root-cause/merge", response_model=MergeRootCauseResponse)
+@traced("root_cause_merge")
 def merge_root_causes(
     request: MergeRootCauseRequest,
     ai_model: RootCauseAI = Depends(get_ai_model),
@@ -247,8 +291,10 @@ def merge_root_causes(
 
 
 @app.post("/api/actions/suggest", response_model=ActionSuggestionResponse)
+@traced("actions_suggest")
 def suggest_actions(
     request: ActionSuggestionRequest,
+    background_tasks: BackgroundTasks,
     db: DatabaseConnector = Depends(get_db),
     ai_model: RootCauseAI = Depends(get_ai_model),
     api_key: str = Depends(get_api_key)
@@ -263,9 +309,31 @@ def suggest_actions(
         problem=request.problem,
         root_cause=request.root_cause,
         area=request.area,
-        category=request.category
+        category=request.category,
+        keep_scores=fast_path.FAST_PATH
     )
 
+    # Same problem and root cause seen before: answer from history without the LLM
+    answer = action_answer(historical_data) if fast_path.FAST_PATH else None
+    if answer is not None:
+        key = refinements.key("suggest_actions", area=request.area, problem=request.problem,
+                              root_cause=request.root_cause, category=request.category)
+        refined = refinements.get(key)
+        if refined is None and fast_path.FAST_PATH_REFINE:
+            background_tasks.add_task(refinements.refine, key, lambda: ai_model.suggest_actions(
+                request.area, request.problem, request.root_cause, request.category, historical_data))
+        fast_path_answers.inc(endpoint="actions_suggest", source=HISTORY if refined is None else "refined")
+        return ActionSuggestionResponse(
+            input_area=request.area,
+            input_problem=request.problem,
+            input_root_cause=request.root_cause,
+            temporary_actions=(refined or answer.answer)["temporary_actions"],
+            preventive_actions=(refined or answer.answer)["preventive_actions"],
+            source=LLM if refined is not None else HISTORY,
+            confidence=None if refined is not None else answer.confidence
+        )
+    fast_path_answers.inc(endpoint="actions_suggest", source=LLM)
+
     # Generate action suggestions using AI model
     action_suggestions = ai_model.suggest_actions(
         area=request.area,
@@ -288,6 +356,7 @@ def suggest_actions(
 
 
 @app.post("/api/root-cause/score", response_model=RootCauseScoreResponse)
+@traced("root_cause_score")
 def score_root_causes(
     request: RootCauseScoreRequest,
     ai_model: RootCauseAI = Depends(get_ai_model),
@@ -334,40 +403,41 @@ def score_root_causes(
                 if not attendance_db.connection or not attendance_db.connection.is_connected():
                     attendance_db.connect()
 
-                # Get current user points
-                user_query = "SELECT points FROM users WHERE id = %s"
-                attendance_db.cursor.execute(user_query, (request.user_id,))
-                user = attendance_db.cursor.fetchone()
+                with span("points_write"):
+                    # Get current user points
+                    user_query = "SELECT points FROM users WHERE id = %s"
+                    attendance_db.cursor.execute(user_query, (request.user_id,))
+                    user = attendance_db.cursor.fetchone()
 
-                if user:
-                    current_points = user['points'] or 0
+                    if user:
+                        current_points = user['points'] or 0
                     
-                    # Use the score directly (already in 1-100 range from AI)
-                    points_to_add = max(1, min(100, int(max_score)))
-                    new_points = current_points + points_to_add
-
-                    # Update user points
-                    update_query = "UPDATE users SET points = %s WHERE id = %s"
-                    attendance_db.cursor.execute(update_query, (new_points, request.user_id))
-
-                    # Use 'contribution' category from the dropdown menu
-                    current_time = datetime.now()
-                    print(f"Recording points with 'ROOT' category")
-                    history_query = f"""
-                    INSERT INTO point_histories 
-                    (userid, type, category, point_before, point_earned, point_after, created_at, updated_at)
-                    VALUES ('{request.user_id}', 'INC', 'ROOT', {current_points}, {points_to_add}, {new_points}, '{current_time}', '{current_time}')
-                    """
+                        # Use the score directly (already in 1-100 range from AI)
+                        points_to_add = max(1, min(100, int(max_score)))
+                        new_points = current_points + points_to_add
+
+                        # Update user points
+                        update_query = "UPDATE users SET points = %s WHERE id = %s"
+                        attendance_db.cursor.execute(update_query, (new_points, request.user_id))
+
+                        # Use 'contribution' category from the dropdown menu
+                        current_time = datetime.now()
+                        print(f"Recording points with 'ROOT' category")
+                        history_query = f"""
+                        INSERT INTO point_histories 
+                        (userid, type, category, point_before, point_earned, point_after, created_at, updated_at)
+                        VALUES ('{request.user_id}', 'INC', 'ROOT', {current_points}, {points_to_add}, {new_points}, '{current_time}', '{current_time}')
+                        """
                     
-                    # Print the actual query for debugging
-                    print(f"Executing SQL query: {history_query}")
+                        # Print the actual query for debugging
+                        print(f"Executing SQL query: {history_query}")
                     
-                    # Execute the raw SQL query with the category directly in the SQL
-                    attendance_db.cursor.execute(history_query)
+                        # Execute the raw SQL query with the category directly in the SQL
+                        attendance_db.cursor.execute(history_query)
 
-                    attendance_db.connection.commit()
-                    print(f"Successfully recorded {points_to_add} points for user {request.user_id} with category 'ROOT'")
-                    print(f"Note: Using 'ROOT' category instead of 'contribution'")
+                        attendance_db.connection.commit()
+                        print(f"Successfully recorded {points_to_add} points for user {request.user_id} with category 'ROOT'")
+                        print(f"Note: Using 'ROOT' category instead of 'contribution'")
             except Exception as e:
                 print(f"Error recording root cause points: {str(e)}")
     
@@ -378,6 +448,7 @@ def score_root_causes(
 
 
 @app.post("/api/attendance/qr", response_model=AttendanceResponse)
+@traced("attendance_qr")
 def record_attendance(
     request: AttendanceRequest,
     attendance_db: AttendanceDB = Depends(get_attendance_db),
@@ -389,16 +460,18 @@ def record_attendance(
             status_code=400, detail="User ID and QR token are required")
 
     # Validate QR token
-    session = attendance_db.validate_qr_token(request.qr_token)
+    with span("sql", query="validate_qr_token"):
+        session = attendance_db.validate_qr_token(request.qr_token)
     if not session:
         raise HTTPException(
             status_code=400, detail="Invalid or expired QR token")
 
     # Record presence
-    success, message, presence_data = attendance_db.record_presence(
-        user_id=request.user_id,
-        session_id=session['id']
-    )
+    with span("sql", query="record_presence"):
+        success, message, presence_data = attendance_db.record_presence(
+            user_id=request.user_id,
+            session_id=session['id']
+        )
 
     if not success:
         raise HTTPException(status_code=400, detail=message)
@@ -414,15 +487,69 @@ def record_attendance(
 
 
 @app.get("/api/session/{session_id}/attendees", response_model=List[Dict[str, Any]])
+@traced("session_attendees")
 def get_session_attendees(
     session_id: int,
+    user_id: Optional[str] = None,
     attendance_db: AttendanceDB = Depends(get_attendance_db),
     api_key: str = Depends(get_api_key)
 ):
-    attendees = attendance_db.get_session_attendees(session_id)
+    # Read from the replica unless this user or session was just written
+    attendees = attendance_db.get_session_attendees(session_id, user_id=user_id)
     return attendees
 
 
+def _load_session_attendees(session_id: int) -> List[Dict[str, Any]]:
+    attendance_db = AttendanceDB()
+    try:
+        attendance_db.connect()
+        return attendance_db.get_session_attendees(session_id)
+    finally:
+        attendance_db.disconnect()
+
+# API endpoint to follow session attendees live (Server-Sent Events)
+
+
+@app.get("/api/session/{session_id}/attendees/stream")
+async def stream_session_attendees(
+    session_id: int,
+    request: Request,
+    api_key: str = Depends(get_api_key)
+):
+    async def event_stream():
+        # Subscribed inside the generator, so a response that is never
+        # iterated leaves no subscription behind; before the snapshot, so no
+        # check-in falls in between
+        subscription = attendance_broker.subscribe(session_id)
+        try:
+            # One snapshot per connection, incremental deltas afterwards
+            attendees = await run_in_threadpool(_load_session_attendees, session_id)
+            yield format_sse({"session_id": session_id, "attendees": attendees}, "snapshot")
+
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                # The client fell behind and lost events; ask it to refetch
+                if subscription.dropped:
+                    yield format_sse({"session_id": session_id, "dropped": subscription.dropped}, "resync")
+                    subscription.dropped = 0
+
+                yield format_sse(event, event.get("type"))
+        finally:
+            attendance_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     # Run the API server
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,253 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Sequence, Union
+
+# In-process application metrics
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        """Increase the counter for the given label values"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value for the given label values"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) triples for exposition"""
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, with optional labels
+    """
+
+    def set(self, value: float, **labels):
+        """Set the gauge for the given label values"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+# Latency buckets in seconds, from a fast SQL fetch up to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Histogram with Prometheus-style upper-bound buckets and optional labels
+    """
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        """Record one observation for the given label values"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def sum(self, **labels) -> float:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[1] if entry else 0.0
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) triples with cumulative buckets, for exposition"""
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        samples = []
+        for key, bucket_counts, total, count in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+REGISTRY: List[Union[Counter, Histogram]] = []
+
+# Structured-output parsing of LLM responses, per endpoint
+llm_parse_attempts = Counter(
+    "llm_parse_attempts_total", "LLM responses parsed into a structured result", ("endpoint",))
+llm_parse_failures = Counter(
+    "llm_parse_failures_total", "LLM responses that could not be parsed or validated", ("endpoint",))
+
+# Root cause scoring latency by execution mode ('single' or 'fanout')
+scoring_latency = Histogram(
+    "root_cause_scoring_seconds", "Wall-clock time of RootCauseAI.score_root_causes", ("mode",))
+
+# Per-endpoint request latency and its breakdown into stages
+# (sql, embed, similarity, prompt, llm, parse, points_write), see app.tracing
+request_latency = Histogram(
+    "request_seconds", "Wall-clock time of an instrumented API endpoint", ("endpoint",))
+stage_latency = Histogram(
+    "request_stage_seconds", "Wall-clock time of one stage of an API endpoint", ("endpoint", "stage"))
+
+# Embedding calls rejected because the embedding executor queue was full
+embedding_rejections = Counter(
+    "embedding_rejected_total", "Embedding calls rejected because the executor queue was full")
+
+# Identical concurrent AI requests: role is 'leader' (computed) or 'collapsed' (shared a result)
+single_flight_calls = Counter(
+    "single_flight_calls_total", "Coalesced AI calls by role", ("name", "role"))
+
+# Adaptive LLM concurrency limiter (app/llm_limiter.py)
+llm_concurrency_limit = Gauge(
+    "llm_concurrency_limit", "Current adaptive limit on concurrent LLM calls")
+llm_in_flight = Gauge(
+    "llm_in_flight", "LLM calls currently running")
+llm_queue_wait = Histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for a concurrency slot")
+llm_shed = Counter(
+    "llm_shed_total", "LLM calls rejected with 503, by reason (queue_full, deadline, rate_limited)", ("reason",))
+
+# Multi-provider router (app/llm_router.py)
+llm_provider_calls = Counter(
+    "llm_provider_calls_total", "LLM calls per provider by outcome (ok, error)", ("provider", "outcome"))
+llm_retries = Counter(
+    "llm_retries_total", "LLM calls retried after a transient error", ("instruction",))
+llm_hedges = Counter(
+    "llm_hedges_total", "Hedged LLM calls by outcome (fired, won, no_slot)", ("provider", "outcome"))
+llm_breaker_open = Gauge(
+    "llm_breaker_open", "1 while a provider's circuit breaker is open", ("provider",))
+
+# Cross-encoder reranking (app/reranker.py): ok, over_budget or error
+rerank_outcomes = Counter(
+    "rerank_total", "Reranking attempts by outcome", ("outcome",))
+
+# No-LLM fast path (app/fast_path.py): source is 'history', 'refined' or 'llm'
+fast_path_answers = Counter(
+    "fast_path_total", "Suggestion requests by answer source", ("endpoint", "source"))
+
+# Materialized root cause statistics (app/root_cause_stats.py)
+root_cause_stats_refresh = Histogram(
+    "root_cause_stats_refresh_seconds", "Time to refresh root cause statistics, by mode (full, incremental)", ("mode",))
+root_cause_stats_rows = Gauge(
+    "root_cause_stats_rows", "Root cause rows counted in the materialized statistics")
+
+
+# Read replica routing (app/read_replica.py): reads by target (replica, primary)
+# and reason (ok, no_replica, read_your_writes, lag, unavailable)
+db_reads = Counter(
+    "db_reads_total", "Read connections by target and routing reason", ("target", "reason"))
+replica_lag = Gauge(
+    "db_replica_lag_seconds", "Last measured replication lag of the read replica (-1 when unknown)")
+
+# Resources acquired while handling a request (app/resources.py): per-request
+# handles (history_db, attendance_db, ai_model), connections (db_primary,
+# db_replica) and use of the sentence model (embedding_model)
+resource_acquisitions = Counter(
+    "resource_acquired_total", "Resources acquired per request, by endpoint and resource", ("endpoint", "resource"))
+
+
+def parse_failure_rate(endpoint: str) -> float:
+    """
+    Share of LLM responses for an endpoint that failed structured parsing
+
+    Args:
+        endpoint (str): Endpoint key, e.g. 'scoring'
+
+    Returns:
+        float: Failure rate between 0 and 1 (0 when nothing was parsed yet)
+    """
+    attempts = llm_parse_attempts.value(endpoint=endpoint)
+    if not attempts:
+        return 0.0
+    return llm_parse_failures.value(endpoint=endpoint) / attempts
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format
+
+    Returns:
+        str: Exposition text (format version 0.0.4)
+    """
+    lines = []
+    for metric in REGISTRY:
+        kind = "histogram" if isinstance(metric, Histogram) else "gauge" if isinstance(metric, Gauge) else "counter"
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        for name, labels, value in metric.samples():
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,213 @@
+import os
+import re
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+import numpy as np
+
+from app.prompt_builder import normalize_text
+
+# Configure logging
+logger = logging.getLogger('near_duplicates')
+
+# Historical records whose identifying fields are near-identical (MinHash
+# Jaccard over character 3-grams >= DEDUP_THRESHOLD) are collapsed into one
+# representative (the most recent) carrying an occurrence count and the last
+# time it was seen. The grouping of a fetched history is computed once and
+# cached, so repeated requests over the same (area, category) reuse it.
+DEDUP_HISTORY = os.getenv("DEDUP_HISTORY", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "256"))
+
+# Maximal marginal relevance when picking the final top-k: relevance weight
+# (1.0 = plain relevance order) and how many ranked candidates it looks at
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_CANDIDATES = int(os.getenv("MMR_CANDIDATES", "30"))
+
+_PRIME = (1 << 31) - 1
+_NUMBER_RE = re.compile(r"\S*\d\S*")
+
+
+class MinHasher:
+    """
+    MinHash signatures of character 3-gram sets, with LSH banding
+
+    Args:
+        num_perm (int): Hash functions per signature
+        bands (int): LSH bands (num_perm must be divisible by it)
+        seed (int): Seed of the hash functions
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def shingles(text: str) -> List[str]:
+        padded = f" {text} "
+        return [padded[i:i + 3] for i in range(max(1, len(padded) - 2))]
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in set(self.shingles(text))], dtype=np.uint64)
+        # (a*h + b) mod p stays below 2^64 for 32-bit h and 31-bit a, b
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def candidate_pairs(self, signatures: np.ndarray) -> set:
+        """Pairs of rows sharing at least one LSH band"""
+        rows = self.num_perm // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = defaultdict(list)
+            for i, sig in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets[sig.tobytes()].append(i)
+            for members in buckets.values():
+                for j in range(1, len(members)):
+                    pairs.add((members[0], members[j]))
+        return pairs
+
+
+def _numbers(text: str) -> FrozenSet[str]:
+    """Tokens with digits (units, item codes); records naming different ones stay apart"""
+    return frozenset(_NUMBER_RE.findall(text))
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def group_near_duplicates(keys: Sequence[str], threshold: float = DEDUP_THRESHOLD,
+                          hasher: Optional[MinHasher] = None) -> List[int]:
+    """
+    Group index of every key; near-identical keys share a group
+
+    Equal keys are grouped directly; distinct keys are compared by MinHash
+    estimated Jaccard similarity, limited to LSH candidate pairs, and only
+    merged when they mention the same numbers and codes ("unit 3" and
+    "unit 5" are different facts however similar the rest is).
+
+    Args:
+        keys (list): Normalized record keys
+        threshold (float): Estimated Jaccard similarity treated as a duplicate
+
+    Returns:
+        list: For each key, the position of its group's first key
+    """
+    distinct: Dict[str, int] = {}
+    for key in keys:
+        distinct.setdefault(key, len(distinct))
+    texts = list(distinct)
+    parent = list(range(len(texts)))
+
+    if len(texts) > 1 and threshold < 1.0:
+        hasher = hasher or MinHasher()
+        signatures = np.stack([hasher.signature(text) for text in texts])
+        numbers = [_numbers(text) for text in texts]
+        for i, j in hasher.candidate_pairs(signatures):
+            if numbers[i] == numbers[j] and float(np.mean(signatures[i] == signatures[j])) >= threshold:
+                root_i, root_j = _find(parent, i), _find(parent, j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    first_position: Dict[int, int] = {}
+    groups = []
+    for position, key in enumerate(keys):
+        root = _find(parent, distinct[key])
+        groups.append(first_position.setdefault(root, position))
+    return groups
+
+
+_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def collapse_near_duplicates(records: List[Dict[str, Any]], fields: Sequence[str],
+                             threshold: float = DEDUP_THRESHOLD,
+                             date_field: str = "created_at") -> List[Dict[str, Any]]:
+    """
+    Collapse near-identical records into representatives
+
+    Records are expected newest first (as the history queries return
+    them), so each group is represented by its most recent record.
+
+    Args:
+        records (list): Historical records
+        fields (list): Fields that define the record identity
+        threshold (float): Estimated Jaccard similarity treated as a duplicate
+        date_field (str): Record field with the creation time, if present
+
+    Returns:
+        list: Copies of the representatives with '_count' (occurrences) and
+            'last_seen' (latest date_field of the group)
+    """
+    if not DEDUP_HISTORY or len(records) < 2:
+        return records
+    keys = [" | ".join(normalize_text(r.get(f)) for f in fields) for r in records]
+    digest = hashlib.sha1("\x1f".join([str(threshold)] + keys).encode("utf-8")).hexdigest()
+
+    with _cache_lock:
+        groups = _cache.get(digest)
+        if groups is not None:
+            _cache.move_to_end(digest)
+    if groups is None:
+        groups = group_near_duplicates(keys, threshold)
+        with _cache_lock:
+            _cache[digest] = groups
+            while len(_cache) > DEDUP_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    collapsed: Dict[int, Dict[str, Any]] = {}
+    for record, group in zip(records, groups):
+        representative = collapsed.get(group)
+        seen = record.get(date_field)
+        if representative is None:
+            collapsed[group] = {**record, "_count": record.get("_count", 1), "last_seen": seen}
+            continue
+        representative["_count"] += record.get("_count", 1)
+        if seen is not None and (representative["last_seen"] is None or str(seen) > str(representative["last_seen"])):
+            representative["last_seen"] = seen
+    return list(collapsed.values())
+
+
+def mmr_order(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_: float = MMR_LAMBDA) -> List[int]:
+    """
+    Maximal marginal relevance selection
+
+    Repeatedly picks the candidate maximizing
+    lambda * relevance - (1 - lambda) * max similarity to those already picked.
+
+    Args:
+        relevance (np.ndarray): Relevance of each candidate to the query
+        vectors (np.ndarray): L2-normalized candidate embeddings
+        k (int): Candidates to pick
+        lambda_ (float): Relevance weight in [0, 1]
+
+    Returns:
+        list: Picked positions, in pick order
+    """
+    n = len(relevance)
+    if n == 0:
+        return []
+    similarity = vectors @ vectors.T
+    picked: List[int] = [int(np.argmax(relevance))]
+    redundancy = similarity[picked[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[picked[0]] = False
+    while len(picked) < min(k, n):
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return picked
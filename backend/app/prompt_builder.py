@@ -0,0 +1,230 @@
+import math
+import os
+import re
+import logging
+from typing import List, Dict, Any, Optional, Callable, Sequence
+
+from app.tracing import span
+
+# Configure logging
+logger = logging.getLogger('prompt_builder')
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_NORMALIZE_RE = re.compile(r"[^\w\s-]", re.UNICODE)
+
+# Per-request input token budget per endpoint (static instructions are
+# registered with the provider separately); override with PROMPT_TOKEN_BUDGET_<ENDPOINT>
+DEFAULT_TOKEN_BUDGETS = {
+    "root_cause": 800,
+    "action": 1200,
+    "scoring": 800,
+    "scoring_summary": 1200,
+    "merge": 6000,
+}
+
+# Longer historical cells are cut to keep one noisy record from eating the budget
+MAX_CELL_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, offline token estimate for Gemini-style subword tokenizers
+
+    Every word or punctuation mark counts as at least one token, with long
+    words counted as one token per 4 characters.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return sum(max(1, math.ceil(len(t) / 4)) for t in _TOKEN_RE.findall(text))
+
+
+def get_token_budget(endpoint: str) -> int:
+    """
+    Get the input token budget for an endpoint
+
+    Args:
+        endpoint (str): Endpoint key, e.g. 'root_cause'
+
+    Returns:
+        int: Token budget
+    """
+    default = DEFAULT_TOKEN_BUDGETS.get(endpoint, 2000)
+    return int(os.getenv(f"PROMPT_TOKEN_BUDGET_{endpoint.upper()}", str(default)))
+
+
+def normalize_text(text: Any) -> str:
+    """Lowercase, strip punctuation (keeping '-') and collapse whitespace"""
+    if text is None:
+        return ""
+    return " ".join(_NORMALIZE_RE.sub(" ", str(text).lower()).split())
+
+
+def deduplicate_records(records: List[Dict[str, Any]], fields: Sequence[str],
+                        threshold: float = 0.85) -> List[Dict[str, Any]]:
+    """
+    Collapse near-identical records, keeping the first (most relevant) one
+
+    Two records are duplicates when their normalized `fields` are equal or
+    their word sets have a Jaccard similarity of at least `threshold`.
+
+    Args:
+        records (list): Records in relevance order
+        fields (list): Fields that define the record identity
+        threshold (float): Jaccard similarity treated as a duplicate
+
+    Returns:
+        list: Copies of the kept records with an occurrence count in '_count'
+    """
+    kept: List[Dict[str, Any]] = []
+    kept_words: List[set] = []
+    exact: Dict[str, int] = {}
+
+    for record in records:
+        key = " | ".join(normalize_text(record.get(f)) for f in fields)
+        index = exact.get(key)
+
+        if index is None:
+            words = set(key.replace("|", " ").split())
+            for i, other in enumerate(kept_words):
+                union = words | other
+                if union and len(words & other) / len(union) >= threshold:
+                    index = i
+                    break
+
+        if index is None:
+            exact[key] = len(kept)
+            kept.append({**record, "_count": record.get("_count", 1)})
+            kept_words.append(set(key.replace("|", " ").split()))
+        else:
+            exact.setdefault(key, index)
+            kept[index]["_count"] += record.get("_count", 1)
+
+    return kept
+
+
+def _cell(value: Any) -> str:
+    text = " ".join(str(value).split()) if value is not None else "-"
+    text = text.replace("|", "/")
+    if len(text) > MAX_CELL_CHARS:
+        text = text[:MAX_CELL_CHARS - 3] + "..."
+    return text or "-"
+
+
+class BuiltPrompt:
+    """
+    A fully rendered prompt plus the accounting of how it was assembled
+    """
+
+    def __init__(self, endpoint: str, text: str, tokens: int, budget: int,
+                 examples_used: int = 0, examples_total: int = 0, duplicates_collapsed: int = 0):
+        self.endpoint = endpoint
+        self.text = text
+        self.tokens = tokens
+        self.budget = budget
+        self.examples_used = examples_used
+        self.examples_total = examples_total
+        self.duplicates_collapsed = duplicates_collapsed
+
+    def stats(self) -> Dict[str, Any]:
+        """Accounting of the prompt, for logging and metrics"""
+        return {
+            "endpoint": self.endpoint,
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "examples_used": self.examples_used,
+            "examples_total": self.examples_total,
+            "duplicates_collapsed": self.duplicates_collapsed,
+        }
+
+
+class PromptBuilder:
+    """
+    Assemble prompts under a per-endpoint token budget.
+
+    Historical records are deduplicated and encoded as a compact pipe table;
+    rows are added in relevance order until the budget is reached.
+    """
+
+    def __init__(self, endpoint: str, template: str, budget: Optional[int] = None,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        self.endpoint = endpoint
+        self.template = template
+        self.budget = budget if budget is not None else get_token_budget(endpoint)
+        self.token_counter = token_counter
+
+    def build(self, variables: Dict[str, Any], records: Optional[List[Dict[str, Any]]] = None,
+              columns: Sequence[str] = (), table_variable: str = "historical_data",
+              empty_message: str = "No historical data available.",
+              context_columns: Optional[Dict[str, Any]] = None,
+              dedup: bool = True, enforce_budget: bool = True) -> BuiltPrompt:
+        """
+        Render the template with a budgeted historical table
+
+        Args:
+            variables (dict): Template variables other than the table
+            records (list): Historical records in relevance order
+            columns (list): Record fields to include as table columns
+            table_variable (str): Template variable that receives the table
+            empty_message (str): Text used when there are no usable records
+            context_columns (dict): Columns dropped from the table when every
+                row matches the given request value (e.g. area, category)
+            dedup (bool): Collapse near-identical records into one row
+            enforce_budget (bool): Drop trailing rows that do not fit the budget;
+                when False every row is kept and the budget is only reported
+
+        Returns:
+            BuiltPrompt: Rendered prompt with token accounting
+        """
+        with span("prompt", prompt=self.endpoint):
+            return self._render(variables, records, columns, table_variable, empty_message,
+                                context_columns, dedup, enforce_budget)
+
+    def _render(self, variables, records, columns, table_variable, empty_message,
+                context_columns, dedup, enforce_budget) -> BuiltPrompt:
+        valid = [r for r in (records or []) if isinstance(r, dict) and all(c in r for c in columns)]
+        rows = deduplicate_records(valid, columns) if dedup else [{**r, "_count": 1} for r in valid]
+        duplicates = len(valid) - len(rows)
+
+        # Drop columns already stated in the context section
+        shown_columns = list(columns)
+        for column, value in (context_columns or {}).items():
+            if column in shown_columns and rows and all(
+                    normalize_text(r.get(column)) == normalize_text(value) for r in rows):
+                shown_columns.remove(column)
+        show_count = any(r["_count"] > 1 for r in rows)
+
+        header = " | ".join(shown_columns + (["n"] if show_count else []))
+        base_tokens = self.token_counter(self.template.format(**variables, **{table_variable: ""}))
+        remaining = self.budget - base_tokens - self.token_counter(header)
+
+        lines = []
+        for row in rows:
+            cells = [_cell(row.get(c)) for c in shown_columns]
+            if show_count:
+                cells.append(str(row["_count"]))
+            line = " | ".join(cells)
+            cost = self.token_counter(line)
+            if enforce_budget and cost > remaining:
+                break
+            lines.append(line)
+            remaining -= cost
+
+        table = "\n".join([header] + lines) if lines else empty_message
+        text = self.template.format(**variables, **{table_variable: table})
+
+        built = BuiltPrompt(
+            endpoint=self.endpoint,
+            text=text,
+            tokens=self.token_counter(text),
+            budget=self.budget,
+            examples_used=len(lines),
+            examples_total=len(valid),
+            duplicates_collapsed=duplicates
+        )
+        if built.tokens > built.budget:
+            logger.warning(f"Prompt for '{self.endpoint}' exceeds budget: {built.tokens} > {built.budget} tokens")
+        return built
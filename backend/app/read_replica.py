@@ -0,0 +1,263 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from typing import Any, Callable, Dict, Optional
+
+import mysql.connector
+
+from app import db_backend
+from app.metrics import db_reads, replica_lag
+
+# Configure logging
+logger = logging.getLogger('read_replica')
+
+# Pure reads (history retrieval, areas, attendee lists) go to a read replica
+# at DB_READ_HOST when one is configured; attendance and points writes stay
+# on the primary (DB_HOST). A read falls back to the primary while the
+# replica lags more than REPLICA_MAX_LAG_SECONDS (measured at most every
+# REPLICA_LAG_CHECK_SECONDS), when it cannot be reached, and for
+# READ_YOUR_WRITES_SECONDS after a write by the same user or to the same
+# session, so a check-in is visible to the next read. Write markers are kept
+# in READ_YOUR_WRITES_FILE, a small SQLite file shared by every worker on the
+# host (run_workers.py), so a check-in handled by one worker sends the next
+# read on any other worker to the primary; empty keeps them per process.
+DB_READ_HOST = os.getenv("DB_READ_HOST", "")
+DB_READ_PORT = os.getenv("DB_READ_PORT", "")
+DB_READ_USER = os.getenv("DB_READ_USER", "")
+DB_READ_PASSWORD = os.getenv("DB_READ_PASSWORD", "")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "30"))
+READ_YOUR_WRITES_FILE = os.getenv("READ_YOUR_WRITES_FILE", "data/read_your_writes.sqlite3")
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+
+def user_key(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+def session_key(session_id: Any) -> str:
+    return f"session:{session_id}"
+
+
+def replica_configured() -> bool:
+    if db_backend.DB_BACKEND == "sqlite":
+        return bool(db_backend.SQLITE_READ_PATH)
+    return bool(DB_READ_HOST)
+
+
+def replica_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Connection arguments of the replica: the primary's, with DB_READ_* overrides"""
+    config = dict(config, host=DB_READ_HOST)
+    if DB_READ_PORT:
+        config["port"] = int(DB_READ_PORT)
+    if DB_READ_USER:
+        config["user"] = DB_READ_USER
+        config["password"] = DB_READ_PASSWORD
+    return config
+
+
+def replication_lag(connection) -> Optional[float]:
+    """
+    Seconds the replica is behind its source
+
+    Returns:
+        float: Lag in seconds, 0 for a server that is not replicating (or the
+            SQLite stand-in), None when replication is stopped or broken
+    """
+    if db_backend.DB_BACKEND == "sqlite":
+        return 0.0
+    cursor = connection.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.Error:
+            # MySQL < 8.0.22 / MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not status:
+        return 0.0
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+
+class SharedWriteMarkers:
+    """
+    Read-your-writes markers (key -> expiry) in a SQLite file, visible to
+    every process on the host
+
+    Args:
+        path (str): SQLite file; created on first use
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._created = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+        if not self._created:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS write_markers (key TEXT PRIMARY KEY, until REAL NOT NULL)")
+            self._created = True
+        return connection
+
+    def mark(self, keys, until: float, now: float):
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO write_markers (key, until) VALUES (?, ?)",
+                                   [(key, until) for key in keys])
+            connection.execute("DELETE FROM write_markers WHERE until <= ?", (now,))
+
+    def written(self, keys, now: float) -> bool:
+        with closing(self._connect()) as connection:
+            placeholders = ", ".join("?" * len(keys))
+            row = connection.execute(f"SELECT 1 FROM write_markers WHERE key IN ({placeholders}) AND until > ? "
+                                     f"LIMIT 1", (*keys, now)).fetchone()
+            return row is not None
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read is served by the replica or the primary
+
+    Args:
+        max_lag (float): Replica lag above which reads use the primary
+        lag_check_interval (float): Seconds a lag measurement is reused
+        read_your_writes (float): Seconds reads for a written key use the primary
+        probe: Callable measuring the lag on a replica connection
+        markers_file (str): Write markers shared with the other workers
+            (READ_YOUR_WRITES_FILE); empty keeps them in this process only
+        clock: Wall clock, comparable across processes and restarts
+    """
+
+    def __init__(self, max_lag: float = REPLICA_MAX_LAG_SECONDS,
+                 lag_check_interval: float = REPLICA_LAG_CHECK_SECONDS,
+                 read_your_writes: float = READ_YOUR_WRITES_SECONDS,
+                 probe: Callable[[Any], Optional[float]] = replication_lag,
+                 markers_file: str = READ_YOUR_WRITES_FILE,
+                 clock: Callable[[], float] = time.time):
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.read_your_writes = read_your_writes
+        self.probe = probe
+        self.clock = clock
+        self._writes: Dict[str, float] = {}
+        self._shared = SharedWriteMarkers(markers_file) if markers_file else None
+        self._lag: Optional[float] = None
+        self._lag_checked: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def mark_write(self, *keys: str):
+        """Record a committed write, so reads for these keys (on any worker) see it"""
+        if not keys or not replica_configured():
+            return
+        now = self.clock()
+        until = now + self.read_your_writes
+        with self._lock:
+            for key in keys:
+                self._writes[key] = until
+            if len(self._writes) > 10000:
+                self._writes = {k: t for k, t in self._writes.items() if t > now}
+        if self._shared is not None:
+            try:
+                self._shared.mark(keys, until, now)
+            except sqlite3.Error as e:
+                # This worker still reads its own writes from the primary
+                logger.warning(f"Could not share write markers through {self._shared.path}: {e}")
+
+    def recently_written(self, *keys: str) -> bool:
+        if not keys:
+            return False
+        now = self.clock()
+        with self._lock:
+            if any(self._writes.get(key, 0) > now for key in keys):
+                return True
+        if self._shared is not None:
+            try:
+                return self._shared.written(keys, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read shared write markers from {self._shared.path}: {e}")
+        return False
+
+    def _lag_due(self) -> bool:
+        with self._lock:
+            return self._lag_checked is None or self.clock() - self._lag_checked >= self.lag_check_interval
+
+    def _set_lag(self, lag: Optional[float]):
+        with self._lock:
+            self._lag, self._lag_checked = lag, self.clock()
+        replica_lag.set(-1 if lag is None else lag)
+
+    def _lag_ok(self) -> bool:
+        with self._lock:
+            return self._lag is not None and self._lag <= self.max_lag
+
+    def read_connection(self, config: Dict[str, Any], *keys: str):
+        """
+        Open a replica connection for a read, if the replica should serve it
+
+        Args:
+            config (dict): Primary connection arguments
+            keys: Read-your-writes keys of the read (user_key, session_key)
+
+        Returns:
+            Replica connection, or None when the read must use the primary
+        """
+        if not replica_configured():
+            return self._route(PRIMARY, "no_replica")
+        if self.recently_written(*keys):
+            return self._route(PRIMARY, "read_your_writes")
+        if not self._lag_due() and not self._lag_ok():
+            return self._route(PRIMARY, "lag" if self._lag is not None else "unavailable")
+        try:
+            connection = db_backend.connect(replica_config(config), replica=True)
+        except mysql.connector.Error as err:
+            logger.warning(f"Read replica unavailable, reading from the primary: {err}")
+            self._set_lag(None)
+            return self._route(PRIMARY, "unavailable")
+        if self._lag_due():
+            try:
+                self._set_lag(self.probe(connection))
+            except mysql.connector.Error as err:
+                logger.warning(f"Replica lag check failed: {err}")
+                self._set_lag(None)
+            if not self._lag_ok():
+                connection.close()
+                return self._route(PRIMARY, "lag" if self._lag is not None else "unavailable")
+        return self._route(REPLICA, "ok", connection)
+
+    @staticmethod
+    def _route(target: str, reason: str, connection=None):
+        db_reads.inc(target=target, reason=reason)
+        return connection
+
+
+_router: Optional[ReplicaRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_replica_router() -> ReplicaRouter:
+    """Process-wide replica router"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ReplicaRouter()
+    return _router
+
+
+def set_replica_router(router: Optional[ReplicaRouter]):
+    """Replace the process-wide router (used by tests)"""
+    global _router
+    with _router_lock:
+        _router = router
@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+from app.metrics import rerank_outcomes
+
+# Configure logging
+logger = logging.getLogger('reranker')
+
+# Optional second retrieval stage: the best RERANK_CANDIDATES records by
+# cosine/hybrid order are scored against the query by a small CPU
+# cross-encoder, in batches of RERANK_BATCH_SIZE, and only the best
+# RERANK_TOP_K go into the prompt. When scoring would not finish within
+# RERANK_BUDGET_MS the stage is abandoned and the cosine order is used.
+RERANK = os.getenv("RERANK", "false").lower() == "true"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "5"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+
+_reranker: Optional[Any] = None
+_reranker_loaded = False
+_reranker_lock = threading.Lock()
+
+
+def load_cross_encoder() -> Any:
+    """Load RERANK_MODEL_NAME in this process (raises on failure)"""
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(RERANK_MODEL_NAME, device="cpu")
+
+
+def get_reranker() -> Optional[Any]:
+    """
+    Process-wide cross-encoder, loaded on first use
+
+    Returns:
+        CrossEncoder: The shared model, or None if reranking is disabled or
+            the model could not be loaded
+    """
+    global _reranker, _reranker_loaded
+    if not RERANK:
+        return None
+    if not _reranker_loaded:
+        with _reranker_lock:
+            if not _reranker_loaded:
+                try:
+                    _reranker = load_cross_encoder()
+                    logger.info(f"Cross-encoder '{RERANK_MODEL_NAME}' loaded successfully")
+                except Exception as e:
+                    logger.error(f"Error loading cross-encoder model: {str(e)}")
+                    _reranker = None
+                _reranker_loaded = True
+    return _reranker
+
+
+def set_reranker(model: Optional[Any]):
+    """Replace the process-wide cross-encoder (used by tests and benchmarks)"""
+    global _reranker, _reranker_loaded
+    with _reranker_lock:
+        _reranker = model
+        _reranker_loaded = True
+
+
+def rerank(model: Any, query: str, texts: Sequence[str], budget_ms: float = RERANK_BUDGET_MS,
+           batch_size: int = RERANK_BATCH_SIZE) -> Optional[np.ndarray]:
+    """
+    Order texts by cross-encoder relevance to the query, within a time budget
+
+    Batches are scored one after another; before each batch the time it
+    would take (the slowest batch so far) is checked against what is left
+    of the budget, so the stage stops early rather than overrunning.
+
+    Args:
+        model: Object with a CrossEncoder-style predict(list_of_pairs) method
+        query (str): Query text
+        texts (list): Candidate texts
+        budget_ms (float): Time budget in milliseconds
+        batch_size (int): Pairs per predict() call
+
+    Returns:
+        np.ndarray: Positions into texts, most relevant first; None when the
+            budget ran out or the model failed (keep the original order)
+    """
+    if not texts:
+        return np.empty(0, dtype=np.int64)
+    budget = budget_ms / 1000
+    start = time.perf_counter()
+    slowest = 0.0
+    scores: List[float] = []
+    try:
+        for offset in range(0, len(texts), batch_size):
+            elapsed = time.perf_counter() - start
+            if elapsed + slowest > budget:
+                rerank_outcomes.inc(outcome="over_budget")
+                logger.warning(f"Reranking stopped after {len(scores)}/{len(texts)} candidates "
+                               f"({elapsed * 1000:.0f} ms of {budget_ms:.0f} ms), keeping cosine order")
+                return None
+            batch_start = time.perf_counter()
+            pairs = [(query, text) for text in texts[offset:offset + batch_size]]
+            scores.extend(float(s) for s in np.ravel(model.predict(pairs, batch_size=len(pairs),
+                                                                   show_progress_bar=False)))
+            slowest = max(slowest, time.perf_counter() - batch_start)
+    except Exception as e:
+        rerank_outcomes.inc(outcome="error")
+        logger.error(f"Reranking failed, keeping cosine order: {str(e)}")
+        return None
+
+    if time.perf_counter() - start > budget:
+        # The last batch overran anyway; the caller is already late
+        rerank_outcomes.inc(outcome="over_budget")
+        return None
+    rerank_outcomes.inc(outcome="ok")
+    return np.argsort(-np.asarray(scores), kind="stable")
@@ -0,0 +1,103 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+from app.embeddings import release_sentence_model
+from app.metrics import resource_acquisitions
+from app.tracing import current_endpoint
+from app.warmup import WARMUP_ON_STARTUP, start_warmup
+
+# Configure logging
+logger = logging.getLogger('resources')
+
+# Two kinds of resources back the endpoints:
+#   singletons  - sentence model, LLM client, caches: created once per
+#                 process (warm-up at startup, or first use) and released
+#                 when the application shuts down (lifespan)
+#   per-request - history DB, attendance DB, AI model: a Handle created by
+#                 the dependency, opened on first use by the handler and
+#                 closed after the response. Connections are opened by the
+#                 first query, so an endpoint that returns early (fast-path
+#                 answer, zero score, cached areas) opens none.
+# Every acquisition is counted in resource_acquired_total{endpoint, resource}.
+
+
+def acquired(resource: str):
+    """Count one acquisition of a resource by the endpoint being handled"""
+    resource_acquisitions.inc(endpoint=current_endpoint(), resource=resource)
+
+
+class Handle:
+    """
+    Per-request resource, created on first use and released after the response
+
+    Attribute access is forwarded to the resource, so a handler uses the
+    handle as if it were the resource (the handle's own names start with
+    an underscore so they cannot shadow the resource's).
+
+    Args:
+        name (str): Resource label for the accounting
+        factory: Creates the resource
+        release: Closes it (e.g. DatabaseConnector.disconnect)
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], release: Optional[Callable[[Any], None]] = None):
+        self._name = name
+        self._factory = factory
+        self._release = release
+        self._resource = None
+
+    @property
+    def _acquired(self) -> bool:
+        return self._resource is not None
+
+    def _acquire(self) -> Any:
+        """The resource, created now if this is its first use"""
+        if self._resource is None:
+            self._resource = self._factory()
+            acquired(self._name)
+        return self._resource
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self._acquire(), attr)
+
+    def _release_resource(self):
+        if self._resource is not None and self._release is not None:
+            try:
+                self._release(self._resource)
+            except Exception as e:
+                logger.warning(f"Error releasing {self._name}: {str(e)}")
+        self._resource = None
+
+
+def request_handle(name: str, factory: Callable[[], Any], release: Optional[Callable[[Any], None]] = None):
+    """
+    FastAPI dependency yielding a Handle that is released after the response
+
+    Args:
+        name (str): Resource label for the accounting
+        factory: Creates the resource
+        release: Closes it
+    """
+    def dependency():
+        handle = Handle(name, factory, release)
+        try:
+            yield handle
+        finally:
+            handle._release_resource()
+    return dependency
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Application lifespan: warm the singletons up, release them at shutdown"""
+    # Embedding model and LLM client load in the background; requests are
+    # served meanwhile and /health/ready reports when they are warm
+    if WARMUP_ON_STARTUP:
+        start_warmup()
+    try:
+        yield
+    finally:
+        release_sentence_model()
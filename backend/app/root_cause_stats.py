@@ -0,0 +1,341 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import root_cause_stats_refresh, root_cause_stats_rows
+from app.near_duplicates import MinHasher, collapse_near_duplicates
+from app.prompt_builder import normalize_text
+
+# Configure logging
+logger = logging.getLogger('root_cause_stats')
+
+# Materialized root cause frequencies per (line, category): counts of each
+# root cause and of each problem -> root cause pair, bucketed by day. Built
+# once from the database (warm-up), then refreshed incrementally (only
+# root_causes rows with an id above the last one seen) when older than
+# STATS_REFRESH_SECONDS; rebuilt from scratch every STATS_REBUILD_SECONDS
+# so edited and deleted rows drop out. Refreshes run in a background thread
+# with their own connection; requests read the current numbers meanwhile.
+ROOT_CAUSE_STATS = os.getenv("ROOT_CAUSE_STATS", "true").lower() == "true"
+STATS_REFRESH_SECONDS = float(os.getenv("STATS_REFRESH_SECONDS", "60"))
+STATS_REBUILD_SECONDS = float(os.getenv("STATS_REBUILD_SECONDS", "3600"))
+STATS_BATCH_SIZE = int(os.getenv("STATS_BATCH_SIZE", "5000"))
+# Default time window (days, 0 = all time) and problem similarity (MinHash
+# Jaccard) for counting a historical problem as the same problem type
+STATS_WINDOW_DAYS = int(os.getenv("STATS_WINDOW_DAYS", "365"))
+STATS_PROBLEM_THRESHOLD = float(os.getenv("STATS_PROBLEM_THRESHOLD", "0.5"))
+# Root causes shown to the LLM as priors in the root cause prompt (0 = off)
+STATS_PRIOR_LIMIT = int(os.getenv("STATS_PRIOR_LIMIT", "5"))
+
+_hasher = MinHasher()
+
+
+def _day(value: Any) -> str:
+    """Day bucket of a created_at value ('' when unknown)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()[:10]
+    return str(value)[:10] if value else ""
+
+
+class _Tally:
+    """Occurrences of one (normalized) text, by day"""
+
+    __slots__ = ("text", "days", "last_seen")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.days: Counter = Counter()
+        self.last_seen = ""
+
+    def add(self, text: str, day: str):
+        self.days[day] += 1
+        if day >= self.last_seen:
+            # The latest wording represents the text
+            self.text, self.last_seen = text, day
+
+    def count(self, since: str) -> int:
+        if not since:
+            return sum(self.days.values())
+        return sum(n for day, n in self.days.items() if day >= since)
+
+
+class _Group:
+    """Statistics of one (line, category)"""
+
+    def __init__(self, area: str, category: str):
+        self.area = area
+        self.category = category
+        self.root_causes: Dict[str, _Tally] = {}
+        # problem key -> (problem tally, root cause key -> tally)
+        self.problems: Dict[str, Tuple[_Tally, Dict[str, _Tally]]] = {}
+        self._problem_keys: List[str] = []
+        self._signatures: Optional[np.ndarray] = None
+
+    def add(self, problem: str, root_cause: str, day: str):
+        rc_key = normalize_text(root_cause)
+        self.root_causes.setdefault(rc_key, _Tally(root_cause)).add(root_cause, day)
+        problem_key = normalize_text(problem)
+        if problem_key not in self.problems:
+            self.problems[problem_key] = (_Tally(problem), {})
+            self._signatures = None
+        problem_tally, pairs = self.problems[problem_key]
+        problem_tally.add(problem, day)
+        pairs.setdefault(rc_key, _Tally(root_cause)).add(root_cause, day)
+
+    def similar_problems(self, problem: str, threshold: float) -> List[str]:
+        """Problem keys of the same problem type (MinHash Jaccard >= threshold)"""
+        if self._signatures is None:
+            self._problem_keys = list(self.problems)
+            self._signatures = np.stack([_hasher.signature(key) for key in self._problem_keys])
+        similarity = (self._signatures == _hasher.signature(normalize_text(problem))).mean(axis=1)
+        return [self._problem_keys[i] for i in np.flatnonzero(similarity >= threshold)]
+
+
+def _ranked(tallies: List[_Tally], since: str, limit: int) -> List[Dict[str, Any]]:
+    """Near-duplicate root causes merged, most frequent first"""
+    records = [{"root_cause": t.text, "_count": t.count(since), "created_at": t.last_seen}
+               for t in tallies]
+    records = [r for r in records if r["_count"]]
+    # Same order for equal counts on every call: most recent first
+    records.sort(key=lambda r: r["created_at"], reverse=True)
+    merged = collapse_near_duplicates(records, ("root_cause",))
+    merged.sort(key=lambda r: r["_count"], reverse=True)
+    total = sum(r["_count"] for r in merged)
+    return [{"root_cause": r["root_cause"], "count": r["_count"], "share": round(r["_count"] / total, 4),
+             "last_seen": r.get("last_seen", r["created_at"]) or None} for r in merged[:limit]]
+
+
+def _connect():
+    from app.database import DatabaseConnector
+
+    return DatabaseConnector()
+
+
+class RootCauseStats:
+    """
+    Materialized root cause frequencies, refreshed incrementally
+
+    Args:
+        clock (callable): Monotonic clock for the refresh intervals
+        connect (callable): Opens the database used by background refreshes
+            (get_root_cause_rows_since, disconnect); a DatabaseConnector by default
+    """
+
+    def __init__(self, clock=time.monotonic, connect: Callable[[], Any] = _connect):
+        self.clock = clock
+        self.connect = connect
+        self.groups: Dict[Tuple[str, str], _Group] = {}
+        self.watermark = 0
+        self.rows = 0
+        self.refreshed_at: Optional[datetime] = None
+        self._refreshed = self._rebuilt = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    def _apply(self, groups: Dict[Tuple[str, str], _Group], rows: List[Dict[str, Any]]) -> int:
+        watermark = 0
+        for row in rows:
+            watermark = max(watermark, int(row["id"]))
+            if not row.get("problem") or not row.get("root_cause"):
+                continue
+            area, category = (row.get("area") or "").strip(), (row.get("category") or "").strip()
+            key = (area, category)
+            if key not in groups:
+                groups[key] = _Group(area, category)
+            groups[key].add(row["problem"], row["root_cause"], _day(row.get("created_at")))
+        return watermark
+
+    @property
+    def loaded(self) -> bool:
+        """Whether a first full load has completed"""
+        return self._rebuilt is not None
+
+    def refresh(self, db, full: bool = False) -> int:
+        """
+        Load root_causes rows added since the last refresh
+
+        A failed read keeps the previous statistics: a rebuild is discarded,
+        an incremental refresh keeps the batches it already applied.
+
+        Args:
+            db: DatabaseConnector (get_root_cause_rows_since)
+            full (bool): Rebuild from scratch instead
+
+        Returns:
+            int: Rows loaded
+
+        Raises:
+            RuntimeError: If the rows could not be read
+        """
+        start = time.perf_counter()
+        # A rebuild fills new groups and swaps them in at the end
+        groups = {} if full else self.groups
+        watermark, loaded = (0 if full else self.watermark), 0
+        while True:
+            rows = db.get_root_cause_rows_since(watermark, STATS_BATCH_SIZE)
+            if rows is None:
+                raise RuntimeError(f"Root cause rows after id {watermark} could not be read")
+            if not rows:
+                break
+            with self._lock:
+                watermark = max(watermark, self._apply(groups, rows))
+                if not full:
+                    # Applied rows are recorded at once, so they are never applied twice
+                    self.watermark, self.rows = watermark, self.rows + len(rows)
+            loaded += len(rows)
+            if len(rows) < STATS_BATCH_SIZE:
+                break
+        with self._lock:
+            if full:
+                self.groups, self.rows, self.watermark = groups, loaded, watermark
+                self._rebuilt = self.clock()
+            self._refreshed = self.clock()
+            self.refreshed_at = datetime.now()
+        root_cause_stats_rows.set(self.rows)
+        root_cause_stats_refresh.observe(time.perf_counter() - start, mode="full" if full else "incremental")
+        logger.info(f"Root cause statistics {'rebuilt' if full else 'refreshed'}: {loaded} rows "
+                    f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return loaded
+
+    def _stale(self) -> bool:
+        return self._rebuilt is None or self.clock() - self._refreshed >= STATS_REFRESH_SECONDS
+
+    def _run_refresh(self):
+        # Called with _refresh_lock held; releases it
+        try:
+            db = self.connect()
+            try:
+                now = self.clock()
+                if self._rebuilt is None or now - self._rebuilt >= STATS_REBUILD_SECONDS:
+                    self.refresh(db, full=True)
+                elif now - self._refreshed >= STATS_REFRESH_SECONDS:
+                    self.refresh(db)
+            finally:
+                db.disconnect()
+        except Exception as e:
+            logger.error(f"Error refreshing root cause statistics: {str(e)}")
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_if_stale(self, wait: bool = False):
+        """
+        Refresh when older than STATS_REFRESH_SECONDS (rebuild when older than
+        STATS_REBUILD_SECONDS), in a background thread: the caller reads the
+        current numbers (nothing before the first load, see loaded)
+
+        Args:
+            wait (bool): Refresh in the calling thread, or wait for the
+                running refresh (warm-up, tests)
+        """
+        if not self._stale():
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            if wait:
+                with self._refresh_lock:
+                    pass
+            return
+        if wait:
+            self._run_refresh()
+        else:
+            threading.Thread(target=self._run_refresh, name="root-cause-stats", daemon=True).start()
+
+    def query(self, area: str, category: str, problem: Optional[str] = None,
+              window_days: int = STATS_WINDOW_DAYS, limit: int = 10) -> Dict[str, Any]:
+        """
+        Most frequent root causes of a line and category
+
+        Lines and categories match like the history queries (the given text
+        contained in the name, ignoring case and punctuation).
+
+        Args:
+            area (str): Line name (or part of it)
+            category (str): Category (or part of it)
+            problem (str): Also count root causes of this problem type
+            window_days (int): Only occurrences in the last window_days (0 = all time)
+            limit (int): Root causes per list
+
+        Returns:
+            dict: total, root_causes and, with a problem, problem_matches and
+                problem_root_causes (each root cause with count, share and last_seen)
+        """
+        since = (date.today() - timedelta(days=window_days)).isoformat() if window_days else ""
+        area_key, category_key = normalize_text(area), normalize_text(category)
+        with self._lock:
+            groups = [g for (a, c), g in self.groups.items()
+                      if area_key in normalize_text(a) and category_key in normalize_text(c)]
+            root_causes = [t for g in groups for t in g.root_causes.values()]
+            result = {"window_days": window_days, "total": sum(t.count(since) for t in root_causes),
+                      "root_causes": _ranked(root_causes, since, limit), "refreshed_at": self.refreshed_at}
+            if problem:
+                matches = [g.problems[key] for g in groups for key in g.similar_problems(problem, STATS_PROBLEM_THRESHOLD)]
+                result["problem_matches"] = sum(tally.count(since) for tally, _ in matches)
+                result["problem_root_causes"] = _ranked(
+                    [t for _, pairs in matches for t in pairs.values()], since, limit)
+        return result
+
+
+def format_priors(stats: Dict[str, Any], limit: int = STATS_PRIOR_LIMIT) -> str:
+    """
+    Root cause frequencies as a compact prompt section
+
+    Root causes of the same problem type are preferred; the line/category
+    frequencies are used when the problem has no history.
+
+    Returns:
+        str: Section text ending with a blank line, or '' without data
+    """
+    rows = stats.get("problem_root_causes") or stats.get("root_causes") or []
+    if not rows or limit <= 0:
+        return ""
+    scope = "problem serupa" if stats.get("problem_root_causes") else "area & category ini"
+    window = f"{stats['window_days']} hari terakhir" if stats.get("window_days") else "semua data"
+    lines = [f"{r['root_cause']} | {r['count']}" for r in rows[:limit]]
+    return f"\n## Root Cause Tersering ({scope}, {window}):\nroot_cause | n\n" + "\n".join(lines) + "\n"
+
+
+def prompt_priors(area: str, category: str, problem: str) -> str:
+    """
+    Prior section for the root cause prompt
+
+    Args:
+        area (str): Line name
+        category (str): Category
+        problem (str): Problem description
+
+    Returns:
+        str: format_priors() text, '' when disabled or without data
+    """
+    stats = get_root_cause_stats()
+    if stats is None or STATS_PRIOR_LIMIT <= 0:
+        return ""
+    stats.refresh_if_stale()
+    return format_priors(stats.query(area, category, problem=problem, limit=STATS_PRIOR_LIMIT))
+
+
+_stats: Optional[RootCauseStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_root_cause_stats() -> Optional[RootCauseStats]:
+    """Process-wide statistics, None when ROOT_CAUSE_STATS is disabled"""
+    global _stats
+    if not ROOT_CAUSE_STATS:
+        return None
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = RootCauseStats()
+    return _stats
+
+
+def set_root_cause_stats(stats: Optional[RootCauseStats]):
+    """Replace the process-wide statistics (used by tests and benchmarks)"""
+    global _stats
+    with _stats_lock:
+        _stats = stats
@@ -0,0 +1,156 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+# Request and response models shared by the API (main.py) and the
+# structured-output parsing of LLM responses (structured_output.py)
+
+
+class RootCauseRequest(BaseModel):
+    area: str
+    problem: str
+    category: str
+
+
+class RootCauseResponse(BaseModel):
+    input_area: str
+    input_problem: str
+    suggested_root_causes: List[str]
+    # 'llm', or 'history' when answered from near-identical historical records
+    source: str = "llm"
+    confidence: Optional[float] = None
+
+# New models for the root cause merging API
+
+
+class RootCauseItem(BaseModel):
+    root_cause: str
+    user_id: str
+
+
+class MergeRootCauseRequest(BaseModel):
+    root_causes: List[RootCauseItem]
+
+
+class OriginalRootCauseItem(BaseModel):
+    root_cause: str
+    user_id: str
+
+
+class MergedRootCauseGroup(BaseModel):
+    merged_root_cause: str
+    original_data: List[OriginalRootCauseItem]
+
+
+class MergeRootCauseResponse(BaseModel):
+    merged_root_causes: List[MergedRootCauseGroup]
+    individual_root_causes: List[OriginalRootCauseItem]
+    all_original_data: List[OriginalRootCauseItem]
+
+# Root cause frequency statistics API
+
+
+class RootCauseFrequency(BaseModel):
+    root_cause: str
+    count: int
+    share: float
+    last_seen: Optional[str] = None
+
+
+class RootCauseStatsResponse(BaseModel):
+    area: str
+    category: str
+    window_days: int
+    total: int
+    root_causes: List[RootCauseFrequency]
+    problem: Optional[str] = None
+    problem_matches: Optional[int] = None
+    problem_root_causes: Optional[List[RootCauseFrequency]] = None
+    refreshed_at: Optional[datetime] = None
+
+# New models for the action suggestion API
+
+
+class ActionSuggestionRequest(BaseModel):
+    area: str
+    problem: str
+    root_cause: str
+    category: str
+
+
+class ActionSuggestionResponse(BaseModel):
+    input_area: str
+    input_problem: str
+    input_root_cause: str
+    temporary_actions: List[str]
+    preventive_actions: List[str]
+    source: str = "llm"
+    confidence: Optional[float] = None
+
+# New models for the root cause scoring API
+
+
+class ScoreItem(BaseModel):
+    root_cause: str
+    spesifisitas: float
+    relevansi: float
+    kejelasan: float
+    actionability: float
+    total_score: float
+    feedback: str
+
+
+class RootCauseScoreRequest(BaseModel):
+    area: str
+    problem: str
+    category: str
+    root_causes: List[str]
+    user_id: str
+
+
+class RootCauseScoreResponse(BaseModel):
+    scores: List[ScoreItem]
+    summary: str
+
+# Models for attendance API
+
+
+class AttendanceRequest(BaseModel):
+    user_id: str
+    qr_token: str
+
+
+class AttendanceData(BaseModel):
+    user_id: str
+    timestamp: str
+    status: str
+    time_in: Optional[str] = None
+    time_out: Optional[str] = None
+    user_name: Optional[str] = None
+    role: Optional[str] = None
+
+
+class AttendanceResponse(BaseModel):
+    status: str
+    message: str
+    data: Optional[AttendanceData] = None
+
+# Shapes the LLM is asked to produce (validated before building API responses)
+
+
+class MergeRootCauseResult(BaseModel):
+    merged_root_causes: List[MergedRootCauseGroup]
+    individual_root_causes: List[OriginalRootCauseItem]
+
+
+class ActionSuggestionResult(BaseModel):
+    temporary_actions: List[str]
+    preventive_actions: List[str]
+
+
+class ScoreItemsResult(BaseModel):
+    scores: List[ScoreItem]
+
+
+class ScoringSummaryResult(BaseModel):
+    summary: str
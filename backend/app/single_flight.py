@@ -0,0 +1,163 @@
+import os
+import json
+import copy
+import asyncio
+import hashlib
+import inspect
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict
+
+from app.llm_limiter import LLMOverloaded, remaining_time
+from app.metrics import llm_shed, single_flight_calls
+from app.prompt_builder import normalize_text
+
+# Configure logging
+logger = logging.getLogger('single_flight')
+
+# Collapse identical concurrent AI requests (same normalized inputs) into
+# one computation whose result every caller receives. Only calls that are
+# in flight at the same time are shared; nothing is cached afterwards.
+# Waiting callers give up at their own request deadline (LLMOverloaded).
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_key(operation: str, **fields) -> str:
+    """
+    Key identifying a request by its normalized inputs
+
+    Strings are lowercased with punctuation and extra whitespace removed,
+    so 'Tinta  kotor!' and 'tinta kotor' share a key.
+
+    Args:
+        operation (str): Operation name, e.g. 'suggest_root_causes'
+        **fields: Request inputs (JSON-serializable)
+
+    Returns:
+        str: Hex digest
+    """
+    payload = json.dumps({"op": operation, **_normalize(fields)}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time
+
+    The first caller for a key (the leader) computes; callers arriving while
+    it runs wait for and receive a copy of the same result, or the same
+    exception. Sync callers (threadpool handlers) and async callers share
+    one table, so they coalesce with each other.
+
+    Args:
+        name (str): Label for the single_flight_calls_total metric
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                single_flight_calls.inc(name=self.name, role="collapsed")
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            single_flight_calls.inc(name=self.name, role="leader")
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _deadline_passed(self) -> LLMOverloaded:
+        llm_shed.inc(reason="deadline")
+        logger.warning(f"Request deadline passed while waiting for an identical '{self.name}' request")
+        return LLMOverloaded("Request deadline passed while waiting for an identical request", reason="deadline")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Run func(), or wait for the in-flight call with the same key
+
+        Args:
+            key (str): Request key, see request_key()
+            func (callable): Computation without arguments
+
+        Returns:
+            The computation's result (a deep copy for waiting callers)
+        """
+        if not SINGLE_FLIGHT:
+            return func()
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return copy.deepcopy(future.result(timeout=self._wait_timeout()))
+            except FutureTimeout:
+                raise self._deadline_passed() from None
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Async variant of do(); waiting does not block the event loop
+
+        Args:
+            key (str): Request key, see request_key()
+            func (callable): Coroutine function, or a blocking function that
+                is run in a worker thread
+        """
+        if not SINGLE_FLIGHT:
+            return await self._run_async(func)
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                # Shielded: a waiter giving up must not cancel the leader's result
+                return copy.deepcopy(await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), self._wait_timeout()))
+            except asyncio.TimeoutError:
+                raise self._deadline_passed() from None
+        try:
+            result = await self._run_async(func)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    @staticmethod
+    def _wait_timeout():
+        remaining = remaining_time()
+        return None if remaining is None else max(0.0, remaining)
+
+    @staticmethod
+    async def _run_async(func: Callable[[], Any]) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await func()
+        return await asyncio.to_thread(func)
@@ -0,0 +1,164 @@
+import re
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterator
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.metrics import llm_parse_attempts, llm_parse_failures
+from app.tracing import span
+
+# Configure logging
+logger = logging.getLogger('structured_output')
+
+_CLOSERS = {'{': '}', '[': ']'}
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class StructuredOutputError(ValueError):
+    """Raised when an LLM response does not contain a valid structured result"""
+
+
+def iter_json(text: str) -> Iterator[Any]:
+    """
+    Yield every valid JSON object or array in noisy LLM output, in order
+
+    Handles code fences, leading/trailing prose and trailing commas in a
+    single left-to-right pass: a bracket-balanced candidate is tracked while
+    respecting string literals, and parsing is only attempted once it closes.
+
+    Args:
+        text (str): Raw model output
+
+    Yields:
+        Any: Each decoded top-level JSON value (dict or list)
+    """
+    start = -1
+    stack = []
+    in_string = False
+    escape = False
+
+    for i, c in enumerate(text):
+        if start < 0:
+            if c in _CLOSERS:
+                start = i
+                stack = [_CLOSERS[c]]
+                in_string = False
+                escape = False
+            continue
+
+        if in_string:
+            if escape:
+                escape = False
+            elif c == '\\':
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in _CLOSERS:
+            stack.append(_CLOSERS[c])
+        elif c in '}]':
+            if c != stack[-1]:
+                # Unbalanced; this was not JSON, keep scanning
+                start = -1
+                continue
+            stack.pop()
+            if not stack:
+                candidate = text[start:i + 1]
+                start = -1
+                try:
+                    yield json.loads(candidate)
+                except json.JSONDecodeError:
+                    try:
+                        yield json.loads(_TRAILING_COMMA_RE.sub(r"\1", candidate))
+                    except json.JSONDecodeError:
+                        continue
+
+
+def extract_json(text: str) -> Any:
+    """
+    Extract the first valid JSON object or array from noisy LLM output
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        Any: The decoded JSON value (dict or list)
+
+    Raises:
+        StructuredOutputError: If no valid JSON object or array is found
+    """
+    for value in iter_json(text):
+        return value
+    raise StructuredOutputError("No valid JSON object or array found in response")
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def _inline_refs(node: Any, defs: Dict[str, Any]) -> Any:
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs[node["$ref"].split("/")[-1]], defs)
+        return {k: _inline_refs(v, defs) for k, v in node.items() if k not in ("$defs", "title")}
+    if isinstance(node, list):
+        return [_inline_refs(v, defs) for v in node]
+    return node
+
+
+@lru_cache(maxsize=None)
+def _json_schema_for(schema: Any) -> str:
+    json_schema = _adapter(schema).json_schema()
+    return json.dumps(_inline_refs(json_schema, json_schema.get("$defs", {})))
+
+
+def json_schema_for(schema: Any) -> Dict[str, Any]:
+    """
+    JSON schema (with $refs inlined) for a Pydantic model or typing type,
+    for providers that support schema-constrained generation
+
+    Args:
+        schema: Pydantic model class or typing type such as List[str]
+
+    Returns:
+        dict: Self-contained JSON schema
+    """
+    return json.loads(_json_schema_for(schema))
+
+
+def parse_structured(text: str, schema: Any, endpoint: str) -> Any:
+    """
+    Extract and validate a structured result from an LLM response
+
+    Every call is counted in llm_parse_attempts_total and every failure in
+    llm_parse_failures_total, labelled by endpoint.
+
+    Args:
+        text (str): Raw model output
+        schema: Pydantic model class or typing type such as List[str]
+        endpoint (str): Endpoint key for the metrics, e.g. 'scoring'
+
+    Returns:
+        Any: The validated value (a model instance for model schemas)
+
+    Raises:
+        StructuredOutputError: If the output has no JSON value that passes validation
+    """
+    llm_parse_attempts.inc(endpoint=endpoint)
+    with span("parse", schema=endpoint):
+        # Prose may contain JSON of its own (an example, a quoted field)
+        # before the answer: the first candidate that validates wins
+        error: Exception = StructuredOutputError("No valid JSON object or array found in response")
+        for value in iter_json(text):
+            try:
+                return _adapter(schema).validate_python(value)
+            except ValidationError as e:
+                if isinstance(error, StructuredOutputError):
+                    error = e
+        llm_parse_failures.inc(endpoint=endpoint)
+        logger.warning(f"Structured output parse failure for '{endpoint}': {str(error)}")
+        raise StructuredOutputError(str(error)) from error
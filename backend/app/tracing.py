@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import uuid
+import inspect
+import functools
+import threading
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from app.metrics import request_latency, stage_latency
+
+# Configure logging
+logger = logging.getLogger('tracing')
+
+# Where finished spans go besides the histograms:
+#   none   - histograms only
+#   memory - in-process collector (inspect with get_collector().spans())
+#   file   - in-process collector that also appends JSON lines to TRACE_EXPORT_FILE
+#   otel   - OpenTelemetry spans, when the opentelemetry packages are installed
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "none").lower()
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "traces.jsonl")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+
+# Endpoint and trace of the request being handled; copied into worker threads
+_current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("trace_endpoint", default="")
+_current_trace: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_id", default=None)
+
+
+class SpanCollector:
+    """
+    Local stand-in for a tracing collector.
+
+    Keeps the most recent finished spans in memory and, when a path is
+    given, appends each one to a JSON lines file for offline analysis.
+    """
+
+    def __init__(self, max_spans: int = 1000, path: Optional[str] = None):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self.path = path
+
+    def export(self, span: Dict[str, Any]):
+        with self._lock:
+            self._spans.append(span)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(span) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write span to {self.path}: {str(e)}")
+
+    def spans(self) -> List[Dict[str, Any]]:
+        """Finished spans, oldest first"""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_collector: Optional[SpanCollector] = None
+_otel_tracer: Optional[Any] = None
+
+
+def configure(export: Optional[str] = None, path: Optional[str] = None):
+    """
+    Select the span exporter (see TRACE_EXPORT)
+
+    Args:
+        export (str): 'none', 'memory', 'file' or 'otel'
+        path (str): JSON lines file for the 'file' exporter
+    """
+    global _collector, _otel_tracer
+    export = (export or TRACE_EXPORT).lower()
+    _collector = None
+    _otel_tracer = None
+
+    if export in ("memory", "file"):
+        _collector = SpanCollector(TRACE_BUFFER_SIZE, (path or TRACE_EXPORT_FILE) if export == "file" else None)
+    elif export == "otel":
+        try:
+            from opentelemetry import trace
+
+            _otel_tracer = trace.get_tracer("gemba-ai")
+        except ImportError:
+            logger.warning("TRACE_EXPORT=otel but opentelemetry is not installed; exporting to memory instead")
+            _collector = SpanCollector(TRACE_BUFFER_SIZE)
+
+
+def get_collector() -> Optional[SpanCollector]:
+    """The in-process span collector, if the 'memory' or 'file' exporter is active"""
+    return _collector
+
+
+@contextmanager
+def _record(name: str, kind: str, attributes: Dict[str, Any]):
+    parent_id = _current_span.get()
+    span_id = uuid.uuid4().hex[:16]
+    token = _current_span.set(span_id)
+    start_wall = time.time()
+    start = time.perf_counter()
+    otel_span = _otel_tracer.start_as_current_span(name, attributes=attributes) if _otel_tracer else None
+    error = None
+    try:
+        if otel_span is not None:
+            with otel_span:
+                yield
+        else:
+            yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        if kind == "endpoint":
+            request_latency.observe(duration, endpoint=attributes["endpoint"])
+        else:
+            stage_latency.observe(duration, endpoint=attributes["endpoint"], stage=name)
+        if _collector is not None:
+            _collector.export({
+                "trace_id": _current_trace.get(),
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "kind": kind,
+                "start": start_wall,
+                "duration": duration,
+                "error": error,
+                "attributes": attributes,
+            })
+
+
+def current_endpoint() -> str:
+    """Endpoint label of the request being handled ('' outside a traced request)"""
+    return _current_endpoint.get()
+
+
+@contextmanager
+def trace_endpoint(endpoint: str, **attributes):
+    """
+    Trace one API request; stages opened inside are attributed to `endpoint`
+
+    Args:
+        endpoint (str): Endpoint label, e.g. 'root_cause_suggest'
+        **attributes: Extra span attributes
+    """
+    endpoint_token = _current_endpoint.set(endpoint)
+    trace_token = _current_trace.set(uuid.uuid4().hex)
+    try:
+        with _record(endpoint, "endpoint", {**attributes, "endpoint": endpoint}):
+            yield
+    finally:
+        _current_trace.reset(trace_token)
+        _current_endpoint.reset(endpoint_token)
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Time one stage of the current request
+
+    Recorded in request_stage_seconds{endpoint, stage}. Outside a traced
+    request the endpoint label is empty.
+
+    Args:
+        stage (str): Stage name: sql, embed, similarity, prompt, llm, parse or points_write
+        **attributes: Extra span attributes
+    """
+    with _record(stage, "stage", {**attributes, "endpoint": _current_endpoint.get()}):
+        yield
+
+
+def traced(endpoint: str):
+    """
+    Decorator form of trace_endpoint for FastAPI handlers
+
+    The wrapped function keeps its signature, so dependency injection is
+    unaffected.
+
+    Args:
+        endpoint (str): Endpoint label, e.g. 'root_cause_suggest'
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with trace_endpoint(endpoint):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_endpoint(endpoint):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+configure()
@@ -0,0 +1,163 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger('warmup')
+
+# Load the heavy dependencies in a background thread as soon as the app
+# starts, instead of on the first request that needs them. The app serves
+# /, attendance and /health/live meanwhile; /health/ready reports progress.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def _load_embedding_model():
+    from app.embeddings import get_sentence_model
+
+    if get_sentence_model() is None:
+        raise RuntimeError("sentence transformer could not be loaded")
+
+
+def _load_embedding_index():
+    from app.embedding_store import EMBEDDING_INDEX_PATH, get_embedding_store
+
+    if EMBEDDING_INDEX_PATH and get_embedding_store() is None:
+        raise RuntimeError(f"embedding index {EMBEDDING_INDEX_PATH} could not be loaded")
+
+    from app.lexical_index import HYBRID_SEARCH, get_lexical_index
+
+    # BM25 over the same texts, built before workers fork so they share it
+    if HYBRID_SEARCH:
+        get_lexical_index()
+
+
+def _load_llm_client():
+    from app.ai import RootCauseAI
+
+    # Creates the shared provider and registers (caches) the static instructions
+    RootCauseAI()
+
+
+def _load_reranker():
+    from app.reranker import get_reranker
+
+    if get_reranker() is None:
+        raise RuntimeError("cross-encoder could not be loaded")
+
+
+def _load_root_cause_stats():
+    from app.root_cause_stats import get_root_cause_stats
+
+    stats = get_root_cause_stats()
+    if stats is not None:
+        stats.refresh_if_stale(wait=True)
+        if not stats.loaded:
+            raise RuntimeError("root cause statistics could not be loaded")
+
+
+def _load_clustering():
+    import sklearn.cluster  # noqa: F401 - used by root cause merge pre-clustering
+
+
+# Components in load order
+COMPONENTS: List[Tuple[str, Callable[[], None]]] = [
+    ("embedding_model", _load_embedding_model),
+    ("embedding_index", _load_embedding_index),
+    ("llm_client", _load_llm_client),
+    ("clustering", _load_clustering),
+    ("root_cause_stats", _load_root_cause_stats),
+]
+if os.getenv("RERANK", "false").lower() == "true":
+    COMPONENTS.insert(2, ("reranker", _load_reranker))
+
+# Components safe to load in a parent process before fork() (run_workers.py).
+# The LLM client is left to each worker: its HTTP/gRPC connections must not
+# be shared across processes. Neither can an embedding process pool
+# (EMBED_EXECUTOR=process), whose management threads do not survive fork().
+_NOT_PRELOADED = {"llm_client"} | ({"embedding_model"} if os.getenv("EMBED_EXECUTOR", "inline") == "process" else set())
+PRELOAD_COMPONENTS = [(name, loader) for name, loader in COMPONENTS if name not in _NOT_PRELOADED]
+
+
+class Warmup:
+    """
+    Background loader for COMPONENTS with per-component progress
+
+    Args:
+        components (list): (name, loader) pairs; a loader raises on failure
+    """
+
+    def __init__(self, components: Optional[List[Tuple[str, Callable[[], None]]]] = None):
+        self.components = list(COMPONENTS if components is None else components)
+        self._state: Dict[str, Dict[str, Any]] = {name: {"status": PENDING} for name, _ in self.components}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = time.time()
+
+    def _set(self, name: str, **state):
+        with self._lock:
+            self._state[name] = state
+
+    def run(self):
+        """Load every component in order (blocking)"""
+        for name, loader in self.components:
+            self._set(name, status=LOADING)
+            start = time.perf_counter()
+            try:
+                loader()
+                self._set(name, status=READY, seconds=round(time.perf_counter() - start, 3))
+                logger.info(f"Warm-up: {name} ready in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                self._set(name, status=FAILED, seconds=round(time.perf_counter() - start, 3), error=str(e))
+                logger.error(f"Warm-up: {name} failed: {str(e)}")
+
+    def start(self) -> threading.Thread:
+        """Run the warm-up in a daemon thread (once)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Warm-up progress
+
+        Returns:
+            dict: ready (every component finished loading), degraded (some
+            failed, the app runs with fallbacks), uptime and per-component state
+        """
+        with self._lock:
+            components = {name: dict(state) for name, state in self._state.items()}
+        statuses = [state["status"] for state in components.values()]
+        return {
+            "ready": all(s in (READY, FAILED) for s in statuses),
+            "degraded": FAILED in statuses,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "components": components,
+        }
+
+
+_warmup: Optional[Warmup] = None
+
+
+def start_warmup(components: Optional[List[Tuple[str, Callable[[], None]]]] = None) -> Warmup:
+    """Start the process-wide warm-up (no-op if already started)"""
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup(components)
+        _warmup.start()
+    return _warmup
+
+
+def warmup_status() -> Dict[str, Any]:
+    """Progress of the process-wide warm-up; ready when it is disabled"""
+    if _warmup is None:
+        return {"ready": not WARMUP_ON_STARTUP, "degraded": False, "uptime_seconds": None, "components": {}}
+    return _warmup.status()
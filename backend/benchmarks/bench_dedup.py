@@ -0,0 +1,144 @@
+"""
+Near-duplicate collapsing and MMR selection in the root cause search.
+
+Every gemba_issues.sql row is repeated as it is in the legacy data: the
+same (area, problem, root cause) typed again with other casing,
+punctuation or a doubled letter. Each (area, category) group is
+then searched with the problems of its rows, both ways:
+
+  plain   - the group as fetched, top 10 by hybrid ranking
+  dedup   - collapse_near_duplicates() on the group, then MMR selection
+            (get_semantic_root_cause_data today)
+
+It reports group rows before/after collapsing, collapse time for a first
+request (cold) and a repeated one (cached grouping), distinct facts among
+the 10 records put into the prompt (and how many the group has), prompt
+tokens in total and per distinct fact, and search latency.
+Run from the backend directory:
+
+    python -m benchmarks.bench_dedup --copies 8
+    python -m benchmarks.bench_dedup --copies 20 --queries 200
+"""
+import time
+import random
+import logging
+import argparse
+from collections import defaultdict
+
+from app import near_duplicates
+from app.ai import ROOT_CAUSE_TEMPLATE
+from app.database import DatabaseConnector
+from app.near_duplicates import collapse_near_duplicates
+from app.prompt_builder import PromptBuilder
+from benchmarks.common import HashingSentenceModel, percentile
+from benchmarks.seed_sqlite import DEFAULT_DUMP, read_dump
+
+FIELDS = ("area", "problem", "root_cause")
+
+
+def retype(text, rng):
+    """The same text as someone else would type it"""
+    style = rng.random()
+    if style < 0.25:
+        return text.lower()
+    if style < 0.45:
+        return text.title()
+    if style < 0.65 and len(text) > 8:
+        i = rng.randrange(1, len(text) - 1)
+        return text[:i] + text[i] + text[i:]
+    if style < 0.85:
+        return text.replace(",", "").replace("&", "dan") + "."
+    return text
+
+
+def repeated_history(copies, seed=0):
+    """Legacy rows, each recurring 1..2*copies times with retyped text, newest first"""
+    rng = random.Random(seed)
+    rows = [r for r in read_dump(DEFAULT_DUMP) if r.get("problem") and r.get("root_cause")]
+    records = []
+    for fact, row in enumerate(rows):
+        for _ in range(rng.randint(1, 2 * copies - 1)):
+            records.append({"area": row["area"].strip(), "category": (row.get("category") or "-").strip(),
+                            "problem": retype(row["problem"].strip(), rng),
+                            "root_cause": retype(row["root_cause"].strip(), rng),
+                            "created_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                            "_fact": fact})
+    records.sort(key=lambda r: r["created_at"], reverse=True)
+    return records, rows
+
+
+def _prompt_tokens(records, area, category, problem):
+    return PromptBuilder("root_cause", ROOT_CAUSE_TEMPLATE).build(
+        variables={"area": area, "problem": problem, "category": category, "priors": ""},
+        records=records, columns=["area", "problem", "root_cause", "category"],
+        context_columns={"area": area, "category": category}).tokens
+
+
+def run(args):
+    records, rows = repeated_history(args.copies, seed=args.seed)
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record["area"], record["category"])].append(record)
+
+    cold, cached, after = [], [], 0
+    for group in groups.values():
+        start = time.perf_counter()
+        collapsed = collapse_near_duplicates(group, FIELDS)
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        collapse_near_duplicates(group, FIELDS)
+        cached.append(time.perf_counter() - start)
+        after += len(collapsed)
+
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.sentence_model = HashingSentenceModel()
+    db.get_optimized_data_by_area_and_category = lambda area, category: groups[(area, category)]
+    rng = random.Random(args.seed + 1)
+    queries = rng.sample(records, min(args.queries, len(records)))
+    facts = {key: len({r["_fact"] for r in group}) for key, group in groups.items()}
+    best = [min(args.k, facts[(r["area"], r["category"])]) for r in queries]
+
+    results = {}
+    for mode in ("plain", "dedup"):
+        near_duplicates.DEDUP_HISTORY = mode == "dedup"
+        latencies, distinct, tokens = [], [], []
+        for record in queries:
+            area, category = record["area"], record["category"]
+            start = time.perf_counter()
+            if mode == "dedup":
+                found = db.get_semantic_root_cause_data(record["problem"], area, category, top_k=args.k)
+            else:
+                found = db._filter_by_semantic_similarity(record["problem"], groups[(area, category)], "problem", args.k)
+            latencies.append(time.perf_counter() - start)
+            distinct.append(len({r["_fact"] for r in found}))
+            tokens.append(_prompt_tokens(found, area, category, record["problem"]))
+        results[mode] = {"latencies": latencies, "distinct": distinct, "tokens": tokens}
+    near_duplicates.DEDUP_HISTORY = True
+    return {"records": len(records), "facts": len(rows), "groups": len(groups), "after": after,
+            "cold": cold, "cached": cached, "best": sum(best) / len(best), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=8, help="average occurrences of each legacy row")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10, help="records returned (root cause search uses 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    r = run(args)
+    print(f"{r['records']} records of {r['facts']} legacy facts in {r['groups']} (area, category) groups")
+    print(f"rows after collapsing: {r['after']} ({r['after'] / r['records']:.1%}); collapse per group "
+          f"p50 {percentile(r['cold'], 50) * 1000:.2f} ms cold, {percentile(r['cached'], 50) * 1000:.2f} ms cached, "
+          f"p95 {percentile(r['cold'], 95) * 1000:.2f} ms cold")
+    print(f"distinct facts available per query: {r['best']:.2f}")
+    print(f"{'mode':<6} {'distinct@' + str(args.k):>11} {'prompt tok':>11} {'tok/fact':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for mode, m in r["results"].items():
+        print(f"{mode:<6} {sum(m['distinct']) / len(m['distinct']):>11.2f} {sum(m['tokens']) / len(m['tokens']):>11.0f} "
+              f"{sum(m['tokens']) / sum(m['distinct']):>9.1f} "
+              f"{percentile(m['latencies'], 50) * 1000:>7.2f} {percentile(m['latencies'], 95) * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Latency of light requests while embeddings are being computed, with the
+model inline (EMBED_EXECUTOR=inline) or in worker processes (process).
+
+Encoder threads stand in for AI requests in the FastAPI threadpool and
+call encode() back to back; a probe thread stands in for attendance and
+listing requests and times a small piece of Python work every few
+milliseconds, including the wait for the GIL. Inline, the encoders hold
+the GIL and the probe waits; with the process pool the probe only shares
+the CPU. Run from the backend directory:
+
+    python -m benchmarks.bench_embedding_isolation --encoders 4 --duration 5
+    python -m benchmarks.bench_embedding_isolation --real-model --batch 64
+
+The default model is the pure-Python hashing stand-in from
+benchmarks.common, which holds the GIL the way tokenization and small
+tensor operations do.
+"""
+import json
+import time
+import argparse
+import threading
+
+from app.embedding_executor import EmbeddingExecutor, EmbeddingOverloaded
+from benchmarks.common import HashingSentenceModel, percentile
+
+_RECORD = {"user_id": "bench-user-1", "session_id": 1, "status": "PRESENT", "points": [5, 10, 15]}
+
+
+def _light_request():
+    # Roughly what /api/attendance/qr does in Python besides waiting on SQL
+    payload = json.dumps({**_RECORD, "time_in": time.time()})
+    return sum(len(k) for k in json.loads(payload))
+
+
+def run_mode(model, encoders, duration, batch, probe_interval):
+    texts = [f"tinta kotor pada unit {i % 6} shift {i % 3} item GRN{i}-JA10" for i in range(batch)]
+    stop = threading.Event()
+    encoded, rejected, latencies = [0], [0], []
+    lock = threading.Lock()
+
+    def encoder():
+        while not stop.is_set():
+            try:
+                model.encode(texts)
+                with lock:
+                    encoded[0] += len(texts)
+            except EmbeddingOverloaded:
+                with lock:
+                    rejected[0] += 1
+                time.sleep(0.01)
+
+    def probe():
+        # Time from "request arrives" (end of the sleep) to "response ready",
+        # including the wait to get the GIL back after sleeping
+        while not stop.is_set():
+            start = time.perf_counter()
+            time.sleep(probe_interval)
+            _light_request()
+            latencies.append(time.perf_counter() - start - probe_interval)
+
+    threads = [threading.Thread(target=encoder) for _ in range(encoders)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        "probe_p50_ms": percentile(latencies, 50) * 1000,
+        "probe_p99_ms": percentile(latencies, 99) * 1000,
+        "probe_max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "texts_per_s": encoded[0] / duration,
+        "rejected": rejected[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encoders", type=int, default=4, help="concurrent embedding callers")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=500, help="texts per encode call")
+    parser.add_argument("--workers", type=int, default=2, help="embedding worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--queue", type=int, default=8, help="max queued or running encode calls")
+    parser.add_argument("--probe-interval", type=float, default=0.005)
+    parser.add_argument("--real-model", action="store_true", help="use the sentence transformer")
+    args = parser.parse_args()
+
+    if args.real_model:
+        from app.embeddings import load_sentence_model
+
+        inline_model, factory = load_sentence_model(), load_sentence_model
+    else:
+        inline_model, factory = HashingSentenceModel(), HashingSentenceModel
+
+    executor = EmbeddingExecutor(workers=args.workers, threads_per_worker=args.threads_per_worker,
+                                 max_queue=args.queue, timeout=120, model_factory=factory)
+    if not executor.warm():
+        raise SystemExit("embedding workers could not load the model")
+
+    results = {
+        "idle": run_mode(inline_model, 0, args.duration, args.batch, args.probe_interval),
+        "inline": run_mode(inline_model, args.encoders, args.duration, args.batch, args.probe_interval),
+        "process": run_mode(executor, args.encoders, args.duration, args.batch, args.probe_interval),
+    }
+    executor.shutdown()
+
+    print(f"encoders={args.encoders} batch={args.batch} workers={args.workers} queue={args.queue} "
+          f"model={'sentence transformer' if args.real_model else 'hashing stand-in'}")
+    print(f"{'mode':<8} {'probe p50 ms':>12} {'probe p99 ms':>12} {'probe max ms':>12} {'texts/s':>10} {'rejected':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['probe_p50_ms']:>12.3f} {r['probe_p99_ms']:>12.3f} {r['probe_max_ms']:>12.1f} "
+              f"{r['texts_per_s']:>10.0f} {r['rejected']:>9}")
+
+
+if __name__ == "__main__":
+    main()
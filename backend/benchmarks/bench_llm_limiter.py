@@ -0,0 +1,92 @@
+"""
+Bursts of root cause suggestions against a provider with a concurrency
+quota, with and without the adaptive LLM limiter (app/llm_limiter.py).
+
+The fake provider answers after --latency seconds and rejects calls over
+--capacity concurrent ones with a 429, the way a Gemini quota does. Every
+--period seconds a burst of --burst requests arrives. Outcomes per mode:
+
+  ok     - real suggestions
+  error  - the "Error generating suggestions" list (no limiter: every 429)
+  shed   - LLMOverloaded, i.e. HTTP 503 + Retry-After (limiter only)
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_llm_limiter --burst 24 --capacity 4
+"""
+import time
+import logging
+import argparse
+import threading
+
+from app.ai import RootCauseAI
+from app.llm_limiter import AdaptiveLimiter, LLMOverloaded
+from benchmarks.common import make_fake_provider, percentile
+
+
+def run_mode(enabled, args):
+    provider = make_fake_provider(latency=args.latency, capacity=args.capacity)
+    limiter = AdaptiveLimiter(initial=args.initial, min_limit=1, max_limit=args.max_limit,
+                              queue_size=args.queue, enabled=enabled)
+    ai = RootCauseAI(provider=provider, limiter=limiter)
+    outcomes = {"ok": [], "error": [], "shed": []}
+    lock = threading.Lock()
+
+    def request(i):
+        start = time.perf_counter()
+        try:
+            result = ai.suggest_root_causes("KBA 3", f"Cetakan kotor {i}", "Material", [])
+            kind = "error" if result and result[0].startswith("Error") else "ok"
+        except LLMOverloaded:
+            kind = "shed"
+        with lock:
+            outcomes[kind].append(time.perf_counter() - start)
+
+    threads = []
+    for burst in range(args.bursts):
+        for i in range(args.burst):
+            thread = threading.Thread(target=request, args=(burst * args.burst + i,))
+            thread.start()
+            threads.append(thread)
+        time.sleep(args.period)
+    for thread in threads:
+        thread.join()
+
+    return {
+        "ok": len(outcomes["ok"]),
+        "error": len(outcomes["error"]),
+        "shed": len(outcomes["shed"]),
+        "provider_429": provider.rate_limited,
+        "ok_p50_ms": percentile(outcomes["ok"], 50) * 1000,
+        "ok_p99_ms": percentile(outcomes["ok"], 99) * 1000,
+        "fail_p99_ms": percentile(outcomes["error"] + outcomes["shed"], 99) * 1000,
+        "final_limit": limiter.limit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst", type=int, default=24, help="requests per burst")
+    parser.add_argument("--period", type=float, default=1.0, help="seconds between bursts")
+    parser.add_argument("--latency", type=float, default=0.3, help="provider seconds per call")
+    parser.add_argument("--capacity", type=int, default=4, help="provider concurrency quota")
+    parser.add_argument("--initial", type=int, default=8, help="limiter starting limit")
+    parser.add_argument("--max-limit", type=int, default=32)
+    parser.add_argument("--queue", type=int, default=16, help="limiter wait queue size")
+    args = parser.parse_args()
+    # Every shed call logs a warning
+    logging.getLogger().setLevel(logging.ERROR)
+
+    print(f"{args.bursts} bursts of {args.burst} every {args.period}s, provider {args.latency}s/call, "
+          f"quota {args.capacity} concurrent")
+    print(f"{'mode':<10} {'ok':>5} {'error':>6} {'shed':>5} {'429s':>5} {'ok p50 ms':>10} {'ok p99 ms':>10} "
+          f"{'fail p99 ms':>12} {'limit':>6}")
+    for mode, enabled in (("no limit", False), ("adaptive", True)):
+        r = run_mode(enabled, args)
+        print(f"{mode:<10} {r['ok']:>5} {r['error']:>6} {r['shed']:>5} {r['provider_429']:>5} "
+              f"{r['ok_p50_ms']:>10.0f} {r['ok_p99_ms']:>10.0f} {r['fail_p99_ms']:>12.0f} {r['final_limit']:>6}")
+
+
+if __name__ == "__main__":
+    main()
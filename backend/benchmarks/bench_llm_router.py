@@ -0,0 +1,83 @@
+"""
+Tail latency of LLM calls through one provider versus the router
+(app/llm_router.py) with hedging to a second provider.
+
+The primary fake provider is usually fast but has a slow tail (--tail-rate
+of calls take --tail-latency seconds); the backup is a little slower and
+steady. With hedging, a call still running after the primary's measured
+p95 is also sent to the backup and the first answer wins. Run from the
+backend directory:
+
+    python -m benchmarks.bench_llm_router --calls 300 --concurrency 8
+"""
+import time
+import random
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.llm_provider import FakeLLMProvider
+from app.llm_router import RouterProvider
+from benchmarks.common import percentile
+
+
+def _latency(rng, lock, fast, slow, tail_rate):
+    def sample(key, prompt):
+        with lock:
+            return rng.uniform(*slow) if rng.random() < tail_rate else rng.uniform(*fast)
+    return sample
+
+
+def run_mode(hedge, args):
+    lock = threading.Lock()
+    rng = random.Random(args.seed)
+    primary = FakeLLMProvider(default_response='["primary"]', latency=_latency(
+        rng, lock, (0.08, 0.15), (args.tail_latency, args.tail_latency * 1.5), args.tail_rate))
+    backup = FakeLLMProvider(default_response='["backup"]', latency=_latency(
+        rng, lock, (0.15, 0.25), (0.15, 0.25), 0.0))
+    providers = {"primary": primary, "backup": backup} if hedge else {"primary": primary}
+    router = RouterProvider(providers, routes={}, retries=0, hedge=hedge,
+                            hedge_min_samples=args.min_samples)
+    router.register_instruction("root_cause", "static")
+
+    def call(i):
+        start = time.perf_counter()
+        router.generate("root_cause", f"prompt {i}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(call, range(args.calls)))
+    # Skip the warm-up calls that measure the primary's p95
+    measured = latencies[args.min_samples:]
+    return {
+        "p50_ms": percentile(measured, 50) * 1000,
+        "p95_ms": percentile(measured, 95) * 1000,
+        "p99_ms": percentile(measured, 99) * 1000,
+        "max_ms": max(measured) * 1000,
+        "extra_calls_pct": 100.0 * len(backup.requests) / args.calls if hedge else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tail-rate", type=float, default=0.04, help="share of slow primary calls")
+    parser.add_argument("--tail-latency", type=float, default=1.5, help="seconds of a slow primary call")
+    parser.add_argument("--min-samples", type=int, default=20, help="calls measured before hedging")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{args.calls} calls, concurrency {args.concurrency}; primary 80-150 ms with "
+          f"{args.tail_rate:.0%} at {args.tail_latency:.1f}s+, backup 150-250 ms")
+    print(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'extra calls':>12}")
+    for mode, hedge in (("primary", False), ("hedged", True)):
+        r = run_mode(hedge, args)
+        print(f"{mode:<12} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f} {r['max_ms']:>8.0f} "
+              f"{r['extra_calls_pct']:>11.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Logging overhead of DatabaseConnector._filter_by_semantic_similarity.
+
+Compares the cost per search of:
+  quiet   - logging disabled (the floor)
+  current - sampled structured summary through the queue handler
+  trace   - the same request with a per-request debug trace (all matches)
+  legacy  - quiet search plus a replay of the previous per-match
+            f-string logger.info lines through a synchronous StreamHandler
+
+Log output goes to os.devnull; the embedding model is a deterministic stub,
+so only search and logging costs are measured. Run from the backend directory:
+
+    python -m benchmarks.bench_logging --records 400 --searches 300
+"""
+import os
+import time
+import logging
+import argparse
+
+from app import logging_config
+from app.database import DatabaseConnector
+from benchmarks.common import StubSentenceModel
+
+
+def make_records(n):
+    return [{
+        "area": "KBA 3", "category": "Machine",
+        "problem": f"Problem nomor {i} cetakan kotor dan hasil cetak buram pada unit {i % 7}",
+        "root_cause": f"Root cause {i}: tekanan roll tidak sesuai setting standar",
+        "temporary_action": "Bersihkan cetakan dan atur ulang tekanan roll " * 3,
+        "preventive_action": "Buat jadwal preventive maintenance mingguan untuk roll " * 3,
+    } for i in range(n)]
+
+
+def legacy_log(logger, query_text, field, records, top_k):
+    """The per-search logging removed from the hot path, line for line"""
+    logger.info(f"\n{'='*50}\nSEMANTIC SEARCH DETAILS\n{'='*50}")
+    logger.info(f"Query: '{query_text}'")
+    logger.info(f"Field to match: '{field}'")
+    logger.info(f"Total records to search: {len(records)}")
+    logger.info(f"Top {top_k} matches will be returned")
+    logger.info(f"Encoding for semantic search: {query_text}")
+    logger.info(f"\n{'='*50}\nSEMANTIC SEARCH RESULTS\n{'='*50}")
+    for i, record in enumerate(records[:top_k]):
+        logger.info(f"Match {i+1}: Score {0.5:.4f}")
+        logger.info(f"  {field}: {record[field]}")
+        for key, label in (("problem", "Problem"), ("root_cause", "Root Cause"),
+                           ("area", "Area"), ("category", "Category")):
+            logger.info(f"  {label}: {record[key]}")
+        for key, label in (("temporary_action", "Temporary Action"), ("preventive_action", "Preventive Action")):
+            text = record[key]
+            logger.info(f"  {label}: {text[:100]}..." if len(text) > 100 else f"  {label}: {text}")
+        logger.info(f"  {'-'*40}")
+    logger.info(f"{'='*50}")
+
+
+def run(db, records, searches, level, debug=False, legacy=None):
+    logging.getLogger().setLevel(level)
+    start = time.perf_counter()
+    for i in range(searches):
+        tokens = logging_config.set_request_context(f"bench-{i}", debug=debug)
+        try:
+            db._filter_by_semantic_similarity("cetakan kotor", records, "problem", 10)
+            if legacy is not None:
+                legacy("cetakan kotor", "problem", records, 10)
+        finally:
+            logging_config.reset_request_context(tokens)
+    return (time.perf_counter() - start) / searches * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=400)
+    parser.add_argument("--searches", type=int, default=300)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    logging_config.configure_logging(force=True)
+    # Point the background writer at devnull
+    for handler in logging_config._listener.handlers:
+        handler.setStream(devnull)
+
+    legacy_logger = logging.getLogger("bench.legacy")
+    legacy_logger.propagate = False
+    legacy_handler = logging.StreamHandler(devnull)
+    legacy_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    legacy_logger.addHandler(legacy_handler)
+    legacy_logger.setLevel(logging.INFO)
+
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.sentence_model = StubSentenceModel()
+    records = make_records(args.records)
+
+    quiet = run(db, records, args.searches, logging.WARNING)
+    results = [
+        ("quiet", quiet),
+        ("current", run(db, records, args.searches, logging.INFO)),
+        ("trace", run(db, records, args.searches, logging.INFO, debug=True)),
+        ("legacy", run(db, records, args.searches, logging.WARNING,
+                       legacy=lambda *a: legacy_log(legacy_logger, *a))),
+    ]
+
+    print(f"records={args.records} searches={args.searches} sample_rate={logging_config.LOG_SAMPLE_RATE}")
+    print(f"{'mode':<8} | {'us/search':>10} | {'logging overhead (us)':>21}")
+    print("-" * 46)
+    for mode, per_search in results:
+        print(f"{mode:<8} | {per_search:>10.1f} | {per_search - quiet:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Retrieval scaling: get_semantic_root_cause_data / get_semantic_action_data
+over corpora of increasing size, for each vector index backend.
+
+A corpus of historical (area, category, problem, root_cause) records is
+generated synthetically (Indonesian/English shop-floor phrases with
+machine and item codes) or sampled from gemba_issues.sql. Like the app,
+every query is restricted to its (area, category) group and then ranked
+by cosine similarity:
+
+  current - what DatabaseConnector does today: encode the group's
+            problems on every request, then brute-force cosine
+  <index> - one vector index per group built once from stored embeddings
+            (see benchmarks/vector_index.py); queries only encode the query text
+
+For each size and backend it reports corpus encode time, index build time
+and peak build memory, index size, query latency (p50/p95) for the root
+cause search (top 10 problems) and the action search (top 8 problems,
+then top 5 by root cause), and recall@k of both against brute force.
+Run from the backend directory:
+
+    python -m benchmarks.bench_retrieval --sizes 1000 10000 100000
+    python -m benchmarks.bench_retrieval --sizes 1000000 --backends exact int8 ivf --current-limit 0
+    python -m benchmarks.bench_retrieval --source dump --real-embeddings --sizes 1000 5000
+
+Embeddings default to a hashing stand-in (benchmarks.common) so large
+corpora are feasible; --real-embeddings uses the sentence transformer,
+which makes the encode column meaningful but is slow beyond ~100k.
+"""
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks import vector_index
+from benchmarks.common import HashingSentenceModel, percentile
+from benchmarks.vector_index import create_index, available_backends, normalize
+
+ROOT_CAUSE_TOP_K = 10
+ACTION_PROBLEM_K = 8
+ACTION_TOP_K = 5
+
+AREAS = ["KBA 1", "KBA 2", "KBA 3", "DC 4", "UV Varnish", "Join Manual", "WP Esatec", "WP Zhengmao",
+         "Sortir", "Lem Otomatis", "Potong", "Laminasi"]
+CATEGORIES = ["Man", "Method", "Material", "Machine", "Environment"]
+COMPONENTS = [("tinta", "ink"), ("roll air", "water roller"), ("rakel", "doctor blade"), ("lem", "glue"),
+              ("saker", "sucker"), ("pisau", "knife"), ("belt", "belt"), ("sensor", "sensor"),
+              ("kertas", "paper"), ("nozzle", "nozzle"), ("varnish", "varnish"), ("cetakan", "print")]
+SYMPTOMS = [("kotor", "dirty"), ("bocor", "leaking"), ("aus", "worn"), ("macet", "jammed"),
+            ("longgar", "loose"), ("melengkung", "curled"), ("terlalu cair", "too thin"),
+            ("tidak rata", "uneven"), ("bergeser", "misaligned"), ("menetes", "dripping")]
+CAUSES = [("tidak dilakukan pengecekan {c}", "{c} not checked"),
+          ("setting {c} tidak sesuai standar", "{c} setting out of standard"),
+          ("operator tidak mengetahui fungsi {c}", "operator unaware of {c} function"),
+          ("{c} sudah aus dan belum diganti", "{c} worn and not replaced"),
+          ("campuran {c} tidak sesuai", "{c} mixture incorrect"),
+          ("jadwal pembersihan {c} terlewat", "{c} cleaning schedule missed")]
+
+
+def _item_code(rng):
+    return f"{rng.choice('GHJKMW')}{rng.choice('BJRT')}{rng.choice('BJNX')}{rng.randint(10, 99)}-{rng.choice(['JA', 'MA', 'KB'])}{rng.randint(1, 30)}"
+
+
+def synthetic_corpus(n, seed=0):
+    """
+    Synthetic historical records mixing Indonesian and English phrasing
+
+    Returns:
+        list: Dicts with area, category, problem and root_cause
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        english = rng.random() < 0.3
+        component = rng.choice(COMPONENTS)[english]
+        symptom = rng.choice(SYMPTOMS)[english]
+        cause = rng.choice(CAUSES)[english].format(c=rng.choice(COMPONENTS)[english])
+        where = f"unit {rng.randint(1, 6)}" if rng.random() < 0.5 else f"({_item_code(rng)})"
+        problem = f"{component} {symptom} {'on' if english else 'pada'} {where}"
+        if rng.random() < 0.3:
+            problem += f" shift {rng.randint(1, 3)}"
+        records.append({"area": rng.choice(AREAS), "category": rng.choice(CATEGORIES),
+                        "problem": problem, "root_cause": cause})
+    return records
+
+
+def dump_corpus(n, seed=0):
+    """Records sampled (with replacement) from gemba_issues.sql, lightly varied so copies differ"""
+    from benchmarks.seed_sqlite import DEFAULT_DUMP, read_dump
+
+    rng = random.Random(seed)
+    rows = [r for r in read_dump(DEFAULT_DUMP) if r.get("problem") and r.get("root_cause")]
+    records = []
+    for i in range(n):
+        row = rng.choice(rows)
+        problem = row["problem"].strip()
+        if i >= len(rows):
+            problem += f" shift {rng.randint(1, 3)}" if rng.random() < 0.5 else f" ({_item_code(rng)})"
+        records.append({"area": (row.get("area") or "-").strip(), "category": (row.get("category") or "-").strip(),
+                        "problem": problem, "root_cause": row["root_cause"].strip()})
+    return records
+
+
+def make_queries(records, count, seed=1):
+    """Perturbed problems of random records (a word dropped or a shift appended)"""
+    rng = random.Random(seed)
+    queries = []
+    for record in rng.sample(records, min(count, len(records))):
+        words = record["problem"].split()
+        if len(words) > 2 and rng.random() < 0.5:
+            words.pop(rng.randrange(len(words)))
+        else:
+            words.append(f"shift {rng.randint(1, 3)}")
+        queries.append({"area": record["area"], "category": record["category"], "problem": " ".join(words),
+                        "root_cause": record["root_cause"]})
+    return queries
+
+
+def _encode(model, texts, batch_size=4096):
+    parts = [model.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+    return np.concatenate(parts) if parts else np.empty((0, 0), dtype=np.float32)
+
+
+def _action_rerank(positions, root_cause_vectors, root_cause_query):
+    # Stage 2 of get_semantic_action_data: rank the problem matches by root cause
+    scores = root_cause_vectors[positions] @ root_cause_query
+    return positions[np.argsort(-scores, kind="stable")[:ACTION_TOP_K]]
+
+
+def _recall(found_scores, threshold, k):
+    # Tie-aware: a hit is any result scoring at least the k-th exact score,
+    # since equally similar records may be returned in any order
+    if k == 0:
+        return 1.0
+    return min(k, int(np.sum(found_scores >= threshold - 1e-5))) / k
+
+
+def _group(records):
+    groups = defaultdict(list)
+    for i, record in enumerate(records):
+        groups[(record["area"], record["category"])].append(i)
+    return {key: np.asarray(members, dtype=np.int64) for key, members in groups.items()}
+
+
+def run_size(records, queries, model, backends, current_limit, options):
+    """Measure every backend on one corpus; returns a list of result rows"""
+    groups = _group(records)
+
+    start = time.perf_counter()
+    problem_vectors = normalize(_encode(model, [r["problem"] for r in records]))
+    root_cause_vectors = normalize(_encode(model, [r["root_cause"] for r in records]))
+    encode_seconds = time.perf_counter() - start
+
+    query_vectors = normalize(_encode(model, [q["problem"] for q in queries]))
+    query_root_causes = normalize(_encode(model, [q["root_cause"] for q in queries]))
+
+    # Ground truth: k-th best exact cosine within the query's group, for
+    # the root cause search, the action problem stage and the action result
+    truth = []
+    for q, query in enumerate(queries):
+        members = groups[(query["area"], query["category"])]
+        scores = np.sort(problem_vectors[members] @ query_vectors[q])[::-1]
+        order = members[np.argsort(-(problem_vectors[members] @ query_vectors[q]), kind="stable")]
+        action = _action_rerank(order[:ACTION_PROBLEM_K], root_cause_vectors, query_root_causes[q])
+        truth.append((scores[:ROOT_CAUSE_TOP_K], scores[:ACTION_PROBLEM_K],
+                      root_cause_vectors[action] @ query_root_causes[q]))
+
+    rows = []
+    base = {"size": len(records), "groups": len(groups), "encode_s": encode_seconds,
+            "vectors_mb": (problem_vectors.nbytes + root_cause_vectors.nbytes) / 2 ** 20}
+
+    if len(records) <= current_limit:
+        texts = [r["problem"] for r in records]
+        latencies = []
+        for query in queries:
+            members = groups[(query["area"], query["category"])]
+            start = time.perf_counter()
+            candidates = normalize(model.encode([texts[i] for i in members]))
+            scores = candidates @ normalize(model.encode(query["problem"]))
+            _ = members[np.argsort(-scores)[:ROOT_CAUSE_TOP_K]]
+            latencies.append(time.perf_counter() - start)
+        rows.append({**base, "backend": "current", "build_s": 0.0, "build_peak_mb": 0.0, "index_mb": 0.0,
+                     "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000,
+                     "recall_rc": 1.0, "recall_action": 1.0})
+
+    for backend in backends:
+        tracemalloc.start()
+        start = time.perf_counter()
+        indexes = {key: create_index(backend, **options.get(backend, {})).build(problem_vectors[members])
+                   for key, members in groups.items()}
+        build_seconds = time.perf_counter() - start
+        _, build_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies, recall_rc, recall_action = [], [], []
+        for q, query in enumerate(queries):
+            key = (query["area"], query["category"])
+            members = groups[key]
+            start = time.perf_counter()
+            query_vector = normalize(model.encode(query["problem"]))
+            positions, _ = indexes[key].search(query_vector, ROOT_CAUSE_TOP_K)
+            latencies.append(time.perf_counter() - start)
+
+            rc_scores, problem_scores, action_scores = truth[q]
+            found_rc = members[positions]
+            recall_rc.append(_recall(problem_vectors[found_rc] @ query_vectors[q],
+                                     rc_scores[-1], len(rc_scores)))
+
+            problem_matches = members[indexes[key].search(query_vectors[q], ACTION_PROBLEM_K)[0]]
+            found_action = _action_rerank(problem_matches, root_cause_vectors, query_root_causes[q])
+            # An action hit must also have passed the exact problem stage
+            passed = problem_vectors[found_action] @ query_vectors[q] >= problem_scores[-1] - 1e-5
+            found_scores = np.where(passed, root_cause_vectors[found_action] @ query_root_causes[q], -np.inf)
+            recall_action.append(_recall(found_scores, action_scores[-1], len(action_scores)))
+
+        rows.append({**base, "backend": backend, "build_s": build_seconds, "build_peak_mb": build_peak / 2 ** 20,
+                     "index_mb": sum(index.nbytes for index in indexes.values()) / 2 ** 20,
+                     "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000,
+                     "recall_rc": float(np.mean(recall_rc)), "recall_action": float(np.mean(recall_action))})
+    return rows
+
+
+def print_table(rows):
+    print(f"{'size':>8} {'groups':>6} {'backend':<8} {'encode s':>9} {'build s':>8} {'build MB':>9} "
+          f"{'index MB':>9} {'p50 ms':>8} {'p95 ms':>8} {'R@10 rc':>8} {'R@5 act':>8}")
+    print("-" * 101)
+    for r in rows:
+        print(f"{r['size']:>8} {r['groups']:>6} {r['backend']:<8} {r['encode_s']:>9.2f} {r['build_s']:>8.2f} "
+              f"{r['build_peak_mb']:>9.1f} {r['index_mb']:>9.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['recall_rc']:>8.3f} {r['recall_action']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--source", choices=["synthetic", "dump"], default="synthetic")
+    parser.add_argument("--backends", nargs="+", default=None, help=f"default: {' '.join(available_backends())}")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--current-limit", type=int, default=100000,
+                        help="largest corpus for the per-request encoding baseline (0 disables it)")
+    parser.add_argument("--nprobe", type=int, default=vector_index.IVF_NPROBE, help="ivf lists scanned per query")
+    parser.add_argument("--dim", type=int, default=384, help="hashing embedding size")
+    parser.add_argument("--real-embeddings", action="store_true", help="use the sentence transformer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the result rows to this file")
+    args = parser.parse_args()
+
+    if args.real_embeddings:
+        from app.embeddings import get_sentence_model
+
+        model = get_sentence_model()
+        if model is None:
+            parser.error("sentence transformer could not be loaded")
+    else:
+        model = HashingSentenceModel(args.dim)
+
+    backends = args.backends or available_backends()
+    if "ivf" in backends:
+        import sklearn.cluster  # noqa: F401 - keep the import out of the first build timing
+    options = {"ivf": {"nprobe": args.nprobe}}
+    generate = synthetic_corpus if args.source == "synthetic" else dump_corpus
+
+    rows = []
+    for size in args.sizes:
+        records = generate(size, args.seed)
+        queries = make_queries(records, args.queries, args.seed + 1)
+        rows.extend(run_size(records, queries, model, backends, args.current_limit, options))
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
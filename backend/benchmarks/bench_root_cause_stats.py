@@ -0,0 +1,111 @@
+"""
+Root cause frequency statistics: materialized (app/root_cause_stats.py)
+versus computing them per request from the history query.
+
+The SQLite stand-in (seed_sqlite.py) is filled with gemba_issues.sql,
+replicated to grow the tables. For random (line, category) pairs, with and
+without a problem, it times:
+
+  per request  - get_optimized_data_by_area_and_category() and counting
+                 its root causes in Python (what answering the question
+                 takes without the statistics)
+  materialized - RootCauseStats.query() on the loaded statistics
+
+plus the full build and an incremental refresh after new root causes are
+inserted. Run from the backend directory:
+
+    python -m benchmarks.bench_root_cause_stats --replicate 20
+"""
+import os
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+from collections import Counter
+
+from app import db_backend
+from app.database import DatabaseConnector
+from app.prompt_builder import normalize_text
+from app.root_cause_stats import RootCauseStats
+from benchmarks.common import percentile
+from benchmarks.seed_sqlite import seed
+
+
+def _add_root_causes(path, count, rng):
+    """Insert count new issues with root causes on existing lines"""
+    connection = sqlite3.connect(path)
+    try:
+        lines = [row[0] for row in connection.execute("SELECT id FROM `lines`")]
+        for i in range(count):
+            issue_id = connection.execute(
+                "INSERT INTO issues (line_id, description, created_at) VALUES (?, ?, datetime('now'))",
+                (rng.choice(lines), f"Cetakan kotor batch {i}")).lastrowid
+            connection.execute("INSERT INTO root_causes (issue_id, description, category) VALUES (?, ?, ?)",
+                               (issue_id, "Rakel aus", "Machine"))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def run(args):
+    path = os.path.join(tempfile.mkdtemp(), "stats_bench.sqlite3")
+    counts = seed(path, replicate=args.replicate, users=1)
+    db_backend.DB_BACKEND, db_backend.SQLITE_PATH = "sqlite", path
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.config, db.connection, db.cursor, db.sentence_model = {}, None, None, None
+    db.connect()
+
+    stats = RootCauseStats()
+    start = time.perf_counter()
+    stats.refresh(db, full=True)
+    build = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    _add_root_causes(path, args.new_rows, rng)
+    start = time.perf_counter()
+    loaded = stats.refresh(db)
+    incremental = time.perf_counter() - start
+
+    pairs = [(g.area, g.category, rng.choice(list(g.problems.values()))[0].text) for g in stats.groups.values()]
+    queries = [rng.choice(pairs) for _ in range(args.queries)]
+    timings = {"per request": [], "materialized": [], "materialized + problem": []}
+    for area, category, problem in queries:
+        start = time.perf_counter()
+        rows = db.get_optimized_data_by_area_and_category(area, category)
+        Counter(normalize_text(r["root_cause"]) for r in rows).most_common(10)
+        timings["per request"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        stats.query(area, category, window_days=0)
+        timings["materialized"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        stats.query(area, category, problem=problem, window_days=0)
+        timings["materialized + problem"].append(time.perf_counter() - start)
+    db.disconnect()
+    return {"counts": counts, "build": build, "incremental": incremental, "loaded": loaded,
+            "groups": len(stats.groups), "timings": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicate", type=int, default=20, help="copies of the gemba_issues.sql rows")
+    parser.add_argument("--new-rows", type=int, default=100, help="root causes added before the incremental refresh")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    r = run(args)
+    print(f"{r['counts']['root_causes']} root causes, {r['groups']} (line, category) groups")
+    print(f"full build {r['build'] * 1000:.0f} ms; incremental refresh of {r['loaded']} new rows "
+          f"{r['incremental'] * 1000:.1f} ms")
+    print(f"{'query':<24} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, latencies in r["timings"].items():
+        print(f"{name:<24} {percentile(latencies, 50) * 1000:>8.3f} {percentile(latencies, 95) * 1000:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Latency of RootCauseAI.score_root_causes in single-call vs fan-out mode.
+
+Uses FakeLLMProvider with a generation-time model of
+    latency = base + per_item * <root causes in the prompt>
+so the comparison runs offline. Run from the backend directory:
+
+    python -m benchmarks.bench_scoring_modes --items 3 6 10 15 --repeat 3
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from app import ai
+from app.ai import RootCauseAI
+from app.llm_provider import FakeLLMProvider
+
+_ITEM_RE = re.compile(r"^\d+\. (.+)$", re.MULTILINE)
+
+
+def _scores(prompt):
+    return [{
+        "root_cause": cause, "spesifisitas": 15, "relevansi": 15, "kejelasan": 15,
+        "actionability": 15, "total_score": 60, "feedback": "Cukup spesifik"
+    } for cause in _ITEM_RE.findall(prompt)]
+
+
+def make_provider(base: float, per_item: float) -> FakeLLMProvider:
+    def latency(key, prompt):
+        if key == "scoring_summary":
+            return base
+        return base + per_item * len(_ITEM_RE.findall(prompt))
+
+    return FakeLLMProvider(responses={
+        "scoring": lambda prompt: json.dumps({"scores": _scores(prompt), "summary": "Ringkasan"}),
+        "scoring_items": lambda prompt: json.dumps({"scores": _scores(prompt)}),
+        "scoring_summary": '{"summary": "Ringkasan"}',
+    }, latency=latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[3, 6, 10, 15])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--base", type=float, default=0.4, help="fixed seconds per LLM call")
+    parser.add_argument("--per-item", type=float, default=0.3, help="generation seconds per scored item")
+    args = parser.parse_args()
+
+    model = RootCauseAI(provider=make_provider(args.base, args.per_item))
+
+    print(f"chunk={ai.SCORE_CHUNK_SIZE} concurrency={ai.SCORE_MAX_CONCURRENCY} "
+          f"threshold={ai.SCORE_FANOUT_THRESHOLD} base={args.base}s per_item={args.per_item}s")
+    print(f"{'items':>5} | {'single p50 (s)':>14} | {'fanout p50 (s)':>14} | {'auto mode':>9}")
+    print("-" * 53)
+    for n in args.items:
+        causes = [f"Root cause nomor {i}" for i in range(n)]
+        timings = {}
+        for mode in ("single", "fanout"):
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                model.score_root_causes("KBA 3", "Cetakan kotor", "Material", causes, mode=mode)
+                samples.append(time.perf_counter() - start)
+            timings[mode] = statistics.median(samples)
+        print(f"{n:>5} | {timings['single']:>14.3f} | {timings['fanout']:>14.3f} | {ai.choose_scoring_mode(n):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Startup cost of the API: how long `import app.main` takes, which modules
+dominate it, and how long the background warm-up needs per component.
+
+Every measurement runs in a fresh interpreter so nothing is cached in
+sys.modules. Reported:
+
+  import app.main  - wall time of the import, minus a bare interpreter
+  heaviest modules - cumulative times from python -X importtime
+  deferred imports - cost of the heavy packages that are now loaded by the
+                     warm-up (or on first use) instead of at import time
+  warm-up          - per-component load time from app.warmup (--warmup)
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --warmup
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from benchmarks.common import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["torch", "sentence_transformers", "sklearn", "scipy", "langchain_core", "langchain_google_genai"]
+DEFERRED_IMPORTS = {
+    "sentence_transformers": "import sentence_transformers",
+    "sklearn (pairwise + cluster)": "import sklearn.metrics.pairwise, sklearn.cluster",
+    "langchain_google_genai": "import langchain_google_genai",
+}
+
+
+def _python(code, *flags):
+    env = {**os.environ, "API_KEY": os.environ.get("API_KEY", "bench-api-key"), "WARMUP_ON_STARTUP": "false"}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True,
+                            cwd=BACKEND_DIR, env=env)
+    return time.perf_counter() - start, result
+
+
+def wall_time(code, repeat):
+    """Median wall seconds of running code in a fresh interpreter, minus interpreter startup"""
+    baseline = sorted(_python("pass")[0] for _ in range(repeat))[repeat // 2]
+    times = []
+    for _ in range(repeat):
+        seconds, result = _python(code)
+        if result.returncode != 0:
+            return None
+        times.append(seconds - baseline)
+    return percentile(times, 50)
+
+
+def heaviest_modules(module, top):
+    """(module, cumulative seconds) of the slowest imports, from -X importtime"""
+    _, result = _python(f"import {module}", "-X", "importtime")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, name.strip(), int(cumulative) / 1e6))
+    # Only direct children of the measured module are shown, so times do not overlap
+    children = [(name, seconds) for depth, name, seconds in rows if depth == 1]
+    total = next((seconds for depth, name, seconds in rows if depth == 0 and name == module), 0.0)
+    return total, sorted(children, key=lambda row: -row[1])[:top]
+
+
+def loaded_heavy_modules(module):
+    _, result = _python(f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def warmup_times():
+    code = "import json; from app.warmup import Warmup; w = Warmup(); w.run(); print(json.dumps(w.status()))"
+    seconds, result = _python(code)
+    if result.returncode != 0:
+        return seconds, {"error": result.stderr.strip().splitlines()[-1:]}
+    return seconds, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--warmup", action="store_true", help="also time the background warm-up components")
+    args = parser.parse_args()
+
+    print(f"import app.main: {wall_time('import app.main', args.repeat):.3f}s (median of {args.repeat})")
+    print(f"heavy modules loaded at import: {', '.join(loaded_heavy_modules('app.main')) or 'none'}")
+
+    total, children = heaviest_modules("app.main", args.top)
+    print(f"\n-X importtime app.main: {total:.3f}s cumulative")
+    for name, seconds in children:
+        print(f"  {name:<40} {seconds:>7.3f}s")
+
+    print("\ndeferred imports (no longer on the startup path)")
+    for label, code in DEFERRED_IMPORTS.items():
+        seconds = wall_time(code, max(1, args.repeat // 2))
+        print(f"  {label:<40} {'not installed' if seconds is None else f'{seconds:>7.3f}s'}")
+
+    if args.warmup:
+        seconds, status = warmup_times()
+        print(f"\nwarm-up: {seconds:.2f}s wall")
+        for name, state in status.get("components", {}).items():
+            print(f"  {name:<20} {state['status']:<8} {state.get('seconds', 0):>7.2f}s {state.get('error', '')}")
+        if "error" in status:
+            print(f"  failed: {status['error']}")
+
+
+if __name__ == "__main__":
+    main()
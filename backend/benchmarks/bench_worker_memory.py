@@ -0,0 +1,197 @@
+"""
+Per-worker memory with and without sharing the model and embedding index.
+
+Forks N workers the way run_workers.py does and, once every worker has
+loaded its data and run queries over the whole index, reads RSS, PSS and
+USS (private memory) from /proc/<pid>/smaps_rollup while all of them are
+alive. Two modes:
+
+  private - every worker loads its own model and reads the index into its
+            own memory (what N independent uvicorn workers do)
+  shared  - the parent loads the model and memory-maps the index before
+            fork() (run_workers.py); workers only touch the shared pages
+
+RSS counts shared pages in every process, so the deciding numbers are PSS
+(shared pages split between the processes using them) and USS; the sum of
+PSS over all processes is the machine's real cost. Linux only. Run from
+the backend directory:
+
+    python -m benchmarks.bench_worker_memory --workers 1 2 4
+    python -m benchmarks.bench_worker_memory --real-model --vectors 50000
+
+Without --real-model the sentence transformer is replaced by a tensor of
+--model-mb megabytes (the default is the size of the float32 weights of
+paraphrase-multilingual-MiniLM-L12-v2), which is shared or private in the
+same way the real weights are.
+"""
+import os
+import gc
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from app.embedding_store import EmbeddingStore
+
+
+def _smaps_rollup(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return {"rss": values.get("Rss", 0.0), "pss": values.get("Pss", 0.0),
+            "uss": values.get("Private_Clean", 0.0) + values.get("Private_Dirty", 0.0)}
+
+
+class StandInModel:
+    """Weights of a given size; encode() reads all of them like a forward pass would"""
+
+    def __init__(self, megabytes, dim=384):
+        try:
+            import torch
+
+            self.weights = torch.rand(int(megabytes * 2 ** 20 / 4))
+            self._sum = lambda: float(self.weights.sum())
+        except ImportError:
+            self.weights = np.random.default_rng(0).random(int(megabytes * 2 ** 20 / 4), dtype=np.float32)
+            self._sum = lambda: float(self.weights.sum())
+        self.dim = dim
+
+    def encode(self, texts):
+        self._sum()
+        return np.random.default_rng(len(texts)).random((len(texts), self.dim), dtype=np.float32)
+
+
+def _load_model(args):
+    if args.real_model:
+        from app.embeddings import get_sentence_model
+
+        model = get_sentence_model()
+        if model is None:
+            raise SystemExit("sentence transformer could not be loaded")
+        return model
+    return StandInModel(args.model_mb, args.dim)
+
+
+def _worker(args, index_dir, model, store, report_fd, release_fd):
+    if model is None:
+        model = _load_model(args)
+    if store is None:
+        store = EmbeddingStore.load(index_dir, mmap=False)
+
+    # A search over the whole index plus a few encodes, so every page is touched
+    query = model.encode(["tinta kotor pada unit 3"])[0]
+    for start in range(0, len(store.vectors), 65536):
+        np.asarray(store.vectors[start:start + 65536]) @ query
+    store.encode(model, ["t0", "t1", "belum ada di index"])
+
+    os.write(report_fd, b"1")
+    os.read(release_fd, 1)  # stay alive until the parent has measured everyone
+
+
+def measure(args, index_dir, mode, workers):
+    model = store = None
+    if mode == "shared":
+        model = _load_model(args)
+        store = EmbeddingStore.load(index_dir, mmap=True)
+        gc.collect()
+        gc.freeze()
+
+    report_r, report_w = os.pipe()
+    release_r, release_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(report_r)
+            os.close(release_w)
+            try:
+                _worker(args, index_dir, model, store, report_w, release_r)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(report_w)
+    os.close(release_r)
+
+    for _ in range(workers):
+        os.read(report_r, 1)
+    time.sleep(0.2)
+    per_worker = [_smaps_rollup(pid) for pid in pids]
+    parent = _smaps_rollup(os.getpid())
+
+    os.close(release_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    os.close(report_r)
+
+    mean = {key: sum(w[key] for w in per_worker) / workers for key in ("rss", "pss", "uss")}
+    return {"mode": mode, "workers": workers, **{f"{k}_mb": round(v, 1) for k, v in mean.items()},
+            "total_pss_mb": round(sum(w["pss"] for w in per_worker) + parent["pss"], 1),
+            "parent_pss_mb": round(parent["pss"], 1)}
+
+
+def _isolated(func, *args):
+    # Each measurement runs in a fresh child, so nothing loaded by an earlier
+    # run is left in the parent whose memory is being measured
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            os.write(write_fd, json.dumps(func(*args)).encode("utf-8"))
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    while True:
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return json.loads(b"".join(chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--vectors", type=int, default=200000, help="texts in the embedding index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--model-mb", type=float, default=450.0, help="stand-in model size")
+    parser.add_argument("--real-model", action="store_true", help="load the sentence transformer instead")
+    parser.add_argument("--json", help="also write the result rows to this file")
+    args = parser.parse_args()
+
+    index_dir = tempfile.mkdtemp(prefix="gemba-index-")
+    try:
+        rng = np.random.default_rng(0)
+        EmbeddingStore([f"t{i}" for i in range(args.vectors)],
+                       rng.random((args.vectors, args.dim), dtype=np.float32)).save(index_dir)
+        index_mb = os.path.getsize(os.path.join(index_dir, "vectors.npy")) / 2 ** 20
+        model_label = "real sentence transformer" if args.real_model else f"{args.model_mb:.0f} MB stand-in"
+        print(f"model: {model_label}, index: {args.vectors} x {args.dim} ({index_mb:.0f} MB)")
+        print(f"{'mode':<8} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} "
+              f"{'parent PSS':>11} {'total PSS':>10}")
+
+        rows = []
+        for workers in args.workers:
+            for mode in ("private", "shared"):
+                row = _isolated(measure, args, index_dir, mode, workers)
+                rows.append(row)
+                print(f"{mode:<8} {workers:>7} {row['rss_mb']:>11.1f} {row['pss_mb']:>11.1f} {row['uss_mb']:>11.1f} "
+                      f"{row['parent_pss_mb']:>11.1f} {row['total_pss_mb']:>10.1f}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(rows, f, indent=2)
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
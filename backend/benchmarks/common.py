@@ -0,0 +1,103 @@
+"""Shared stand-ins and statistics for the benchmark scripts"""
+import re
+import json
+import zlib
+import hashlib
+
+import numpy as np
+
+from app.llm_provider import FakeLLMProvider
+
+_NUMBERED_RE = re.compile(r"^\d+\. (.+)$", re.MULTILINE)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class StubSentenceModel:
+    """Deterministic 32-dimensional hash embeddings; no model download"""
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        vectors = [np.frombuffer(hashlib.sha256(str(t).encode("utf-8")).digest(), dtype=np.uint8).astype(np.float32)
+                   for t in ([texts] if single else texts)]
+        return vectors[0] if single else np.stack(vectors)
+
+
+class HashingSentenceModel:
+    """
+    Signed feature hashing of words and word bigrams.
+
+    Unlike StubSentenceModel, texts that share words get similar vectors,
+    so nearest-neighbour structure (and recall) behaves like a real corpus.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self._buckets = {}
+
+    def _bucket(self, token):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = zlib.crc32(token.encode("utf-8"))
+            bucket = self._buckets[token] = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+        return bucket
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _TOKEN_RE.findall(str(text).lower())
+            for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                column, sign = self._bucket(token)
+                vectors[row, column] += sign
+        return vectors[0] if single else vectors
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _filler(tokens):
+    return " ".join(["kata"] * max(1, tokens))
+
+
+def make_fake_provider(latency=0.5, output_tokens=60, tokens_per_second=0.0, **kwargs):
+    """
+    FakeLLMProvider answering every RootCauseAI instruction with valid JSON
+
+    Args:
+        latency (float): Fixed seconds per call (time to first token)
+        output_tokens (int): Approximate tokens of generated text per item
+        tokens_per_second (float): Generation speed; 0 disables the per-token delay
+
+    Returns:
+        FakeLLMProvider: The provider
+    """
+    text = _filler(output_tokens // 4)
+
+    def scores(prompt):
+        return [{"root_cause": cause, "spesifisitas": 15, "relevansi": 15, "kejelasan": 15,
+                 "actionability": 15, "total_score": 60, "feedback": text}
+                for cause in _NUMBERED_RE.findall(prompt)]
+
+    responses = {
+        "root_cause": json.dumps([f"Root cause {i}: {text}" for i in range(4)]),
+        "action": json.dumps({"temporary_actions": [f"Temporary {i}: {text}" for i in range(3)],
+                              "preventive_actions": [f"Preventive {i}: {text}" for i in range(3)]}),
+        "scoring": lambda prompt: json.dumps({"scores": scores(prompt), "summary": text}),
+        "scoring_items": lambda prompt: json.dumps({"scores": scores(prompt)}),
+        "scoring_summary": json.dumps({"summary": text}),
+        "merge": json.dumps({"merged_root_causes": [], "individual_root_causes": []}),
+    }
+
+    def delay(key, prompt):
+        items = max(1, len(_NUMBERED_RE.findall(prompt))) if key.startswith("scoring") else 4
+        generation = items * output_tokens / tokens_per_second if tokens_per_second else 0.0
+        return latency + generation
+
+    return FakeLLMProvider(responses=responses, latency=delay, **kwargs)
@@ -0,0 +1,90 @@
+"""
+How many root cause requests the no-LLM fast path (app/fast_path.py)
+answers, and how often its top answer is right, per similarity threshold.
+
+History is the legacy data with recurring rows (bench_dedup.repeated_history).
+Requests are recurring defects (a row's problem typed again) and new ones
+(a row's problem held out of the history). The fast-path answer is right
+when its first root cause is the row's own root cause ("in answer": any
+of the returned root causes is); for new problems any fast-path answer is a
+miss the LLM would have handled.
+Run from the backend directory:
+
+    python -m benchmarks.eval_fast_path --copies 8 --queries 300
+"""
+import random
+import logging
+import argparse
+from collections import defaultdict
+
+from app.database import DatabaseConnector
+from app.fast_path import root_cause_answer
+from app.prompt_builder import normalize_text
+from benchmarks.bench_dedup import repeated_history, retype
+from benchmarks.common import HashingSentenceModel
+
+THRESHOLDS = (0.85, 0.9, 0.95, 0.98)
+
+
+def run(args):
+    records, rows = repeated_history(args.copies, seed=args.seed)
+    rng = random.Random(args.seed + 1)
+    held_out = set(rng.sample(range(len(rows)), len(rows) // 10))
+    groups = defaultdict(list)
+    for record in records:
+        if record["_fact"] not in held_out:
+            groups[(record["area"], record["category"])].append(record)
+
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.sentence_model = HashingSentenceModel()
+    db.get_optimized_data_by_area_and_category = lambda area, category: groups[(area, category)]
+
+    # Retyped root causes still identify their row
+    facts = defaultdict(set)
+    for record in records:
+        facts[normalize_text(record["root_cause"])].add(record["_fact"])
+
+    queries = []
+    for record in rng.sample(records, min(args.queries, len(records))):
+        recurring = record["_fact"] not in held_out
+        found = db.get_semantic_root_cause_data(retype(record["problem"], rng), record["area"], record["category"],
+                                                keep_scores=True)
+        queries.append((recurring, record["_fact"], found))
+
+    results = {}
+    for threshold in THRESHOLDS:
+        answered = right = listed = wrong_new = 0
+        for recurring, fact, found in queries:
+            answer = root_cause_answer(found, threshold=threshold)
+            if answer is None:
+                continue
+            answered += 1
+            if not recurring:
+                wrong_new += 1
+            else:
+                right += fact in facts[normalize_text(answer.answer[0])]
+                listed += any(fact in facts[normalize_text(a)] for a in answer.answer)
+        results[threshold] = (answered, right, listed, wrong_new)
+    return queries, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    queries, results = run(args)
+    recurring = sum(1 for q in queries if q[0])
+    print(f"{len(queries)} requests ({recurring} recurring, {len(queries) - recurring} new problems), "
+          f"hashing stand-in embedding")
+    print(f"{'threshold':>9} {'no LLM':>7} {'top-1 right':>12} {'in answer':>10} {'new answered':>13}")
+    for threshold, (answered, right, listed, wrong_new) in results.items():
+        print(f"{threshold:>9.2f} {answered / len(queries):>7.1%} {right / max(1, answered):>12.1%} "
+              f"{listed / max(1, answered):>10.1%} {wrong_new:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Hit rate and latency of the root cause retrieval with semantic search
+only, BM25 only, and the hybrid (RRF) ranking used by default.
+
+Queries are problems of corpus records, rewritten the way users type
+them again: item codes with other separators ("GRN28-JA10" as "GRN28JA10"
+or "grn28 ja10"), unit numbers glued ("unit3"), words switched between
+Indonesian and English, filler words dropped. A query hits when a record
+with the original problem text is in the top k of its (area, category)
+group. Every mode runs DatabaseConnector._filter_by_semantic_similarity:
+
+  semantic - HYBRID_SEARCH=false
+  bm25     - no sentence model (keyword ranking only)
+  hybrid   - semantic and BM25 fused by reciprocal rank fusion
+
+Run from the backend directory:
+
+    python -m benchmarks.eval_hybrid_search --records 5000 --queries 400
+    python -m benchmarks.eval_hybrid_search --source dump --real-model
+
+The default embedding is the hashing stand-in from benchmarks.common;
+--real-model uses the sentence transformer.
+"""
+import re
+import time
+import random
+import logging
+import argparse
+from collections import defaultdict
+
+from app import database
+from app.database import DatabaseConnector
+from app.embedding_store import EmbeddingStore, set_embedding_store
+from benchmarks.bench_retrieval import COMPONENTS, SYMPTOMS, dump_corpus, synthetic_corpus
+from benchmarks.common import HashingSentenceModel, percentile
+
+_CODE_RE = re.compile(r"\b([A-Z]{3})(\d{2})-([A-Z]{2})(\d{1,2})\b")
+_UNIT_RE = re.compile(r"\bunit (\d)\b")
+_SWAPS = {a: b for pair in COMPONENTS + SYMPTOMS for a, b in (pair, pair[::-1]) if a != b}
+_FILLER = {"pada", "on", "di"}
+
+
+def rewrite(problem, rng):
+    """
+    A user's retyping of a problem
+
+    Returns:
+        tuple: (query, kind) where kind is 'code' when a code was rewritten,
+            otherwise 'wording'
+    """
+    query, kind = problem, "wording"
+    if _CODE_RE.search(query):
+        style = rng.choice(["{0}{1}{2}{3}", "{0}{1} {2}{3}", "{0} {1} {2}{3}"])
+        query = _CODE_RE.sub(lambda m: style.format(*m.groups()), query)
+        query = query.lower() if rng.random() < 0.5 else query
+        kind = "code"
+    elif _UNIT_RE.search(query) and rng.random() < 0.5:
+        query = _UNIT_RE.sub(lambda m: f"unit{m.group(1)}", query)
+        kind = "code"
+    for phrase, other in _SWAPS.items():
+        if phrase in query and rng.random() < 0.3:
+            query = query.replace(phrase, other, 1)
+            break
+    words = [w for w in query.replace("(", " ").replace(")", " ").split()
+             if w.lower() not in _FILLER or rng.random() < 0.5]
+    return " ".join(words), kind
+
+
+def run(args):
+    records = (dump_corpus if args.source == "dump" else synthetic_corpus)(args.records, seed=args.seed)
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record["area"], record["category"])].append(record)
+
+    if args.real_model:
+        from app.embeddings import load_sentence_model
+
+        model = load_sentence_model()
+    else:
+        model = HashingSentenceModel()
+
+    # Historical problems come from a precomputed index, as in production
+    texts = sorted({r["problem"] for r in records})
+    set_embedding_store(EmbeddingStore(texts, model.encode(texts)))
+
+    rng = random.Random(args.seed + 1)
+    queries = [(record, *rewrite(record["problem"], rng)) for record in rng.sample(records, min(args.queries, len(records)))]
+
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    modes = {"semantic": (model, False), "bm25": (None, True), "hybrid": (model, True)}
+    results = {}
+    for mode, (mode_model, hybrid) in modes.items():
+        db.sentence_model = mode_model
+        database.HYBRID_SEARCH = hybrid
+        db._filter_by_semantic_similarity("warm up", groups[next(iter(groups))], "problem", args.k)
+        latencies, ranks, kinds = [], [], []
+        for record, query, kind in queries:
+            start = time.perf_counter()
+            found = db._filter_by_semantic_similarity(query, groups[(record["area"], record["category"])],
+                                                      "problem", args.k)
+            latencies.append(time.perf_counter() - start)
+            problems = [r["problem"] for r in found]
+            ranks.append(problems.index(record["problem"]) + 1 if record["problem"] in problems else None)
+            kinds.append(kind)
+        results[mode] = {"latencies": latencies, "ranks": ranks, "kinds": kinds}
+    database.HYBRID_SEARCH = True
+    set_embedding_store(None)
+    return results
+
+
+def _hit_rate(ranks, k):
+    return sum(1 for r in ranks if r is not None and r <= k) / max(1, len(ranks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["synthetic", "dump"], default="synthetic")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--k", type=int, default=10, help="records returned (root cause search uses 10)")
+    parser.add_argument("--real-model", action="store_true", help="use the sentence transformer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = run(args)
+    kinds = results["hybrid"]["kinds"]
+    print(f"{args.source} corpus, {args.records} records, {len(kinds)} queries "
+          f"({kinds.count('code')} with rewritten codes), "
+          f"model={'sentence transformer' if args.real_model else 'hashing stand-in'}")
+    print(f"{'mode':<9} {'hit@1':>6} {'hit@5':>6} {'hit@' + str(args.k):>7} {'MRR':>6} "
+          f"{'code hit@' + str(args.k):>12} {'p50 ms':>7} {'p95 ms':>7}")
+    for mode, r in results.items():
+        ranks = r["ranks"]
+        code_ranks = [rank for rank, kind in zip(ranks, r["kinds"]) if kind == "code"]
+        mrr = sum(1.0 / rank for rank in ranks if rank) / max(1, len(ranks))
+        print(f"{mode:<9} {_hit_rate(ranks, 1):>6.3f} {_hit_rate(ranks, 5):>6.3f} {_hit_rate(ranks, args.k):>7.3f} "
+              f"{mrr:>6.3f} {_hit_rate(code_ranks, args.k):>12.3f} "
+              f"{percentile(r['latencies'], 50) * 1000:>7.2f} {percentile(r['latencies'], 95) * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Query plans and latency of the history queries: joins over issues,
+root_causes, lines and actions (what ran before) versus the issue_history
+read model (scripts/migrate_issue_history.py).
+
+The SQLite stand-in (seed_sqlite.py) is filled with gemba_issues.sql,
+replicated to grow the tables; its schema creates issue_history and the
+triggers that fill it. For each query it prints EXPLAIN QUERY PLAN for one
+(line, category) pair, then times the query over random pairs. Run from the
+backend directory:
+
+    python -m benchmarks.explain_history_query --replicate 20
+
+With --mysql the plans (EXPLAIN) are read from the DB_* database instead,
+after the migration has been applied there; nothing is timed.
+"""
+import os
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+
+from app import database
+from app.database import DatabaseConnector
+from benchmarks.common import percentile
+from benchmarks.seed_sqlite import seed
+
+QUERIES = {
+    "root causes, join": database.ROOT_CAUSE_JOIN_QUERY,
+    "root causes, read model": database.ROOT_CAUSE_HISTORY_QUERY,
+    "actions, join": database.ACTION_JOIN_QUERY,
+    "actions, read model": database.ACTION_HISTORY_QUERY,
+}
+
+
+def _sqlite(query):
+    return query.replace("%s", "?")
+
+
+def explain_mysql(area, category):
+    db = DatabaseConnector()
+    if not db.connect():
+        raise SystemExit("Database connection failed")
+    try:
+        for name, query in QUERIES.items():
+            db.cursor.execute("EXPLAIN " + query, (f"%{area}%", f"%{category}%"))
+            print(f"\n{name}")
+            for row in db.cursor.fetchall():
+                print("  " + ", ".join(f"{k}={row[k]}" for k in ("table", "type", "key", "rows", "Extra")))
+    finally:
+        db.disconnect()
+
+
+def run(args):
+    path = os.path.join(tempfile.mkdtemp(), "history_bench.sqlite3")
+    counts = seed(path, replicate=args.replicate, users=1)
+    connection = sqlite3.connect(path)
+    pairs = connection.execute("SELECT DISTINCT l.name, rc.category FROM root_causes rc "
+                               "JOIN issues i ON i.id = rc.issue_id JOIN `lines` l ON l.id = i.line_id").fetchall()
+    rng = random.Random(args.seed)
+    sample = [(f"%{area}%", f"%{category}%") for area, category in (rng.choice(pairs) for _ in range(args.queries))]
+
+    plans, timings, rows = {}, {}, {}
+    for name, query in QUERIES.items():
+        plans[name] = [row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + _sqlite(query), sample[0])]
+        timings[name], rows[name] = [], 0
+        for params in sample:
+            start = time.perf_counter()
+            rows[name] += len(connection.execute(_sqlite(query), params).fetchall())
+            timings[name].append(time.perf_counter() - start)
+    connection.close()
+    return {"counts": counts, "plans": plans, "timings": timings, "rows": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicate", type=int, default=20, help="copies of the gemba_issues.sql rows")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mysql", nargs=2, metavar=("AREA", "CATEGORY"), help="explain on the DB_* database")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    if args.mysql:
+        explain_mysql(*args.mysql)
+        return
+
+    r = run(args)
+    print(f"{r['counts']['root_causes']} root causes, {args.queries} random (line, category) queries")
+    for name, plan in r["plans"].items():
+        print(f"\n{name}")
+        for step in plan:
+            print(f"  {step}")
+    print(f"\n{'query':<24} {'p50 ms':>8} {'p95 ms':>8} {'rows':>8}")
+    for name, latencies in r["timings"].items():
+        print(f"{name:<24} {percentile(latencies, 50) * 1000:>8.3f} {percentile(latencies, 95) * 1000:>8.3f} "
+              f"{r['rows'][name] // args.queries:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Load test for app.main:app against local stand-ins.
+
+Starts the API in-process with uvicorn, backed by:
+  - a SQLite copy of gemba_issues.sql (DB_BACKEND=sqlite, see seed_sqlite.py)
+  - FakeLLMProvider with configurable latency and output size
+  - a stub embedding model (or the real one with --real-embeddings)
+then drives each endpoint at a fixed concurrency and reports throughput,
+p50/p95/p99 latency and process RSS. Results can be stored as a baseline
+and later runs compared against it. Run from the backend directory:
+
+    python -m benchmarks.load_test --concurrency 8 --requests 200
+    python -m benchmarks.load_test --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.load_test --compare benchmarks/baselines/local.json --tolerance 0.25
+
+--compare exits with status 1 when an endpoint regresses: p95 above, or
+throughput below, the baseline by more than the tolerance, or more errors.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import resource
+import sqlite3
+import tempfile
+import threading
+
+API_KEY = "bench-api-key"
+ENDPOINTS = ("areas", "suggest", "actions", "score", "merge", "attendance")
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _configure_environment(db_path):
+    # Must happen before any app module is imported
+    os.environ.update({
+        "DB_BACKEND": "sqlite",
+        "SQLITE_PATH": db_path,
+        "API_KEY": API_KEY,
+        "LLM_PROVIDER": "fake",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "GEMINI_CONTEXT_CACHE": "false",
+    })
+
+
+def _sample_payloads(db_path, seed):
+    rng = random.Random(seed)
+    connection = sqlite3.connect(db_path)
+    try:
+        rows = connection.execute("""
+            SELECT l.name, i.description, rc.description, rc.category
+            FROM issues i JOIN root_causes rc ON rc.issue_id = i.id JOIN `lines` l ON l.id = i.line_id
+            WHERE i.description IS NOT NULL AND rc.description IS NOT NULL AND rc.category IS NOT NULL
+        """).fetchall()
+        users = [r[0] for r in connection.execute("SELECT id FROM users")]
+    finally:
+        connection.close()
+
+    def suggest():
+        area, problem, _, category = rng.choice(rows)
+        return "POST", "/api/root-cause/suggest", {"area": area, "problem": problem, "category": category}
+
+    def actions():
+        area, problem, root_cause, category = rng.choice(rows)
+        return "POST", "/api/actions/suggest", {
+            "area": area, "problem": problem, "root_cause": root_cause, "category": category}
+
+    def score():
+        area, problem, _, category = rng.choice(rows)
+        causes = [r[2] for r in rng.sample(rows, 4)]
+        return "POST", "/api/root-cause/score", {
+            "area": area, "problem": problem, "category": category,
+            "root_causes": causes, "user_id": rng.choice(users)}
+
+    def merge():
+        entries = [{"root_cause": r[2], "user_id": rng.choice(users)} for r in rng.sample(rows, 12)]
+        return "POST", "/api/root-cause/merge", {"root_causes": entries}
+
+    def attendance():
+        return "POST", "/api/attendance/qr", {"user_id": rng.choice(users), "qr_token": "SESSION_2025_01_01_T1"}
+
+    def areas():
+        return "GET", "/api/areas", None
+
+    return {"areas": areas, "suggest": suggest, "actions": actions,
+            "score": score, "merge": merge, "attendance": attendance}
+
+
+def _start_server(app, port):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           access_log=False, lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("API server did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _drive(base_url, make_request, requests, concurrency):
+    import httpx
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(make_request())
+
+    async def worker(client):
+        nonlocal errors
+        while True:
+            try:
+                method, path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers={"X-API-KEY": API_KEY},
+                                 timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def run(args):
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="gemba-bench-"), "gemba.sqlite3")
+    _configure_environment(db_path)
+
+    from benchmarks.seed_sqlite import seed
+
+    if args.db is None or not os.path.exists(db_path):
+        seed(db_path, users=args.users, replicate=args.replicate)
+
+    from app import embeddings
+    from app.llm_provider import set_default_provider
+    from benchmarks.common import StubSentenceModel, make_fake_provider
+
+    if not args.real_embeddings:
+        embeddings.set_sentence_model(StubSentenceModel())
+    set_default_provider(make_fake_provider(args.llm_latency, args.llm_output_tokens, args.llm_tokens_per_second))
+
+    from app.main import app
+
+    port = _free_port()
+    server, thread = _start_server(app, port)
+    payloads = _sample_payloads(db_path, args.seed)
+    base_url = f"http://127.0.0.1:{port}"
+
+    results = {}
+    try:
+        for endpoint in args.endpoints:
+            # One short warm-up pass so first-call costs do not skew percentiles
+            asyncio.run(_drive(base_url, payloads[endpoint], min(args.concurrency, args.requests), args.concurrency))
+            rss_before = _rss_mb()
+            latencies, errors, elapsed = asyncio.run(
+                _drive(base_url, payloads[endpoint], args.requests, args.concurrency))
+            results[endpoint] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile_ms(latencies, 50), 2),
+                "p95_ms": round(percentile_ms(latencies, 95), 2),
+                "p99_ms": round(percentile_ms(latencies, 99), 2),
+                "rss_mb": round(_rss_mb(), 1),
+                "rss_growth_mb": round(_rss_mb() - rss_before, 1),
+            }
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency": args.llm_latency,
+            "llm_output_tokens": args.llm_output_tokens,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "replicate": args.replicate,
+            "real_embeddings": args.real_embeddings,
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        },
+        "endpoints": results,
+    }
+
+
+def percentile_ms(latencies, q):
+    from benchmarks.common import percentile
+
+    return percentile(latencies, q) * 1000
+
+
+def print_report(report):
+    meta = report["meta"]
+    print(f"concurrency={meta['concurrency']} requests={meta['requests']} llm_latency={meta['llm_latency']}s "
+          f"output_tokens={meta['llm_output_tokens']} peak_rss={meta['peak_rss_mb']}MB")
+    print(f"{'endpoint':<11} {'reqs':>5} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>7}")
+    for endpoint, r in report["endpoints"].items():
+        print(f"{endpoint:<11} {r['requests']:>5} {r['errors']:>4} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['rss_mb']:>7.1f}")
+
+
+def compare(report, baseline, tolerance):
+    """
+    Regressions of a report against a baseline
+
+    Returns:
+        list: Human-readable regression messages (empty when none)
+    """
+    regressions = []
+    for endpoint, base in baseline["endpoints"].items():
+        current = report["endpoints"].get(endpoint)
+        if current is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{endpoint}: throughput {current['throughput_rps']} rps "
+                               f"< baseline {base['throughput_rps']} rps")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{endpoint}: {current['errors']} errors > baseline {base['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM seconds per call")
+    parser.add_argument("--llm-output-tokens", type=int, default=60, help="fake LLM tokens per generated item")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0,
+                        help="fake LLM generation speed; 0 disables the per-token delay")
+    parser.add_argument("--db", help="existing or new SQLite file (default: temporary)")
+    parser.add_argument("--replicate", type=int, default=1, help="copies of the historical data")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--real-embeddings", action="store_true", help="load the sentence transformer")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", help="write the report as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Seed a SQLite stand-in database from the gemba_issues.sql dump.
+
+Each gemba_issues row becomes a line (area), an issue, a root cause and its
+CORRECTIVE (temporary) and PREVENTIVE actions, matching the tables queried
+by DatabaseConnector. Users and an in-progress gemba session are added for
+the attendance and scoring endpoints. Run from the backend directory:
+
+    python -m benchmarks.seed_sqlite --out gemba_bench.sqlite3
+"""
+import os
+import re
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+from app.db_backend import create_sqlite_schema
+
+DEFAULT_DUMP = os.path.join(os.path.dirname(__file__), "..", "..", "gemba_issues.sql")
+
+_INSERT_RE = re.compile(r"INSERT INTO `gemba_issues` \(([^)]*)\) VALUES\s*", re.IGNORECASE)
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "0": "\0", "\\": "\\", "'": "'", '"': '"'}
+
+
+def _parse_values(text, pos):
+    """Parse '(v, ...), (v, ...);' starting at pos; yields tuples of Python values"""
+    row, value, in_string, quoted = [], [], False, False
+    i = pos
+    while i < len(text):
+        c = text[i]
+        if in_string:
+            if c == "\\" and i + 1 < len(text):
+                value.append(_ESCAPES.get(text[i + 1], text[i + 1]))
+                i += 1
+            elif c == "'" and text[i + 1:i + 2] == "'":
+                value.append("'")
+                i += 1
+            elif c == "'":
+                in_string = False
+            else:
+                value.append(c)
+        elif c == "'":
+            in_string, quoted = True, True
+        elif c in ",)":
+            token = "".join(value)
+            if quoted:
+                row.append(token)
+            else:
+                token = token.strip()
+                row.append(None if token.upper() == "NULL" else int(token) if token.lstrip("-").isdigit() else token)
+            value, quoted = [], False
+            if c == ")":
+                yield tuple(row)
+                row = []
+                # Skip to the next row or the end of the statement
+                while i + 1 < len(text) and text[i + 1] in " \r\n\t,":
+                    i += 1
+                if text[i + 1:i + 2] == ";":
+                    return
+                i += 1  # opening parenthesis of the next row
+        elif c == "(" and not value:
+            pass
+        else:
+            value.append(c)
+        i += 1
+
+
+def read_dump(path):
+    """All gemba_issues rows of a phpMyAdmin dump, as dicts"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    rows = []
+    for match in _INSERT_RE.finditer(text):
+        columns = [c.strip(" `") for c in match.group(1).split(",")]
+        start = text.index("(", match.end())
+        rows.extend(dict(zip(columns, values)) for values in _parse_values(text, start))
+    return rows
+
+
+def seed(path, dump_path=DEFAULT_DUMP, users=200, replicate=1):
+    """
+    Create and fill the stand-in database
+
+    Args:
+        path (str): SQLite file to create (replaced if it exists)
+        dump_path (str): gemba_issues.sql dump
+        users (int): Number of users (ids bench-user-0 ...)
+        replicate (int): Copies of the historical data, to test larger tables
+
+    Returns:
+        dict: Row counts per table
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    create_sqlite_schema(path)
+
+    rows = read_dump(dump_path)
+    connection = sqlite3.connect(path)
+    try:
+        line_ids = {}
+        for copy in range(replicate):
+            for row in rows:
+                area = (row.get("area") or "").strip() or "-"
+                if area not in line_ids:
+                    line_ids[area] = connection.execute("INSERT INTO `lines` (name) VALUES (?)", (area,)).lastrowid
+                created_at = f"{(row.get('date') or '').strip() or '2021-01-01'} 00:00:00"
+                issue_id = connection.execute(
+                    "INSERT INTO issues (line_id, description, created_at) VALUES (?, ?, ?)",
+                    (line_ids[area], row.get("problem"), created_at)).lastrowid
+                root_cause_id = connection.execute(
+                    "INSERT INTO root_causes (issue_id, description, category) VALUES (?, ?, ?)",
+                    (issue_id, row.get("root_cause"), row.get("category"))).lastrowid
+                for action_type, field in (("CORRECTIVE", "temporary_action"), ("PREVENTIVE", "preventive_action")):
+                    if row.get(field):
+                        connection.execute(
+                            "INSERT INTO actions (root_cause_id, type, description) VALUES (?, ?, ?)",
+                            (root_cause_id, action_type, row[field]))
+
+        connection.executemany(
+            "INSERT INTO users (id, name, role, email, points) VALUES (?, ?, ?, ?, 0)",
+            [(f"bench-user-{i}", f"Bench User {i}", "OPERATOR", f"user{i}@example.com") for i in range(users)])
+        start_time = (datetime.now() + timedelta(days=365)).isoformat(" ")
+        connection.execute("INSERT INTO genba_sessions (id, name, status, start_time) VALUES (1, ?, 'PROGRESS', ?)",
+                           ("Bench session", start_time))
+        connection.commit()
+
+        return {table: connection.execute(f"SELECT COUNT(*) FROM `{table}`").fetchone()[0]
+                for table in ("lines", "issues", "root_causes", "actions", "users")}
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="gemba_bench.sqlite3")
+    parser.add_argument("--dump", default=DEFAULT_DUMP)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--replicate", type=int, default=1)
+    args = parser.parse_args()
+    print(seed(args.out, args.dump, args.users, args.replicate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Per-endpoint stage latency percentiles from a span file.
+
+Run the API with TRACE_EXPORT=file (spans are appended to TRACE_EXPORT_FILE,
+traces.jsonl by default), then from the backend directory:
+
+    python -m benchmarks.trace_report traces.jsonl
+"""
+import argparse
+import json
+from collections import defaultdict
+
+from benchmarks.common import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="traces.jsonl")
+    args = parser.parse_args()
+
+    durations = defaultdict(list)
+    with open(args.path, encoding="utf-8") as f:
+        for line in f:
+            span = json.loads(line)
+            endpoint = span["attributes"].get("endpoint") or "-"
+            stage = "total" if span["kind"] == "endpoint" else span["name"]
+            durations[(endpoint, stage)].append(span["duration"])
+
+    print(f"{'endpoint':<20} {'stage':<13} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for (endpoint, stage), values in sorted(durations.items()):
+        print(f"{endpoint:<20} {stage:<13} {len(values):>6} "
+              f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+              f"{percentile(values, 99) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
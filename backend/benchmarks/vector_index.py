@@ -0,0 +1,264 @@
+"""Vector index backends measured by benchmarks/bench_retrieval.py"""
+from typing import Dict, Any, List, Optional, Tuple, Type
+
+import numpy as np
+
+from app.embedding_store import normalize
+
+# Nearest-neighbour backends compared by bench_retrieval (cosine similarity):
+#   exact - brute-force matrix product over all vectors
+#   int8  - brute force over int8-quantized vectors (4x less memory, approximate)
+#   ivf   - k-means partitioned lists, only the closest lists are scanned
+#   hnsw  - graph index, when the hnswlib package is installed
+# The app itself ranks each (area, category) group by brute force
+# (DatabaseConnector._filter_by_semantic_similarity).
+DEFAULT_BACKEND = "exact"
+IVF_NPROBE = 8
+
+# Rows scored per block by the int8 backend, bounding the float32 scratch space
+_BLOCK_ROWS = 65536
+
+
+def _top_k(scores: np.ndarray, k: int, ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return (top if ids is None else ids[top]).astype(np.int64), scores[top].astype(np.float32)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over a fixed set of row vectors.
+
+    build() takes the vectors of the corpus (in corpus order); search()
+    returns corpus positions and similarities, best first.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.size = 0
+        self.dim = 0
+
+    def build(self, embeddings: np.ndarray) -> "VectorIndex":
+        raise NotImplementedError
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest corpus vectors of one query vector
+
+        Args:
+            query (np.ndarray): Query embedding
+            k (int): Number of neighbours
+
+        Returns:
+            tuple: (positions, similarities), both of length <= k, best first
+        """
+        raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index structures"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class ExactIndex(VectorIndex):
+    """Brute force: one matrix-vector product per query; always exact"""
+
+    name = "exact"
+
+    def build(self, embeddings: np.ndarray) -> "ExactIndex":
+        self.vectors = normalize(embeddings)
+        self.size, self.dim = self.vectors.shape
+        return self
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return _top_k(self.vectors @ normalize(query), k)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+
+class Int8Index(VectorIndex):
+    """
+    Brute force over int8 vectors with one scale per dimension.
+
+    Stores a quarter of the float32 index; scores are approximate, so the
+    ranking can differ slightly from ExactIndex.
+    """
+
+    name = "int8"
+
+    def build(self, embeddings: np.ndarray) -> "Int8Index":
+        vectors = normalize(embeddings)
+        self.size, self.dim = vectors.shape
+        self.scale = np.abs(vectors).max(axis=0) / 127.0
+        self.scale[self.scale == 0] = 1.0
+        self.codes = np.round(vectors / self.scale).astype(np.int8)
+        return self
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        weighted = normalize(query) * self.scale
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, _BLOCK_ROWS):
+            block = self.codes[start:start + _BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ weighted
+        return _top_k(scores, k)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scale.nbytes
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: vectors are partitioned by k-means and a query
+    scans only the `nprobe` partitions with the closest centroids.
+
+    Args:
+        nlist (int): Number of partitions; defaults to about 4*sqrt(n)
+        nprobe (int): Partitions scanned per query
+        train_size (int): Vectors sampled to train the centroids
+        min_size (int): Below this many vectors a single list is kept, since
+            scanning everything is cheaper than training centroids
+    """
+
+    name = "ivf"
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: Optional[int] = None, train_size: int = 50000,
+                 min_size: int = 2048):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe or IVF_NPROBE
+        self.train_size = train_size
+        self.min_size = min_size
+
+    def build(self, embeddings: np.ndarray) -> "IVFIndex":
+        from sklearn.cluster import MiniBatchKMeans
+
+        vectors = normalize(embeddings)
+        self.size, self.dim = vectors.shape
+        nlist = self.nlist or int(4 * np.sqrt(self.size))
+        nlist = 1 if self.size < self.min_size else max(1, min(nlist, self.size))
+
+        if nlist == 1:
+            self.centroids = normalize(vectors.mean(axis=0, keepdims=True))
+        else:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(self.size, min(self.size, max(self.train_size, nlist)), replace=False)]
+            kmeans = MiniBatchKMeans(n_clusters=nlist, random_state=0, n_init=1, batch_size=4096).fit(sample)
+            self.centroids = normalize(kmeans.cluster_centers_)
+
+        assignment = np.empty(self.size, dtype=np.int64)
+        for start in range(0, self.size, _BLOCK_ROWS):
+            assignment[start:start + _BLOCK_ROWS] = np.argmax(
+                vectors[start:start + _BLOCK_ROWS] @ self.centroids.T, axis=1)
+
+        # Vectors stored grouped by partition; offsets[i]:offsets[i+1] is list i
+        order = np.argsort(assignment, kind="stable")
+        self.ids = order
+        self.vectors = vectors[order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=nlist))))
+        self.nlist = nlist
+        return self
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query = normalize(query)
+        nprobe = min(self.nprobe, self.nlist)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        return _top_k(self.vectors[rows] @ query, k, self.ids[rows])
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.ids.nbytes + self.centroids.nbytes + self.offsets.nbytes
+
+
+class HnswIndex(VectorIndex):
+    """
+    Hierarchical navigable small-world graph (hnswlib)
+
+    Args:
+        m (int): Graph degree
+        ef_construction (int): Build-time search width
+        ef_search (int): Query-time search width (raised to k when smaller)
+    """
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        super().__init__()
+        import hnswlib  # optional dependency
+
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+    def build(self, embeddings: np.ndarray) -> "HnswIndex":
+        vectors = normalize(embeddings)
+        self.size, self.dim = vectors.shape
+        self.index = self._hnswlib.Index(space="ip", dim=self.dim)
+        self.index.init_index(max_elements=max(1, self.size), ef_construction=self.ef_construction, M=self.m)
+        self.index.add_items(vectors, np.arange(self.size))
+        return self
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        self.index.set_ef(max(self.ef_search, k))
+        labels, distances = self.index.knn_query(normalize(query), k=k)
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        # hnswlib does not report its size; vectors plus 2*M links per node
+        return self.size * (self.dim * 4 + 2 * self.m * 4)
+
+
+BACKENDS: Dict[str, Type[VectorIndex]] = {
+    ExactIndex.name: ExactIndex,
+    Int8Index.name: Int8Index,
+    IVFIndex.name: IVFIndex,
+    HnswIndex.name: HnswIndex,
+}
+
+
+def available_backends() -> List[str]:
+    """Backends usable in this environment (hnsw needs hnswlib)"""
+    names = []
+    for name, cls in BACKENDS.items():
+        try:
+            cls()
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+
+def create_index(backend: Optional[str] = None, **options: Any) -> VectorIndex:
+    """
+    Create an empty index
+
+    Args:
+        backend (str): Backend name; defaults to DEFAULT_BACKEND
+        **options: Backend-specific options, e.g. nprobe for 'ivf'
+
+    Returns:
+        VectorIndex: The index, ready for build()
+
+    Raises:
+        ValueError: If the backend is unknown
+        ImportError: If the backend's optional package is not installed
+    """
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector index backend '{backend}'; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**options)
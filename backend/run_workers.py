@@ -0,0 +1,140 @@
+"""
+Multi-worker runner that shares one copy of the embedding model and index.
+
+The parent process imports the app, loads the sentence transformer and the
+memory-mapped embedding index (EMBEDDING_INDEX_PATH) once, binds the port,
+and then forks the workers. Model weights stay shared copy-on-write and the
+index pages are shared through the page cache, so N workers cost far less
+than N separate `uvicorn --workers N` processes that each load their own
+copy. Crashed workers are re-forked from the preloaded parent.
+
+    python run_workers.py --workers 4 --port 8001
+
+On platforms without fork() (Windows) it falls back to uvicorn's own
+multi-process mode, without sharing. See MULTI_WORKER.md.
+"""
+import os
+import sys
+import gc
+import time
+import signal
+import socket
+import logging
+import argparse
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+
+logger = logging.getLogger('run_workers')
+
+
+def _limit_threads(workers):
+    # One worker per core share: keep torch/BLAS pools from oversubscribing
+    # the CPU. Must be set before torch or numpy is imported.
+    threads = str(max(1, (os.cpu_count() or 1) // workers))
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(name, threads)
+
+
+def _preload():
+    from app.main import app
+    from app.warmup import PRELOAD_COMPONENTS, Warmup
+
+    warmup = Warmup(PRELOAD_COMPONENTS)
+    warmup.run()
+    for name, state in warmup.status()["components"].items():
+        logger.info(f"Preloaded {name}: {state['status']} ({state.get('seconds', 0)}s)")
+
+    # Move everything loaded so far out of the garbage collector's view, so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def _serve(app, sock, host, port):
+    import uvicorn
+
+    config = uvicorn.Config(app, host=host, port=port, log_level=os.getenv("UVICORN_LOG_LEVEL", "info"))
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock, host, port):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            _serve(app, sock, host, port)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run(workers, host, port):
+    _limit_threads(workers)
+    app = _preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    stopping = False
+    children = {}
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        pid = _spawn(app, sock, host, port)
+        children[pid] = time.monotonic()
+    logger.info(f"Serving on {host}:{port} with {workers} workers: {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {status}; restarting")
+        if time.monotonic() - started < 1:
+            time.sleep(1)  # crash loop guard
+        children[_spawn(app, sock, host, port)] = time.monotonic()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not hasattr(os, "fork"):
+        import uvicorn
+
+        logger.warning("fork() is not available; starting uvicorn workers without a shared model")
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+        return
+    run(args.workers, args.host, args.port)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Precompute embeddings of all historical problem and root cause texts.
+
+The output directory is what EMBEDDING_INDEX_PATH points to; the API then
+memory-maps the vectors instead of re-encoding history on every request.
+Rebuild after importing new data (texts not in the index are still
+encoded per request). Run from the backend directory:
+
+    python -m scripts.build_embedding_index --out data/embedding_index
+"""
+import argparse
+import time
+
+from app.database import DatabaseConnector
+from app.embeddings import SENTENCE_MODEL_NAME, get_sentence_model
+from app.embedding_store import build_store
+
+QUERY = """
+    SELECT description FROM issues WHERE description IS NOT NULL
+    UNION
+    SELECT description FROM root_causes WHERE description IS NOT NULL
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="data/embedding_index")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    model = get_sentence_model()
+    if model is None:
+        raise SystemExit("Sentence transformer could not be loaded")
+
+    db = DatabaseConnector()
+    if not db.connect():
+        raise SystemExit("Database connection failed")
+    try:
+        db.cursor.execute(QUERY)
+        texts = [row["description"] for row in db.cursor.fetchall()]
+    finally:
+        db.disconnect()
+
+    start = time.perf_counter()
+    store = build_store(model, texts, args.batch_size, meta={"model": SENTENCE_MODEL_NAME, "built_at": time.time()})
+    store.save(args.out)
+    print(f"{len(store)} texts encoded in {time.perf_counter() - start:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
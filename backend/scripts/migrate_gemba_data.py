@@ -1,7 +1,10 @@
+# Jalankan dari direktori backend: python -m scripts.migrate_gemba_data
 import mysql.connector
 import re
 from datetime import datetime
 
+from app.areas_cache import invalidate_areas
+
 # --- KONFIGURASI DATABASE BARU ---
 DB_CONFIG = {
     'host': 'localhost',        # Ganti dengan host database Anda
@@ -44,8 +47,12 @@ def parse_sql_insert_values(line):
                 parsed_values.append(val) # Jika bukan int, simpan sebagai string
     return parsed_values
 
+# Diisi True oleh get_or_create_line jika ada line baru (cache /api/areas perlu di-reload)
+lines_created = False
+
 def get_or_create_line(cursor, area_name):
     """Mendapatkan line_id untuk area_name, membuat jika belum ada."""
+    global lines_created
     if not area_name:
         return None
     cursor.execute("SELECT id FROM `lines` WHERE name = %s", (area_name,))
@@ -54,6 +61,7 @@ def get_or_create_line(cursor, area_name):
         return result[0]
     else:
         cursor.execute("INSERT INTO `lines` (name) VALUES (%s)", (area_name,))
+        lines_created = True
         return cursor.lastrowid
 
 def migrate_data():
@@ -160,6 +168,9 @@ def migrate_data():
             
         conn.commit()
         print("Migrasi data selesai dan di-commit.")
+        if lines_created:
+            invalidate_areas()
+            print("Cache daftar area API di-invalidate.")
 
     except mysql.connector.Error as err:
         print(f"Error MySQL: {err}")
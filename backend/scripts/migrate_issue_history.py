@@ -0,0 +1,147 @@
+"""
+Create the issue_history read model used by the history queries.
+
+issue_history holds one row per root cause with its line, problem and
+actions, so get_optimized_data_by_area_and_category() and
+get_action_data_by_area_and_category() read an index on
+(line_id, category, created_at) instead of joining issues, root_causes,
+lines and actions and grouping on long text columns. Triggers on those
+tables keep it in sync; the backfill only runs when the migration is
+applied. Idempotent. Run from the backend directory:
+
+    python -m scripts.migrate_issue_history
+    python -m scripts.migrate_issue_history --rollback
+
+The SQLite stand-in (app/db_backend.py) creates the same table and triggers.
+"""
+import argparse
+import time
+
+from app.database import DatabaseConnector
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS issue_history (
+    root_cause_id BIGINT PRIMARY KEY,
+    issue_id BIGINT NOT NULL,
+    line_id BIGINT NOT NULL,
+    area VARCHAR(255),
+    category VARCHAR(191),
+    problem TEXT,
+    root_cause TEXT,
+    temporary_action TEXT,
+    preventive_action TEXT,
+    created_at DATETIME NULL,
+    INDEX idx_issue_history_line_category (line_id, category, created_at),
+    INDEX idx_issue_history_issue (issue_id)
+)
+"""
+
+_ACTIONS = """
+temporary_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = {id} AND type = 'CORRECTIVE'),
+preventive_action = (SELECT MAX(description) FROM actions WHERE root_cause_id = {id} AND type = 'PREVENTIVE')
+"""
+
+TRIGGERS = {
+    "trg_issue_history_rc_insert": """
+        AFTER INSERT ON root_causes FOR EACH ROW
+        INSERT INTO issue_history (root_cause_id, issue_id, line_id, area, category, problem, root_cause, created_at)
+        SELECT NEW.id, i.id, i.line_id, l.name, NEW.category, i.description, NEW.description, i.created_at
+        FROM issues i JOIN `lines` l ON l.id = i.line_id WHERE i.id = NEW.issue_id
+    """,
+    "trg_issue_history_rc_update": """
+        AFTER UPDATE ON root_causes FOR EACH ROW
+        UPDATE issue_history h JOIN issues i ON i.id = NEW.issue_id JOIN `lines` l ON l.id = i.line_id
+        SET h.issue_id = i.id, h.line_id = i.line_id, h.area = l.name, h.category = NEW.category,
+            h.problem = i.description, h.root_cause = NEW.description, h.created_at = i.created_at
+        WHERE h.root_cause_id = NEW.id
+    """,
+    "trg_issue_history_rc_delete": """
+        AFTER DELETE ON root_causes FOR EACH ROW
+        DELETE FROM issue_history WHERE root_cause_id = OLD.id
+    """,
+    "trg_issue_history_issue_update": """
+        AFTER UPDATE ON issues FOR EACH ROW
+        UPDATE issue_history h JOIN `lines` l ON l.id = NEW.line_id
+        SET h.line_id = NEW.line_id, h.area = l.name, h.problem = NEW.description, h.created_at = NEW.created_at
+        WHERE h.issue_id = NEW.id
+    """,
+    "trg_issue_history_issue_delete": """
+        AFTER DELETE ON issues FOR EACH ROW
+        DELETE FROM issue_history WHERE issue_id = OLD.id
+    """,
+    "trg_issue_history_line_update": """
+        AFTER UPDATE ON `lines` FOR EACH ROW
+        UPDATE issue_history SET area = NEW.name WHERE line_id = NEW.id
+    """,
+    "trg_issue_history_action_insert": f"""
+        AFTER INSERT ON actions FOR EACH ROW
+        UPDATE issue_history SET {_ACTIONS.format(id="NEW.root_cause_id")}
+        WHERE root_cause_id = NEW.root_cause_id
+    """,
+    "trg_issue_history_action_update": f"""
+        AFTER UPDATE ON actions FOR EACH ROW
+        UPDATE issue_history SET {_ACTIONS.format(id="issue_history.root_cause_id")}
+        WHERE root_cause_id IN (OLD.root_cause_id, NEW.root_cause_id)
+    """,
+    "trg_issue_history_action_delete": f"""
+        AFTER DELETE ON actions FOR EACH ROW
+        UPDATE issue_history SET {_ACTIONS.format(id="OLD.root_cause_id")}
+        WHERE root_cause_id = OLD.root_cause_id
+    """,
+}
+
+BACKFILL = f"""
+INSERT IGNORE INTO issue_history
+    (root_cause_id, issue_id, line_id, area, category, problem, root_cause, created_at,
+     temporary_action, preventive_action)
+SELECT rc.id, i.id, i.line_id, l.name, rc.category, i.description, rc.description, i.created_at,
+    (SELECT MAX(description) FROM actions WHERE root_cause_id = rc.id AND type = 'CORRECTIVE'),
+    (SELECT MAX(description) FROM actions WHERE root_cause_id = rc.id AND type = 'PREVENTIVE')
+FROM root_causes rc
+JOIN issues i ON i.id = rc.issue_id
+JOIN `lines` l ON l.id = i.line_id
+"""
+
+
+def migrate(cursor):
+    """Create the table and triggers, then copy the existing rows"""
+    cursor.execute(CREATE_TABLE)
+    # Triggers first, so rows written during the backfill are not missed
+    for name, body in TRIGGERS.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {body}")
+    cursor.execute(BACKFILL)
+    return cursor.rowcount
+
+
+def rollback(cursor):
+    """Drop the triggers and the table; the history queries fall back to the joins"""
+    for name in TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute("DROP TABLE IF EXISTS issue_history")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rollback", action="store_true", help="drop the triggers and the issue_history table")
+    args = parser.parse_args()
+
+    db = DatabaseConnector()
+    if not db.connect(read_only=False):
+        raise SystemExit("Database connection failed")
+    try:
+        start = time.perf_counter()
+        if args.rollback:
+            rollback(db.cursor)
+            db.connection.commit()
+            print("issue_history and its triggers dropped")
+        else:
+            rows = migrate(db.cursor)
+            db.connection.commit()
+            print(f"issue_history ready, {rows} rows backfilled in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import areas_cache
+from app.areas_cache import AreasCache, set_areas_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Lines:
+    """Stand-in for the lines table; records which database each load read"""
+
+    def __init__(self, *names):
+        self.names = list(names)
+        self.loads = []
+
+    def __call__(self, primary=False):
+        self.loads.append("primary" if primary else "replica")
+        return list(self.names)
+
+
+def _cache(tmp_path, lines, clock=None):
+    return AreasCache(loader=lines, ttl=300, version_file=str(tmp_path / "areas.version"), clock=clock or Clock())
+
+
+def test_areas_are_reloaded_only_after_an_invalidation_or_the_ttl(tmp_path):
+    clock, lines = Clock(), Lines("KBA 3", "Lem Otomatis")
+    cache = _cache(tmp_path, lines, clock)
+    areas, etag = cache.get()
+    assert areas == ["KBA 3", "Lem Otomatis"] and cache.get() == (areas, etag)
+    assert lines.loads == ["replica"]
+
+    # Another process (a migration script) adds a line and touches the version file
+    lines.names.append("Printing 2")
+    other = _cache(tmp_path, lines)
+    other.invalidate()
+    areas, new_etag = cache.get()
+    assert "Printing 2" in areas and new_etag != etag
+    # Read from the primary, which already has the new line
+    assert lines.loads[-1] == "primary"
+
+    lines.names.append("Slitter")
+    assert "Slitter" not in cache.get()[0]
+    clock.now = 301
+    assert "Slitter" in cache.get()[0]
+
+
+def test_a_failed_reload_keeps_the_last_list(tmp_path):
+    lines = Lines("KBA 3")
+    cache = _cache(tmp_path, lines)
+    assert cache.get()[0] == ["KBA 3"]
+    cache.loader = lambda primary=False: None
+    cache.invalidate()
+    assert cache.get()[0] == ["KBA 3"]
+    assert _cache(tmp_path, lambda primary=False: None).get() == ([], None)
+
+
+def _request(**headers):
+    return Request({"type": "http", "method": "GET", "path": "/api/areas",
+                    "headers": [(k.lower().replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+def test_endpoint_answers_304_for_a_matching_etag_without_the_database(tmp_path, monkeypatch):
+    pytest.importorskip("dotenv")
+    from app import main
+
+    monkeypatch.setattr(main, "DatabaseConnector", None)  # never constructed
+    lines = Lines("KBA 3")
+    set_areas_cache(_cache(tmp_path, lines))
+    try:
+        response = main.get_areas(_request(), api_key="key")
+        etag = response.headers["ETag"]
+        assert response.status_code == 200 and response.body == b'["KBA 3"]'
+        assert response.headers["Cache-Control"] == f"private, max-age={areas_cache.AREAS_CACHE_MAX_AGE}"
+
+        assert main.get_areas(_request(If_None_Match=etag), api_key="key").status_code == 304
+        main.invalidate_areas_cache(api_key="key")
+        lines.names.append("Slitter")
+        response = main.get_areas(_request(If_None_Match=etag), api_key="key")
+        assert response.status_code == 200 and response.headers["ETag"] != etag
+        assert len(lines.loads) == 2
+    finally:
+        set_areas_cache(None)
+
+
+def test_endpoint_answers_503_until_the_areas_were_loaded_once(tmp_path):
+    pytest.importorskip("dotenv")
+    from app import main
+
+    lines = Lines("KBA 3")
+    down = [True]
+    set_areas_cache(_cache(tmp_path, lambda primary=False: None if down[0] else lines(primary)))
+    try:
+        with pytest.raises(HTTPException) as excinfo:
+            main.get_areas(_request(), api_key="key")
+        assert excinfo.value.status_code == 503 and "Cache-Control" not in excinfo.value.headers
+        down[0] = False
+        assert main.get_areas(_request(), api_key="key").body == b'["KBA 3"]'
+    finally:
+        set_areas_cache(None)
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import pytest
+from starlette.requests import Request
+
+from app.attendance_events import AttendanceEventBroker, format_sse
+
+
+def test_publish_fans_out_to_all_session_subscribers():
+    async def scenario():
+        broker = AttendanceEventBroker()
+        first = broker.subscribe(1)
+        second = broker.subscribe(1)
+        other = broker.subscribe(2)
+
+        broker.publish(1, {"type": "check_in", "user_id": "7"})
+
+        assert (await first.get(timeout=1))["user_id"] == "7"
+        assert (await second.get(timeout=1))["user_id"] == "7"
+        assert await other.get(timeout=0.05) is None
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_does_not_block_publisher():
+    async def scenario():
+        broker = AttendanceEventBroker(max_queue_size=2)
+        slow = broker.subscribe(1)
+
+        # Publish from a worker thread, like the threaded request handlers do
+        publisher = threading.Thread(
+            target=lambda: [broker.publish(1, {"seq": i}) for i in range(10)])
+        publisher.start()
+        publisher.join(timeout=1)
+        assert not publisher.is_alive()
+
+        await asyncio.sleep(0.05)
+        assert slow.dropped == 8
+        assert (await slow.get(timeout=1))["seq"] == 8
+        assert (await slow.get(timeout=1))["seq"] == 9
+
+    asyncio.run(scenario())
+
+
+def test_unsubscribe_removes_subscriber():
+    async def scenario():
+        broker = AttendanceEventBroker()
+        subscription = broker.subscribe(3)
+        assert broker.subscriber_count(3) == 1
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(subscription)
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_that_is_never_iterated_leaves_no_subscription():
+    pytest.importorskip("dotenv")
+    from app import main
+
+    async def scenario():
+        request = Request({"type": "http", "method": "GET", "path": "/api/session/1/attendees/stream", "headers": []})
+        before = main.attendance_broker.subscriber_count(1)
+        # e.g. the client disconnected before the body was sent
+        response = await main.stream_session_attendees(1, request, api_key="key")
+        assert response.media_type == "text/event-stream"
+        assert main.attendance_broker.subscriber_count(1) == before
+
+    asyncio.run(scenario())
+
+
+def test_format_sse():
+    frame = format_sse({"type": "check_out"}, "check_out")
+    assert frame == 'event: check_out\ndata: {"type": "check_out"}\n\n'
@@ -0,0 +1,99 @@
+import json
+
+import numpy as np
+
+from app.ai import RootCauseAI
+from app.clustering import cluster_root_causes, reconcile_merge_result, SINGLE, DUPLICATE, AMBIGUOUS
+from app.llm_provider import FakeLLMProvider
+
+# Hand-made embeddings: the two "baut" texts are near-identical, the two
+# "suhu" texts are related but not duplicates, "operator" stands alone
+VECTORS = {
+    "Baut cetakan kendor": [1.0, 0.0, 0.0],
+    "baut cetakan kendor!": [1.0, 0.0, 0.0],
+    "Baut pada cetakan longgar": [0.98, 0.05, 0.0],
+    "Suhu heater terlalu tinggi": [0.0, 1.0, 0.0],
+    "Setting temperatur mesin salah": [0.0, 0.8, 0.6],
+    "Operator belum training": [0.0, 0.0, -1.0],
+}
+
+
+def fake_embed(texts):
+    return np.array([VECTORS[t] for t in texts])
+
+
+def test_clusters_are_classified_by_similarity():
+    texts = list(VECTORS)
+    clusters = cluster_root_causes(texts, fake_embed, cluster_threshold=0.7, duplicate_threshold=0.95)
+
+    by_kind = {c.kind: c for c in clusters}
+    assert by_kind[DUPLICATE].members == [0, 1, 2]
+    assert by_kind[AMBIGUOUS].members == [3, 4]
+    assert by_kind[SINGLE].members == [5]
+    assert sorted(i for c in clusters for i in c.members) == list(range(len(texts)))
+
+
+def test_exact_duplicates_are_embedded_once():
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return fake_embed(texts)
+
+    cluster_root_causes(["Baut cetakan kendor", "baut cetakan kendor!", "Operator belum training"], embed)
+    assert calls == [["Baut cetakan kendor", "Operator belum training"]]
+
+
+def test_reconcile_keeps_every_entry_once():
+    entries = [
+        {"root_cause": "A", "user_id": "1"},
+        {"root_cause": "B", "user_id": "2"},
+        {"root_cause": "C", "user_id": "3"},
+    ]
+    llm_result = {
+        "merged_root_causes": [{"merged_root_cause": "A+B", "original_data": [
+            {"root_cause": "A", "user_id": "1"}, {"root_cause": "B", "user_id": "2"},
+            {"root_cause": "Invented", "user_id": "9"}]}],
+        "individual_root_causes": [{"root_cause": "A", "user_id": "1"}],
+    }
+    result = reconcile_merge_result(llm_result, entries)
+
+    assert [len(g["original_data"]) for g in result["merged_root_causes"]] == [2]
+    assert result["individual_root_causes"] == [{"root_cause": "C", "user_id": "3"}]
+
+
+def test_merge_only_sends_ambiguous_clusters_to_llm(monkeypatch):
+    monkeypatch.setattr("app.clustering.MERGE_CLUSTER_THRESHOLD", 0.7)
+    monkeypatch.setattr("app.clustering.MERGE_DUPLICATE_THRESHOLD", 0.95)
+    provider = FakeLLMProvider(responses={"merge": json.dumps({
+        "merged_root_causes": [{"merged_root_cause": "Temperatur mesin tidak sesuai", "original_data": [
+            {"root_cause": "Suhu heater terlalu tinggi", "user_id": "u4"},
+            {"root_cause": "Setting temperatur mesin salah", "user_id": "u5"}]}],
+        "individual_root_causes": []
+    })})
+    model = RootCauseAI(provider=provider, embedder=fake_embed)
+    entries = [{"root_cause": text, "user_id": f"u{i + 1}"} for i, text in enumerate(VECTORS)]
+
+    result = model.analyze_and_merge_root_causes(entries)
+
+    assert len(provider.requests) == 1
+    prompt = provider.requests[0]["prompt"]
+    assert "Suhu heater" in prompt and "Baut" not in prompt and "Operator" not in prompt
+    assert [g["merged_root_cause"] for g in result["merged_root_causes"]] == [
+        "Baut cetakan kendor", "Temperatur mesin tidak sesuai"]
+    assert result["individual_root_causes"] == [{"root_cause": "Operator belum training", "user_id": "u6"}]
+    assert model.last_merge_stats["llm_entries"] == 2
+
+
+def test_merge_without_ambiguity_makes_no_llm_call():
+    provider = FakeLLMProvider()
+    model = RootCauseAI(provider=provider, embedder=fake_embed)
+    result = model.analyze_and_merge_root_causes([
+        {"root_cause": "Baut cetakan kendor", "user_id": "a"},
+        {"root_cause": "baut cetakan kendor!", "user_id": "b"},
+        {"root_cause": "Operator belum training", "user_id": "c"},
+    ])
+
+    assert provider.requests == []
+    assert "error" not in result
+    assert len(result["merged_root_causes"][0]["original_data"]) == 2
@@ -0,0 +1,33 @@
+import mysql.connector
+import pytest
+
+from app import db_backend
+from benchmarks.load_test import compare
+
+
+def test_sqlite_shim_behaves_like_a_mysql_dictionary_cursor(tmp_path):
+    path = str(tmp_path / "gemba.sqlite3")
+    db_backend.create_sqlite_schema(path)
+    connection = db_backend.SQLiteConnection(path)
+    cursor = connection.cursor(dictionary=True)
+
+    cursor.execute("INSERT INTO `lines` (name) VALUES (%s)", ("Line A",))
+    line_id = cursor.lastrowid
+    connection.commit()
+    cursor.execute("SELECT id, name FROM `lines` WHERE id = %s", (line_id,))
+    assert cursor.fetchone() == {"id": line_id, "name": "Line A"}
+
+    with pytest.raises(mysql.connector.Error):
+        cursor.execute("SELECT * FROM missing_table")
+
+    connection.close()
+    assert not connection.is_connected()
+
+
+def test_compare_flags_latency_throughput_and_error_regressions():
+    baseline = {"endpoints": {"suggest": {"p95_ms": 100.0, "throughput_rps": 50.0, "errors": 0}}}
+    steady = {"endpoints": {"suggest": {"p95_ms": 110.0, "throughput_rps": 45.0, "errors": 0}}}
+    worse = {"endpoints": {"suggest": {"p95_ms": 200.0, "throughput_rps": 20.0, "errors": 3}}}
+
+    assert compare(steady, baseline, 0.25) == []
+    assert len(compare(worse, baseline, 0.25)) == 3
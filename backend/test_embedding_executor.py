@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from app import main
+from app.embedding_executor import EmbeddingExecutor, EmbeddingOverloaded
+from app.metrics import embedding_rejections
+from benchmarks.common import HashingSentenceModel
+
+
+@pytest.fixture(scope="module")
+def executor():
+    pool = EmbeddingExecutor(workers=1, threads_per_worker=1, max_queue=2, timeout=60,
+                             model_factory=HashingSentenceModel)
+    assert pool.warm()
+    yield pool
+    pool.shutdown()
+
+
+def test_process_pool_returns_the_models_embeddings(executor):
+    local = HashingSentenceModel()
+    texts = ["tinta kotor pada unit 3", "roll air aus", "lem terlalu cair"]
+
+    np.testing.assert_allclose(executor.encode(texts), local.encode(texts))
+    assert executor.encode("roll air aus").shape == (executor.dim,)
+    assert executor.encode([]).shape == (0, executor.dim)
+
+
+def test_full_queue_is_rejected_immediately(executor):
+    rejected = embedding_rejections.value()
+    for _ in range(executor.max_queue):
+        executor._slots.acquire()
+    try:
+        with pytest.raises(EmbeddingOverloaded):
+            executor.encode(["tinta kotor"])
+    finally:
+        for _ in range(executor.max_queue):
+            executor._slots.release()
+    assert embedding_rejections.value() == rejected + 1
+    assert executor.encode(["tinta kotor"]).shape == (1, executor.dim)
+
+
+def test_overload_maps_to_503_with_retry_after():
+    response = main.embedding_overloaded(None, EmbeddingOverloaded("full"))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
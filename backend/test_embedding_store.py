@@ -0,0 +1,36 @@
+import numpy as np
+
+from app import embedding_store
+from app.embedding_store import EmbeddingStore, build_store, encode_texts
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_store_only_encodes_unknown_texts(tmp_path):
+    model = CountingModel()
+    build_store(model, ["tinta kotor", "roll aus", "tinta kotor", ""], meta={"model": "m"}).save(str(tmp_path))
+    assert model.encoded == ["tinta kotor", "roll aus"]
+
+    store = EmbeddingStore.load(str(tmp_path))
+    assert isinstance(store.vectors, np.memmap)
+    assert store.meta["count"] == 2 and store.meta["model"] == "m"
+
+    model.encoded.clear()
+    vectors = store.encode(model, ["roll aus", "belt longgar", "tinta kotor"])
+    assert model.encoded == ["belt longgar"]
+    assert vectors.tolist() == [[8.0, 1.0], [12.0, 1.0], [11.0, 1.0]]
+
+
+def test_encode_texts_falls_back_to_the_model_without_a_store(monkeypatch):
+    monkeypatch.setattr(embedding_store, "_store", None)
+    monkeypatch.setattr(embedding_store, "_store_loaded", True)
+    model = CountingModel()
+    assert encode_texts(model, ["a", "bb"]).shape == (2, 2)
+    assert model.encoded == ["a", "bb"]
@@ -0,0 +1,96 @@
+import pytest
+from fastapi import BackgroundTasks
+
+from app import fast_path
+from app.fast_path import Refinements, action_answer, root_cause_answer
+from app.llm_provider import FakeLLMProvider
+from app.metrics import fast_path_answers
+
+
+def _record(problem, root_cause, problem_score, root_cause_score=None, count=1, **actions):
+    scores = {"problem": problem_score}
+    if root_cause_score is not None:
+        scores["root_cause"] = root_cause_score
+    return {"area": "KBA 3", "category": "Machine", "problem": problem, "root_cause": root_cause,
+            "_count": count, "_similarity": scores, **actions}
+
+
+HISTORY = [
+    _record("Cetakan kotor", "Roll air banjir", 0.97),
+    _record("Cetakan kotor", "Rakel aus", 0.99, count=3),
+    _record("Cetakan kotor unit 3", "rakel aus.", 0.96),
+    _record("Tinta menetes", "Campuran tinta salah", 0.80),
+]
+
+
+def test_root_causes_of_near_identical_problems_ranked_by_occurrences():
+    answer = root_cause_answer(HISTORY, threshold=0.95)
+    assert answer.answer == ["Rakel aus", "Roll air banjir"]
+    assert answer.confidence == 0.99 and answer.matches == 5
+    assert root_cause_answer(HISTORY, threshold=0.995) is None
+    # Records without scores (no sentence model) never take the fast path
+    assert root_cause_answer([{"problem": "x", "root_cause": "y"}], threshold=0.0) is None
+
+
+def test_actions_need_both_problem_and_root_cause_matches():
+    history = [
+        _record("Cetakan kotor", "Rakel aus", 0.98, 0.97, temporary_action="Ganti rakel",
+                preventive_action="Cek rakel tiap shift"),
+        _record("Cetakan kotor", "Rakel aus", 0.98, 0.90, temporary_action="Bersihkan roll",
+                preventive_action="Jadwal cleaning"),
+    ]
+    answer = action_answer(history, threshold=0.95)
+    assert answer.answer == {"temporary_actions": ["Ganti rakel"], "preventive_actions": ["Cek rakel tiap shift"]}
+    history[0]["preventive_action"] = None
+    assert action_answer(history, threshold=0.95) is None
+
+
+def test_refined_answers_are_kept_until_they_expire():
+    now = [0.0]
+    refinements = Refinements(ttl=10, clock=lambda: now[0])
+    refinements.refine("a", lambda: ["Error generating suggestions. Please try again."])
+    assert refinements.get("a") is None
+    refinements.refine("a", lambda: ["Rakel aus karena tekanan terlalu tinggi"])
+    assert refinements.get("a") == ["Rakel aus karena tekanan terlalu tinggi"]
+    now[0] = 11
+    assert refinements.get("a") is None
+
+
+class FakeDB:
+    def get_semantic_root_cause_data(self, problem, area, category, top_k=10, keep_scores=False):
+        return [dict(r) for r in HISTORY] if keep_scores else [
+            {k: v for k, v in r.items() if k != "_similarity"} for r in HISTORY]
+
+
+def test_suggest_skips_the_llm_and_refines_in_the_background(monkeypatch):
+    pytest.importorskip("dotenv")
+    from app import main
+    from app.ai import RootCauseAI
+    from app.schemas import RootCauseRequest
+
+    monkeypatch.setattr(main, "prompt_priors", lambda *args: "")
+    monkeypatch.setattr(fast_path, "FAST_PATH_REFINE", True)
+    monkeypatch.setattr(main, "refinements", Refinements())
+    provider = FakeLLMProvider(responses={"root_cause": '["Rakel aus karena tekanan terlalu tinggi"]'})
+    ai = RootCauseAI(provider=provider)
+    request = RootCauseRequest(area="KBA 3", problem="Cetakan kotor", category="Machine")
+    before = fast_path_answers.value(endpoint="root_cause_suggest", source="history")
+
+    tasks = BackgroundTasks()
+    response = main.suggest_root_causes(request, tasks, db=FakeDB(), ai_model=ai, api_key="key")
+    assert (response.source, response.confidence) == ("history", 0.99)
+    assert response.suggested_root_causes == ["Rakel aus", "Roll air banjir"]
+    assert provider.requests == []
+    assert fast_path_answers.value(endpoint="root_cause_suggest", source="history") == before + 1
+
+    # The background refinement is served to the next identical request
+    for task in tasks.tasks:
+        task.func(*task.args, **task.kwargs)
+    response = main.suggest_root_causes(request, BackgroundTasks(), db=FakeDB(), ai_model=ai, api_key="key")
+    assert response.source == "llm" and response.suggested_root_causes == ["Rakel aus karena tekanan terlalu tinggi"]
+    assert len(provider.requests) == 1
+
+    # Fast path off: every request goes to the LLM
+    monkeypatch.setattr(fast_path, "FAST_PATH", False)
+    response = main.suggest_root_causes(request, BackgroundTasks(), db=FakeDB(), ai_model=ai, api_key="key")
+    assert response.source == "llm" and response.confidence is None
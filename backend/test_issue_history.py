@@ -0,0 +1,90 @@
+from app import database, db_backend
+from app.database import DatabaseConnector
+
+
+def _connector(monkeypatch, path):
+    monkeypatch.setattr(db_backend, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(db_backend, "SQLITE_PATH", path)
+    monkeypatch.setattr(database, "_read_model_missing_since", None)
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.config, db.connection, db.cursor, db.sentence_model = {}, None, None, None
+    assert db.connect(read_only=False)
+    return db
+
+
+def _history(db):
+    rows = {}
+    for query in (database.ROOT_CAUSE_HISTORY_QUERY, database.ACTION_HISTORY_QUERY,
+                  database.ROOT_CAUSE_JOIN_QUERY, database.ACTION_JOIN_QUERY):
+        db.cursor.execute(query, ("%KBA%", "%Machine%"))
+        rows[query] = db.cursor.fetchall()
+    return rows
+
+
+def test_triggers_keep_the_read_model_equal_to_the_join(monkeypatch, tmp_path):
+    path = str(tmp_path / "gemba.sqlite3")
+    db_backend.create_sqlite_schema(path)
+    db = _connector(monkeypatch, path)
+    execute = db.cursor.execute
+
+    execute("INSERT INTO `lines` (name) VALUES ('KBA 3')")
+    line_id = db.cursor.lastrowid
+    for day, problem in ((1, "Cetakan kotor"), (2, "Tinta menetes")):
+        execute("INSERT INTO issues (line_id, description, created_at) VALUES (%s, %s, %s)",
+                (line_id, problem, f"2024-01-0{day} 08:00:00"))
+        execute("INSERT INTO root_causes (issue_id, description, category) VALUES (%s, %s, 'Machine')",
+                (db.cursor.lastrowid, f"Penyebab {problem}"))
+        root_cause_id = db.cursor.lastrowid
+        execute("INSERT INTO actions (root_cause_id, type, description) VALUES (%s, 'CORRECTIVE', 'Bersihkan')",
+                (root_cause_id,))
+        execute("INSERT INTO actions (root_cause_id, type, description) VALUES (%s, 'PREVENTIVE', 'Cek rutin')",
+                (root_cause_id,))
+    db.connection.commit()
+
+    def assert_in_sync():
+        rows = _history(db)
+        assert rows[database.ROOT_CAUSE_HISTORY_QUERY] == rows[database.ROOT_CAUSE_JOIN_QUERY]
+        assert rows[database.ACTION_HISTORY_QUERY] == rows[database.ACTION_JOIN_QUERY]
+        return rows[database.ACTION_HISTORY_QUERY]
+
+    rows = assert_in_sync()
+    assert [r["problem"] for r in rows] == ["Tinta menetes", "Cetakan kotor"]
+    assert rows[0]["temporary_action"] == "Bersihkan" and rows[0]["preventive_action"] == "Cek rutin"
+
+    execute("UPDATE actions SET description = 'Ganti rakel' WHERE root_cause_id = %s AND type = 'CORRECTIVE'",
+            (root_cause_id,))
+    execute("DELETE FROM actions WHERE root_cause_id = %s AND type = 'PREVENTIVE'", (root_cause_id,))
+    execute("UPDATE root_causes SET description = 'Rakel aus' WHERE id = %s", (root_cause_id,))
+    execute("UPDATE `lines` SET name = 'KBA 3A' WHERE id = %s", (line_id,))
+    rows = assert_in_sync()
+    assert (rows[0]["area"], rows[0]["root_cause"]) == ("KBA 3A", "Rakel aus")
+    assert (rows[0]["temporary_action"], rows[0]["preventive_action"]) == ("Ganti rakel", None)
+
+    execute("DELETE FROM root_causes WHERE id = %s", (root_cause_id,))
+    assert [r["problem"] for r in assert_in_sync()] == ["Cetakan kotor"]
+    db.disconnect()
+
+
+def test_history_falls_back_to_the_join_without_the_read_model(monkeypatch, tmp_path):
+    path = str(tmp_path / "gemba.sqlite3")
+    db_backend.create_sqlite_schema(path)
+    db = _connector(monkeypatch, path)
+    db.cursor.execute("INSERT INTO `lines` (name) VALUES ('KBA 3')")
+    db.cursor.execute("INSERT INTO issues (line_id, description, created_at) VALUES (%s, 'Cetakan kotor', "
+                      "'2024-01-01 08:00:00')", (db.cursor.lastrowid,))
+    db.cursor.execute("INSERT INTO root_causes (issue_id, description, category) VALUES (%s, 'Rakel aus', 'Machine')",
+                      (db.cursor.lastrowid,))
+    db.cursor.execute("DROP TABLE issue_history")
+    db.connection.commit()
+
+    assert [r["root_cause"] for r in db.get_optimized_data_by_area_and_category("KBA", "Machine")] == ["Rakel aus"]
+    assert database._read_model_missing_since is not None
+    assert db.get_action_data_by_area_and_category("KBA", "Machine")[0]["temporary_action"] is None
+
+    # The migration runs later (an empty table here): used once the retry interval has passed
+    db_backend.create_sqlite_schema(path)
+    assert len(db.get_optimized_data_by_area_and_category("KBA", "Machine")) == 1
+    monkeypatch.setattr(database, "HISTORY_READ_MODEL_RETRY_SECONDS", 0)
+    assert db.get_optimized_data_by_area_and_category("KBA", "Machine") == []
+    assert database._read_model_missing_since is None
+    db.disconnect()
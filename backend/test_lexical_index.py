@@ -0,0 +1,61 @@
+import re
+
+import pytest
+
+from app.lexical_index import BM25Index, rrf_fuse, tokenize
+from benchmarks.common import HashingSentenceModel
+
+RECORDS = [
+    {"problem": "Tinta kotor pada (WBX55-MA3)", "root_cause": "Rakel aus"},
+    {"problem": "Tinta kotor pada unit 3", "root_cause": "Campuran tinta tidak sesuai"},
+    {"problem": "Tinta kotor pada (GRN28-JA10)", "root_cause": "Roll air kotor"},
+    {"problem": "Lem bocor di KBA 2", "root_cause": "Nozzle aus"},
+]
+
+
+class CodeBlindModel(HashingSentenceModel):
+    """Embeds only words without digits, like an embedding that misses item codes"""
+
+    def encode(self, texts, **kwargs):
+        strip = lambda text: re.sub(r"\S*\d\S*", " ", text)
+        return super().encode(strip(texts) if isinstance(texts, str) else [strip(t) for t in texts], **kwargs)
+
+
+def test_tokenize_expands_codes():
+    terms = tokenize("Tinta kotor (GRN28-JA10) di KBA 2")
+    assert {"grn28-ja10", "grn28", "ja10", "grn28ja10", "kba", "2", "kba2"} <= set(terms)
+
+
+def test_bm25_matches_codes_however_written():
+    index = BM25Index().build([r["problem"] for r in RECORDS])
+    positions, scores = index.search("tinta kotor GRN28JA10", k=2)
+    assert positions[0] == 2 and scores[0] > scores[1]
+    assert index.search("lem KBA2", k=1)[0][0] == 3
+    # Texts outside the index are scored with the index statistics
+    scores = index.score_texts("grn28-ja10", ["masalah GRN28-JA10", "masalah lain"])
+    assert scores[0] > 0 and scores[1] == 0
+
+
+def test_rrf_fuse_rewards_agreement():
+    assert list(rrf_fuse([[0, 1, 2], [2, 0]])) == [0, 2, 1]
+    assert list(rrf_fuse([[0, 1], []])) == [0, 1]
+
+
+def test_hybrid_search_finds_the_item_code_the_embeddings_miss(monkeypatch):
+    pytest.importorskip("mysql.connector")
+    from app import database
+    from app.database import DatabaseConnector
+
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.sentence_model = CodeBlindModel()
+    best = db._filter_by_semantic_similarity("tinta kotor GRN28JA10", RECORDS, "problem", top_k=1)
+    assert best[0]["problem"] == "Tinta kotor pada (GRN28-JA10)"
+
+    # Without the model, keywords still rank the records
+    db.sentence_model = None
+    assert db._filter_by_semantic_similarity("lem KBA 2", RECORDS, "problem", top_k=2)[0] == RECORDS[3]
+
+    # Semantic only: the code is invisible, ties keep the input order
+    monkeypatch.setattr(database, "HYBRID_SEARCH", False)
+    db.sentence_model = CodeBlindModel()
+    assert db._filter_by_semantic_similarity("tinta kotor GRN28JA10", RECORDS, "problem", top_k=1)[0] == RECORDS[0]
@@ -0,0 +1,159 @@
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.llm_limiter import (
+    AdaptiveLimiter, LLMOverloaded, is_rate_limited, reset_request_deadline, set_request_deadline
+)
+from app.llm_provider import FakeLLMProvider, RateLimitError
+
+
+def _hold(limiter, release):
+    return limiter.call(lambda: release.wait(5))
+
+
+def test_limit_grows_when_saturated_and_halves_on_rate_limit():
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=8, queue_size=4)
+    for _ in range(3):
+        limiter.call(lambda: None)
+    assert limiter.limit == 2
+
+    def rate_limited():
+        raise RateLimitError("429 Too Many Requests")
+
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=8, queue_size=4)
+    with pytest.raises(LLMOverloaded) as excinfo:
+        limiter.call(rate_limited)
+    assert excinfo.value.reason == "rate_limited"
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_only_one_backoff_per_window():
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=8, queue_size=8)
+    barrier = threading.Barrier(4)
+
+    def rate_limited():
+        barrier.wait()
+        raise RateLimitError("429")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(limiter.call, rate_limited) for _ in range(4)]
+        for future in futures:
+            with pytest.raises(LLMOverloaded):
+                future.result()
+    # Four 429s from calls started together count as one signal
+    assert limiter.limit == 4
+
+
+def test_full_queue_is_rejected_immediately():
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, queue_size=1)
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        running = pool.submit(_hold, limiter, release)
+        while limiter.in_flight == 0:
+            time.sleep(0.01)
+        queued = pool.submit(limiter.call, lambda: "queued")
+        while limiter.waiting == 0:
+            time.sleep(0.01)
+
+        start = time.monotonic()
+        with pytest.raises(LLMOverloaded) as excinfo:
+            limiter.call(lambda: "rejected")
+        assert time.monotonic() - start < 0.1
+        assert excinfo.value.reason == "queue_full"
+        assert excinfo.value.retry_after >= 1
+
+        release.set()
+        running.result()
+        assert queued.result() == "queued"
+
+
+def test_waiting_stops_at_the_request_deadline():
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, queue_size=4)
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        running = pool.submit(_hold, limiter, release)
+        while limiter.in_flight == 0:
+            time.sleep(0.01)
+
+        def within_deadline():
+            token = set_request_deadline(0.2)
+            try:
+                return limiter.call(lambda: "late")
+            finally:
+                reset_request_deadline(token)
+
+        start = time.monotonic()
+        with pytest.raises(LLMOverloaded) as excinfo:
+            contextvars.copy_context().run(within_deadline)
+        assert 0.15 < time.monotonic() - start < 1.0
+        assert excinfo.value.reason == "deadline"
+        assert limiter.waiting == 0
+        release.set()
+        running.result()
+
+
+def test_rate_limit_detection():
+    class ResourceExhausted(Exception):
+        pass
+
+    class APIStatusError(Exception):
+        status_code = 429
+
+    assert is_rate_limited(ResourceExhausted("quota"))
+    assert is_rate_limited(RateLimitError("429 Too Many Requests"))
+    assert is_rate_limited(APIStatusError("slow down"))
+    assert not is_rate_limited(ValueError("bad json"))
+    # Only the type or status code count, not the wording
+    assert not is_rate_limited(ValueError("Invalid field 'quota_429' in request"))
+
+
+def test_provider_call_gets_the_remaining_request_time_as_timeout():
+    pytest.importorskip("langchain_google_genai")
+    from app.llm_provider import GeminiProvider
+
+    provider = GeminiProvider(api_key="test", use_context_cache=False)
+    provider.register_instruction("root_cause", "static")
+    calls = []
+    provider.model = type("Model", (), {"invoke": lambda self, messages, **kwargs: calls.append(kwargs) or "[]"})()
+
+    provider.generate("root_cause", "p")
+    token = set_request_deadline(5)
+    try:
+        provider.generate("root_cause", "p")
+    finally:
+        reset_request_deadline(token)
+    assert "timeout" not in calls[0]
+    assert 4 < calls[1]["timeout"] <= 5
+
+
+def test_burst_against_rate_limiting_provider_is_shed_not_turned_into_errors():
+    pytest.importorskip("dotenv")
+    from app import main
+    from app.ai import RootCauseAI
+
+    provider = FakeLLMProvider(responses={"root_cause": '["Tinta menetes"]'}, latency=0.2, capacity=2)
+    limiter = AdaptiveLimiter(initial=6, min_limit=1, max_limit=8, queue_size=16)
+    ai = RootCauseAI(provider=provider, limiter=limiter)
+
+    def suggest(i):
+        try:
+            return ai.suggest_root_causes("KBA 3", f"Cetakan kotor {i}", "Material", [])
+        except LLMOverloaded as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(suggest, range(6)))
+
+    shed = [r for r in results if isinstance(r, LLMOverloaded)]
+    assert provider.rate_limited > 0 and len(shed) == provider.rate_limited
+    assert all(r == ["Tinta menetes"] for r in results if not isinstance(r, LLMOverloaded))
+    assert limiter.limit <= 3
+
+    response = main.llm_overloaded(None, shed[0])
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
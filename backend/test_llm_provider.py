@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+from app.llm_provider import FakeLLMProvider
+from app.prompts import INSTRUCTIONS
+
+
+def test_instruction_is_registered_once():
+    provider = FakeLLMProvider()
+    provider.register_instruction("root_cause", "static")
+    provider.register_instruction("root_cause", "static")
+    assert provider.registered_bytes == len("static")
+
+
+def test_fake_provider_records_bytes_per_request():
+    provider = FakeLLMProvider(responses={"root_cause": lambda prompt: json.dumps([prompt])})
+    provider.register_instruction("root_cause", "x" * 1000)
+
+    assert provider.generate("root_cause", "abc") == '["abc"]'
+    assert provider.generate("root_cause", "de") == '["de"]'
+    assert [r["bytes_sent"] for r in provider.requests] == [3, 2]
+    assert provider.total_bytes_sent() == 5
+
+
+def test_unregistered_instruction_is_rejected():
+    with pytest.raises(KeyError):
+        FakeLLMProvider().generate("missing", "prompt")
+
+
+def test_root_cause_ai_sends_only_per_request_variables():
+    pytest.importorskip("dotenv")
+    from app.ai import RootCauseAI
+
+    provider = FakeLLMProvider(responses={"root_cause": '["Tinta menetes"]'})
+    ai = RootCauseAI(provider=provider)
+    RootCauseAI(provider=provider)
+
+    history = [{"area": "KBA 3", "problem": "Cetakan Kotor", "root_cause": "Tinta menetes", "category": "Material"}]
+    for _ in range(3):
+        assert ai.suggest_root_causes("KBA 3", "Cetakan kotor", "Material", history) == ["Tinta menetes"]
+
+    static_bytes = sum(len(text.encode("utf-8")) for text in INSTRUCTIONS.values())
+    assert provider.registered_bytes == static_bytes
+    per_request = provider.requests[0]["bytes_sent"]
+    assert per_request < len(INSTRUCTIONS["root_cause"].encode("utf-8"))
+    assert "Anda adalah AI expert" not in provider.requests[0]["prompt"]
+    assert provider.total_bytes_sent() == 3 * per_request
+
+
+def test_expired_gemini_cache_is_refreshed_once_outside_the_lock():
+    pytest.importorskip("langchain_google_genai")
+    import threading
+    import time
+    from app.llm_provider import GeminiProvider
+
+    provider = GeminiProvider(api_key="test", use_context_cache=True)
+    created, release = [], threading.Event()
+
+    def create_cache(key, text):
+        created.append(key)
+        if len(created) > 1:
+            release.wait(timeout=5)
+        return f"cache-{len(created)}", time.monotonic() + 3600
+
+    provider._create_cache = create_cache
+    provider.register_instruction("root_cause", "static")
+    assert provider._cache_name_for("root_cause") == "cache-1"
+
+    provider._caches["root_cause"] = ("cache-1", time.monotonic() - 1)
+    names = []
+    threads = [threading.Thread(target=lambda: names.append(provider._cache_name_for("root_cause")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    # While one thread uploads, the others keep the old cache and the lock is free
+    assert sorted(set(names)) == ["cache-1"] and len(names) == 7
+    assert provider.has_instruction("root_cause") and provider._lock.acquire(timeout=1)
+    provider._lock.release()
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert created == ["root_cause", "root_cause"] and names[-1] == "cache-2"
+    assert provider._cache_name_for("root_cause") == "cache-2"
+
+
+def test_gemini_cache_is_dropped_only_when_gemini_rejects_it():
+    pytest.importorskip("langchain_google_genai")
+    import time
+    from app.llm_provider import GeminiProvider, RateLimitError
+
+    class NotFound(Exception):
+        pass
+
+    provider = GeminiProvider(api_key="test", use_context_cache=True)
+    uploads = []
+
+    def create_cache(key, text):
+        uploads.append(key)
+        if len(uploads) == 3:
+            return None, time.monotonic() + 300  # the upload failed
+        return f"cache-{len(uploads)}", time.monotonic() + 3600
+
+    provider._create_cache = create_cache
+    provider.register_instruction("root_cause", "static")
+    errors, calls = [], []
+
+    def invoke(messages, **kwargs):
+        calls.append(kwargs.get("cached_content"))
+        if errors:
+            raise errors.pop(0)
+        return "[]"
+
+    provider.model = type("Model", (), {"invoke": lambda self, messages, **kwargs: invoke(messages, **kwargs)})()
+
+    # A rate limit is raised once, without a second call, and the cache stays
+    errors.append(RateLimitError("429"))
+    with pytest.raises(RateLimitError):
+        provider.generate("root_cause", "p")
+    assert calls == ["cache-1"] and provider._cache_name_for("root_cause") == "cache-1"
+
+    # An evicted cache: this call goes without it, the next one re-uploads
+    errors.append(NotFound("cached content not found"))
+    provider.generate("root_cause", "p")
+    assert calls[1:] == ["cache-1", None]
+    provider.generate("root_cause", "p")
+    assert calls[-1] == "cache-2" and len(uploads) == 2
+
+    # A failed refresh sends the instruction as system instruction until the retry
+    provider._caches["root_cause"] = ("cache-2", time.monotonic() - 1)
+    provider.generate("root_cause", "p")
+    assert calls[-1] is None and len(uploads) == 3
+    provider._caches["root_cause"] = (None, time.monotonic() - 1)
+    provider.generate("root_cause", "p")
+    assert calls[-1] == "cache-4"
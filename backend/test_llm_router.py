@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from app.llm_limiter import AdaptiveLimiter, LLMOverloaded
+from app.llm_provider import FakeLLMProvider, RateLimitError, create_provider
+from app.llm_router import CLOSED, OPEN, RouterProvider, is_transient, parse_routes
+
+
+def _fake(answer, latency=0.0, failure=None):
+    return FakeLLMProvider(default_response=answer, latency=latency, failure=failure)
+
+
+def _router(providers, **kwargs):
+    kwargs.setdefault("sleep", lambda seconds: None)
+    router = RouterProvider(providers, **kwargs)
+    router.register_instruction("root_cause", "static")
+    router.register_instruction("scoring", "static")
+    return router
+
+
+def test_slow_primary_is_hedged_with_the_next_provider():
+    primary = _fake('["primary"]', latency=1.0)
+    backup = _fake('["backup"]', latency=0.05)
+    router = _router({"primary": primary, "backup": backup}, routes={}, hedge_delay=0.1)
+
+    start = time.monotonic()
+    assert router.generate("root_cause", "p") == '["backup"]'
+    assert time.monotonic() - start < 0.5
+    assert len(primary.requests) == len(backup.requests) == 1
+
+
+def test_hedge_delay_follows_the_measured_p95():
+    primary = _fake('["primary"]', latency=0.01)
+    router = _router({"primary": primary, "backup": _fake('["backup"]')}, routes={},
+                     hedge_delay=5.0, hedge_min_samples=5)
+    assert router.hedge_after("primary") == 5.0
+    for _ in range(5):
+        router.generate("root_cause", "p")
+    assert router.hedge_after("primary") < 0.1
+
+
+def test_transient_errors_are_retried_then_succeed():
+    failures = [ConnectionError("connection reset"), TimeoutError("read timed out")]
+    provider = _fake('["ok"]', failure=lambda key, prompt: failures.pop(0) if failures else None)
+    router = _router({"only": provider}, routes={}, retries=2)
+
+    assert router.generate("root_cause", "p") == '["ok"]'
+    assert len(provider.requests) == 3
+
+
+def test_rate_limit_fails_over_then_reaches_the_limiter_without_retries():
+    limited = _fake('["x"]', failure=lambda key, prompt: RateLimitError("429"))
+    backup = _fake('["x"]', failure=lambda key, prompt: TimeoutError("read timed out"))
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=8)
+    router = _router({"limited": limited, "backup": backup}, routes={}, retries=2, limiter=limiter)
+
+    with pytest.raises(LLMOverloaded) as excinfo:
+        limiter.call(lambda: router.generate("root_cause", "p"))
+    assert excinfo.value.reason == "rate_limited"
+    assert len(limited.requests) == len(backup.requests) == 1
+    assert limiter.limit == 2
+
+
+def test_hedge_needs_a_free_limiter_slot():
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+    primary = _fake('["primary"]', latency=0.3)
+    backup = _fake('["backup"]')
+    router = _router({"primary": primary, "backup": backup}, routes={}, hedge_delay=0.05, limiter=limiter)
+
+    # The only slot is held by the call itself: no hedge
+    assert limiter.call(lambda: router.generate("root_cause", "p")) == '["primary"]'
+    assert len(backup.requests) == 0
+
+    limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=2)
+    router._limiter = limiter
+    assert limiter.call(lambda: router.generate("root_cause", "p")) == '["backup"]'
+    time.sleep(0.4)
+    # The hedge returned its slot when it finished
+    assert limiter.in_flight == 0
+
+
+def test_permanent_errors_are_not_retried():
+    provider = _fake('["ok"]', failure=lambda key, prompt: ValueError("invalid argument"))
+    router = _router({"only": provider}, routes={}, retries=2)
+    with pytest.raises(ValueError):
+        router.generate("root_cause", "p")
+    assert len(provider.requests) == 1
+
+
+def test_errors_are_classified_by_type_and_status_not_by_message():
+    class InvalidArgument(Exception):
+        code = 400
+
+    class ServiceUnavailable(Exception):
+        code = 503
+
+    class APIStatusError(Exception):
+        status_code = 502
+
+    assert is_transient(ServiceUnavailable("model overloaded"))
+    assert is_transient(APIStatusError("bad gateway"))
+    assert is_transient(TimeoutError("read timed out"))
+    assert not is_transient(InvalidArgument("prompt is 9500 tokens, max 8500 tokens"))
+    assert not is_transient(ValueError("connection field 503 is invalid"))
+
+    # Neither retried nor counted against the breaker
+    provider = _fake('["ok"]', failure=lambda key, prompt: InvalidArgument("max 8500 tokens (HTTP 500)"))
+    router = _router({"only": provider}, routes={}, retries=2, breaker_failures=1)
+    with pytest.raises(InvalidArgument):
+        router.generate("root_cause", "p")
+    assert len(provider.requests) == 1 and router.breakers["only"].state == CLOSED
+
+
+def test_open_breaker_skips_the_failing_provider():
+    broken = _fake('["broken"]', failure=lambda key, prompt: ConnectionError("connection reset"))
+    backup = _fake('["backup"]')
+    router = _router({"broken": broken, "backup": backup}, routes={}, retries=0,
+                     breaker_failures=2, breaker_cooldown=60)
+
+    for _ in range(4):
+        assert router.generate("root_cause", "p") == '["backup"]'
+    assert router.breakers["broken"].state == OPEN
+    assert len(broken.requests) == 2
+    assert len(backup.requests) == 4
+
+
+def test_all_breakers_open_sheds_the_call():
+    broken = _fake('["x"]', failure=lambda key, prompt: ConnectionError("connection reset"))
+    router = _router({"broken": broken}, routes={}, retries=0, breaker_failures=1, breaker_cooldown=60)
+    with pytest.raises(ConnectionError):
+        router.generate("root_cause", "p")
+    with pytest.raises(LLMOverloaded) as excinfo:
+        router.generate("root_cause", "p")
+    assert excinfo.value.reason == "unavailable"
+
+
+def test_routes_by_instruction_key():
+    assert parse_routes("scoring=b, a;merge=a") == {"scoring": ["b", "a"], "merge": ["a"]}
+    a, b = _fake('["a"]'), _fake('["b"]')
+    router = _router({"a": a, "b": b}, routes={"scoring": ["b", "a"]})
+    assert router.generate("scoring", "p") == '["b"]'
+    assert router.generate("root_cause", "p") == '["a"]'
+    # Instructions reach every provider
+    assert a.has_instruction("scoring") and b.has_instruction("root_cause")
+
+
+def test_comma_separated_provider_name_builds_a_router():
+    router = create_provider("fake, fake")
+    assert isinstance(router, RouterProvider)
+    assert router.default_route == ["fake"]
@@ -0,0 +1,94 @@
+import logging
+import queue
+
+from app import logging_config
+from app.logging_config import (
+    DeferredQueueHandler, JsonFormatter, log_event, debug_event,
+    set_request_context, reset_request_context
+)
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _logger(name, level=logging.INFO):
+    logger = logging.getLogger(name)
+    logger.handlers = []
+    logger.propagate = False
+    logger.setLevel(level)
+    handler = _Collect()
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def test_events_below_level_or_sampled_out_are_dropped():
+    logger, handler = _logger("test.level", logging.WARNING)
+    log_event(logger, logging.INFO, "below_level", sample_rate=1.0)
+    assert handler.records == []
+
+    logger.setLevel(logging.INFO)
+    log_event(logger, logging.INFO, "sampled_out", sample_rate=0.0)
+    log_event(logger, logging.INFO, "kept", sample_rate=1.0, n=3)
+    assert [(r.getMessage(), r.fields) for r in handler.records] == [("kept", {"n": 3})]
+
+
+def test_debug_trace_bypasses_level_and_sampling():
+    logger, handler = _logger("test.trace", logging.WARNING)
+    tokens = set_request_context("req-1", debug=True)
+    try:
+        log_event(logger, logging.INFO, "search", sample_rate=0.0)
+        debug_event(logger, "match", rank=1)
+    finally:
+        reset_request_context(tokens)
+    debug_event(logger, "after_request")
+
+    assert [r.getMessage() for r in handler.records] == ["search", "match"]
+
+
+def test_debug_trace_can_be_enabled_per_request_id():
+    logger, handler = _logger("test.request_id", logging.INFO)
+    logging_config.enable_debug_trace("req-42")
+    try:
+        for request_id in ("req-41", "req-42"):
+            tokens = set_request_context(request_id)
+            try:
+                debug_event(logger, "detail", request=request_id)
+            finally:
+                reset_request_context(tokens)
+    finally:
+        logging_config.disable_debug_trace("req-42")
+
+    assert [r.fields["request"] for r in handler.records] == ["req-42"]
+
+
+def test_queue_handler_defers_formatting_to_the_writer():
+    class Expensive:
+        renders = 0
+
+        def __str__(self):
+            Expensive.renders += 1
+            return "expensive"
+
+    log_queue = queue.Queue()
+    handler = DeferredQueueHandler(log_queue)
+    logger = logging.getLogger("test.deferred")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    tokens = set_request_context("req-7")
+    try:
+        logger.info("value %s", Expensive())
+    finally:
+        reset_request_context(tokens)
+
+    record = log_queue.get_nowait()
+    assert Expensive.renders == 0
+    assert record.request_id == "req-7"
+    assert '"message": "value expensive"' in JsonFormatter().format(record)
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.near_duplicates import collapse_near_duplicates, group_near_duplicates, mmr_order
+from benchmarks.common import HashingSentenceModel
+
+FIELDS = ("area", "problem", "root_cause")
+
+
+def _record(problem, root_cause, day):
+    return {"area": "Printing Line 1", "problem": problem, "root_cause": root_cause,
+            "category": "Machine", "created_at": datetime(2024, 5, day)}
+
+
+# Newest first, as the history queries return them
+HISTORY = [
+    _record("Cetakan Kotor / Tinta menetes", "Rakel aus", 20),
+    _record("Cetakan kotor, tinta menetes", "Rakel aus", 25),
+    _record("Cetakan Kotor / Tinta meneteS", "rakel aus.", 12),
+    _record("Cetakan Kotor / Tinta menetess", "Rakel aus", 3),
+    _record("Lem bocor di unit 2", "Nozzle aus", 18),
+    _record("Cetakan Kotor / Tinta menetes", "Campuran tinta tidak sesuai", 10),
+]
+
+
+def test_near_identical_records_collapse_with_count_and_recency():
+    collapsed = collapse_near_duplicates(HISTORY, FIELDS)
+    assert [r["problem"] for r in collapsed] == [HISTORY[0]["problem"], HISTORY[4]["problem"], HISTORY[5]["problem"]]
+    assert [r["_count"] for r in collapsed] == [4, 1, 1]
+    assert collapsed[0]["last_seen"] == datetime(2024, 5, 25)
+    # Inputs are left untouched
+    assert "_count" not in HISTORY[0]
+
+
+def test_distinct_facts_are_kept():
+    keys = ["tinta kotor pada unit 3 | rakel aus", "tinta kotor pada unit 5 | rakel aus",
+            "roll air aus | bearing rusak", "tinta kotor pada unit 3 | rakel aus"]
+    assert group_near_duplicates(keys, threshold=1.0) == [0, 1, 2, 0]
+    assert group_near_duplicates(keys) == [0, 1, 2, 0]
+
+
+def test_mmr_prefers_a_different_fact_over_a_second_copy():
+    vectors = np.array([[1.0, 0.0], [0.999, 0.045], [0.6, 0.8]], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    relevance = np.array([0.95, 0.94, 0.8])
+    assert mmr_order(relevance, vectors, k=2, lambda_=1.0) == [0, 1]
+    assert mmr_order(relevance, vectors, k=2, lambda_=0.7) == [0, 2]
+
+
+def test_root_cause_search_returns_distinct_representatives(monkeypatch):
+    pytest.importorskip("mysql.connector")
+    from app.database import DatabaseConnector
+
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.sentence_model = HashingSentenceModel()
+    monkeypatch.setattr(db, "get_optimized_data_by_area_and_category", lambda area, category: HISTORY * 3, raising=False)
+    found = db.get_semantic_root_cause_data("tinta menetes", "Printing Line 1", "Machine", top_k=10)
+    assert len(found) == 3
+    assert len({(r["problem"].lower()[:14], r["root_cause"].lower()[:5]) for r in found}) == 3
+    assert sum(r["_count"] for r in found) == len(HISTORY) * 3
@@ -0,0 +1,52 @@
+from app.prompt_builder import PromptBuilder, deduplicate_records, estimate_tokens
+
+TEMPLATE = "Area: {area}\nProblem: {problem}\n## Data Historis:\n{historical_data}\n"
+
+
+def _record(problem, root_cause, area="KBA 3", category="Material"):
+    return {"area": area, "problem": problem, "root_cause": root_cause, "category": category}
+
+
+def test_near_identical_records_are_collapsed_with_count():
+    records = [
+        _record("Cetakan Kotor", "Tinta menetes"),
+        _record("cetakan kotor.", "Tinta  menetes"),
+        _record("Mesin On-OFF", "Rantai kendor"),
+    ]
+    kept = deduplicate_records(records, ["problem", "root_cause"])
+    assert [r["_count"] for r in kept] == [2, 1]
+    assert kept[0]["problem"] == "Cetakan Kotor"
+
+
+def test_table_drops_context_columns_and_adds_count():
+    builder = PromptBuilder("root_cause", TEMPLATE, budget=500)
+    built = builder.build(
+        variables={"area": "KBA 3", "problem": "Cetakan Kotor"},
+        records=[_record("Cetakan Kotor", "Tinta menetes")] * 3 + [_record("Mesin On-OFF", "Rantai kendor")],
+        columns=["area", "problem", "root_cause", "category"],
+        context_columns={"area": "KBA 3", "category": "Material"},
+    )
+    assert "problem | root_cause | n\nCetakan Kotor | Tinta menetes | 3\nMesin On-OFF | Rantai kendor | 1" in built.text
+    assert built.examples_used == 2
+    assert built.duplicates_collapsed == 2
+    assert built.tokens == estimate_tokens(built.text)
+
+
+def test_budget_drops_least_relevant_rows():
+    records = [_record(f"Problem nomor {i} yang panjang sekali", f"Penyebab {i}") for i in range(50)]
+    builder = PromptBuilder("root_cause", TEMPLATE, budget=120)
+    built = builder.build(
+        variables={"area": "KBA 3", "problem": "x"},
+        records=records,
+        columns=["problem", "root_cause"],
+    )
+    assert 0 < built.examples_used < 50
+    assert built.tokens <= 120
+    assert "Problem nomor 0 " in built.text
+
+
+def test_empty_history_uses_message():
+    built = PromptBuilder("root_cause", TEMPLATE, budget=100).build(
+        variables={"area": "A", "problem": "B"}, records=[], columns=["problem"],
+        empty_message="No historical data available for this area.")
+    assert "No historical data available for this area." in built.text
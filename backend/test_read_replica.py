@@ -0,0 +1,127 @@
+import sqlite3
+
+import mysql.connector
+import pytest
+
+from app import db_backend, read_replica
+from app.attendance_db import AttendanceDB
+from app.metrics import db_reads
+from app.read_replica import ReplicaRouter, set_replica_router
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _database(path):
+    db_backend.create_sqlite_schema(path)
+    connection = sqlite3.connect(path)
+    connection.execute("INSERT INTO users (id, name, role, email, points) VALUES ('u1', 'Budi', 'user', 'b@x', 0)")
+    connection.execute("INSERT INTO genba_sessions (id, name, status, start_time) "
+                       "VALUES (1, 'Gemba', 'PROGRESS', '2099-01-01 08:00:00')")
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def replica(monkeypatch, tmp_path):
+    """Primary and a replica that never receives the writes (infinite lag)"""
+    primary, replica = str(tmp_path / "primary.sqlite3"), str(tmp_path / "replica.sqlite3")
+    _database(primary)
+    _database(replica)
+    monkeypatch.setattr(db_backend, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(db_backend, "SQLITE_PATH", primary)
+    monkeypatch.setattr(db_backend, "SQLITE_READ_PATH", replica)
+    clock, lag = Clock(), [0.0]
+    router = ReplicaRouter(max_lag=5, lag_check_interval=10, read_your_writes=30,
+                           probe=lambda connection: lag[0], markers_file=str(tmp_path / "markers.sqlite3"),
+                           clock=clock)
+    set_replica_router(router)
+    yield clock, lag
+    set_replica_router(None)
+
+
+def _attendees(session_id=1, user_id=None):
+    db = AttendanceDB()
+    try:
+        return [a["user_id"] for a in db.get_session_attendees(session_id, user_id=user_id)]
+    finally:
+        db.disconnect()
+
+
+def test_check_in_is_read_from_the_primary_until_the_replica_catches_up(replica):
+    clock, _ = replica
+    before = db_reads.value(target="replica", reason="ok")
+    assert _attendees() == []
+    assert db_reads.value(target="replica", reason="ok") == before + 1
+
+    db = AttendanceDB()
+    success, _, _ = db.record_presence("u1", 1)
+    db.disconnect()
+    assert success
+
+    # Read-your-writes: the session (and user) just written go to the primary
+    assert _attendees() == ["u1"]
+    assert _attendees(session_id=2, user_id="u1") == []
+    assert db_reads.value(target="primary", reason="read_your_writes") >= 2
+
+    # Afterwards the (stale) replica serves the read again
+    clock.now = 31
+    assert _attendees() == []
+
+
+def test_lagging_or_unreachable_replica_sends_reads_to_the_primary(replica, monkeypatch):
+    clock, lag = replica
+    lag[0] = 8.0
+    before = db_reads.value(target="primary", reason="lag")
+    assert read_replica.get_replica_router().read_connection({}) is None
+    # The measurement is reused until the next check
+    lag[0] = 0.0
+    assert read_replica.get_replica_router().read_connection({}) is None
+    assert db_reads.value(target="primary", reason="lag") == before + 2
+
+    clock.now = 11
+    connection = read_replica.get_replica_router().read_connection({})
+    assert connection is not None
+    connection.close()
+
+    def unreachable(config, replica=False):
+        raise mysql.connector.Error(msg="replica down")
+
+    clock.now = 22
+    monkeypatch.setattr(db_backend, "connect", unreachable)
+    assert read_replica.get_replica_router().read_connection({}) is None
+    assert db_reads.value(target="primary", reason="unavailable") >= 1
+
+
+def test_no_replica_configured_reads_the_primary(monkeypatch):
+    monkeypatch.setattr(db_backend, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(read_replica, "DB_READ_HOST", "")
+    assert ReplicaRouter().read_connection({"host": "db"}) is None
+
+    monkeypatch.setattr(read_replica, "DB_READ_HOST", "replica.db")
+    monkeypatch.setattr(read_replica, "DB_READ_PORT", "3307")
+    assert read_replica.replica_config({"host": "db", "port": 3306, "user": "app"}) == {
+        "host": "replica.db", "port": 3307, "user": "app"}
+
+
+def test_write_on_one_worker_sends_reads_on_another_to_the_primary(replica, tmp_path):
+    clock, _ = replica
+    markers = str(tmp_path / "markers.sqlite3")
+    worker_a = ReplicaRouter(read_your_writes=30, probe=lambda connection: 0.0, markers_file=markers, clock=clock)
+    worker_b = ReplicaRouter(read_your_writes=30, probe=lambda connection: 0.0, markers_file=markers, clock=clock)
+    worker_a.mark_write("user:u1", "session:1")
+
+    assert worker_b.recently_written("session:1")
+    assert not worker_b.recently_written("session:2")
+    set_replica_router(worker_b)
+    before = db_reads.value(target="primary", reason="read_your_writes")
+    _attendees()
+    assert db_reads.value(target="primary", reason="read_your_writes") == before + 1
+
+    clock.now = 31
+    assert not worker_b.recently_written("session:1")
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from app import reranker
+from app.metrics import rerank_outcomes
+from app.reranker import rerank, set_reranker
+from benchmarks.common import HashingSentenceModel
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the words it shares; optionally slow per batch"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = 0
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches += 1
+        time.sleep(self.delay)
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+
+
+TEXTS = ["lem bocor", "tinta kotor pada unit 3", "roll air aus", "tinta kotor rakel aus unit 3"]
+
+
+def test_rerank_orders_by_cross_encoder_score():
+    order = rerank(FakeCrossEncoder(), "tinta kotor rakel aus", TEXTS, budget_ms=1000, batch_size=2)
+    assert list(order[:2]) == [3, 1]
+
+
+def test_rerank_gives_up_before_overrunning_the_budget():
+    model = FakeCrossEncoder(delay=0.05)
+    before = rerank_outcomes.value(outcome="over_budget")
+    assert rerank(model, "tinta", TEXTS * 10, budget_ms=120, batch_size=4) is None
+    assert model.batches < 10
+    assert rerank_outcomes.value(outcome="over_budget") == before + 1
+
+
+def test_root_cause_search_feeds_fewer_reranked_examples(monkeypatch):
+    pytest.importorskip("mysql.connector")
+    from app import database
+    from app.database import DatabaseConnector
+
+    records = [{"problem": text} for text in TEXTS * 3]
+    db = DatabaseConnector.__new__(DatabaseConnector)
+    db.sentence_model = HashingSentenceModel()
+    monkeypatch.setattr(reranker, "RERANK", True)
+    monkeypatch.setattr(database, "RERANK_TOP_K", 2)
+    try:
+        set_reranker(FakeCrossEncoder())
+        found = db._filter_by_semantic_similarity("tinta kotor rakel aus", records, "problem", 10, rerank=True)
+        assert [r["problem"] for r in found] == [TEXTS[3], TEXTS[3]]
+
+        # Over budget: cosine/hybrid order and the full top_k
+        set_reranker(FakeCrossEncoder(delay=0.2))
+        found = db._filter_by_semantic_similarity("tinta kotor rakel aus", records, "problem", 10, rerank=True)
+        assert len(found) == 10
+    finally:
+        set_reranker(None)
@@ -0,0 +1,130 @@
+import json
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app import db_backend, embeddings
+from app.areas_cache import AreasCache, set_areas_cache
+from app.llm_provider import FakeLLMProvider, set_default_provider
+from app.metrics import resource_acquisitions
+from app.resources import Handle
+from app.root_cause_stats import RootCauseStats, set_root_cause_stats
+from benchmarks.common import HashingSentenceModel
+
+RESOURCES = ("history_db", "attendance_db", "ai_model", "db_primary", "db_replica", "embedding_model")
+
+
+def test_handle_creates_the_resource_on_first_use_and_releases_it():
+    created, released = [], []
+    resource = SimpleNamespace(get=lambda: "resource's own get")
+    handle = Handle("thing", lambda: created.append(1) or resource, released.append)
+    handle._release_resource()
+    assert created == [] and released == []
+    assert handle.get() == "resource's own get" and handle._acquired
+    handle._release_resource()
+    assert created == [1] and released == [resource] and not handle._acquired
+
+
+def _score(total):
+    def respond(prompt):
+        return json.dumps({"scores": [{"root_cause": "Rakel aus", "spesifisitas": 0, "relevansi": 0, "kejelasan": 0,
+                                       "actionability": 0, "total_score": total[0], "feedback": "ok"}],
+                           "summary": "ringkasan"})
+    return respond
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    pytest.importorskip("dotenv")
+    httpx = pytest.importorskip("httpx")
+    from app import main
+    from app.auth import get_api_key
+
+    path = str(tmp_path / "gemba.sqlite3")
+    db_backend.create_sqlite_schema(path)
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        INSERT INTO `lines` (id, name) VALUES (1, 'KBA 3');
+        INSERT INTO issues (id, line_id, description, created_at) VALUES (1, 1, 'Cetakan kotor', '2024-01-01 08:00:00');
+        INSERT INTO root_causes (id, issue_id, description, category) VALUES (1, 1, 'Rakel aus', 'Machine');
+        INSERT INTO users (id, name, role, email, points) VALUES ('u1', 'Budi', 'user', 'b@x', 0);
+        INSERT INTO genba_sessions (id, name, status, start_time) VALUES (1, 'Gemba', 'PROGRESS', '2099-01-01');
+    """)
+    connection.commit()
+    connection.close()
+    monkeypatch.setattr(db_backend, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(db_backend, "SQLITE_PATH", path)
+    monkeypatch.setattr(db_backend, "SQLITE_READ_PATH", "")
+    monkeypatch.setattr(embeddings, "_sentence_model", HashingSentenceModel())
+    monkeypatch.setattr(embeddings, "_sentence_model_loaded", True)
+
+    total = [0]
+    set_default_provider(FakeLLMProvider(responses={"root_cause": '["Roll air banjir"]', "scoring": _score(total)}))
+    set_areas_cache(AreasCache(version_file=str(tmp_path / "areas.version")))
+    stats = RootCauseStats()
+    stats.refresh_if_stale(wait=True)  # the warm-up's first load
+    set_root_cause_stats(stats)
+    main.app.dependency_overrides[get_api_key] = lambda: "key"
+    try:
+        def request(method, url, **kwargs):
+            # Through the ASGI app, so dependencies are resolved and released as in production
+            async def send():
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                    return await http.request(method, url, **kwargs)
+            return asyncio.run(send())
+
+        yield request, total
+    finally:
+        main.app.dependency_overrides.clear()
+        set_default_provider(None)
+        set_areas_cache(None)
+        set_root_cause_stats(None)
+
+
+def _acquired(endpoint, call):
+    """Resources acquired by one request, as {resource: count}"""
+    before = {r: resource_acquisitions.value(endpoint=endpoint, resource=r) for r in RESOURCES}
+    response = call()
+    assert response.status_code == 200, response.text
+    after = {r: resource_acquisitions.value(endpoint=endpoint, resource=r) for r in RESOURCES}
+    return {r: after[r] - before[r] for r in RESOURCES if after[r] != before[r]}
+
+
+def test_each_endpoint_acquires_only_the_resources_it_touches(client):
+    request, total = client
+
+    def get(url):
+        return request("GET", url)
+
+    def post(url, json):
+        return request("POST", url, json=json)
+
+    suggest = {"area": "KBA 3", "category": "Machine"}
+    score = {"area": "KBA 3", "problem": "Cetakan kotor", "category": "Machine", "root_causes": ["Rakel aus"],
+             "user_id": "u1"}
+
+    # Cached areas: one connection for the first request, nothing afterwards
+    assert _acquired("areas", lambda: get("/api/areas")) == {"db_primary": 1}
+    assert _acquired("areas", lambda: get("/api/areas")) == {}
+
+    # Statistics are materialized and refreshed in the background: nothing per request
+    assert _acquired("root_cause_stats", lambda: get("/api/root-cause/stats?area=KBA 3&category=Machine")) == {}
+
+    # A known problem is answered from history: no AI model
+    assert _acquired("root_cause_suggest", lambda: post("/api/root-cause/suggest", json={
+        **suggest, "problem": "Cetakan kotor"})) == {"history_db": 1, "db_primary": 1, "embedding_model": 1}
+    assert _acquired("root_cause_suggest", lambda: post("/api/root-cause/suggest", json={
+        **suggest, "problem": "Tinta menetes di unit 5"})) == {
+        "history_db": 1, "db_primary": 1, "embedding_model": 1, "ai_model": 1}
+
+    # A zero score has nothing to write: no attendance database
+    assert _acquired("root_cause_score", lambda: post("/api/root-cause/score", json=score)) == {"ai_model": 1}
+    total[0] = 80
+    assert _acquired("root_cause_score", lambda: post("/api/root-cause/score", json=score)) == {
+        "ai_model": 1, "attendance_db": 1, "db_primary": 1}
+
+    assert _acquired("session_attendees", lambda: get("/api/session/1/attendees")) == {
+        "attendance_db": 1, "db_primary": 1}
@@ -0,0 +1,116 @@
+import json
+import re
+import threading
+
+from app import ai
+from app.ai import RootCauseAI, choose_scoring_mode
+from app.llm_provider import FakeLLMProvider
+from app.metrics import scoring_latency
+
+
+def _score_items(prompt):
+    causes = re.findall(r"^\d+\. (.+)$", prompt, re.MULTILINE)
+    return json.dumps({"scores": [{
+        "root_cause": cause, "spesifisitas": 10, "relevansi": 10, "kejelasan": 10,
+        "actionability": 10, "total_score": 40 + i, "feedback": "ok"
+    } for i, cause in enumerate(causes)]})
+
+
+def _provider(**kwargs):
+    return FakeLLMProvider(responses={
+        "scoring": lambda prompt: json.dumps({**json.loads(_score_items(prompt)), "summary": "single"}),
+        "scoring_items": _score_items,
+        "scoring_summary": '{"summary": "ringkasan"}',
+    }, **kwargs)
+
+
+def test_mode_is_chosen_by_item_count():
+    assert choose_scoring_mode(ai.SCORE_FANOUT_THRESHOLD) == "single"
+    assert choose_scoring_mode(ai.SCORE_FANOUT_THRESHOLD + 1) == "fanout"
+
+
+def test_fanout_scores_chunks_in_parallel_and_keeps_order(monkeypatch):
+    monkeypatch.setattr(ai, "SCORE_CHUNK_SIZE", 2)
+    monkeypatch.setattr(ai, "SCORE_MAX_CONCURRENCY", 3)
+
+    in_flight = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def latency(key, prompt):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        return 0.05
+
+    provider = _provider(latency=latency)
+    original_generate = provider.generate
+
+    def generate(*args, **kwargs):
+        try:
+            return original_generate(*args, **kwargs)
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+
+    provider.generate = generate
+    causes = [f"Penyebab {i}" for i in range(9)]
+    scoring_latency.reset()
+
+    result = RootCauseAI(provider=provider).score_root_causes("KBA 3", "Cetakan kotor", "Material", causes, mode="fanout")
+
+    assert [item["root_cause"] for item in result["scores"]] == causes
+    assert result["summary"] == "ringkasan"
+    keys = [r["instruction_key"] for r in provider.requests]
+    assert keys.count("scoring_items") == 5 and keys[-1] == "scoring_summary"
+    assert in_flight["peak"] == 3
+    assert scoring_latency.count(mode="fanout") == 1
+
+
+def test_failed_chunk_only_zeroes_its_own_items(monkeypatch):
+    monkeypatch.setattr(ai, "SCORE_CHUNK_SIZE", 2)
+    provider = _provider()
+    provider.responses["scoring_items"] = lambda prompt: "rusak" if "Penyebab 0" in prompt else _score_items(prompt)
+
+    result = RootCauseAI(provider=provider).score_root_causes("A", "B", "C", [f"Penyebab {i}" for i in range(4)], mode="fanout")
+
+    assert [item["total_score"] for item in result["scores"]] == [0, 0, 40, 41]
+    assert "error" in result
+
+
+def test_chunk_whose_scores_do_not_match_it_is_zeroed(monkeypatch):
+    monkeypatch.setattr(ai, "SCORE_CHUNK_SIZE", 2)
+    provider = _provider()
+
+    def drop_one(prompt):
+        # The model skipped the second root cause of the first chunk
+        result = json.loads(_score_items(prompt))
+        if "Penyebab 0" in prompt:
+            result["scores"] = result["scores"][:1]
+        return json.dumps(result)
+
+    provider.responses["scoring_items"] = drop_one
+    causes = [f"Penyebab {i}" for i in range(4)]
+    result = RootCauseAI(provider=provider).score_root_causes("A", "B", "C", causes, mode="fanout")
+
+    assert [item["root_cause"] for item in result["scores"]] == causes
+    assert [item["total_score"] for item in result["scores"]] == [0, 0, 40, 41]
+    assert "does not match" in result["error"]
+
+
+def test_reworded_root_causes_keep_their_scores_and_submitted_text(monkeypatch):
+    monkeypatch.setattr(ai, "SCORE_CHUNK_SIZE", 2)
+    provider = _provider()
+    # The model fixes the wording and adds a trailing period
+    provider.responses["scoring_items"] = lambda prompt: _score_items(prompt).replace("penyebab", "Penyebab.")
+    causes = [f"penyebab {i}" for i in range(4)]
+    result = RootCauseAI(provider=provider).score_root_causes("A", "B", "C", causes, mode="fanout")
+
+    assert [item["root_cause"] for item in result["scores"]] == causes
+    assert [item["total_score"] for item in result["scores"]] == [40, 41, 40, 41]
+    assert "error" not in result
+
+
+def test_summary_fallback_without_scores():
+    provider = _provider()
+    provider.responses["scoring_summary"] = "rusak"
+    assert RootCauseAI(provider=provider)._summarize_scores("A", "B", "C", []) == "Ringkasan penilaian tidak tersedia."
@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.llm_provider import FakeLLMProvider
+from app.root_cause_stats import RootCauseStats, format_priors
+
+TODAY = date.today()
+
+
+def _row(id, problem, root_cause, days_ago, area="KBA 3", category="Machine"):
+    return {"id": id, "area": area, "category": category, "problem": problem, "root_cause": root_cause,
+            "created_at": TODAY - timedelta(days=days_ago)}
+
+
+class FakeDB:
+    """Serves root cause rows like DatabaseConnector.get_root_cause_rows_since"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetched = 0
+
+    def get_root_cause_rows_since(self, last_id=0, limit=5000):
+        rows = [r for r in self.rows if r["id"] > last_id][:limit]
+        self.fetched += len(rows)
+        return rows
+
+    def disconnect(self):
+        pass
+
+
+ROWS = [
+    _row(1, "Cetakan kotor", "Rakel aus", 3),
+    _row(2, "Cetakan kotor", "Rakel aus.", 10),
+    _row(3, "Cetakan Kotor!", "rakel sudah aus", 20),
+    _row(4, "Tinta menetes", "Roll air banjir", 30),
+    _row(5, "Tinta menetes di unit 3", "Roll air banjir", 500),
+    _row(6, "Lem bocor", "Nozzle aus", 5, area="Lem Otomatis"),
+    _row(7, "Cetakan kotor", "Campuran tinta salah", 40, category="Material"),
+]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_counts_by_line_category_window_and_problem_type():
+    stats = RootCauseStats()
+    stats.refresh(FakeDB(ROWS), full=True)
+
+    result = stats.query("kba 3", "machine", window_days=365)
+    assert result["total"] == 4
+    assert [(r["root_cause"], r["count"]) for r in result["root_causes"]] == [("Rakel aus", 2), ("rakel sudah aus", 1),
+                                                                             ("Roll air banjir", 1)]
+    assert result["root_causes"][0]["last_seen"] == (TODAY - timedelta(days=3)).isoformat()
+    assert stats.query("KBA 3", "Machine", window_days=0)["total"] == 5
+
+    result = stats.query("KBA 3", "Machine", problem="tinta menetes", window_days=0)
+    assert result["problem_matches"] == 2
+    assert [r["root_cause"] for r in result["problem_root_causes"]] == ["Roll air banjir"]
+
+
+def test_incremental_refresh_loads_only_new_rows_and_rebuild_drops_deleted_ones(monkeypatch):
+    from app import root_cause_stats
+
+    monkeypatch.setattr(root_cause_stats, "STATS_REFRESH_SECONDS", 60)
+    monkeypatch.setattr(root_cause_stats, "STATS_REBUILD_SECONDS", 3600)
+    clock, db = Clock(), FakeDB(ROWS)
+    stats = RootCauseStats(clock=clock, connect=lambda: db)
+    stats.refresh_if_stale(wait=True)
+    assert db.fetched == len(ROWS)
+
+    db.rows.append(_row(8, "Cetakan kotor", "Rakel aus", 0))
+    stats.refresh_if_stale(wait=True)
+    assert stats.query("KBA 3", "Machine")["total"] == 4  # still fresh
+
+    clock.now = 61
+    stats.refresh_if_stale(wait=True)
+    assert db.fetched == len(ROWS) + 1
+    assert stats.query("KBA 3", "Machine")["root_causes"][0]["count"] == 3
+
+    db.rows = [r for r in db.rows if r["id"] != 8]
+    clock.now = 3601
+    stats.refresh_if_stale(wait=True)
+    assert stats.query("KBA 3", "Machine")["root_causes"][0]["count"] == 2
+    assert stats.rows == len(ROWS)
+
+
+def test_failed_reads_keep_the_statistics_and_requests_do_not_wait(monkeypatch):
+    import threading
+    from app import root_cause_stats
+
+    monkeypatch.setattr(root_cause_stats, "STATS_BATCH_SIZE", 3)
+    clock, db = Clock(), FakeDB(ROWS)
+    stats = RootCauseStats(clock=clock, connect=lambda: db)
+    stats.refresh_if_stale(wait=True)
+    before = stats.query("KBA 3", "Machine")
+
+    # The database fails during the hourly rebuild: previous numbers are kept
+    fetch = db.get_root_cause_rows_since
+    db.get_root_cause_rows_since = lambda last_id=0, limit=5000: fetch(last_id, limit) if last_id < 3 else None
+    clock.now = 3601
+    stats.refresh_if_stale(wait=True)
+    assert stats.query("KBA 3", "Machine") == before
+    assert stats.rows == len(ROWS) and stats.watermark == 7
+
+    # A request starts the refresh in the background and reads the current numbers
+    release = threading.Event()
+    db.get_root_cause_rows_since = lambda last_id=0, limit=5000: release.wait(5) and fetch(last_id, limit)
+    stats.refresh_if_stale()
+    assert stats.query("KBA 3", "Machine") == before
+    release.set()
+    stats.refresh_if_stale(wait=True)
+    assert stats.rows == len(ROWS) and stats._rebuilt == 3601
+
+
+def test_priors_are_added_to_the_root_cause_prompt():
+    pytest.importorskip("dotenv")
+    from app.ai import RootCauseAI
+
+    stats = RootCauseStats()
+    stats.refresh(FakeDB(ROWS), full=True)
+    priors = format_priors(stats.query("KBA 3", "Machine", problem="cetakan kotor"))
+    assert "problem serupa" in priors and "Rakel aus | 2" in priors
+    assert format_priors(stats.query("KBA 3", "Environment")) == ""
+
+    provider = FakeLLMProvider(responses={"root_cause": '["Rakel aus"]'})
+    ai = RootCauseAI(provider=provider)
+    assert ai.suggest_root_causes("KBA 3", "Cetakan kotor", "Machine", [], priors=priors) == ["Rakel aus"]
+    assert "Rakel aus | 2" in provider.requests[-1]["prompt"]
+    assert "Root Cause Tersering" not in ai.create_root_cause_prompt("KBA 3", "Cetakan kotor", "Machine", []).text
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.llm_limiter import LLMOverloaded, reset_request_deadline, set_request_deadline
+from app.llm_provider import FakeLLMProvider
+from app.metrics import single_flight_calls
+from app.single_flight import SingleFlight, request_key
+
+HISTORY = [{"area": "KBA 3", "problem": "Cetakan Kotor", "root_cause": "Tinta menetes", "category": "Material"}]
+
+
+def test_request_key_uses_normalized_inputs():
+    assert request_key("op", problem="Tinta  kotor!", area="KBA 3") == request_key("op", area="kba 3", problem="tinta kotor")
+    assert request_key("op", problem="tinta kotor") != request_key("op", problem="tinta bersih")
+    assert request_key("a", problem="x") != request_key("b", problem="x")
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flight = SingleFlight("test_share")
+    calls, started = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return ["Tinta menetes"]
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, "k", compute)
+        started.wait()
+        followers = [pool.submit(flight.do, "k", compute) for _ in range(4)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert results == [["Tinta menetes"]] * 5
+    assert results[1] is not results[0]  # followers get their own copy
+    assert single_flight_calls.value(name="test_share", role="collapsed") == 4
+    assert flight.in_flight() == 0
+    # Finished calls are not cached
+    assert flight.do("k", lambda: ["baru"]) == ["baru"]
+
+
+def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight("test_errors")
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("provider down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(flight.do, "k", fail)
+        started.wait()
+        followers = [pool.submit(flight.do, "k", fail) for _ in range(2)]
+        for future in [leader] + followers:
+            with pytest.raises(RuntimeError, match="provider down"):
+                future.result()
+    assert flight.in_flight() == 0
+
+
+def test_waiting_caller_gives_up_at_its_request_deadline():
+    flight = SingleFlight("test_deadline")
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return ["lambat"]
+
+    def follower():
+        token = set_request_deadline(0.1)
+        try:
+            return flight.do("k", slow)
+        finally:
+            reset_request_deadline(token)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", slow)
+        started.wait()
+        waiting = pool.submit(follower)
+        with pytest.raises(LLMOverloaded) as excinfo:
+            waiting.result(timeout=2)
+        assert excinfo.value.reason == "deadline"
+        # The leader still finishes for its own caller
+        release.set()
+        assert leader.result() == ["lambat"]
+
+
+def test_async_and_sync_callers_coalesce():
+    flight = SingleFlight("test_async")
+    calls, started = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"temporary_actions": ["Bersihkan"], "preventive_actions": ["Ganti roll"]}
+
+    async def run():
+        sync_leader = asyncio.get_running_loop().run_in_executor(None, flight.do, "k", compute)
+        await asyncio.to_thread(started.wait)
+        return await asyncio.gather(sync_leader, *(flight.do_async("k", compute) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_root_cause_ai_sends_one_llm_call_for_identical_requests():
+    pytest.importorskip("dotenv")
+    from app.ai import RootCauseAI
+
+    provider = FakeLLMProvider(responses={"root_cause": '["Tinta menetes"]'}, latency=0.2)
+    ai = RootCauseAI(provider=provider)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(ai.suggest_root_causes, "KBA 3", problem, "Material", HISTORY)
+                   for problem in ("Cetakan kotor", "cetakan  kotor", "Cetakan kotor!", "Cetakan kotor")]
+        results = [f.result() for f in futures]
+    assert results == [["Tinta menetes"]] * 4
+    assert len(provider.requests) == 1
+
+    # A different root cause is a different request
+    provider.responses["action"] = '{"temporary_actions": ["a"], "preventive_actions": ["b"]}'
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(ai.suggest_actions, "KBA 3", "Cetakan kotor", "Tinta menetes", "Material", HISTORY)
+        second = pool.submit(ai.suggest_actions, "KBA 3", "Cetakan kotor", "Roll aus", "Material", HISTORY)
+        first.result(), second.result()
+    assert len(provider.requests) == 3
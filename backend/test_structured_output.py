@@ -0,0 +1,53 @@
+from typing import List
+
+import pytest
+
+from app.metrics import llm_parse_attempts, llm_parse_failures, parse_failure_rate
+from app.schemas import RootCauseScoreResponse, ActionSuggestionResult
+from app.structured_output import StructuredOutputError, extract_json, json_schema_for, parse_structured
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('["a", "b"]', ["a", "b"]),
+    ('```json\n{"a": [1, 2]}\n```', {"a": [1, 2]}),
+    ('Berikut hasilnya: {"a": "kurung } di string"} selesai', {"a": "kurung } di string"}),
+    ('{"a": "escaped \\" quote"}', {"a": 'escaped " quote'}),
+    ('[catatan] ["x"]', ["x"]),
+    ('{"a": [1, 2,],}', {"a": [1, 2]}),
+])
+def test_extract_json(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(StructuredOutputError):
+        extract_json("maaf, tidak bisa")
+
+
+def test_parse_structured_validates_and_counts_failures():
+    llm_parse_attempts.reset()
+    llm_parse_failures.reset()
+
+    actions = parse_structured(
+        '```json\n{"temporary_actions": ["Bersihkan"], "preventive_actions": ["Cek harian"]}\n```',
+        ActionSuggestionResult, "action")
+    assert actions.temporary_actions == ["Bersihkan"]
+
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"temporary_actions": "bukan list"}', ActionSuggestionResult, "action")
+
+    assert parse_structured('["a"]', List[str], "root_cause") == ["a"]
+    assert parse_failure_rate("action") == 0.5
+    assert parse_failure_rate("root_cause") == 0.0
+
+
+def test_parse_structured_skips_candidates_that_do_not_validate():
+    text = 'Contoh format: {"root_cause": "..."}. Jawaban:\n["Rakel aus", "Tinta encer"]'
+    assert parse_structured(text, List[str], "root_cause") == ["Rakel aus", "Tinta encer"]
+    assert extract_json(text) == {"root_cause": "..."}
+
+
+def test_json_schema_inlines_nested_models():
+    schema = json_schema_for(RootCauseScoreResponse)
+    assert "$defs" not in schema
+    assert schema["properties"]["scores"]["items"]["properties"]["total_score"]["type"] == "number"
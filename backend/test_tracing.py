@@ -0,0 +1,60 @@
+import json
+
+from app import ai, tracing
+from app.ai import RootCauseAI
+from app.llm_provider import FakeLLMProvider
+from app.metrics import Histogram, REGISTRY, render_prometheus, stage_latency, request_latency
+
+
+def test_stages_are_attributed_to_the_endpoint():
+    tracing.configure("memory")
+    try:
+        with tracing.trace_endpoint("unit_endpoint"):
+            with tracing.span("sql"):
+                with tracing.span("embed"):
+                    pass
+
+        spans = {s["name"]: s for s in tracing.get_collector().spans()}
+        assert spans["embed"]["parent_id"] == spans["sql"]["span_id"]
+        assert spans["sql"]["parent_id"] == spans["unit_endpoint"]["span_id"]
+        assert len({s["trace_id"] for s in spans.values()}) == 1
+        assert stage_latency.count(endpoint="unit_endpoint", stage="sql") == 1
+        assert request_latency.count(endpoint="unit_endpoint") == 1
+    finally:
+        tracing.configure("none")
+
+
+def test_fanout_workers_report_to_the_calling_endpoint(monkeypatch):
+    monkeypatch.setattr(ai, "SCORE_CHUNK_SIZE", 1)
+    item = {"root_cause": "x", "spesifisitas": 1, "relevansi": 1, "kejelasan": 1,
+            "actionability": 1, "total_score": 4, "feedback": "-"}
+    provider = FakeLLMProvider(responses={
+        # Echo the chunk's root cause, numbered "1. <cause>" in the prompt
+        "scoring_items": lambda prompt: json.dumps(
+            {"scores": [{**item, "root_cause": prompt.split("1. ", 1)[1].split("\n", 1)[0]}]}),
+        "scoring_summary": '{"summary": "ok"}',
+    })
+
+    with tracing.trace_endpoint("unit_fanout"):
+        RootCauseAI(provider=provider).score_root_causes("A", "P", "Man", ["a", "b", "c"], mode="fanout")
+
+    assert stage_latency.count(endpoint="unit_fanout", stage="llm") == 4
+    assert stage_latency.count(endpoint="unit_fanout", stage="parse") == 4
+    assert stage_latency.count(endpoint="unit_fanout", stage="prompt") == 4
+
+
+def test_prometheus_exposition_has_cumulative_buckets():
+    histogram = Histogram("unit_test_seconds", "Test histogram", ("stage",), buckets=(0.1, 1.0))
+    try:
+        histogram.observe(0.05, stage="a")
+        histogram.observe(0.5, stage="a")
+        histogram.observe(5, stage="a")
+        text = render_prometheus()
+    finally:
+        REGISTRY.remove(histogram)
+
+    assert "# TYPE unit_test_seconds histogram" in text
+    assert 'unit_test_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'unit_test_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'unit_test_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'unit_test_seconds_count{stage="a"} 3' in text
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from benchmarks.vector_index import ExactIndex, IVFIndex, Int8Index, available_backends, create_index, normalize
+
+
+def _clustered(n, dim=32, centers=20, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.normal(size=(centers, dim))
+    return means[rng.integers(0, centers, n)] + 0.3 * rng.normal(size=(n, dim))
+
+
+def test_exact_index_matches_brute_force():
+    vectors = _clustered(500)
+    query = vectors[7] + 0.01
+    positions, scores = ExactIndex().build(vectors).search(query, 5)
+
+    expected = np.argsort(-(normalize(vectors) @ normalize(query)))[:5]
+    assert positions.tolist() == expected.tolist()
+    assert positions[0] == 7
+    assert np.all(np.diff(scores) <= 0)
+
+
+@pytest.mark.parametrize("index", [Int8Index(), IVFIndex(nlist=20, nprobe=3, min_size=100)])
+def test_approximate_indexes_keep_high_recall(index):
+    vectors = _clustered(3000)
+    exact = ExactIndex().build(vectors)
+    index.build(vectors)
+
+    recalls = []
+    for query in vectors[:50] + 0.05:
+        expected = set(exact.search(query, 10)[0].tolist())
+        recalls.append(len(expected & set(index.search(query, 10)[0].tolist())) / 10)
+    assert np.mean(recalls) >= 0.9
+    assert len(index) == 3000
+
+
+def test_create_index_validates_the_backend():
+    assert {"exact", "int8", "ivf"} <= set(available_backends())
+    assert isinstance(create_index("exact"), ExactIndex)
+    with pytest.raises(ValueError):
+        create_index("annoy")
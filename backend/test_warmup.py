@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from app import main, warmup
+from app.warmup import Warmup
+
+
+def test_warmup_reports_progress_and_failures():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+
+    def broken():
+        raise RuntimeError("no model")
+
+    state = Warmup([("slow", slow), ("broken", broken)])
+    thread = state.start()
+    assert state.status()["ready"] is False
+
+    release.set()
+    thread.join(5)
+    status = state.status()
+    assert status["ready"] is True and status["degraded"] is True
+    assert status["components"]["slow"]["status"] == "ready"
+    assert status["components"]["broken"]["status"] == "failed"
+    assert status["components"]["broken"]["error"] == "no model"
+
+
+def test_readiness_probe_is_503_until_warm(monkeypatch):
+    release = threading.Event()
+    state = Warmup([("model", lambda: release.wait(5))])
+    monkeypatch.setattr(warmup, "_warmup", state)
+    thread = state.start()
+
+    assert main.health_ready().status_code == 503
+    assert main.health_live() == {"status": "alive"}
+    release.set()
+    thread.join(5)
+    response = main.health_ready()
+    assert response.status_code == 200
+    assert json.loads(response.body)["components"]["model"]["status"] == "ready"
+
+
+def test_importing_the_app_skips_heavy_dependencies():
+    heavy = ["torch", "sentence_transformers", "sklearn", "langchain_core", "langchain_google_genai"]
+    code = f"import sys, app.main; print([m for m in {heavy!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "API_KEY": "test"})
+    assert out.stdout.strip() == "[]"